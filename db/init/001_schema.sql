@@ -121,13 +121,15 @@ CREATE TABLE IF NOT EXISTS msgraph_drive_items (
   sp_list_id text,
   sp_list_item_id text,
   sp_list_item_unique_id text,
+  e_tag text,
+  c_tag text,
   permissions_last_synced_at timestamptz,
   permissions_last_error_at timestamptz,
   permissions_last_error text,
   permissions_last_error_details jsonb,
   synced_at timestamptz,
   deleted_at timestamptz,
-  raw_json jsonb,
+  raw_json jsonb COMPRESSION lz4,
   PRIMARY KEY (drive_id, id)
 );
 
@@ -145,7 +147,7 @@ CREATE TABLE IF NOT EXISTS msgraph_drive_item_permissions (
   inherited_from_id text,
   synced_at timestamptz,
   deleted_at timestamptz,
-  raw_json jsonb,
+  raw_json jsonb COMPRESSION lz4,
   PRIMARY KEY (drive_id, item_id, permission_id)
 );
 
@@ -160,7 +162,7 @@ CREATE TABLE IF NOT EXISTS msgraph_drive_item_permission_grants (
   principal_user_principal_name text,
   synced_at timestamptz,
   deleted_at timestamptz,
-  raw_json jsonb,
+  raw_json jsonb COMPRESSION lz4,
   PRIMARY KEY (drive_id, item_id, permission_id, principal_type, principal_id)
 );
 
@@ -170,15 +172,35 @@ CREATE TABLE IF NOT EXISTS msgraph_group_memberships (
   member_type text NOT NULL,
   synced_at timestamptz,
   deleted_at timestamptz,
-  raw_json jsonb,
+  raw_json jsonb COMPRESSION lz4,
   PRIMARY KEY (group_id, member_id, member_type)
 );
 
+-- Raw payloads of the tables above when GRAPH_RAW_PAYLOADS is archive (payload) or hash (hash only).
+CREATE TABLE IF NOT EXISTS msgraph_raw_payloads (
+  entity_type text NOT NULL,
+  entity_key text[] NOT NULL,
+  payload_hash bytea NOT NULL,
+  payload jsonb COMPRESSION lz4,
+  updated_at timestamptz NOT NULL DEFAULT now(),
+  PRIMARY KEY (entity_type, entity_key)
+) WITH (toast_tuple_target = 128);
+
+-- Per-table policy mode the inline raw_json backlog was last drained under (raw_payload_maintenance).
+CREATE TABLE IF NOT EXISTS msgraph_raw_payload_state (
+  entity_type text PRIMARY KEY,
+  mode text NOT NULL,
+  backlog_cleared_at timestamptz,
+  updated_at timestamptz NOT NULL DEFAULT now()
+);
+
 CREATE TABLE IF NOT EXISTS msgraph_delta_state (
   resource_type text,
   partition_key text,
   delta_link text,
   last_synced_at timestamptz,
+  source_modified_dt timestamptz,
+  source_quota_used bigint,
   PRIMARY KEY (resource_type, partition_key)
 );
 
@@ -768,14 +790,78 @@ CREATE TABLE IF NOT EXISTS mv_refresh_queue (
   attempts int NOT NULL DEFAULT 0
 );
 
+CREATE TABLE IF NOT EXISTS mv_refresh_history (
+  id bigint GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+  mv_name text NOT NULL,
+  run_id uuid,
+  started_at timestamptz NOT NULL,
+  finished_at timestamptz NOT NULL DEFAULT now(),
+  duration_ms int NOT NULL,
+  row_count bigint,
+  outcome text NOT NULL,
+  error text
+);
+
+CREATE INDEX IF NOT EXISTS idx_mv_refresh_history_mv_finished
+ON mv_refresh_history (mv_name, finished_at DESC);
+
+CREATE TABLE IF NOT EXISTS table_change_log (
+  id bigint GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+  table_name text NOT NULL,
+  inserted_rows bigint NOT NULL DEFAULT 0,
+  updated_rows bigint NOT NULL DEFAULT 0,
+  deleted_rows bigint NOT NULL DEFAULT 0,
+  logged_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS table_change_pending (
+  table_name text PRIMARY KEY,
+  inserted_rows bigint NOT NULL DEFAULT 0,
+  updated_rows bigint NOT NULL DEFAULT 0,
+  deleted_rows bigint NOT NULL DEFAULT 0,
+  first_changed_at timestamptz NOT NULL DEFAULT now()
+);
+
+-- Statement triggers pass the columns to ignore when deciding whether an UPDATE changed a row
+-- (bookkeeping columns no MV reads, and synced_at where MVs only show it as a last-sync time, since
+-- every crawl rewrites it). Statements that change nothing do not invalidate anything.
+-- Sessions with sentinel.defer_mv_invalidation=on (the worker) only log the change counts; the
+-- worker releases them into mv_refresh_queue itself.
 CREATE OR REPLACE FUNCTION refresh_impacted_mvs() RETURNS trigger AS $$
 DECLARE
   mv record;
+  ignored_columns text[] := COALESCE(TG_ARGV::text[], ARRAY[]::text[]);
+  inserted_count bigint := 0;
+  updated_count bigint := 0;
+  deleted_count bigint := 0;
 BEGIN
   IF pg_trigger_depth() > 1 THEN
     RETURN NULL;
   END IF;
 
+  IF TG_OP = 'INSERT' THEN
+    SELECT count(*) INTO inserted_count FROM new_rows;
+  ELSIF TG_OP = 'UPDATE' THEN
+    SELECT count(*) INTO updated_count
+    FROM (
+      SELECT to_jsonb(n) - ignored_columns FROM new_rows n
+      EXCEPT ALL
+      SELECT to_jsonb(o) - ignored_columns FROM old_rows o
+    ) changed;
+  ELSE
+    SELECT count(*) INTO deleted_count FROM old_rows;
+  END IF;
+
+  IF inserted_count + updated_count + deleted_count = 0 THEN
+    RETURN NULL;
+  END IF;
+
+  IF current_setting('sentinel.defer_mv_invalidation', true) = 'on' THEN
+    INSERT INTO table_change_log (table_name, inserted_rows, updated_rows, deleted_rows)
+    VALUES (TG_TABLE_NAME, inserted_count, updated_count, deleted_count);
+    RETURN NULL;
+  END IF;
+
   FOR mv IN SELECT DISTINCT mv_name FROM mv_dependencies WHERE table_name = TG_TABLE_NAME LOOP
     INSERT INTO mv_refresh_queue (mv_name, dirty_since)
     VALUES (mv.mv_name, now())
@@ -812,6 +898,16 @@ WHERE deleted_at IS NULL AND link_scope IS NOT NULL;
 CREATE INDEX IF NOT EXISTS idx_drive_item_permission_grants_active_item
 ON msgraph_drive_item_permission_grants (drive_id, item_id)
 WHERE deleted_at IS NULL;
+CREATE INDEX IF NOT EXISTS idx_drive_items_deleted_raw_json
+ON msgraph_drive_items (deleted_at) WHERE raw_json IS NOT NULL AND deleted_at IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_drive_item_permissions_deleted_raw_json
+ON msgraph_drive_item_permissions (deleted_at) WHERE raw_json IS NOT NULL AND deleted_at IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_drive_item_permission_grants_deleted_raw_json
+ON msgraph_drive_item_permission_grants (deleted_at) WHERE raw_json IS NOT NULL AND deleted_at IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_group_memberships_deleted_raw_json
+ON msgraph_group_memberships (deleted_at) WHERE raw_json IS NOT NULL AND deleted_at IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_raw_payloads_updated_at
+ON msgraph_raw_payloads (entity_type, updated_at);
 CREATE INDEX IF NOT EXISTS idx_copilot_sessions_started
 ON copilot_sessions (started_at DESC)
 WHERE deleted_at IS NULL;
@@ -863,35 +959,123 @@ ON m365_copilot_interaction_aggregates (source_app, bucket_start_utc DESC);
 CREATE INDEX IF NOT EXISTS idx_m365_copilot_interactions_user_bucket
 ON m365_copilot_interaction_aggregates (entra_user_id, bucket_start_utc DESC);
 
--- Triggered MV queue invalidation on base table changes (statement-level)
-CREATE TRIGGER trg_refresh_mvs_users
-AFTER INSERT OR UPDATE OR DELETE ON msgraph_users
+-- Triggered MV queue invalidation on base table changes (statement-level, transition tables)
+CREATE TRIGGER trg_refresh_mvs_users_insert
+AFTER INSERT ON msgraph_users
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs('availability_checked_at');
+
+CREATE TRIGGER trg_refresh_mvs_users_update
+AFTER UPDATE ON msgraph_users
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs('availability_checked_at', 'synced_at', 'raw_json');
+
+CREATE TRIGGER trg_refresh_mvs_users_delete
+AFTER DELETE ON msgraph_users
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs('availability_checked_at');
+
+CREATE TRIGGER trg_refresh_mvs_groups_insert
+AFTER INSERT ON msgraph_groups
+REFERENCING NEW TABLE AS new_rows
 FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs();
 
-CREATE TRIGGER trg_refresh_mvs_groups
-AFTER INSERT OR UPDATE OR DELETE ON msgraph_groups
+CREATE TRIGGER trg_refresh_mvs_groups_update
+AFTER UPDATE ON msgraph_groups
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs('synced_at', 'raw_json');
+
+CREATE TRIGGER trg_refresh_mvs_groups_delete
+AFTER DELETE ON msgraph_groups
+REFERENCING OLD TABLE AS old_rows
 FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs();
 
-CREATE TRIGGER trg_refresh_mvs_sites
-AFTER INSERT OR UPDATE OR DELETE ON msgraph_sites
+CREATE TRIGGER trg_refresh_mvs_sites_insert
+AFTER INSERT ON msgraph_sites
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs('availability_checked_at');
+
+CREATE TRIGGER trg_refresh_mvs_sites_update
+AFTER UPDATE ON msgraph_sites
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs('availability_checked_at', 'synced_at');
+
+CREATE TRIGGER trg_refresh_mvs_sites_delete
+AFTER DELETE ON msgraph_sites
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs('availability_checked_at');
+
+CREATE TRIGGER trg_refresh_mvs_drives_insert
+AFTER INSERT ON msgraph_drives
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs('availability_checked_at');
+
+CREATE TRIGGER trg_refresh_mvs_drives_update
+AFTER UPDATE ON msgraph_drives
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs('availability_checked_at', 'synced_at', 'raw_json');
+
+CREATE TRIGGER trg_refresh_mvs_drives_delete
+AFTER DELETE ON msgraph_drives
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs('availability_checked_at');
+
+CREATE TRIGGER trg_refresh_mvs_drive_items_insert
+AFTER INSERT ON msgraph_drive_items
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs('permissions_last_synced_at');
+
+CREATE TRIGGER trg_refresh_mvs_drive_items_update
+AFTER UPDATE ON msgraph_drive_items
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs('permissions_last_synced_at', 'synced_at', 'raw_json');
+
+CREATE TRIGGER trg_refresh_mvs_drive_items_delete
+AFTER DELETE ON msgraph_drive_items
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs('permissions_last_synced_at');
+
+CREATE TRIGGER trg_refresh_mvs_item_permissions_insert
+AFTER INSERT ON msgraph_drive_item_permissions
+REFERENCING NEW TABLE AS new_rows
 FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs();
 
-CREATE TRIGGER trg_refresh_mvs_drives
-AFTER INSERT OR UPDATE OR DELETE ON msgraph_drives
+CREATE TRIGGER trg_refresh_mvs_item_permissions_update
+AFTER UPDATE ON msgraph_drive_item_permissions
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs('raw_json');
+
+CREATE TRIGGER trg_refresh_mvs_item_permissions_delete
+AFTER DELETE ON msgraph_drive_item_permissions
+REFERENCING OLD TABLE AS old_rows
 FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs();
 
-CREATE TRIGGER trg_refresh_mvs_drive_items
-AFTER INSERT OR UPDATE OR DELETE ON msgraph_drive_items
+CREATE TRIGGER trg_refresh_mvs_item_permission_grants_insert
+AFTER INSERT ON msgraph_drive_item_permission_grants
+REFERENCING NEW TABLE AS new_rows
 FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs();
 
-CREATE TRIGGER trg_refresh_mvs_item_permissions
-AFTER INSERT OR UPDATE OR DELETE ON msgraph_drive_item_permissions
+CREATE TRIGGER trg_refresh_mvs_item_permission_grants_update
+AFTER UPDATE ON msgraph_drive_item_permission_grants
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs('raw_json');
+
+CREATE TRIGGER trg_refresh_mvs_item_permission_grants_delete
+AFTER DELETE ON msgraph_drive_item_permission_grants
+REFERENCING OLD TABLE AS old_rows
 FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs();
 
-CREATE TRIGGER trg_refresh_mvs_item_permission_grants
-AFTER INSERT OR UPDATE OR DELETE ON msgraph_drive_item_permission_grants
+CREATE TRIGGER trg_refresh_mvs_group_memberships_insert
+AFTER INSERT ON msgraph_group_memberships
+REFERENCING NEW TABLE AS new_rows
 FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs();
 
-CREATE TRIGGER trg_refresh_mvs_group_memberships
-AFTER INSERT OR UPDATE OR DELETE ON msgraph_group_memberships
+CREATE TRIGGER trg_refresh_mvs_group_memberships_update
+AFTER UPDATE ON msgraph_group_memberships
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs('synced_at', 'raw_json');
+
+CREATE TRIGGER trg_refresh_mvs_group_memberships_delete
+AFTER DELETE ON msgraph_group_memberships
+REFERENCING OLD TABLE AS old_rows
 FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs();
@@ -20,7 +20,9 @@ CREATE TABLE IF NOT EXISTS job_runs (
   started_at timestamptz,
   finished_at timestamptz,
   status text,
-  error text
+  error text,
+  cancel_requested_at timestamptz,
+  deadline_at timestamptz
 );
 
 CREATE TABLE IF NOT EXISTS job_run_logs (
@@ -32,6 +34,41 @@ CREATE TABLE IF NOT EXISTS job_run_logs (
   context jsonb
 );
 
+CREATE TABLE IF NOT EXISTS job_leases (
+  job_id uuid PRIMARY KEY REFERENCES jobs(job_id) ON DELETE CASCADE,
+  run_id uuid NOT NULL,
+  owner text NOT NULL,
+  acquired_at timestamptz NOT NULL DEFAULT now(),
+  heartbeat_at timestamptz NOT NULL DEFAULT now(),
+  leased_until timestamptz NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_job_leases_run_id
+ON job_leases (run_id);
+
+CREATE TABLE IF NOT EXISTS job_queue (
+  job_id uuid PRIMARY KEY REFERENCES jobs(job_id) ON DELETE CASCADE,
+  priority integer NOT NULL DEFAULT 0,
+  trigger text NOT NULL,
+  actor jsonb,
+  requested_at timestamptz NOT NULL DEFAULT now(),
+  request_count integer NOT NULL DEFAULT 1,
+  deadline_seconds integer
+);
+
+CREATE TABLE IF NOT EXISTS job_resume_cursors (
+  job_type text NOT NULL,
+  cursor_key text NOT NULL,
+  cursor jsonb NOT NULL,
+  run_id uuid,
+  stop_reason text,
+  updated_at timestamptz NOT NULL DEFAULT now(),
+  PRIMARY KEY (job_type, cursor_key)
+);
+
+CREATE INDEX IF NOT EXISTS idx_job_queue_dispatch
+ON job_queue (priority DESC, requested_at);
+
 CREATE INDEX IF NOT EXISTS idx_job_run_logs_run_id_logged_at
 ON job_run_logs (run_id, logged_at DESC);
 
@@ -49,10 +86,56 @@ CREATE TRIGGER trg_touch_job_runs
 AFTER INSERT OR UPDATE OR DELETE ON job_runs
 FOR EACH ROW EXECUTE FUNCTION touch_table_update_log();
 
-CREATE TRIGGER trg_refresh_mvs_job_runs
-AFTER INSERT OR UPDATE OR DELETE ON job_runs
+CREATE TRIGGER trg_refresh_mvs_job_runs_insert
+AFTER INSERT ON job_runs
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs();
+
+CREATE TRIGGER trg_refresh_mvs_job_runs_update
+AFTER UPDATE ON job_runs
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
 FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs();
 
+CREATE TRIGGER trg_refresh_mvs_job_runs_delete
+AFTER DELETE ON job_runs
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs();
+
+-- Scheduler wakeups: the worker LISTENs on ps_scheduler_wakeup instead of waiting out its poll
+-- interval. mv_refresh_queue only notifies when rows were actually queued, and sessions that set
+-- sentinel.suppress_scheduler_wakeup=on (an mv_refresh run queueing views it refreshes itself) stay quiet.
+CREATE OR REPLACE FUNCTION notify_scheduler_wakeup() RETURNS trigger AS $$
+BEGIN
+  IF TG_TABLE_NAME = 'mv_refresh_queue' THEN
+    IF current_setting('sentinel.suppress_scheduler_wakeup', true) = 'on' THEN
+      RETURN NULL;
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM new_rows) THEN
+      RETURN NULL;
+    END IF;
+  END IF;
+
+  PERFORM pg_notify(
+    'ps_scheduler_wakeup',
+    json_build_object('table_name', TG_TABLE_NAME, 'operation', TG_OP)::text
+  );
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_notify_scheduler_job_schedules
+AFTER INSERT OR UPDATE OR DELETE ON job_schedules
+FOR EACH STATEMENT EXECUTE FUNCTION notify_scheduler_wakeup();
+
+CREATE TRIGGER trg_notify_scheduler_mv_refresh_queue
+AFTER INSERT ON mv_refresh_queue
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION notify_scheduler_wakeup();
+
+CREATE TRIGGER trg_notify_scheduler_job_queue
+AFTER INSERT OR UPDATE ON job_queue
+FOR EACH STATEMENT EXECUTE FUNCTION notify_scheduler_wakeup();
+
 -- Seed jobs (no default schedules)
 INSERT INTO jobs (job_id, job_type, tenant_id, config, enabled)
 VALUES
@@ -71,6 +154,14 @@ INSERT INTO jobs (job_id, job_type, tenant_id, config, enabled)
 SELECT gen_random_uuid(), 'copilot_usage_sync', 'default', '{"interaction_mode": "all_time", "interaction_lookback_days": 7, "interaction_page_size": 100, "interaction_max_users": 0}'::jsonb, true
 WHERE NOT EXISTS (SELECT 1 FROM jobs WHERE job_type = 'copilot_usage_sync');
 
+INSERT INTO jobs (job_id, job_type, tenant_id, config, enabled)
+SELECT gen_random_uuid(), 'activity_rollup_reconcile', 'default', '{"window_days": 0, "repair": true}'::jsonb, true
+WHERE NOT EXISTS (SELECT 1 FROM jobs WHERE job_type = 'activity_rollup_reconcile');
+
+INSERT INTO jobs (job_id, job_type, tenant_id, config, enabled)
+SELECT gen_random_uuid(), 'raw_payload_maintenance', 'default', '{}'::jsonb, true
+WHERE NOT EXISTS (SELECT 1 FROM jobs WHERE job_type = 'raw_payload_maintenance');
+
 INSERT INTO job_schedules (schedule_id, job_id, cron_expr, next_run_at, enabled)
 SELECT gen_random_uuid(), j.job_id, '*/5 * * * *', NULL, true
 FROM jobs j
@@ -88,3 +179,15 @@ SELECT gen_random_uuid(), j.job_id, '0 6 * * *', NULL, true
 FROM jobs j
 LEFT JOIN job_schedules js ON js.job_id = j.job_id
 WHERE j.job_type = 'copilot_usage_sync' AND js.job_id IS NULL;
+
+INSERT INTO job_schedules (schedule_id, job_id, cron_expr, next_run_at, enabled)
+SELECT gen_random_uuid(), j.job_id, '0 3 * * 0', NULL, true
+FROM jobs j
+LEFT JOIN job_schedules js ON js.job_id = j.job_id
+WHERE j.job_type = 'activity_rollup_reconcile' AND js.job_id IS NULL;
+
+INSERT INTO job_schedules (schedule_id, job_id, cron_expr, next_run_at, enabled)
+SELECT gen_random_uuid(), j.job_id, '0 4 * * *', NULL, true
+FROM jobs j
+LEFT JOIN job_schedules js ON js.job_id = j.job_id
+WHERE j.job_type = 'raw_payload_maintenance' AND js.job_id IS NULL;
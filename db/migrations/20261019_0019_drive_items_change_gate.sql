@@ -0,0 +1,5 @@
+-- Drive markers recorded at the last successful drive_items delta commit, used to skip
+-- delta requests for drives whose lastModifiedDateTime and quota usage have not moved.
+ALTER TABLE msgraph_delta_state
+  ADD COLUMN IF NOT EXISTS source_modified_dt timestamptz,
+  ADD COLUMN IF NOT EXISTS source_quota_used bigint;
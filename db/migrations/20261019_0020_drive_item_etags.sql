@@ -0,0 +1,5 @@
+-- Graph eTag/cTag per drive item so unchanged items returned by delta skip the upsert and keep
+-- their permission sync state.
+ALTER TABLE msgraph_drive_items
+  ADD COLUMN IF NOT EXISTS e_tag text,
+  ADD COLUMN IF NOT EXISTS c_tag text;
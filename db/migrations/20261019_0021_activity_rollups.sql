@@ -0,0 +1,386 @@
+-- Replace the daily activity materialized views with incrementally maintained rollup tables.
+-- The old views were fully re-aggregated from msgraph_drive_items / permissions after every ingest.
+
+DROP MATERIALIZED VIEW IF EXISTS mv_msgraph_item_link_daily;
+DROP MATERIALIZED VIEW IF EXISTS mv_msgraph_user_activity_daily;
+DROP MATERIALIZED VIEW IF EXISTS mv_msgraph_site_activity_daily;
+
+DELETE FROM mv_dependencies
+WHERE mv_name IN ('mv_msgraph_site_activity_daily', 'mv_msgraph_user_activity_daily', 'mv_msgraph_item_link_daily');
+
+DELETE FROM mv_refresh_queue
+WHERE mv_name IN ('mv_msgraph_site_activity_daily', 'mv_msgraph_user_activity_daily', 'mv_msgraph_item_link_daily');
+
+DELETE FROM mv_refresh_log
+WHERE mv_name IN ('mv_msgraph_site_activity_daily', 'mv_msgraph_user_activity_daily', 'mv_msgraph_item_link_daily');
+
+-- Daily activity rollups are maintained incrementally instead of fully re-aggregated.
+-- Statement triggers on the ingest tables record which (site, day), (user, day) and (drive, item)
+-- buckets a statement touched; the worker recomputes only those buckets
+-- (worker/app/jobs/activity_rollups.py). The *_source views keep the full definitions for
+-- the periodic reconcile job and for backfills.
+
+CREATE OR REPLACE VIEW msgraph_site_activity_daily_source AS
+WITH mods AS (
+  SELECT
+    CASE WHEN d.site_id IS NULL THEN 'drive:' || d.id ELSE d.site_id END AS site_key,
+    date_trunc('day', i.modified_dt) AS day,
+    COUNT(*)::int AS modified_items,
+    COUNT(DISTINCT i.last_modified_by_user_id) FILTER (WHERE i.last_modified_by_user_id IS NOT NULL)::int AS active_users
+  FROM msgraph_drive_items i
+  JOIN msgraph_drives d ON d.id = i.drive_id
+  WHERE i.deleted_at IS NULL
+    AND d.deleted_at IS NULL
+    AND i.modified_dt IS NOT NULL
+    AND LOWER(COALESCE(d.web_url, '')) NOT LIKE '%cachelibrary%'
+  GROUP BY CASE WHEN d.site_id IS NULL THEN 'drive:' || d.id ELSE d.site_id END, date_trunc('day', i.modified_dt)
+),
+shares AS (
+  SELECT
+    CASE WHEN d.site_id IS NULL THEN 'drive:' || d.id ELSE d.site_id END AS site_key,
+    date_trunc('day', p.synced_at) AS day,
+    COUNT(*)::int AS shares
+  FROM msgraph_drive_item_permissions p
+  JOIN msgraph_drives d ON d.id = p.drive_id
+  WHERE p.deleted_at IS NULL
+    AND d.deleted_at IS NULL
+    AND p.link_scope IS NOT NULL
+    AND p.synced_at IS NOT NULL
+    AND LOWER(COALESCE(d.web_url, '')) NOT LIKE '%cachelibrary%'
+  GROUP BY CASE WHEN d.site_id IS NULL THEN 'drive:' || d.id ELSE d.site_id END, date_trunc('day', p.synced_at)
+)
+SELECT
+  COALESCE(m.site_key, s.site_key) AS site_key,
+  COALESCE(m.day, s.day) AS day,
+  COALESCE(m.modified_items, 0) AS modified_items,
+  COALESCE(m.active_users, 0) AS active_users,
+  COALESCE(s.shares, 0) AS shares
+FROM mods m
+FULL OUTER JOIN shares s ON s.site_key = m.site_key AND s.day = m.day;
+
+CREATE OR REPLACE VIEW msgraph_user_activity_daily_source AS
+SELECT
+  i.last_modified_by_user_id AS user_id,
+  date_trunc('day', i.modified_dt) AS day,
+  COUNT(*)::int AS modified_items,
+  COUNT(DISTINCT COALESCE(d.site_id, d.id))::int AS sites_touched,
+  MAX(i.modified_dt) AS last_modified_dt
+FROM msgraph_drive_items i
+JOIN msgraph_drives d ON d.id = i.drive_id
+WHERE i.deleted_at IS NULL AND d.deleted_at IS NULL
+  AND i.last_modified_by_user_id IS NOT NULL
+  AND i.modified_dt IS NOT NULL
+  AND LOWER(COALESCE(d.web_url, '')) NOT LIKE '%cachelibrary%'
+GROUP BY i.last_modified_by_user_id, date_trunc('day', i.modified_dt);
+
+CREATE OR REPLACE VIEW msgraph_item_link_daily_source AS
+SELECT
+  p.drive_id,
+  p.item_id,
+  p.link_scope,
+  date_trunc('day', p.synced_at) AS day,
+  COUNT(*)::int AS link_shares
+FROM msgraph_drive_item_permissions p
+JOIN msgraph_drives d ON d.id = p.drive_id
+WHERE p.deleted_at IS NULL
+  AND p.link_scope IS NOT NULL
+  AND p.synced_at IS NOT NULL
+  AND d.deleted_at IS NULL
+  AND LOWER(COALESCE(d.web_url, '')) NOT LIKE '%cachelibrary%'
+GROUP BY p.drive_id, p.item_id, p.link_scope, date_trunc('day', p.synced_at);
+
+CREATE TABLE IF NOT EXISTS msgraph_site_activity_daily (
+  site_key text NOT NULL,
+  day timestamptz NOT NULL,
+  modified_items int NOT NULL DEFAULT 0,
+  active_users int NOT NULL DEFAULT 0,
+  shares int NOT NULL DEFAULT 0,
+  PRIMARY KEY (site_key, day)
+);
+
+CREATE TABLE IF NOT EXISTS msgraph_user_activity_daily (
+  user_id text NOT NULL,
+  day timestamptz NOT NULL,
+  modified_items int NOT NULL DEFAULT 0,
+  sites_touched int NOT NULL DEFAULT 0,
+  last_modified_dt timestamptz,
+  PRIMARY KEY (user_id, day)
+);
+
+CREATE TABLE IF NOT EXISTS msgraph_item_link_daily (
+  drive_id text NOT NULL,
+  item_id text NOT NULL,
+  link_scope text NOT NULL,
+  day timestamptz NOT NULL,
+  link_shares int NOT NULL DEFAULT 0,
+  PRIMARY KEY (drive_id, item_id, link_scope, day)
+);
+
+CREATE INDEX IF NOT EXISTS msgraph_item_link_daily_scope_day_idx
+ON msgraph_item_link_daily (link_scope, day);
+
+CREATE TABLE IF NOT EXISTS activity_rollup_dirty_site_days (
+  site_key text NOT NULL,
+  day timestamptz NOT NULL,
+  PRIMARY KEY (site_key, day)
+);
+
+CREATE TABLE IF NOT EXISTS activity_rollup_dirty_user_days (
+  user_id text NOT NULL,
+  day timestamptz NOT NULL,
+  PRIMARY KEY (user_id, day)
+);
+
+CREATE TABLE IF NOT EXISTS activity_rollup_dirty_items (
+  drive_id text NOT NULL,
+  item_id text NOT NULL,
+  PRIMARY KEY (drive_id, item_id)
+);
+
+-- Drives whose site, availability or URL changed: every bucket of the drive is rebuilt, including
+-- the buckets of the site keys it belonged to before the change.
+CREATE TABLE IF NOT EXISTS activity_rollup_dirty_drives (
+  drive_id text PRIMARY KEY,
+  old_site_keys text[] NOT NULL DEFAULT '{}'
+);
+
+-- Bucket lookups used by the incremental recompute.
+CREATE INDEX IF NOT EXISTS idx_drive_items_drive_modified
+ON msgraph_drive_items (drive_id, modified_dt)
+WHERE deleted_at IS NULL AND modified_dt IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_drive_items_modified_by_user_modified
+ON msgraph_drive_items (last_modified_by_user_id, modified_dt)
+WHERE deleted_at IS NULL AND last_modified_by_user_id IS NOT NULL AND modified_dt IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_drive_item_permissions_link_synced
+ON msgraph_drive_item_permissions (drive_id, synced_at)
+WHERE deleted_at IS NULL AND link_scope IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_drives_site_key
+ON msgraph_drives ((CASE WHEN site_id IS NULL THEN 'drive:' || id ELSE site_id END));
+
+CREATE OR REPLACE FUNCTION mark_drive_item_activity_rollups() RETURNS trigger AS $$
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    WITH touched AS (
+      SELECT drive_id, modified_dt, last_modified_by_user_id FROM new_rows
+    ), site_days AS (
+      INSERT INTO activity_rollup_dirty_site_days (site_key, day)
+      SELECT DISTINCT CASE WHEN d.site_id IS NULL THEN 'drive:' || d.id ELSE d.site_id END, date_trunc('day', t.modified_dt)
+      FROM touched t
+      JOIN msgraph_drives d ON d.id = t.drive_id
+      WHERE t.modified_dt IS NOT NULL
+      ON CONFLICT DO NOTHING
+    )
+    INSERT INTO activity_rollup_dirty_user_days (user_id, day)
+    SELECT DISTINCT t.last_modified_by_user_id, date_trunc('day', t.modified_dt)
+    FROM touched t
+    WHERE t.last_modified_by_user_id IS NOT NULL AND t.modified_dt IS NOT NULL
+    ON CONFLICT DO NOTHING;
+  ELSIF TG_OP = 'DELETE' THEN
+    WITH touched AS (
+      SELECT drive_id, modified_dt, last_modified_by_user_id FROM old_rows
+    ), site_days AS (
+      INSERT INTO activity_rollup_dirty_site_days (site_key, day)
+      SELECT DISTINCT CASE WHEN d.site_id IS NULL THEN 'drive:' || d.id ELSE d.site_id END, date_trunc('day', t.modified_dt)
+      FROM touched t
+      JOIN msgraph_drives d ON d.id = t.drive_id
+      WHERE t.modified_dt IS NOT NULL
+      ON CONFLICT DO NOTHING
+    )
+    INSERT INTO activity_rollup_dirty_user_days (user_id, day)
+    SELECT DISTINCT t.last_modified_by_user_id, date_trunc('day', t.modified_dt)
+    FROM touched t
+    WHERE t.last_modified_by_user_id IS NOT NULL AND t.modified_dt IS NOT NULL
+    ON CONFLICT DO NOTHING;
+  ELSE
+    -- Upserts rewrite every column; only rows whose bucket inputs changed mark anything.
+    WITH changed AS (
+      SELECT o.drive_id, o.modified_dt AS old_modified_dt, o.last_modified_by_user_id AS old_user_id,
+             n.modified_dt AS new_modified_dt, n.last_modified_by_user_id AS new_user_id
+      FROM old_rows o
+      JOIN new_rows n ON n.drive_id = o.drive_id AND n.id = o.id
+      WHERE (o.modified_dt, o.last_modified_by_user_id, o.deleted_at)
+        IS DISTINCT FROM (n.modified_dt, n.last_modified_by_user_id, n.deleted_at)
+    ), touched AS (
+      SELECT drive_id, old_modified_dt AS modified_dt, old_user_id AS last_modified_by_user_id FROM changed
+      UNION
+      SELECT drive_id, new_modified_dt, new_user_id FROM changed
+    ), site_days AS (
+      INSERT INTO activity_rollup_dirty_site_days (site_key, day)
+      SELECT DISTINCT CASE WHEN d.site_id IS NULL THEN 'drive:' || d.id ELSE d.site_id END, date_trunc('day', t.modified_dt)
+      FROM touched t
+      JOIN msgraph_drives d ON d.id = t.drive_id
+      WHERE t.modified_dt IS NOT NULL
+      ON CONFLICT DO NOTHING
+    )
+    INSERT INTO activity_rollup_dirty_user_days (user_id, day)
+    SELECT DISTINCT t.last_modified_by_user_id, date_trunc('day', t.modified_dt)
+    FROM touched t
+    WHERE t.last_modified_by_user_id IS NOT NULL AND t.modified_dt IS NOT NULL
+    ON CONFLICT DO NOTHING;
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION mark_permission_activity_rollups() RETURNS trigger AS $$
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    WITH touched AS (
+      SELECT drive_id, item_id, synced_at FROM new_rows WHERE link_scope IS NOT NULL
+    ), site_days AS (
+      INSERT INTO activity_rollup_dirty_site_days (site_key, day)
+      SELECT DISTINCT CASE WHEN d.site_id IS NULL THEN 'drive:' || d.id ELSE d.site_id END, date_trunc('day', t.synced_at)
+      FROM touched t
+      JOIN msgraph_drives d ON d.id = t.drive_id
+      WHERE t.synced_at IS NOT NULL
+      ON CONFLICT DO NOTHING
+    )
+    INSERT INTO activity_rollup_dirty_items (drive_id, item_id)
+    SELECT DISTINCT drive_id, item_id FROM touched
+    ON CONFLICT DO NOTHING;
+  ELSIF TG_OP = 'DELETE' THEN
+    WITH touched AS (
+      SELECT drive_id, item_id, synced_at FROM old_rows WHERE link_scope IS NOT NULL
+    ), site_days AS (
+      INSERT INTO activity_rollup_dirty_site_days (site_key, day)
+      SELECT DISTINCT CASE WHEN d.site_id IS NULL THEN 'drive:' || d.id ELSE d.site_id END, date_trunc('day', t.synced_at)
+      FROM touched t
+      JOIN msgraph_drives d ON d.id = t.drive_id
+      WHERE t.synced_at IS NOT NULL
+      ON CONFLICT DO NOTHING
+    )
+    INSERT INTO activity_rollup_dirty_items (drive_id, item_id)
+    SELECT DISTINCT drive_id, item_id FROM touched
+    ON CONFLICT DO NOTHING;
+  ELSE
+    WITH changed AS (
+      SELECT o.drive_id, o.item_id,
+             o.link_scope AS old_link_scope, o.synced_at AS old_synced_at,
+             n.link_scope AS new_link_scope, n.synced_at AS new_synced_at
+      FROM old_rows o
+      JOIN new_rows n ON n.drive_id = o.drive_id AND n.item_id = o.item_id AND n.permission_id = o.permission_id
+      WHERE (o.link_scope, o.synced_at, o.deleted_at) IS DISTINCT FROM (n.link_scope, n.synced_at, n.deleted_at)
+    ), touched AS (
+      SELECT drive_id, item_id, old_synced_at AS synced_at FROM changed WHERE old_link_scope IS NOT NULL
+      UNION
+      SELECT drive_id, item_id, new_synced_at FROM changed WHERE new_link_scope IS NOT NULL
+    ), site_days AS (
+      INSERT INTO activity_rollup_dirty_site_days (site_key, day)
+      SELECT DISTINCT CASE WHEN d.site_id IS NULL THEN 'drive:' || d.id ELSE d.site_id END, date_trunc('day', t.synced_at)
+      FROM touched t
+      JOIN msgraph_drives d ON d.id = t.drive_id
+      WHERE t.synced_at IS NOT NULL
+      ON CONFLICT DO NOTHING
+    )
+    INSERT INTO activity_rollup_dirty_items (drive_id, item_id)
+    SELECT DISTINCT drive_id, item_id FROM touched
+    ON CONFLICT DO NOTHING;
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION mark_drive_activity_rollups() RETURNS trigger AS $$
+BEGIN
+  IF TG_OP = 'DELETE' THEN
+    INSERT INTO activity_rollup_dirty_drives AS dirty (drive_id, old_site_keys)
+    SELECT o.id, ARRAY[CASE WHEN o.site_id IS NULL THEN 'drive:' || o.id ELSE o.site_id END]
+    FROM old_rows o
+    ON CONFLICT (drive_id) DO UPDATE
+    SET old_site_keys = ARRAY(SELECT DISTINCT unnest(dirty.old_site_keys || EXCLUDED.old_site_keys));
+  ELSE
+    INSERT INTO activity_rollup_dirty_drives AS dirty (drive_id, old_site_keys)
+    SELECT o.id, ARRAY[CASE WHEN o.site_id IS NULL THEN 'drive:' || o.id ELSE o.site_id END]
+    FROM old_rows o
+    JOIN new_rows n ON n.id = o.id
+    WHERE (o.site_id, o.deleted_at, o.web_url) IS DISTINCT FROM (n.site_id, n.deleted_at, n.web_url)
+    ON CONFLICT (drive_id) DO UPDATE
+    SET old_site_keys = ARRAY(SELECT DISTINCT unnest(dirty.old_site_keys || EXCLUDED.old_site_keys));
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Transition tables allow one event per trigger, hence one trigger per operation.
+DROP TRIGGER IF EXISTS trg_activity_rollups_drive_items_insert ON msgraph_drive_items;
+CREATE TRIGGER trg_activity_rollups_drive_items_insert
+AFTER INSERT ON msgraph_drive_items
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION mark_drive_item_activity_rollups();
+
+DROP TRIGGER IF EXISTS trg_activity_rollups_drive_items_update ON msgraph_drive_items;
+CREATE TRIGGER trg_activity_rollups_drive_items_update
+AFTER UPDATE ON msgraph_drive_items
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION mark_drive_item_activity_rollups();
+
+DROP TRIGGER IF EXISTS trg_activity_rollups_drive_items_delete ON msgraph_drive_items;
+CREATE TRIGGER trg_activity_rollups_drive_items_delete
+AFTER DELETE ON msgraph_drive_items
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION mark_drive_item_activity_rollups();
+
+DROP TRIGGER IF EXISTS trg_activity_rollups_permissions_insert ON msgraph_drive_item_permissions;
+CREATE TRIGGER trg_activity_rollups_permissions_insert
+AFTER INSERT ON msgraph_drive_item_permissions
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION mark_permission_activity_rollups();
+
+DROP TRIGGER IF EXISTS trg_activity_rollups_permissions_update ON msgraph_drive_item_permissions;
+CREATE TRIGGER trg_activity_rollups_permissions_update
+AFTER UPDATE ON msgraph_drive_item_permissions
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION mark_permission_activity_rollups();
+
+DROP TRIGGER IF EXISTS trg_activity_rollups_permissions_delete ON msgraph_drive_item_permissions;
+CREATE TRIGGER trg_activity_rollups_permissions_delete
+AFTER DELETE ON msgraph_drive_item_permissions
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION mark_permission_activity_rollups();
+
+DROP TRIGGER IF EXISTS trg_activity_rollups_drives_update ON msgraph_drives;
+CREATE TRIGGER trg_activity_rollups_drives_update
+AFTER UPDATE ON msgraph_drives
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION mark_drive_activity_rollups();
+
+DROP TRIGGER IF EXISTS trg_activity_rollups_drives_delete ON msgraph_drives;
+CREATE TRIGGER trg_activity_rollups_drives_delete
+AFTER DELETE ON msgraph_drives
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION mark_drive_activity_rollups();
+
+-- Backfill once from the full definitions; later changes flow through the dirty bucket tables.
+INSERT INTO msgraph_site_activity_daily (site_key, day, modified_items, active_users, shares)
+SELECT site_key, day, modified_items, active_users, shares
+FROM msgraph_site_activity_daily_source
+ON CONFLICT DO NOTHING;
+
+INSERT INTO msgraph_user_activity_daily (user_id, day, modified_items, sites_touched, last_modified_dt)
+SELECT user_id, day, modified_items, sites_touched, last_modified_dt
+FROM msgraph_user_activity_daily_source
+ON CONFLICT DO NOTHING;
+
+INSERT INTO msgraph_item_link_daily (drive_id, item_id, link_scope, day, link_shares)
+SELECT drive_id, item_id, link_scope, day, link_shares
+FROM msgraph_item_link_daily_source
+ON CONFLICT DO NOTHING;
+
+INSERT INTO mv_refresh_log (mv_name, last_refreshed_at) VALUES
+  ('msgraph_site_activity_daily', now()),
+  ('msgraph_user_activity_daily', now()),
+  ('msgraph_item_link_daily', now())
+ON CONFLICT (mv_name) DO UPDATE SET last_refreshed_at = EXCLUDED.last_refreshed_at;
+
+INSERT INTO jobs (job_id, job_type, tenant_id, config, enabled)
+SELECT gen_random_uuid(), 'activity_rollup_reconcile', 'default', '{"window_days": 0, "repair": true}'::jsonb, true
+WHERE NOT EXISTS (SELECT 1 FROM jobs WHERE job_type = 'activity_rollup_reconcile');
+
+INSERT INTO job_schedules (schedule_id, job_id, cron_expr, next_run_at, enabled)
+SELECT gen_random_uuid(), j.job_id, '0 3 * * 0', NULL, true
+FROM jobs j
+LEFT JOIN job_schedules js ON js.job_id = j.job_id
+WHERE j.job_type = 'activity_rollup_reconcile' AND js.job_id IS NULL;
@@ -0,0 +1,16 @@
+-- Per-refresh duration, row count and outcome for cost-aware MV refresh scheduling and p50/p95 reporting.
+
+CREATE TABLE IF NOT EXISTS mv_refresh_history (
+  id bigint GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+  mv_name text NOT NULL,
+  run_id uuid,
+  started_at timestamptz NOT NULL,
+  finished_at timestamptz NOT NULL DEFAULT now(),
+  duration_ms int NOT NULL,
+  row_count bigint,
+  outcome text NOT NULL,
+  error text
+);
+
+CREATE INDEX IF NOT EXISTS idx_mv_refresh_history_mv_finished
+ON mv_refresh_history (mv_name, finished_at DESC);
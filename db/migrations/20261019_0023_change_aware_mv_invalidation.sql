@@ -0,0 +1,244 @@
+-- Change-aware MV invalidation.
+-- refresh_impacted_mvs() used to queue every dependent MV after any statement on an ingest table,
+-- including statements that matched no rows. It now counts the rows a statement really inserted,
+-- updated (ignoring bookkeeping columns passed as trigger arguments) or deleted, and worker
+-- sessions (sentinel.defer_mv_invalidation=on) log those counts in table_change_log so the worker
+-- can queue only MVs whose sources changed, optionally above a change-volume threshold.
+
+CREATE TABLE IF NOT EXISTS table_change_log (
+  id bigint GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+  table_name text NOT NULL,
+  inserted_rows bigint NOT NULL DEFAULT 0,
+  updated_rows bigint NOT NULL DEFAULT 0,
+  deleted_rows bigint NOT NULL DEFAULT 0,
+  logged_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS table_change_pending (
+  table_name text PRIMARY KEY,
+  inserted_rows bigint NOT NULL DEFAULT 0,
+  updated_rows bigint NOT NULL DEFAULT 0,
+  deleted_rows bigint NOT NULL DEFAULT 0,
+  first_changed_at timestamptz NOT NULL DEFAULT now()
+);
+
+-- Statement triggers pass the columns to ignore when deciding whether an UPDATE changed a row
+-- (bookkeeping columns no MV reads). Statements that change nothing do not invalidate anything.
+-- Sessions with sentinel.defer_mv_invalidation=on (the worker) only log the change counts; the
+-- worker releases them into mv_refresh_queue itself.
+CREATE OR REPLACE FUNCTION refresh_impacted_mvs() RETURNS trigger AS $$
+DECLARE
+  mv record;
+  ignored_columns text[] := COALESCE(TG_ARGV::text[], ARRAY[]::text[]);
+  inserted_count bigint := 0;
+  updated_count bigint := 0;
+  deleted_count bigint := 0;
+BEGIN
+  IF pg_trigger_depth() > 1 THEN
+    RETURN NULL;
+  END IF;
+
+  IF TG_OP = 'INSERT' THEN
+    SELECT count(*) INTO inserted_count FROM new_rows;
+  ELSIF TG_OP = 'UPDATE' THEN
+    SELECT count(*) INTO updated_count
+    FROM (
+      SELECT to_jsonb(n) - ignored_columns FROM new_rows n
+      EXCEPT ALL
+      SELECT to_jsonb(o) - ignored_columns FROM old_rows o
+    ) changed;
+  ELSE
+    SELECT count(*) INTO deleted_count FROM old_rows;
+  END IF;
+
+  IF inserted_count + updated_count + deleted_count = 0 THEN
+    RETURN NULL;
+  END IF;
+
+  IF current_setting('sentinel.defer_mv_invalidation', true) = 'on' THEN
+    INSERT INTO table_change_log (table_name, inserted_rows, updated_rows, deleted_rows)
+    VALUES (TG_TABLE_NAME, inserted_count, updated_count, deleted_count);
+    RETURN NULL;
+  END IF;
+
+  FOR mv IN SELECT DISTINCT mv_name FROM mv_dependencies WHERE table_name = TG_TABLE_NAME LOOP
+    INSERT INTO mv_refresh_queue (mv_name, dirty_since)
+    VALUES (mv.mv_name, now())
+    ON CONFLICT (mv_name) DO NOTHING;
+  END LOOP;
+
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_refresh_mvs_users ON msgraph_users;
+DROP TRIGGER IF EXISTS trg_refresh_mvs_groups ON msgraph_groups;
+DROP TRIGGER IF EXISTS trg_refresh_mvs_sites ON msgraph_sites;
+DROP TRIGGER IF EXISTS trg_refresh_mvs_drives ON msgraph_drives;
+DROP TRIGGER IF EXISTS trg_refresh_mvs_drive_items ON msgraph_drive_items;
+DROP TRIGGER IF EXISTS trg_refresh_mvs_item_permissions ON msgraph_drive_item_permissions;
+DROP TRIGGER IF EXISTS trg_refresh_mvs_item_permission_grants ON msgraph_drive_item_permission_grants;
+DROP TRIGGER IF EXISTS trg_refresh_mvs_group_memberships ON msgraph_group_memberships;
+DROP TRIGGER IF EXISTS trg_refresh_mvs_job_runs ON job_runs;
+
+DROP TRIGGER IF EXISTS trg_refresh_mvs_users_insert ON msgraph_users;
+CREATE TRIGGER trg_refresh_mvs_users_insert
+AFTER INSERT ON msgraph_users
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs('availability_checked_at');
+
+DROP TRIGGER IF EXISTS trg_refresh_mvs_users_update ON msgraph_users;
+CREATE TRIGGER trg_refresh_mvs_users_update
+AFTER UPDATE ON msgraph_users
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs('availability_checked_at');
+
+DROP TRIGGER IF EXISTS trg_refresh_mvs_users_delete ON msgraph_users;
+CREATE TRIGGER trg_refresh_mvs_users_delete
+AFTER DELETE ON msgraph_users
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs('availability_checked_at');
+
+DROP TRIGGER IF EXISTS trg_refresh_mvs_groups_insert ON msgraph_groups;
+CREATE TRIGGER trg_refresh_mvs_groups_insert
+AFTER INSERT ON msgraph_groups
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs();
+
+DROP TRIGGER IF EXISTS trg_refresh_mvs_groups_update ON msgraph_groups;
+CREATE TRIGGER trg_refresh_mvs_groups_update
+AFTER UPDATE ON msgraph_groups
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs();
+
+DROP TRIGGER IF EXISTS trg_refresh_mvs_groups_delete ON msgraph_groups;
+CREATE TRIGGER trg_refresh_mvs_groups_delete
+AFTER DELETE ON msgraph_groups
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs();
+
+DROP TRIGGER IF EXISTS trg_refresh_mvs_sites_insert ON msgraph_sites;
+CREATE TRIGGER trg_refresh_mvs_sites_insert
+AFTER INSERT ON msgraph_sites
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs('availability_checked_at');
+
+DROP TRIGGER IF EXISTS trg_refresh_mvs_sites_update ON msgraph_sites;
+CREATE TRIGGER trg_refresh_mvs_sites_update
+AFTER UPDATE ON msgraph_sites
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs('availability_checked_at');
+
+DROP TRIGGER IF EXISTS trg_refresh_mvs_sites_delete ON msgraph_sites;
+CREATE TRIGGER trg_refresh_mvs_sites_delete
+AFTER DELETE ON msgraph_sites
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs('availability_checked_at');
+
+DROP TRIGGER IF EXISTS trg_refresh_mvs_drives_insert ON msgraph_drives;
+CREATE TRIGGER trg_refresh_mvs_drives_insert
+AFTER INSERT ON msgraph_drives
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs('availability_checked_at');
+
+DROP TRIGGER IF EXISTS trg_refresh_mvs_drives_update ON msgraph_drives;
+CREATE TRIGGER trg_refresh_mvs_drives_update
+AFTER UPDATE ON msgraph_drives
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs('availability_checked_at');
+
+DROP TRIGGER IF EXISTS trg_refresh_mvs_drives_delete ON msgraph_drives;
+CREATE TRIGGER trg_refresh_mvs_drives_delete
+AFTER DELETE ON msgraph_drives
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs('availability_checked_at');
+
+DROP TRIGGER IF EXISTS trg_refresh_mvs_drive_items_insert ON msgraph_drive_items;
+CREATE TRIGGER trg_refresh_mvs_drive_items_insert
+AFTER INSERT ON msgraph_drive_items
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs('permissions_last_synced_at');
+
+DROP TRIGGER IF EXISTS trg_refresh_mvs_drive_items_update ON msgraph_drive_items;
+CREATE TRIGGER trg_refresh_mvs_drive_items_update
+AFTER UPDATE ON msgraph_drive_items
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs('permissions_last_synced_at');
+
+DROP TRIGGER IF EXISTS trg_refresh_mvs_drive_items_delete ON msgraph_drive_items;
+CREATE TRIGGER trg_refresh_mvs_drive_items_delete
+AFTER DELETE ON msgraph_drive_items
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs('permissions_last_synced_at');
+
+DROP TRIGGER IF EXISTS trg_refresh_mvs_item_permissions_insert ON msgraph_drive_item_permissions;
+CREATE TRIGGER trg_refresh_mvs_item_permissions_insert
+AFTER INSERT ON msgraph_drive_item_permissions
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs();
+
+DROP TRIGGER IF EXISTS trg_refresh_mvs_item_permissions_update ON msgraph_drive_item_permissions;
+CREATE TRIGGER trg_refresh_mvs_item_permissions_update
+AFTER UPDATE ON msgraph_drive_item_permissions
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs();
+
+DROP TRIGGER IF EXISTS trg_refresh_mvs_item_permissions_delete ON msgraph_drive_item_permissions;
+CREATE TRIGGER trg_refresh_mvs_item_permissions_delete
+AFTER DELETE ON msgraph_drive_item_permissions
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs();
+
+DROP TRIGGER IF EXISTS trg_refresh_mvs_item_permission_grants_insert ON msgraph_drive_item_permission_grants;
+CREATE TRIGGER trg_refresh_mvs_item_permission_grants_insert
+AFTER INSERT ON msgraph_drive_item_permission_grants
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs();
+
+DROP TRIGGER IF EXISTS trg_refresh_mvs_item_permission_grants_update ON msgraph_drive_item_permission_grants;
+CREATE TRIGGER trg_refresh_mvs_item_permission_grants_update
+AFTER UPDATE ON msgraph_drive_item_permission_grants
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs();
+
+DROP TRIGGER IF EXISTS trg_refresh_mvs_item_permission_grants_delete ON msgraph_drive_item_permission_grants;
+CREATE TRIGGER trg_refresh_mvs_item_permission_grants_delete
+AFTER DELETE ON msgraph_drive_item_permission_grants
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs();
+
+DROP TRIGGER IF EXISTS trg_refresh_mvs_group_memberships_insert ON msgraph_group_memberships;
+CREATE TRIGGER trg_refresh_mvs_group_memberships_insert
+AFTER INSERT ON msgraph_group_memberships
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs();
+
+DROP TRIGGER IF EXISTS trg_refresh_mvs_group_memberships_update ON msgraph_group_memberships;
+CREATE TRIGGER trg_refresh_mvs_group_memberships_update
+AFTER UPDATE ON msgraph_group_memberships
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs();
+
+DROP TRIGGER IF EXISTS trg_refresh_mvs_group_memberships_delete ON msgraph_group_memberships;
+CREATE TRIGGER trg_refresh_mvs_group_memberships_delete
+AFTER DELETE ON msgraph_group_memberships
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs();
+
+DROP TRIGGER IF EXISTS trg_refresh_mvs_job_runs_insert ON job_runs;
+CREATE TRIGGER trg_refresh_mvs_job_runs_insert
+AFTER INSERT ON job_runs
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs();
+
+DROP TRIGGER IF EXISTS trg_refresh_mvs_job_runs_update ON job_runs;
+CREATE TRIGGER trg_refresh_mvs_job_runs_update
+AFTER UPDATE ON job_runs
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs();
+
+DROP TRIGGER IF EXISTS trg_refresh_mvs_job_runs_delete ON job_runs;
+CREATE TRIGGER trg_refresh_mvs_job_runs_delete
+AFTER DELETE ON job_runs
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs();
@@ -0,0 +1,33 @@
+-- Event-driven scheduler wakeups.
+-- The scheduler used to poll job_schedules every SCHEDULER_POLL_SECONDS. Changes to schedules and
+-- new mv_refresh_queue entries now wake it through pg_notify('ps_scheduler_wakeup', ...).
+
+CREATE OR REPLACE FUNCTION notify_scheduler_wakeup() RETURNS trigger AS $$
+BEGIN
+  IF TG_TABLE_NAME = 'mv_refresh_queue' THEN
+    IF current_setting('sentinel.suppress_scheduler_wakeup', true) = 'on' THEN
+      RETURN NULL;
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM new_rows) THEN
+      RETURN NULL;
+    END IF;
+  END IF;
+
+  PERFORM pg_notify(
+    'ps_scheduler_wakeup',
+    json_build_object('table_name', TG_TABLE_NAME, 'operation', TG_OP)::text
+  );
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_notify_scheduler_job_schedules ON job_schedules;
+CREATE TRIGGER trg_notify_scheduler_job_schedules
+AFTER INSERT OR UPDATE OR DELETE ON job_schedules
+FOR EACH STATEMENT EXECUTE FUNCTION notify_scheduler_wakeup();
+
+DROP TRIGGER IF EXISTS trg_notify_scheduler_mv_refresh_queue ON mv_refresh_queue;
+CREATE TRIGGER trg_notify_scheduler_mv_refresh_queue
+AFTER INSERT ON mv_refresh_queue
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION notify_scheduler_wakeup();
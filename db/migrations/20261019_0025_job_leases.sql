@@ -0,0 +1,15 @@
+-- Job leases replace session advisory locks for job runs.
+-- A run owns its job's lease row; the worker renews leased_until while the run is active and the
+-- scheduler fails runs whose lease expired, so no connection stays open for the length of a job.
+
+CREATE TABLE IF NOT EXISTS job_leases (
+  job_id uuid PRIMARY KEY REFERENCES jobs(job_id) ON DELETE CASCADE,
+  run_id uuid NOT NULL,
+  owner text NOT NULL,
+  acquired_at timestamptz NOT NULL DEFAULT now(),
+  heartbeat_at timestamptz NOT NULL DEFAULT now(),
+  leased_until timestamptz NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_job_leases_run_id
+ON job_leases (run_id);
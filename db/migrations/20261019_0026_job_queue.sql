@@ -0,0 +1,20 @@
+-- Persistent job queue. Schedules and run-now requests become queue rows; the scheduler dispatches
+-- them by priority (higher first, then request order) onto the executor pool. One row per job, so a
+-- repeated request while the job is still pending coalesces into the existing row.
+
+CREATE TABLE IF NOT EXISTS job_queue (
+  job_id uuid PRIMARY KEY REFERENCES jobs(job_id) ON DELETE CASCADE,
+  priority integer NOT NULL DEFAULT 0,
+  trigger text NOT NULL,
+  actor jsonb,
+  requested_at timestamptz NOT NULL DEFAULT now(),
+  request_count integer NOT NULL DEFAULT 1
+);
+
+CREATE INDEX IF NOT EXISTS idx_job_queue_dispatch
+ON job_queue (priority DESC, requested_at);
+
+DROP TRIGGER IF EXISTS trg_notify_scheduler_job_queue ON job_queue;
+CREATE TRIGGER trg_notify_scheduler_job_queue
+AFTER INSERT OR UPDATE ON job_queue
+FOR EACH STATEMENT EXECUTE FUNCTION notify_scheduler_wakeup();
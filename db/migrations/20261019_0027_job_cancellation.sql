@@ -0,0 +1,20 @@
+-- Cooperative cancellation and run deadlines. A cancel request is recorded on the run row so any
+-- worker's lease heartbeat can pick it up; deadline_at records the time budget the run started with.
+-- Jobs that stop early finish as 'partial' and leave a resume cursor for the next run.
+
+ALTER TABLE job_runs
+  ADD COLUMN IF NOT EXISTS cancel_requested_at timestamptz,
+  ADD COLUMN IF NOT EXISTS deadline_at timestamptz;
+
+ALTER TABLE job_queue
+  ADD COLUMN IF NOT EXISTS deadline_seconds integer;
+
+CREATE TABLE IF NOT EXISTS job_resume_cursors (
+  job_type text NOT NULL,
+  cursor_key text NOT NULL,
+  cursor jsonb NOT NULL,
+  run_id uuid,
+  stop_reason text,
+  updated_at timestamptz NOT NULL DEFAULT now(),
+  PRIMARY KEY (job_type, cursor_key)
+);
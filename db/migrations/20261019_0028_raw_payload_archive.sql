@@ -0,0 +1,44 @@
+-- Raw Graph payload policy (GRAPH_RAW_PAYLOADS). Outside the default inline mode the worker leaves
+-- raw_json NULL on the high-volume inventory tables and keeps either the lz4-compressed payload or
+-- only its sha256 here, one row per entity, so the hot tables stay narrow. Existing inline payloads
+-- are moved over in bounded chunks by the raw_payload_maintenance job (migration 0029).
+
+CREATE TABLE IF NOT EXISTS msgraph_raw_payloads (
+  entity_type text NOT NULL,
+  entity_key text[] NOT NULL,
+  payload_hash bytea NOT NULL,
+  payload jsonb COMPRESSION lz4,
+  updated_at timestamptz NOT NULL DEFAULT now(),
+  PRIMARY KEY (entity_type, entity_key)
+) WITH (toast_tuple_target = 128);
+
+-- Payloads still stored inline compress better with lz4 as they are rewritten.
+ALTER TABLE msgraph_drive_items ALTER COLUMN raw_json SET COMPRESSION lz4;
+ALTER TABLE msgraph_drive_item_permissions ALTER COLUMN raw_json SET COMPRESSION lz4;
+ALTER TABLE msgraph_drive_item_permission_grants ALTER COLUMN raw_json SET COMPRESSION lz4;
+ALTER TABLE msgraph_group_memberships ALTER COLUMN raw_json SET COMPRESSION lz4;
+
+-- No MV reads raw_json on these tables, so moving or pruning payloads must not invalidate MVs.
+DROP TRIGGER IF EXISTS trg_refresh_mvs_drive_items_update ON msgraph_drive_items;
+CREATE TRIGGER trg_refresh_mvs_drive_items_update
+AFTER UPDATE ON msgraph_drive_items
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs('permissions_last_synced_at', 'raw_json');
+
+DROP TRIGGER IF EXISTS trg_refresh_mvs_item_permissions_update ON msgraph_drive_item_permissions;
+CREATE TRIGGER trg_refresh_mvs_item_permissions_update
+AFTER UPDATE ON msgraph_drive_item_permissions
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs('raw_json');
+
+DROP TRIGGER IF EXISTS trg_refresh_mvs_item_permission_grants_update ON msgraph_drive_item_permission_grants;
+CREATE TRIGGER trg_refresh_mvs_item_permission_grants_update
+AFTER UPDATE ON msgraph_drive_item_permission_grants
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs('raw_json');
+
+DROP TRIGGER IF EXISTS trg_refresh_mvs_group_memberships_update ON msgraph_group_memberships;
+CREATE TRIGGER trg_refresh_mvs_group_memberships_update
+AFTER UPDATE ON msgraph_group_memberships
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs('raw_json');
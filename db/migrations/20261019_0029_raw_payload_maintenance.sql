@@ -0,0 +1,34 @@
+-- Raw payload maintenance runs as its own scheduled job instead of at the end of every graph_ingest.
+-- msgraph_raw_payload_state remembers, per table, the policy mode rows were last moved under, so a
+-- table whose inline backlog is drained is not rescanned until GRAPH_RAW_PAYLOADS changes.
+
+CREATE TABLE IF NOT EXISTS msgraph_raw_payload_state (
+  entity_type text PRIMARY KEY,
+  mode text NOT NULL,
+  backlog_cleared_at timestamptz,
+  updated_at timestamptz NOT NULL DEFAULT now()
+);
+
+-- Retention only looks at deleted rows that still carry an inline payload.
+CREATE INDEX IF NOT EXISTS idx_drive_items_deleted_raw_json
+ON msgraph_drive_items (deleted_at) WHERE raw_json IS NOT NULL AND deleted_at IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_drive_item_permissions_deleted_raw_json
+ON msgraph_drive_item_permissions (deleted_at) WHERE raw_json IS NOT NULL AND deleted_at IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_drive_item_permission_grants_deleted_raw_json
+ON msgraph_drive_item_permission_grants (deleted_at) WHERE raw_json IS NOT NULL AND deleted_at IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_group_memberships_deleted_raw_json
+ON msgraph_group_memberships (deleted_at) WHERE raw_json IS NOT NULL AND deleted_at IS NOT NULL;
+
+-- Archived payloads are only rewritten by live upserts, so retention can skip recently updated ones.
+CREATE INDEX IF NOT EXISTS idx_raw_payloads_updated_at
+ON msgraph_raw_payloads (entity_type, updated_at);
+
+INSERT INTO jobs (job_id, job_type, tenant_id, config, enabled)
+SELECT gen_random_uuid(), 'raw_payload_maintenance', 'default', '{}'::jsonb, true
+WHERE NOT EXISTS (SELECT 1 FROM jobs WHERE job_type = 'raw_payload_maintenance');
+
+INSERT INTO job_schedules (schedule_id, job_id, cron_expr, next_run_at, enabled)
+SELECT gen_random_uuid(), j.job_id, '0 4 * * *', NULL, true
+FROM jobs j
+LEFT JOIN job_schedules js ON js.job_id = j.job_id
+WHERE j.job_type = 'raw_payload_maintenance' AND js.job_id IS NULL;
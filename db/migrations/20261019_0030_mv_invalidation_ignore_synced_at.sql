@@ -0,0 +1,42 @@
+-- Every crawl rewrites synced_at on the rows it sees, so refresh_impacted_mvs() counted every
+-- crawled row as changed and the change-volume threshold never held anything back. The UPDATE
+-- triggers now also ignore synced_at where MVs only show it as a last-sync time (permission and
+-- grant synced_at feed share dates and stay compared), and raw_json where no MV reads it, which
+-- also keeps the wide payloads out of the row comparison. Sites keep raw_json: MVs read it.
+-- The *_last_synced_at columns of mv_msgraph_inventory_summary follow with the next real change.
+
+DROP TRIGGER IF EXISTS trg_refresh_mvs_users_update ON msgraph_users;
+CREATE TRIGGER trg_refresh_mvs_users_update
+AFTER UPDATE ON msgraph_users
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs('availability_checked_at', 'synced_at', 'raw_json');
+
+DROP TRIGGER IF EXISTS trg_refresh_mvs_groups_update ON msgraph_groups;
+CREATE TRIGGER trg_refresh_mvs_groups_update
+AFTER UPDATE ON msgraph_groups
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs('synced_at', 'raw_json');
+
+DROP TRIGGER IF EXISTS trg_refresh_mvs_sites_update ON msgraph_sites;
+CREATE TRIGGER trg_refresh_mvs_sites_update
+AFTER UPDATE ON msgraph_sites
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs('availability_checked_at', 'synced_at');
+
+DROP TRIGGER IF EXISTS trg_refresh_mvs_drives_update ON msgraph_drives;
+CREATE TRIGGER trg_refresh_mvs_drives_update
+AFTER UPDATE ON msgraph_drives
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs('availability_checked_at', 'synced_at', 'raw_json');
+
+DROP TRIGGER IF EXISTS trg_refresh_mvs_drive_items_update ON msgraph_drive_items;
+CREATE TRIGGER trg_refresh_mvs_drive_items_update
+AFTER UPDATE ON msgraph_drive_items
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs('permissions_last_synced_at', 'synced_at', 'raw_json');
+
+DROP TRIGGER IF EXISTS trg_refresh_mvs_group_memberships_update ON msgraph_group_memberships;
+CREATE TRIGGER trg_refresh_mvs_group_memberships_update
+AFTER UPDATE ON msgraph_group_memberships
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_impacted_mvs('synced_at', 'raw_json');
@@ -97,7 +97,7 @@ async function ActivityPage({ searchParams }: { searchParams?: Promise<SearchPar
           COALESCE(SUM(d.modified_items), 0)::int AS modified_items,
           COALESCE(SUM(d.active_users), 0)::int AS active_users,
           COALESCE(SUM(d.shares), 0)::int AS shares
-        FROM mv_msgraph_site_activity_daily d
+        FROM msgraph_site_activity_daily d
         JOIN base b ON b.site_key = d.site_key
         ${windowStart ? `WHERE d.day >= date_trunc('day', $${params.length + 1}::timestamptz)` : ""}
         GROUP BY d.site_key
@@ -115,7 +115,7 @@ async function ActivityPage({ searchParams }: { searchParams?: Promise<SearchPar
           COALESCE(SUM(d.modified_items), 0)::int AS modified_items,
           COALESCE(SUM(d.active_users), 0)::int AS active_users,
           COALESCE(SUM(d.shares), 0)::int AS shares
-        FROM mv_msgraph_site_activity_daily d
+        FROM msgraph_site_activity_daily d
         JOIN base b ON b.site_key = d.site_key
         ${windowStart ? `WHERE d.day >= date_trunc('day', $1::timestamptz)` : ""}
         GROUP BY d.site_key
@@ -218,7 +218,7 @@ async function RiskPage({ searchParams }: { searchParams?: Promise<SearchParams>
         COUNT(*)::int AS total
       FROM (
         SELECT i.drive_id, i.id
-        FROM mv_msgraph_item_link_daily d
+        FROM msgraph_item_link_daily d
         JOIN msgraph_drive_items i ON i.drive_id = d.drive_id AND i.id = d.item_id
         JOIN msgraph_drives dr ON dr.id = i.drive_id
         WHERE d.link_scope = 'anonymous' AND i.deleted_at IS NULL AND dr.deleted_at IS NULL
@@ -235,7 +235,7 @@ async function RiskPage({ searchParams }: { searchParams?: Promise<SearchParams>
         COUNT(*)::int AS total
       FROM (
         SELECT i.drive_id, i.id
-        FROM mv_msgraph_item_link_daily d
+        FROM msgraph_item_link_daily d
         JOIN msgraph_drive_items i ON i.drive_id = d.drive_id AND i.id = d.item_id
         JOIN msgraph_drives dr ON dr.id = i.drive_id
         WHERE d.link_scope = 'organization' AND i.deleted_at IS NULL AND dr.deleted_at IS NULL
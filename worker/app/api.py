@@ -1,11 +1,12 @@
 from http import HTTPStatus
-from threading import Thread
-from flask import Flask, g, jsonify, request
+from flask import Flask, Response, g, jsonify, request
 
 from app import db
 from app.auth import require_internal_token
 from app.conditional_access import ConditionalAccessManager, CAResult
 from app.heartbeat import get_heartbeat_status, is_heartbeat_healthy
+from app.job_progress import get_progress, open_progress_stream
+from app.jobs.mv_refresh import get_mv_refresh_stats
 from app.license import (
     LicenseFeatureError,
     get_current_license,
@@ -13,8 +14,9 @@ from app.license import (
     get_license_lookup_failure_summary,
     require_license_feature,
 )
+from app.metrics import render_metrics
 from app.runtime_logger import emit
-from app.scheduler import get_scheduler_status, run_job_once
+from app.scheduler import JOB_QUEUE_MAX_PRIORITY, cancel_job_run, get_scheduler_status, run_job_once
 from app.utils import log_audit_event
 
 
@@ -134,9 +136,12 @@ def create_app():
             """
             SELECT j.job_id, j.job_type, j.enabled,
                    js.schedule_id, js.cron_expr, js.next_run_at, js.enabled AS schedule_enabled,
-                   m.run_id, m.started_at, m.finished_at, m.status, m.status AS latest_run_status, m.error
+                   m.run_id, m.started_at, m.finished_at, m.status, m.status AS latest_run_status, m.error,
+                   q.priority AS queued_priority, q.trigger AS queued_trigger,
+                   q.requested_at AS queued_at, q.request_count AS queued_request_count
             FROM jobs j
             LEFT JOIN job_schedules js ON js.job_id = j.job_id
+            LEFT JOIN job_queue q ON q.job_id = j.job_id
             LEFT JOIN LATERAL (
                 SELECT run_id, started_at, finished_at, status, error
                 FROM job_runs
@@ -149,6 +154,45 @@ def create_app():
         )
         return jsonify({"jobs": rows, "license": _safe_license_summary("Jobs status")})
 
+    @app.get("/jobs/progress")
+    @require_internal_token
+    def jobs_progress():
+        run_id = (request.args.get("run_id") or "").strip() or None
+        runs = get_progress(run_id)
+        if run_id and not runs:
+            return jsonify({"error": "run_not_found"}), 404
+        return jsonify({"runs": runs})
+
+    @app.get("/jobs/progress/stream")
+    @require_internal_token
+    def jobs_progress_stream():
+        run_id = (request.args.get("run_id") or "").strip() or None
+        if run_id and not get_progress(run_id):
+            return jsonify({"error": "run_not_found"}), 404
+        stream = open_progress_stream(run_id)
+        if stream is None:
+            return jsonify({"error": "too_many_progress_streams"}), 503, {"Retry-After": "5"}
+        return Response(
+            stream,
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    @app.get("/metrics")
+    @require_internal_token
+    def metrics():
+        return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+    @app.get("/mv-refresh/stats")
+    @require_internal_token
+    def mv_refresh_stats():
+        try:
+            days = int(request.args.get("days", "7"))
+        except ValueError:
+            return jsonify({"error": "invalid_days"}), 400
+        days = max(1, min(days, 90))
+        return jsonify({"days": days, "views": get_mv_refresh_stats(days=days)})
+
     @app.post("/jobs/run-now")
     @require_internal_token
     def run_now():
@@ -157,6 +201,22 @@ def create_app():
         if not job_id:
             return jsonify({"error": "job_id_required"}), 400
 
+        priority = body.get("priority")
+        if priority is not None:
+            try:
+                priority = max(0, min(int(priority), JOB_QUEUE_MAX_PRIORITY))
+            except (TypeError, ValueError):
+                return jsonify({"error": "invalid_priority"}), 400
+
+        deadline_seconds = body.get("deadline_seconds")
+        if deadline_seconds is not None:
+            try:
+                deadline_seconds = int(deadline_seconds)
+            except (TypeError, ValueError):
+                deadline_seconds = 0
+            if deadline_seconds <= 0:
+                return jsonify({"error": "invalid_deadline_seconds"}), 400
+
         job = db.fetch_one("SELECT job_id, job_type FROM jobs WHERE job_id = %s", [job_id])
         if not job:
             return jsonify({"error": "job_not_found"}), 404
@@ -175,14 +235,52 @@ def create_app():
             entity_type="job",
             entity_id=job_id,
             actor=actor,
-            details={"job_type": job["job_type"]},
+            details={"job_type": job["job_type"], "priority": priority, "deadline_seconds": deadline_seconds},
+        )
+
+        queued = run_job_once(job, actor, priority=priority, deadline_seconds=deadline_seconds)
+        if queued is None:
+            return jsonify({"error": "job_run_blocked"}), 403
+
+        return (
+            jsonify(
+                {
+                    "status": "queued",
+                    "priority": queued["priority"],
+                    "coalesced": queued["coalesced"],
+                    "request_count": queued["request_count"],
+                }
+            ),
+            202,
         )
 
-        thread = Thread(target=run_job_once, args=(job, actor))
-        thread.daemon = True
-        thread.start()
+    @app.post("/jobs/cancel")
+    @require_internal_token
+    def cancel_job():
+        body = request.get_json(silent=True) or {}
+        job_id = _job_id_from_body(body)
+        run_id = str(body.get("run_id") or "").strip() or None
+        if not job_id and not run_id:
+            return jsonify({"error": "job_id_or_run_id_required"}), 400
 
-        return jsonify({"status": "queued"}), 202
+        try:
+            require_license_feature("job_control")
+        except LicenseFeatureError as exc:
+            return jsonify({"error": str(exc), "license": exc.summary}), 403
+
+        actor = _actor_from_body(body)
+        result = cancel_job_run(run_id=run_id, job_id=job_id, actor_claims=actor)
+        if not result["run_ids"] and not result["dequeued"]:
+            return jsonify({"error": "no_running_or_queued_run"}), 404
+
+        log_audit_event(
+            action="job_run_cancel_requested",
+            entity_type="job" if job_id else "job_run",
+            entity_id=job_id or run_id,
+            actor=actor,
+            details=result,
+        )
+        return jsonify({"status": "cancel_requested", **result}), 202
 
     @app.post("/jobs/pause")
     @require_internal_token
@@ -1,12 +1,23 @@
+import io
+import json
 import os
 import random
 import re
+import time
 from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date, datetime
+from typing import Optional
 
 import psycopg2
+import psycopg2.extensions
 import psycopg2.extras
 
+from app import flush_sizing
+from app.metrics import DB_WRITE_ROWS, DB_WRITE_SECONDS, DB_WRITES
 from app.runtime_logger import emit
+from app.stage_timing import COMMIT, DB_READ, DB_WRITE, current_timer, timed
+from app.tracing import span
 
 
 DB_URL = os.getenv("DATABASE_URL")
@@ -15,9 +26,15 @@ DB_WRITE_MAX_RETRIES = int(os.getenv("DB_WRITE_MAX_RETRIES", "6"))
 DB_WRITE_RETRY_BASE_MS = int(os.getenv("DB_WRITE_RETRY_BASE_MS", "200"))
 DB_WRITE_RETRY_MAX_MS = int(os.getenv("DB_WRITE_RETRY_MAX_MS", "3000"))
 DB_WRITE_RETRY_JITTER_MS = int(os.getenv("DB_WRITE_RETRY_JITTER_MS", "150"))
+# graph_ingest sessions log base-table changes instead of queueing MVs per statement and release
+# them through mv_refresh.enqueue_changed_mvs(). Other jobs and the web app invalidate immediately.
+DB_DEFER_MV_INVALIDATION = os.getenv("DB_DEFER_MV_INVALIDATION", "true").strip().lower() not in {"0", "false", "no", "off"}
+DB_STREAM_ITERSIZE = int(os.getenv("DB_STREAM_ITERSIZE", "2000"))
 
 RETRYABLE_DB_SQLSTATES = {"40P01", "55P03", "40001"}
 
+_defer_mv_invalidation: ContextVar[bool] = ContextVar("defer_mv_invalidation", default=False)
+
 
 def _normalize_table_name(raw: str) -> str:
     return raw.strip().strip('"')
@@ -43,10 +60,58 @@ def _classify_write_query(query: str) -> tuple[str, str]:
     return "unknown", "unknown"
 
 
+def _statement_category(query) -> str:
+    head = query[:16] if isinstance(query, (str, bytes)) else b""
+    if isinstance(head, bytes):
+        head = head.decode("utf-8", "replace")
+    return DB_READ if head.lstrip().lower().startswith(("select", "with")) else DB_WRITE
+
+
+class TimedCursor(psycopg2.extensions.cursor):
+    """Adds statement time to the job stage timer, when one is active (see app.stage_timing)."""
+
+    def execute(self, query, vars=None):
+        if current_timer() is None:
+            return super().execute(query, vars)
+        with timed(_statement_category(query)):
+            return super().execute(query, vars)
+
+    def copy_expert(self, sql, file, size=8192):
+        with timed(DB_WRITE):
+            return super().copy_expert(sql, file, size)
+
+
+class TimedConnection(psycopg2.extensions.connection):
+    def cursor(self, *args, **kwargs):
+        kwargs.setdefault("cursor_factory", TimedCursor)
+        return super().cursor(*args, **kwargs)
+
+    def commit(self):
+        with timed(COMMIT):
+            return super().commit()
+
+
 def get_conn():
     if not DB_URL:
         raise RuntimeError("DATABASE_URL is not set")
-    return psycopg2.connect(DB_URL, connect_timeout=DB_CONNECT_TIMEOUT_SECONDS)
+    if DB_DEFER_MV_INVALIDATION and _defer_mv_invalidation.get():
+        return psycopg2.connect(
+            DB_URL,
+            connect_timeout=DB_CONNECT_TIMEOUT_SECONDS,
+            options="-c sentinel.defer_mv_invalidation=on",
+            connection_factory=TimedConnection,
+        )
+    return psycopg2.connect(DB_URL, connect_timeout=DB_CONNECT_TIMEOUT_SECONDS, connection_factory=TimedConnection)
+
+
+@contextmanager
+def deferred_mv_invalidation():
+    """Open connections in the block (and in work submitted with `copy_context`) with deferred MV invalidation."""
+    token = _defer_mv_invalidation.set(True)
+    try:
+        yield
+    finally:
+        _defer_mv_invalidation.reset(token)
 
 
 @contextmanager
@@ -74,22 +139,138 @@ def transaction():
         conn.close()
 
 
-def execute_values(cur, query: str, rows: list[tuple], page_size: int = 1000):
+def stream_rows(conn, name: str, query: str, params=None, *, itersize: int = DB_STREAM_ITERSIZE, withhold: bool = False):
+    """Yield the rows of `query` from a named server-side cursor, `itersize` rows per round trip.
+
+    A plain named cursor lives only as long as the current transaction. With `withhold=True` the
+    cursor is declared WITH HOLD and committed straight away, so the caller may commit or roll back
+    per row; Postgres keeps the remaining rows on the server instead of in the worker.
+    """
+    cur = conn.cursor(name=name, withhold=withhold)
+    cur.itersize = max(1, itersize)
+    try:
+        cur.execute(query, params)
+        if withhold:
+            conn.commit()
+        for row in cur:
+            yield row
+    finally:
+        _close_cursor_quietly(cur)
+
+
+def _close_cursor_quietly(cur):
+    # Closing a named cursor sends CLOSE; that fails once the connection or transaction is gone,
+    # and the server drops the cursor with it anyway.
+    try:
+        cur.close()
+    except psycopg2.Error:
+        pass
+
+
+def _write_span_attributes(table: str, op: str, rows: Optional[int]) -> dict:
+    return {"db.system": "postgresql", "db.collection.name": table, "db.operation.name": op, "db.rows": rows}
+
+
+def _record_write(table: str, op: str, started: float, *, rows: int, outcome: str):
+    DB_WRITE_SECONDS.observe(time.perf_counter() - started, table=table, op=op)
+    DB_WRITES.inc(table=table, op=op, outcome=outcome)
+    if rows > 0:
+        DB_WRITE_ROWS.inc(rows, table=table, op=op)
+
+
+def execute_values(cur, query: str, rows: list[tuple], page_size: int = 1000, *, sizing_key: Optional[str] = None):
+    """Run `query` over `rows` with psycopg2's execute_values, recording metrics and flush sizing.
+
+    Inserts feed the adaptive flush size of the table parsed from `query`, or of `sizing_key` when
+    one table is written with differently shaped rows (e.g. narrow tombstones).
+    """
     op, table = _classify_write_query(query)
     row_count = len(rows or [])
     emit("INFO", "DB_CONN", f"Write requested: table={table} op={op} rows={row_count}")
-    try:
-        psycopg2.extras.execute_values(cur, query, rows, page_size=page_size)
-    except Exception as exc:
-        emit("ERROR", "DB_CONN", f"Write failed: table={table} op={op} rows={row_count} error={exc}")
-        raise
+    started = time.perf_counter()
+    with span("db.write", **_write_span_attributes(table, op, row_count)):
+        try:
+            psycopg2.extras.execute_values(cur, query, rows, page_size=page_size)
+        except Exception as exc:
+            _record_write(table, op, started, rows=0, outcome="error")
+            emit("ERROR", "DB_CONN", f"Write failed: table={table} op={op} rows={row_count} error={exc}")
+            raise
+    _record_write(table, op, started, rows=row_count, outcome="success")
+    if op == "insert":
+        flush_sizing.observe(sizing_key or table, rows=row_count, seconds=time.perf_counter() - started, nbytes=_values_bytes(cur, row_count, page_size))
     emit("INFO", "DB_CONN", f"Write completed: table={table} op={op} rows={row_count}")
 
 
+def _values_bytes(cur, row_count: int, page_size: int) -> Optional[int]:
+    # cursor.query holds the last page's statement; scale it to all rows.
+    query = getattr(cur, "query", None)
+    if not isinstance(query, (bytes, str)) or row_count <= 0:
+        return None
+    last_page_rows = row_count - page_size * ((row_count - 1) // page_size)
+    return int(len(query) * row_count / last_page_rows)
+
+
 def jsonb(value):
     return psycopg2.extras.Json(value)
 
 
+_COPY_TEXT_ESCAPES = str.maketrans({"\\": "\\\\", "\n": "\\n", "\r": "\\r", "\t": "\\t"})
+
+
+def _copy_text_value(value) -> str:
+    if value.__class__ is str:
+        return value.translate(_COPY_TEXT_ESCAPES)
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, psycopg2.extras.Json):
+        value = json.dumps(value.adapted)
+    elif isinstance(value, (list, tuple)):
+        value = _array_literal(value)
+    return str(value).translate(_COPY_TEXT_ESCAPES)
+
+
+def _array_literal(values) -> str:
+    # One-dimensional text[] literal, e.g. permission roles: {"read","write"}.
+    items = []
+    for item in values:
+        if item is None:
+            items.append("NULL")
+        else:
+            items.append('"' + str(item).replace("\\", "\\\\").replace('"', '\\"') + '"')
+    return "{" + ",".join(items) + "}"
+
+
+def encode_copy_rows(rows: list[tuple]) -> bytes:
+    # Postgres COPY text format: tab-separated columns, \N for NULL, backslash escapes.
+    lines = ["\t".join(_copy_text_value(value) for value in row) for row in rows]
+    if not lines:
+        return b""
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def copy_rows(cur, table: str, columns: list[str], buffer: bytes, *, row_count: int, format: str = "text"):
+    emit("INFO", "DB_CONN", f"Write requested: table={table} op=copy rows={row_count}")
+    started = time.perf_counter()
+    with span("db.write", **_write_span_attributes(table, "copy", row_count)):
+        try:
+            cur.copy_expert(
+                f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT {format})",
+                io.BytesIO(buffer),
+            )
+        except Exception as exc:
+            _record_write(table, "copy", started, rows=0, outcome="error")
+            emit("ERROR", "DB_CONN", f"Write failed: table={table} op=copy rows={row_count} error={exc}")
+            raise
+    _record_write(table, "copy", started, rows=row_count, outcome="success")
+    emit("INFO", "DB_CONN", f"Write completed: table={table} op=copy rows={row_count}")
+
+
 def fetch_one(query, params=None):
     with get_cursor() as cur:
         cur.execute(query, params or [])
@@ -105,13 +286,17 @@ def fetch_all(query, params=None):
 def execute(query, params=None):
     op, table = _classify_write_query(query)
     emit("INFO", "DB_CONN", f"Write requested: table={table} op={op} rows=unknown")
-    with get_cursor(commit=True) as cur:
+    with get_cursor(commit=True) as cur, span("db.write", **_write_span_attributes(table, op, None)) as write_span:
+        started = time.perf_counter()
         try:
             cur.execute(query, params or [])
         except Exception as exc:
+            _record_write(table, op, started, rows=0, outcome="error")
             emit("ERROR", "DB_CONN", f"Write failed: table={table} op={op} rows=unknown error={exc}")
             raise
         rowcount = cur.rowcount
+        write_span.set_attribute("db.rows", rowcount)
+        _record_write(table, op, started, rows=max(rowcount, 0), outcome="success")
         emit("INFO", "DB_CONN", f"Write completed: table={table} op={op} rows={rowcount}")
         return rowcount
 
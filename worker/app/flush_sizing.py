@@ -0,0 +1,149 @@
+import os
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    raw = os.getenv(name)
+    if raw is None:
+        return default
+    return raw.strip().lower() in {"1", "true", "t", "yes", "y", "on"}
+
+
+GRAPH_ADAPTIVE_FLUSH = _env_flag("GRAPH_ADAPTIVE_FLUSH", False)
+GRAPH_FLUSH_TARGET_SECONDS = float(os.getenv("GRAPH_FLUSH_TARGET_SECONDS", "0.5"))
+GRAPH_FLUSH_MAX_BYTES = int(os.getenv("GRAPH_FLUSH_MAX_BYTES", str(8 * 1024 * 1024)))
+GRAPH_FLUSH_MIN_ROWS = int(os.getenv("GRAPH_FLUSH_MIN_ROWS", "50"))
+GRAPH_FLUSH_MAX_ROWS = int(os.getenv("GRAPH_FLUSH_MAX_ROWS", "10000"))
+
+# Weight of the newest flush in the per-row cost averages.
+_SMOOTHING = 0.5
+
+
+class _TableState:
+    def __init__(self, size: int):
+        self.size = size
+        self.min_size = size
+        self.max_size = size
+        self.flushes = 0
+        self.rows = 0
+        self.seconds = 0.0
+        self.seconds_per_row: Optional[float] = None
+        self.bytes_per_row: Optional[float] = None
+
+
+class FlushSizer:
+    """Per-table flush sizes for one job stage.
+
+    Each table starts at the stage's static `flush_every`. After every full flush, the size moves
+    toward the row count that would take `target_seconds` to write and stay under `max_bytes`.
+    Both are based on smoothed per-row write time and row size. A size at most doubles or halves
+    per flush and stays within `[min_rows, max_rows]`. Short tail flushes are not used for sizing
+    because fixed per-statement cost makes them look slow per row.
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        *,
+        target_seconds: float = GRAPH_FLUSH_TARGET_SECONDS,
+        max_bytes: int = GRAPH_FLUSH_MAX_BYTES,
+        min_rows: int = GRAPH_FLUSH_MIN_ROWS,
+        max_rows: int = GRAPH_FLUSH_MAX_ROWS,
+    ):
+        self.min_rows = max(1, min_rows)
+        self.max_rows = max(self.min_rows, max_rows)
+        self.initial = self._clamp(initial)
+        self.target_seconds = target_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._tables: Dict[str, _TableState] = {}
+
+    def _clamp(self, rows: float) -> int:
+        return int(min(self.max_rows, max(self.min_rows, rows)))
+
+    def _state(self, table: str) -> _TableState:
+        state = self._tables.get(table)
+        if state is None:
+            state = self._tables[table] = _TableState(self.initial)
+        return state
+
+    def size(self, table: str) -> int:
+        with self._lock:
+            return self._state(table).size
+
+    def observe(self, table: str, *, rows: int, seconds: float, nbytes: Optional[int] = None):
+        if rows <= 0:
+            return
+        with self._lock:
+            state = self._state(table)
+            state.flushes += 1
+            state.rows += rows
+            state.seconds += seconds
+            if rows * 2 < state.size:
+                return
+            state.seconds_per_row = _smooth(state.seconds_per_row, seconds / rows)
+            if nbytes:
+                state.bytes_per_row = _smooth(state.bytes_per_row, nbytes / rows)
+            ideal = float(self.max_rows)
+            if state.seconds_per_row:
+                ideal = min(ideal, self.target_seconds / state.seconds_per_row)
+            if state.bytes_per_row:
+                ideal = min(ideal, self.max_bytes / state.bytes_per_row)
+            state.size = self._clamp(min(state.size * 2, max(state.size / 2, ideal)))
+            state.min_size = min(state.min_size, state.size)
+            state.max_size = max(state.max_size, state.size)
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                table: {
+                    "flush_rows": state.size,
+                    "min_flush_rows": state.min_size,
+                    "max_flush_rows": state.max_size,
+                    "flushes": state.flushes,
+                    "avg_flush_seconds": round(state.seconds / state.flushes, 4) if state.flushes else None,
+                    "bytes_per_row": round(state.bytes_per_row) if state.bytes_per_row else None,
+                }
+                for table, state in self._tables.items()
+                if state.flushes
+            }
+
+
+def _smooth(previous: Optional[float], value: float) -> float:
+    if previous is None:
+        return value
+    return previous + _SMOOTHING * (value - previous)
+
+
+_current: ContextVar[Optional[FlushSizer]] = ContextVar("flush_sizer", default=None)
+
+
+@contextmanager
+def flush_sizer(initial: int, *, enabled: Optional[bool] = None):
+    """Make a fresh FlushSizer current for the block; yields None when adaptive flushing is off."""
+    if not (GRAPH_ADAPTIVE_FLUSH if enabled is None else enabled):
+        yield None
+        return
+    sizer = FlushSizer(initial)
+    token = _current.set(sizer)
+    try:
+        yield sizer
+    finally:
+        _current.reset(token)
+
+
+def flush_size(table: str, default: int) -> int:
+    """Rows to buffer for `table` before flushing: the current sizer's size, else `default`."""
+    sizer = _current.get()
+    if sizer is None:
+        return default
+    return sizer.size(table)
+
+
+def observe(table: str, *, rows: int, seconds: float, nbytes: Optional[int] = None):
+    sizer = _current.get()
+    if sizer is not None:
+        sizer.observe(table, rows=rows, seconds=seconds, nbytes=nbytes)
@@ -8,13 +8,23 @@ from typing import Any, Dict, Iterable, Iterator, Optional
 import requests
 from msal import ConfidentialClientApplication
 
+from app.metrics import (
+    GRAPH_REQUEST_SECONDS,
+    GRAPH_REQUESTS,
+    GRAPH_RETRIES,
+    GRAPH_THROTTLE_SLEEP_SECONDS,
+    graph_endpoint_class,
+)
 from app.runtime_logger import emit
+from app.stage_timing import GRAPH_WAIT, THROTTLE_SLEEP, timed
+from app.tracing import SPAN_KIND_CLIENT, span
 
 
 DEFAULT_GRAPH_BASE = "https://graph.microsoft.com/v1.0"
 
 
-@dataclass(frozen=True)
+# Not frozen: context managers (stage timers, trace spans) re-raise by assigning `__traceback__`.
+@dataclass(eq=False)
 class GraphError(Exception):
     status_code: int
     message: str
@@ -28,22 +38,25 @@ class GraphError(Exception):
 class GraphClient:
     def __init__(self):
         self._graph_base = os.getenv("GRAPH_BASE", DEFAULT_GRAPH_BASE).rstrip("/")
-
-        tenant_id = os.getenv("ENTRA_TENANT_ID")
-        client_id = os.getenv("ENTRA_CLIENT_ID")
-        client_secret = os.getenv("ENTRA_CLIENT_SECRET")
-        if not tenant_id or not client_id or not client_secret:
-            raise RuntimeError("ENTRA_TENANT_ID/ENTRA_CLIENT_ID/ENTRA_CLIENT_SECRET must be set")
+        # Fixed bearer token for a local fake Graph (benchmarks/fake_graph.py); skips MSAL entirely.
+        self._static_token = os.getenv("GRAPH_STATIC_TOKEN") or None
 
         self._max_retries = int(os.getenv("GRAPH_MAX_RETRIES", "5"))
         self._connect_timeout = float(os.getenv("GRAPH_CONNECT_TIMEOUT", "10"))
         self._read_timeout = float(os.getenv("GRAPH_READ_TIMEOUT", "60"))
 
-        self._cca = ConfidentialClientApplication(
-            client_id,
-            authority=f"https://login.microsoftonline.com/{tenant_id}",
-            client_credential=client_secret,
-        )
+        self._cca: Optional[ConfidentialClientApplication] = None
+        if self._static_token is None:
+            tenant_id = os.getenv("ENTRA_TENANT_ID")
+            client_id = os.getenv("ENTRA_CLIENT_ID")
+            client_secret = os.getenv("ENTRA_CLIENT_SECRET")
+            if not tenant_id or not client_id or not client_secret:
+                raise RuntimeError("ENTRA_TENANT_ID/ENTRA_CLIENT_ID/ENTRA_CLIENT_SECRET must be set")
+            self._cca = ConfidentialClientApplication(
+                client_id,
+                authority=f"https://login.microsoftonline.com/{tenant_id}",
+                client_credential=client_secret,
+            )
         self._token_lock = threading.Lock()
         self._cached_token: Optional[str] = None
         self._cached_token_expires_at: float = 0.0
@@ -53,6 +66,8 @@ class GraphClient:
         return self._graph_base
 
     def _get_token(self) -> str:
+        if self._static_token is not None:
+            return self._static_token
         now = time.time()
         if self._cached_token and now < (self._cached_token_expires_at - 60):
             return self._cached_token
@@ -86,116 +101,113 @@ class GraphClient:
             path_or_url = "/" + path_or_url
         return f"{self._graph_base}{path_or_url}"
 
-    def get_json(self, path_or_url: str) -> Dict[str, Any]:
-        return self.request_json("GET", path_or_url)
+    def get_json(self, path_or_url: str, *, headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        return self.request_json("GET", path_or_url, headers=headers)
 
     def get_text(self, path_or_url: str) -> str:
         return self.request_text("GET", path_or_url)
 
-    def request_json(self, method: str, path_or_url: str, *, json: Any = None) -> Dict[str, Any]:
-        url = self._build_url(path_or_url)
-        backoff = 2.0
-
-        for attempt in range(self._max_retries + 1):
-            attempt_number = attempt + 1
-            token = self._get_token()
-            headers = {"Authorization": f"Bearer {token}"}
-            try:
-                resp = requests.request(
-                    method,
-                    url,
-                    headers=headers,
-                    json=json,
-                    timeout=(self._connect_timeout, self._read_timeout),
-                )
-            except requests.RequestException as exc:
-                if attempt >= self._max_retries:
-                    emit("ERROR", "GRAPH", f"Graph request failed: method={method} url={url} error={exc}")
-                    raise RuntimeError(f"Graph request failed: {exc}") from exc
-                emit(
-                    "WARN",
-                    "GRAPH",
-                    f"Graph request retrying after transport error: method={method} url={url} attempt={attempt_number}/{self._max_retries + 1} error={exc}",
-                )
-                time.sleep(backoff + random.uniform(0, 0.25))
-                backoff = min(backoff * 2, 60)
-                continue
-
-            if resp.status_code == 401 and attempt < self._max_retries:
-                self._cached_token = None
-                self._cached_token_expires_at = 0.0
-                emit(
-                    "WARN",
-                    "GRAPH",
-                    f"Graph request retrying after 401: method={method} url={url} attempt={attempt_number}/{self._max_retries + 1}",
-                )
-                time.sleep(0.5)
-                continue
-
-            if resp.status_code in (408, 429, 500, 502, 503, 504) and attempt < self._max_retries:
-                retry_after = resp.headers.get("Retry-After")
-                emit(
-                    "WARN",
-                    "GRAPH",
-                    f"Graph request retrying after status={resp.status_code}: method={method} url={url} attempt={attempt_number}/{self._max_retries + 1}",
-                )
-                if retry_after and retry_after.isdigit():
-                    time.sleep(float(retry_after))
-                else:
-                    time.sleep(backoff + random.uniform(0, 0.25))
-                    backoff = min(backoff * 2, 60)
-                continue
-
-            if not resp.ok:
-                text = resp.text or ""
-                message = text[:400] if text else "request_failed"
-                emit(
-                    "ERROR",
-                    "GRAPH",
-                    f"Graph request failed with status={resp.status_code}: method={method} url={url} error={message}",
-                )
-                raise GraphError(resp.status_code, message, url, text)
-
-            if resp.status_code == 204:
-                return {}
-            try:
-                return resp.json()
-            except ValueError as exc:
-                emit("ERROR", "GRAPH", f"Graph response invalid JSON: method={method} url={url}")
-                raise RuntimeError("Graph response was not valid JSON") from exc
-
-        emit("ERROR", "GRAPH", f"Graph request retries exhausted: method={method} url={url}")
-        raise RuntimeError("Graph request retries exhausted")
+    def get_bytes(self, path_or_url: str) -> bytes:
+        return self.request_bytes("GET", path_or_url)
+
+    def request_json(
+        self,
+        method: str,
+        path_or_url: str,
+        *,
+        json: Any = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Dict[str, Any]:
+        resp = self._send(method, path_or_url, json=json, headers=headers)
+        if resp.status_code == 204:
+            return {}
+        try:
+            return resp.json()
+        except ValueError as exc:
+            emit("ERROR", "GRAPH", f"Graph response invalid JSON: method={method} url={self._build_url(path_or_url)}")
+            raise RuntimeError("Graph response was not valid JSON") from exc
 
     def request_text(self, method: str, path_or_url: str, *, json: Any = None) -> str:
+        resp = self._send(method, path_or_url, json=json)
+        return resp.text or ""
+
+    def request_bytes(self, method: str, path_or_url: str, *, json: Any = None) -> bytes:
+        resp = self._send(method, path_or_url, json=json)
+        return resp.content or b""
+
+    def _send(
+        self,
+        method: str,
+        path_or_url: str,
+        *,
+        json: Any = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> requests.Response:
         url = self._build_url(path_or_url)
+        endpoint = graph_endpoint_class(url)
+        with span(
+            "graph.request",
+            kind=SPAN_KIND_CLIENT,
+            **{"http.request.method": method, "graph.endpoint": endpoint},
+        ) as request_span:
+            resp = self._send_with_retries(
+                method, url, endpoint, json=json, extra_headers=headers, request_span=request_span
+            )
+            request_span.set_attribute("http.response.status_code", resp.status_code)
+            return resp
+
+    def _send_with_retries(
+        self,
+        method: str,
+        url: str,
+        endpoint: str,
+        *,
+        json: Any,
+        extra_headers: Optional[Dict[str, str]] = None,
+        request_span,
+    ) -> requests.Response:
         backoff = 2.0
 
         for attempt in range(self._max_retries + 1):
             attempt_number = attempt + 1
+            request_span.set_attribute("graph.attempts", attempt_number)
             token = self._get_token()
-            headers = {"Authorization": f"Bearer {token}"}
-            try:
-                resp = requests.request(
-                    method,
-                    url,
-                    headers=headers,
-                    json=json,
-                    timeout=(self._connect_timeout, self._read_timeout),
-                )
-            except requests.RequestException as exc:
+            headers = {**(extra_headers or {}), "Authorization": f"Bearer {token}"}
+            started = time.perf_counter()
+            transport_error: Optional[requests.RequestException] = None
+            with span("graph.attempt", **{"graph.attempt": attempt_number}) as attempt_span:
+                try:
+                    with timed(GRAPH_WAIT):
+                        resp = requests.request(
+                            method,
+                            url,
+                            headers=headers,
+                            json=json,
+                            timeout=(self._connect_timeout, self._read_timeout),
+                        )
+                except requests.RequestException as exc:
+                    transport_error = exc
+                    attempt_span.record_exception(exc)
+                else:
+                    attempt_span.set_attribute("http.response.status_code", resp.status_code)
+            GRAPH_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint, method=method)
+
+            if transport_error is not None:
+                GRAPH_REQUESTS.inc(endpoint=endpoint, method=method, status="error")
                 if attempt >= self._max_retries:
-                    emit("ERROR", "GRAPH", f"Graph request failed: method={method} url={url} error={exc}")
-                    raise RuntimeError(f"Graph request failed: {exc}") from exc
+                    emit("ERROR", "GRAPH", f"Graph request failed: method={method} url={url} error={transport_error}")
+                    raise RuntimeError(f"Graph request failed: {transport_error}") from transport_error
                 emit(
                     "WARN",
                     "GRAPH",
-                    f"Graph request retrying after transport error: method={method} url={url} attempt={attempt_number}/{self._max_retries + 1} error={exc}",
+                    f"Graph request retrying after transport error: method={method} url={url} attempt={attempt_number}/{self._max_retries + 1} error={transport_error}",
                 )
-                time.sleep(backoff + random.uniform(0, 0.25))
+                self._retry_sleep(endpoint, "transport", backoff + random.uniform(0, 0.25))
                 backoff = min(backoff * 2, 60)
                 continue
 
+            GRAPH_REQUESTS.inc(endpoint=endpoint, method=method, status=str(resp.status_code))
+
             if resp.status_code == 401 and attempt < self._max_retries:
                 self._cached_token = None
                 self._cached_token_expires_at = 0.0
@@ -204,7 +216,7 @@ class GraphClient:
                     "GRAPH",
                     f"Graph request retrying after 401: method={method} url={url} attempt={attempt_number}/{self._max_retries + 1}",
                 )
-                time.sleep(0.5)
+                self._retry_sleep(endpoint, "401", 0.5)
                 continue
 
             if resp.status_code in (408, 429, 500, 502, 503, 504) and attempt < self._max_retries:
@@ -215,9 +227,9 @@ class GraphClient:
                     f"Graph request retrying after status={resp.status_code}: method={method} url={url} attempt={attempt_number}/{self._max_retries + 1}",
                 )
                 if retry_after and retry_after.isdigit():
-                    time.sleep(float(retry_after))
+                    self._retry_sleep(endpoint, str(resp.status_code), float(retry_after))
                 else:
-                    time.sleep(backoff + random.uniform(0, 0.25))
+                    self._retry_sleep(endpoint, str(resp.status_code), backoff + random.uniform(0, 0.25))
                     backoff = min(backoff * 2, 60)
                 continue
 
@@ -229,13 +241,21 @@ class GraphClient:
                     "GRAPH",
                     f"Graph request failed with status={resp.status_code}: method={method} url={url} error={message}",
                 )
+                request_span.set_attribute("http.response.status_code", resp.status_code)
                 raise GraphError(resp.status_code, message, url, text)
 
-            return resp.text or ""
+            return resp
 
         emit("ERROR", "GRAPH", f"Graph request retries exhausted: method={method} url={url}")
         raise RuntimeError("Graph request retries exhausted")
 
+    def _retry_sleep(self, endpoint: str, reason: str, seconds: float):
+        GRAPH_RETRIES.inc(endpoint=endpoint, reason=reason)
+        with span("graph.retry_sleep", **{"graph.retry_reason": reason, "graph.sleep_seconds": round(seconds, 3)}):
+            with timed(THROTTLE_SLEEP):
+                time.sleep(seconds)
+        GRAPH_THROTTLE_SLEEP_SECONDS.inc(seconds, endpoint=endpoint)
+
     def iter_paged(self, path_or_url: str) -> Iterator[Dict[str, Any]]:
         next_url: Optional[str] = self._build_url(path_or_url)
         while next_url:
@@ -0,0 +1,175 @@
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+
+from app import db
+from app.job_executor import parse_job_type_limits
+from app.runtime_logger import emit
+
+
+JOB_RUN_DEADLINE_SECONDS = int(os.getenv("JOB_RUN_DEADLINE_SECONDS", "0"))
+JOB_TYPE_DEADLINE_SECONDS = os.getenv("JOB_TYPE_DEADLINE_SECONDS", "")
+
+STOP_CANCEL_REQUESTED = "cancel_requested"
+STOP_DEADLINE_EXCEEDED = "deadline_exceeded"
+STOP_LEASE_LOST = "lease_lost"
+
+_job_type_deadlines = parse_job_type_limits(JOB_TYPE_DEADLINE_SECONDS)
+
+
+def job_run_deadline_seconds(job_type: str) -> Optional[int]:
+    """Default run deadline for a job type (`JOB_TYPE_DEADLINE_SECONDS`, then `JOB_RUN_DEADLINE_SECONDS`)."""
+    seconds = _job_type_deadlines.get(job_type, JOB_RUN_DEADLINE_SECONDS)
+    return seconds if seconds and seconds > 0 else None
+
+
+class RunControl:
+    """Stop signal for one running job: a cancel request or an elapsed deadline.
+
+    Jobs poll it at flush boundaries and stop cleanly; stages that stopped early are recorded so the
+    run finishes as `partial` rather than `success`.
+    """
+
+    def __init__(self, run_id: str, *, job_type: str, deadline_seconds: Optional[int] = None):
+        self.run_id = run_id
+        self.job_type = job_type
+        self.deadline_seconds = deadline_seconds
+        self._deadline = time.monotonic() + deadline_seconds if deadline_seconds else None
+        self._cancel_reason: Optional[str] = None
+        self._lock = threading.Lock()
+        self.stopped_stages: list[str] = []
+
+    def request_cancel(self, reason: str = STOP_CANCEL_REQUESTED):
+        with self._lock:
+            if self._cancel_reason is None:
+                self._cancel_reason = reason
+
+    def stop_reason(self) -> Optional[str]:
+        with self._lock:
+            if self._cancel_reason is not None:
+                return self._cancel_reason
+        if self._deadline is not None and time.monotonic() >= self._deadline:
+            return STOP_DEADLINE_EXCEEDED
+        return None
+
+    def record_stop(self, stage: str):
+        with self._lock:
+            if stage not in self.stopped_stages:
+                self.stopped_stages.append(stage)
+
+
+_runs_lock = threading.Lock()
+_runs: Dict[str, RunControl] = {}
+
+
+def register_run(run_id: str, *, job_type: str, deadline_seconds: Optional[int] = None) -> RunControl:
+    control = RunControl(str(run_id), job_type=job_type, deadline_seconds=deadline_seconds)
+    with _runs_lock:
+        _runs[control.run_id] = control
+    return control
+
+
+def unregister_run(run_id: str):
+    with _runs_lock:
+        _runs.pop(str(run_id), None)
+
+
+def get_run_control(run_id: str) -> Optional[RunControl]:
+    with _runs_lock:
+        return _runs.get(str(run_id))
+
+
+def request_cancel(run_id: str, reason: str = STOP_CANCEL_REQUESTED) -> bool:
+    control = get_run_control(run_id)
+    if control is None:
+        return False
+    control.request_cancel(reason)
+    return True
+
+
+def stop_requested(run_id: str, *, stage: str) -> Optional[str]:
+    """Return the stop reason for `run_id` and record `stage` as stopped, or None to keep going.
+
+    Runs that were not started through the scheduler (tests, ad-hoc calls) are never stopped.
+    """
+    control = get_run_control(run_id)
+    if control is None:
+        return None
+    reason = control.stop_reason()
+    if reason is not None:
+        control.record_stop(stage)
+    return reason
+
+
+def sync_cancel_requests(run_ids: Iterable[str]) -> int:
+    """Apply cancel requests recorded in `job_runs` (possibly by another worker) to local runs."""
+    run_ids = [str(run_id) for run_id in run_ids]
+    if not run_ids:
+        return 0
+    rows = db.fetch_all(
+        """
+        SELECT run_id
+        FROM job_runs
+        WHERE run_id = ANY(%s::uuid[])
+          AND cancel_requested_at IS NOT NULL
+        """,
+        [run_ids],
+    )
+    applied = 0
+    for row in rows:
+        run_id = str(row["run_id"])
+        control = get_run_control(run_id)
+        if control is not None and control.stop_reason() is None:
+            control.request_cancel()
+            applied += 1
+            emit("WARN", "SCHEDULER", f"Cancel request picked up: run_id={run_id}")
+    return applied
+
+
+def stop_lost_leases(run_ids: Iterable[str]) -> int:
+    """Stop local runs whose job lease expired; the reaper has already failed them and freed the job."""
+    stopped = 0
+    for run_id in run_ids:
+        if request_cancel(str(run_id), STOP_LEASE_LOST):
+            stopped += 1
+            emit("WARN", "SCHEDULER", f"Job lease lost, stopping run: run_id={run_id}")
+    return stopped
+
+
+def rotate_after(ids: list, after: Optional[Any]) -> list:
+    """Reorder sorted `ids` to start right after `after`, so a resumed run does the unfinished ones first."""
+    if after is None:
+        return list(ids)
+    for index, value in enumerate(ids):
+        if value > after:
+            return list(ids[index:]) + list(ids[:index])
+    return list(ids)
+
+
+def load_resume_cursor(cur, job_type: str, cursor_key: str) -> Optional[Dict[str, Any]]:
+    cur.execute(
+        "SELECT cursor FROM job_resume_cursors WHERE job_type = %s AND cursor_key = %s",
+        [job_type, cursor_key],
+    )
+    rows = cur.fetchall()
+    return rows[0][0] if rows else None
+
+
+def save_resume_cursor(cur, job_type: str, cursor_key: str, cursor: Dict[str, Any], *, run_id: str, reason: str):
+    cur.execute(
+        """
+        INSERT INTO job_resume_cursors (job_type, cursor_key, cursor, run_id, stop_reason, updated_at)
+        VALUES (%s, %s, %s, %s, %s, now())
+        ON CONFLICT (job_type, cursor_key) DO UPDATE SET
+          cursor = EXCLUDED.cursor,
+          run_id = EXCLUDED.run_id,
+          stop_reason = EXCLUDED.stop_reason,
+          updated_at = EXCLUDED.updated_at
+        """,
+        [job_type, cursor_key, db.jsonb(cursor), run_id, reason],
+    )
+
+
+def clear_resume_cursor(cur, job_type: str, cursor_key: str):
+    cur.execute("DELETE FROM job_resume_cursors WHERE job_type = %s AND cursor_key = %s", [job_type, cursor_key])
@@ -0,0 +1,233 @@
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from app import db
+from app.runtime_logger import emit
+
+
+JOB_EXECUTOR_MAX_WORKERS = int(os.getenv("JOB_EXECUTOR_MAX_WORKERS", "4"))
+JOB_TYPE_CONCURRENCY = os.getenv("JOB_TYPE_CONCURRENCY", "")
+DEFAULT_JOB_TYPE_CONCURRENCY = int(os.getenv("JOB_TYPE_CONCURRENCY_DEFAULT", "1"))
+JOB_LEASE_TTL_SECONDS = int(os.getenv("JOB_LEASE_TTL_SECONDS", "120"))
+JOB_LEASE_HEARTBEAT_SECONDS = int(os.getenv("JOB_LEASE_HEARTBEAT_SECONDS", "30"))
+
+LEASE_OWNER = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def parse_job_type_limits(raw: str) -> Dict[str, int]:
+    """Parse `graph_ingest=1,mv_refresh=2` into per-job-type limits (minimum 1)."""
+    limits: Dict[str, int] = {}
+    for part in (raw or "").split(","):
+        name, sep, value = part.partition("=")
+        name = name.strip()
+        if not sep or not name:
+            continue
+        try:
+            limits[name] = max(1, int(value.strip()))
+        except ValueError:
+            continue
+    return limits
+
+
+class JobSlot:
+    def __init__(self, job_type: str):
+        self.job_type = job_type
+        self.started = False
+        self.released = False
+
+
+class JobExecutor:
+    """Fixed thread pool that runs jobs with a total and a per-job-type concurrency limit.
+
+    A caller reserves a slot before creating the run row, then either starts the run in that slot or
+    releases it. Reservations count against the limits, so the dispatcher never over-commits.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_workers: int,
+        type_limits: Optional[Dict[str, int]] = None,
+        default_type_limit: int = 1,
+        on_finished: Optional[Callable[[], None]] = None,
+    ):
+        self.max_workers = max(1, int(max_workers))
+        self.type_limits = dict(type_limits or {})
+        self.default_type_limit = max(1, int(default_type_limit))
+        self.on_finished = on_finished
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._counts: Dict[str, int] = {}
+        self._active: Dict[str, Dict[str, Any]] = {}
+
+    def limit_for(self, job_type: str) -> int:
+        return min(self.type_limits.get(job_type, self.default_type_limit), self.max_workers)
+
+    def _total(self) -> int:
+        return sum(self._counts.values())
+
+    def has_capacity(self, job_type: Optional[str] = None) -> bool:
+        with self._lock:
+            if self._total() >= self.max_workers:
+                return False
+            return job_type is None or self._counts.get(job_type, 0) < self.limit_for(job_type)
+
+    def saturated_job_types(self) -> list[str]:
+        with self._lock:
+            return sorted(job_type for job_type, count in self._counts.items() if count >= self.limit_for(job_type))
+
+    def reserve(self, job_type: str) -> Optional[JobSlot]:
+        with self._lock:
+            if self._total() >= self.max_workers or self._counts.get(job_type, 0) >= self.limit_for(job_type):
+                return None
+            self._counts[job_type] = self._counts.get(job_type, 0) + 1
+        return JobSlot(job_type)
+
+    def release(self, slot: JobSlot):
+        with self._lock:
+            if slot.released:
+                return
+            slot.released = True
+            self._counts[slot.job_type] = max(0, self._counts.get(slot.job_type, 0) - 1)
+            if not self._counts[slot.job_type]:
+                del self._counts[slot.job_type]
+
+    def start(self, slot: JobSlot, *, run_id: str, job_id: str, fn: Callable[[], Any]):
+        if slot.started or slot.released:
+            raise RuntimeError("job_slot_already_used")
+        slot.started = True
+        with self._lock:
+            self._active[run_id] = {
+                "run_id": run_id,
+                "job_id": job_id,
+                "job_type": slot.job_type,
+                "started_at": datetime.now(timezone.utc).isoformat(),
+            }
+
+        def run():
+            try:
+                fn()
+            except Exception as exc:
+                emit("ERROR", "SCHEDULER", f"Job executor task failed: run_id={run_id} job_id={job_id} error={exc}")
+            finally:
+                with self._lock:
+                    self._active.pop(run_id, None)
+                self.release(slot)
+                if self.on_finished is not None:
+                    try:
+                        self.on_finished()
+                    except Exception:
+                        pass
+
+        return self._pool.submit(run)
+
+    def active_runs(self) -> list[Dict[str, Any]]:
+        with self._lock:
+            return [dict(item) for item in self._active.values()]
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._counts)
+            active = [dict(item) for item in self._active.values()]
+        return {
+            "max_workers": self.max_workers,
+            "type_limits": dict(self.type_limits),
+            "default_type_limit": self.default_type_limit,
+            "slots_in_use": counts,
+            "active_runs": active,
+        }
+
+
+def acquire_job_lease(cur, *, job_id: str, run_id: str, ttl_seconds: Optional[int] = None) -> bool:
+    """Take the job's lease row unless another run holds an unexpired one."""
+    cur.execute(
+        """
+        INSERT INTO job_leases (job_id, run_id, owner, acquired_at, heartbeat_at, leased_until)
+        VALUES (%s, %s, %s, now(), now(), now() + make_interval(secs => %s))
+        ON CONFLICT (job_id) DO UPDATE
+        SET run_id = EXCLUDED.run_id,
+            owner = EXCLUDED.owner,
+            acquired_at = EXCLUDED.acquired_at,
+            heartbeat_at = EXCLUDED.heartbeat_at,
+            leased_until = EXCLUDED.leased_until
+        WHERE job_leases.leased_until < now()
+        RETURNING job_id
+        """,
+        [job_id, run_id, LEASE_OWNER, ttl_seconds or JOB_LEASE_TTL_SECONDS],
+    )
+    return cur.fetchone() is not None
+
+
+def release_job_lease(cur, *, job_id: str, run_id: str):
+    cur.execute("DELETE FROM job_leases WHERE job_id = %s AND run_id = %s", [job_id, run_id])
+
+
+def renew_job_leases(run_ids: Iterable[str], *, ttl_seconds: Optional[int] = None) -> list[str]:
+    """Extend this worker's leases for `run_ids`; returns the runs whose lease is gone (reaped or taken over)."""
+    run_ids = [str(run_id) for run_id in run_ids]
+    if not run_ids:
+        return []
+    conn = db.get_conn()
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            UPDATE job_leases
+            SET heartbeat_at = now(),
+                leased_until = now() + make_interval(secs => %s)
+            WHERE run_id = ANY(%s::uuid[])
+              AND owner = %s
+            RETURNING run_id
+            """,
+            [ttl_seconds or JOB_LEASE_TTL_SECONDS, run_ids, LEASE_OWNER],
+        )
+        renewed = {str(row[0]) for row in cur.fetchall()}
+        conn.commit()
+    finally:
+        conn.close()
+    lost = [run_id for run_id in run_ids if run_id not in renewed]
+    if lost:
+        emit("WARN", "SCHEDULER", f"Job lease heartbeat lost leases: run_ids={','.join(lost)} active={len(run_ids)}")
+    return lost
+
+
+def start_lease_heartbeat_thread(
+    executor: JobExecutor,
+    *,
+    on_heartbeat: Optional[Callable[[list[str]], Any]] = None,
+    on_lease_lost: Optional[Callable[[list[str]], Any]] = None,
+):
+    thread = threading.Thread(target=_lease_heartbeat_loop, args=(executor, on_heartbeat, on_lease_lost), daemon=True)
+    thread.start()
+
+
+def _lease_heartbeat_loop(
+    executor: JobExecutor,
+    on_heartbeat: Optional[Callable[[list[str]], Any]] = None,
+    on_lease_lost: Optional[Callable[[list[str]], Any]] = None,
+):
+    interval_seconds = max(1, min(JOB_LEASE_HEARTBEAT_SECONDS, max(1, JOB_LEASE_TTL_SECONDS // 2)))
+    while True:
+        time.sleep(interval_seconds)
+        run_ids = [item["run_id"] for item in executor.active_runs()]
+        try:
+            lost = renew_job_leases(run_ids)
+        except Exception as exc:
+            lost = []
+            emit("WARN", "SCHEDULER", f"Job lease heartbeat failed: error={exc}")
+        # A run whose lease was reaped may already be dispatched again elsewhere; it must stop writing.
+        if on_lease_lost is not None and lost:
+            try:
+                on_lease_lost(lost)
+            except Exception as exc:
+                emit("WARN", "SCHEDULER", f"Job lease lost callback failed: error={exc}")
+        if on_heartbeat is not None and run_ids:
+            try:
+                on_heartbeat(run_ids)
+            except Exception as exc:
+                emit("WARN", "SCHEDULER", f"Job heartbeat callback failed: error={exc}")
@@ -0,0 +1,245 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+
+JOB_PROGRESS_RATE_WINDOW_SECONDS = int(os.getenv("JOB_PROGRESS_RATE_WINDOW_SECONDS", "60"))
+JOB_PROGRESS_KEEP_FINISHED = int(os.getenv("JOB_PROGRESS_KEEP_FINISHED", "20"))
+JOB_PROGRESS_STREAM_MAX_SECONDS = int(os.getenv("JOB_PROGRESS_STREAM_MAX_SECONDS", "60"))
+# Each open stream holds one API thread (gunicorn runs 4), so only a few may be open at once.
+JOB_PROGRESS_STREAM_MAX_CLIENTS = int(os.getenv("JOB_PROGRESS_STREAM_MAX_CLIENTS", "2"))
+JOB_PROGRESS_STREAM_MIN_INTERVAL_SECONDS = float(os.getenv("JOB_PROGRESS_STREAM_MIN_INTERVAL_SECONDS", "1"))
+JOB_PROGRESS_STREAM_HEARTBEAT_SECONDS = float(os.getenv("JOB_PROGRESS_STREAM_HEARTBEAT_SECONDS", "15"))
+
+
+class StageProgress:
+    def __init__(self, name: str):
+        self.name = name
+        self.items_seen = 0
+        self.rows_written = 0
+        self.units_done: Optional[int] = None
+        self.units_total: Optional[int] = None
+        self.unit: Optional[str] = None
+        self.started_at = datetime.now(timezone.utc)
+        self._start = time.monotonic()
+        self._unit_start = self._start
+        self._samples: deque = deque([(self._start, 0)])
+        self.finished = False
+
+    def update(self, *, items_seen=None, rows_written=None, units_done=None, units_total=None, unit=None):
+        if items_seen is not None:
+            self.items_seen = int(items_seen)
+        if rows_written is not None:
+            self.rows_written = int(rows_written)
+        if units_done is not None:
+            self.units_done = int(units_done)
+        if units_total is not None:
+            self.units_total = int(units_total)
+        now = time.monotonic()
+        if unit is not None and unit != self.unit:
+            # A stage that moves on to a different list (sites, then groups) times its ETA from the switch.
+            self.unit = unit
+            self._unit_start = now
+        self._samples.append((now, self.rows_written))
+        while len(self._samples) > 2 and now - self._samples[1][0] >= JOB_PROGRESS_RATE_WINDOW_SECONDS:
+            self._samples.popleft()
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        elapsed = max(now - self._start, 1e-6)
+        first_at, first_rows = self._samples[0]
+        window = max(now - first_at, 1e-6)
+        eta_seconds = None
+        if not self.finished and self.units_total and self.units_done:
+            remaining = max(self.units_total - self.units_done, 0)
+            eta_seconds = round(max(now - self._unit_start, 0.0) / self.units_done * remaining, 1)
+        return {
+            "stage": self.name,
+            "started_at": self.started_at.isoformat(),
+            "elapsed_seconds": round(elapsed, 1),
+            "items_seen": self.items_seen,
+            "rows_written": self.rows_written,
+            "units_done": self.units_done,
+            "units_total": self.units_total,
+            "unit": self.unit,
+            "rows_per_second": round(self.rows_written / elapsed, 1),
+            "current_rows_per_second": round((self.rows_written - first_rows) / window, 1),
+            "eta_seconds": eta_seconds,
+            "finished": self.finished,
+        }
+
+
+class RunProgress:
+    """Live counters for one run, updated by the job at its flush points and read by the progress API."""
+
+    def __init__(self, run_id: str, *, job_id: str, job_type: str):
+        self.run_id = run_id
+        self.job_id = job_id
+        self.job_type = job_type
+        self.started_at = datetime.now(timezone.utc)
+        self._start = time.monotonic()
+        self.status = "running"
+        self.finished_at: Optional[datetime] = None
+        self.current_stage: Optional[str] = None
+        self.stages: Dict[str, StageProgress] = {}
+
+    def stage(self, name: str) -> StageProgress:
+        if self.current_stage != name:
+            previous = self.stages.get(self.current_stage) if self.current_stage else None
+            if previous is not None:
+                previous.finished = True
+            self.current_stage = name
+        if name not in self.stages:
+            self.stages[name] = StageProgress(name)
+        return self.stages[name]
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "run_id": self.run_id,
+            "job_id": self.job_id,
+            "job_type": self.job_type,
+            "status": self.status,
+            "started_at": self.started_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "elapsed_seconds": round(time.monotonic() - self._start, 1),
+            "current_stage": self.current_stage,
+            "stages": [stage.snapshot() for stage in self.stages.values()],
+        }
+
+
+_changed = threading.Condition()
+_version = 0
+_runs: Dict[str, RunProgress] = {}
+_finished: deque = deque(maxlen=max(1, JOB_PROGRESS_KEEP_FINISHED))
+
+
+def _bump():
+    global _version
+    _version += 1
+    _changed.notify_all()
+
+
+def start_progress(run_id: str, *, job_id: str, job_type: str) -> RunProgress:
+    progress = RunProgress(str(run_id), job_id=str(job_id), job_type=job_type)
+    with _changed:
+        _runs[progress.run_id] = progress
+        _bump()
+    return progress
+
+
+def finish_progress(run_id: str, status: str):
+    with _changed:
+        progress = _runs.pop(str(run_id), None)
+        if progress is None:
+            return
+        progress.status = status
+        progress.finished_at = datetime.now(timezone.utc)
+        for stage in progress.stages.values():
+            stage.finished = True
+        _finished.append(progress)
+        _bump()
+
+
+def report_progress(run_id: str, stage: str, **counts):
+    """Record counters for `stage` of a running job (no-op for runs not started through the scheduler).
+
+    Counters are totals for the stage so far: `items_seen`, `rows_written`, and `units_done` out of
+    `units_total` for stages that work through a known list (drives, groups, item batches).
+    """
+    with _changed:
+        progress = _runs.get(str(run_id))
+        if progress is None:
+            return
+        progress.stage(stage).update(**counts)
+        _bump()
+
+
+def progress_version() -> int:
+    with _changed:
+        return _version
+
+
+def wait_for_progress(version: int, timeout: float) -> int:
+    """Block until progress changes past `version` or `timeout` elapses; return the current version."""
+    with _changed:
+        _changed.wait_for(lambda: _version != version, timeout=timeout)
+        return _version
+
+
+def get_progress(run_id: Optional[str] = None) -> list[Dict[str, Any]]:
+    """Snapshots of running jobs, then recently finished ones (newest first), optionally for one run."""
+    with _changed:
+        runs = list(_runs.values()) + list(reversed(_finished))
+        if run_id is not None:
+            runs = [progress for progress in runs if progress.run_id == str(run_id)][:1]
+        return [progress.snapshot() for progress in runs]
+
+
+def _sse(event: str, data: Dict[str, Any], *, event_id: Optional[int] = None) -> str:
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, default=str, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+def iter_progress_events(
+    run_id: Optional[str] = None,
+    *,
+    max_seconds: Optional[float] = None,
+    min_interval: Optional[float] = None,
+    heartbeat_seconds: Optional[float] = None,
+):
+    """Server-sent events with progress snapshots: on every change (at most once per `min_interval`)
+    and at least every `heartbeat_seconds`. A stream for one run ends when that run finishes; every
+    stream ends after `max_seconds` so it does not hold an API thread forever (clients reconnect).
+    """
+    max_seconds = JOB_PROGRESS_STREAM_MAX_SECONDS if max_seconds is None else max_seconds
+    min_interval = JOB_PROGRESS_STREAM_MIN_INTERVAL_SECONDS if min_interval is None else min_interval
+    heartbeat_seconds = JOB_PROGRESS_STREAM_HEARTBEAT_SECONDS if heartbeat_seconds is None else heartbeat_seconds
+    deadline = time.monotonic() + max(0.0, max_seconds)
+    while True:
+        version = progress_version()
+        runs = get_progress(run_id)
+        yield _sse("progress", {"runs": runs}, event_id=version)
+        if run_id is not None and (not runs or runs[0]["status"] != "running"):
+            yield _sse("end", {"reason": "run_finished" if runs else "run_not_found"})
+            return
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            yield _sse("end", {"reason": "max_duration"})
+            return
+        wait_for_progress(version, timeout=max(0.0, min(heartbeat_seconds, remaining)))
+        if min_interval > 0:
+            time.sleep(min(min_interval, max(0.0, deadline - time.monotonic())))
+
+
+_stream_slots = threading.BoundedSemaphore(max(1, JOB_PROGRESS_STREAM_MAX_CLIENTS))
+
+
+class ProgressStream:
+    """Event iterator that gives its stream slot back when the server closes the response."""
+
+    def __init__(self, events, release):
+        self._events = events
+        self._release = release
+
+    def __iter__(self):
+        return self._events
+
+    def close(self):
+        self._events.close()
+        release, self._release = self._release, None
+        if release is not None:
+            release()
+
+
+def open_progress_stream(run_id: Optional[str] = None, **kwargs: Any) -> Optional[ProgressStream]:
+    """Start a progress stream, or return None when `JOB_PROGRESS_STREAM_MAX_CLIENTS` are already open."""
+    if not _stream_slots.acquire(blocking=False):
+        return None
+    return ProgressStream(iter_progress_events(run_id, **kwargs), _stream_slots.release)
@@ -0,0 +1,413 @@
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from app import db
+from app.runtime_logger import emit
+from app.utils import log_audit_event, log_job_run_log
+
+
+DEFAULT_APPLY_BATCH_SIZE = int(os.getenv("ACTIVITY_ROLLUP_BATCH_SIZE", "20000"))
+_APPLY_LOCK_KEY = "activity_rollups_apply"
+ROLLUP_TABLES = ("msgraph_site_activity_daily", "msgraph_user_activity_daily", "msgraph_item_link_daily")
+
+_CLAIM_TABLES_SQL = (
+    "CREATE TEMP TABLE IF NOT EXISTS activity_rollup_claimed_drives "
+    "(drive_id text, site_keys text[]) ON COMMIT DELETE ROWS",
+    "CREATE TEMP TABLE IF NOT EXISTS activity_rollup_claimed_site_days "
+    "(site_key text, day timestamptz) ON COMMIT DELETE ROWS",
+    "CREATE TEMP TABLE IF NOT EXISTS activity_rollup_claimed_user_days "
+    "(user_id text, day timestamptz) ON COMMIT DELETE ROWS",
+    "CREATE TEMP TABLE IF NOT EXISTS activity_rollup_claimed_items "
+    "(drive_id text, item_id text) ON COMMIT DELETE ROWS",
+)
+
+# A drive whose site, URL or deleted state changed invalidates every bucket it feeds, under both its
+# previous and current site keys.
+_CLAIM_DRIVES_SQL = """
+WITH claimed AS (
+  DELETE FROM activity_rollup_dirty_drives
+  RETURNING drive_id, old_site_keys
+)
+INSERT INTO activity_rollup_claimed_drives (drive_id, site_keys)
+SELECT
+  c.drive_id,
+  c.old_site_keys || CASE
+    WHEN d.id IS NULL THEN ARRAY[]::text[]
+    ELSE ARRAY[CASE WHEN d.site_id IS NULL THEN 'drive:' || d.id ELSE d.site_id END]
+  END
+FROM claimed c
+LEFT JOIN msgraph_drives d ON d.id = c.drive_id
+"""
+
+_EXPAND_DRIVES_SQL = (
+    """
+    INSERT INTO activity_rollup_dirty_site_days (site_key, day)
+    SELECT DISTINCT k.site_key, b.day
+    FROM activity_rollup_claimed_drives c
+    CROSS JOIN LATERAL unnest(c.site_keys) AS k(site_key)
+    JOIN LATERAL (
+      SELECT date_trunc('day', i.modified_dt) AS day
+      FROM msgraph_drive_items i
+      WHERE i.drive_id = c.drive_id AND i.modified_dt IS NOT NULL
+      UNION
+      SELECT date_trunc('day', p.synced_at)
+      FROM msgraph_drive_item_permissions p
+      WHERE p.drive_id = c.drive_id AND p.link_scope IS NOT NULL AND p.synced_at IS NOT NULL
+    ) b ON true
+    ON CONFLICT DO NOTHING
+    """,
+    """
+    INSERT INTO activity_rollup_dirty_user_days (user_id, day)
+    SELECT DISTINCT i.last_modified_by_user_id, date_trunc('day', i.modified_dt)
+    FROM activity_rollup_claimed_drives c
+    JOIN msgraph_drive_items i ON i.drive_id = c.drive_id
+    WHERE i.last_modified_by_user_id IS NOT NULL AND i.modified_dt IS NOT NULL
+    ON CONFLICT DO NOTHING
+    """,
+    """
+    INSERT INTO activity_rollup_dirty_items (drive_id, item_id)
+    SELECT p.drive_id, p.item_id
+    FROM activity_rollup_claimed_drives c
+    JOIN msgraph_drive_item_permissions p ON p.drive_id = c.drive_id
+    WHERE p.link_scope IS NOT NULL
+    UNION
+    SELECT r.drive_id, r.item_id
+    FROM activity_rollup_claimed_drives c
+    JOIN msgraph_item_link_daily r ON r.drive_id = c.drive_id
+    ON CONFLICT DO NOTHING
+    """,
+)
+
+_CLAIM_BUCKETS_SQL = {
+    "site_days": """
+        WITH claimed AS (
+          DELETE FROM activity_rollup_dirty_site_days
+          WHERE (site_key, day) IN (SELECT site_key, day FROM activity_rollup_dirty_site_days LIMIT %s)
+          RETURNING site_key, day
+        )
+        INSERT INTO activity_rollup_claimed_site_days (site_key, day)
+        SELECT site_key, day FROM claimed
+        """,
+    "user_days": """
+        WITH claimed AS (
+          DELETE FROM activity_rollup_dirty_user_days
+          WHERE (user_id, day) IN (SELECT user_id, day FROM activity_rollup_dirty_user_days LIMIT %s)
+          RETURNING user_id, day
+        )
+        INSERT INTO activity_rollup_claimed_user_days (user_id, day)
+        SELECT user_id, day FROM claimed
+        """,
+    "items": """
+        WITH claimed AS (
+          DELETE FROM activity_rollup_dirty_items
+          WHERE (drive_id, item_id) IN (SELECT drive_id, item_id FROM activity_rollup_dirty_items LIMIT %s)
+          RETURNING drive_id, item_id
+        )
+        INSERT INTO activity_rollup_claimed_items (drive_id, item_id)
+        SELECT drive_id, item_id FROM claimed
+        """,
+}
+
+# Each recompute mirrors the matching *_source view restricted to the claimed buckets. Day ranges
+# use `day + interval '1 day'` so the (drive_id, modified_dt) style indexes can be used.
+_RECOMPUTE_SQL = {
+    "site_days": (
+        """
+        DELETE FROM msgraph_site_activity_daily r
+        USING activity_rollup_claimed_site_days c
+        WHERE r.site_key = c.site_key AND r.day = c.day
+        """,
+        """
+        INSERT INTO msgraph_site_activity_daily (site_key, day, modified_items, active_users, shares)
+        WITH bucket_drives AS (
+          SELECT c.site_key, c.day, d.id AS drive_id
+          FROM activity_rollup_claimed_site_days c
+          JOIN msgraph_drives d ON (CASE WHEN d.site_id IS NULL THEN 'drive:' || d.id ELSE d.site_id END) = c.site_key
+          WHERE d.deleted_at IS NULL
+            AND LOWER(COALESCE(d.web_url, '')) NOT LIKE '%cachelibrary%'
+        ),
+        mods AS (
+          SELECT
+            b.site_key,
+            b.day,
+            COUNT(*)::int AS modified_items,
+            COUNT(DISTINCT i.last_modified_by_user_id) FILTER (WHERE i.last_modified_by_user_id IS NOT NULL)::int AS active_users
+          FROM bucket_drives b
+          JOIN msgraph_drive_items i
+            ON i.drive_id = b.drive_id
+           AND i.modified_dt >= b.day
+           AND i.modified_dt < b.day + interval '1 day'
+          WHERE i.deleted_at IS NULL
+          GROUP BY b.site_key, b.day
+        ),
+        shares AS (
+          SELECT b.site_key, b.day, COUNT(*)::int AS shares
+          FROM bucket_drives b
+          JOIN msgraph_drive_item_permissions p
+            ON p.drive_id = b.drive_id
+           AND p.synced_at >= b.day
+           AND p.synced_at < b.day + interval '1 day'
+          WHERE p.deleted_at IS NULL
+            AND p.link_scope IS NOT NULL
+          GROUP BY b.site_key, b.day
+        )
+        SELECT
+          COALESCE(m.site_key, s.site_key),
+          COALESCE(m.day, s.day),
+          COALESCE(m.modified_items, 0),
+          COALESCE(m.active_users, 0),
+          COALESCE(s.shares, 0)
+        FROM mods m
+        FULL OUTER JOIN shares s ON s.site_key = m.site_key AND s.day = m.day
+        """,
+    ),
+    "user_days": (
+        """
+        DELETE FROM msgraph_user_activity_daily r
+        USING activity_rollup_claimed_user_days c
+        WHERE r.user_id = c.user_id AND r.day = c.day
+        """,
+        """
+        INSERT INTO msgraph_user_activity_daily (user_id, day, modified_items, sites_touched, last_modified_dt)
+        SELECT
+          c.user_id,
+          c.day,
+          COUNT(*)::int,
+          COUNT(DISTINCT COALESCE(d.site_id, d.id))::int,
+          MAX(i.modified_dt)
+        FROM activity_rollup_claimed_user_days c
+        JOIN msgraph_drive_items i
+          ON i.last_modified_by_user_id = c.user_id
+         AND i.modified_dt >= c.day
+         AND i.modified_dt < c.day + interval '1 day'
+        JOIN msgraph_drives d ON d.id = i.drive_id
+        WHERE i.deleted_at IS NULL
+          AND d.deleted_at IS NULL
+          AND LOWER(COALESCE(d.web_url, '')) NOT LIKE '%cachelibrary%'
+        GROUP BY c.user_id, c.day
+        """,
+    ),
+    "items": (
+        """
+        DELETE FROM msgraph_item_link_daily r
+        USING activity_rollup_claimed_items c
+        WHERE r.drive_id = c.drive_id AND r.item_id = c.item_id
+        """,
+        """
+        INSERT INTO msgraph_item_link_daily (drive_id, item_id, link_scope, day, link_shares)
+        SELECT p.drive_id, p.item_id, p.link_scope, date_trunc('day', p.synced_at), COUNT(*)::int
+        FROM activity_rollup_claimed_items c
+        JOIN msgraph_drive_item_permissions p ON p.drive_id = c.drive_id AND p.item_id = c.item_id
+        JOIN msgraph_drives d ON d.id = p.drive_id
+        WHERE p.deleted_at IS NULL
+          AND p.link_scope IS NOT NULL
+          AND p.synced_at IS NOT NULL
+          AND d.deleted_at IS NULL
+          AND LOWER(COALESCE(d.web_url, '')) NOT LIKE '%cachelibrary%'
+        GROUP BY p.drive_id, p.item_id, p.link_scope, date_trunc('day', p.synced_at)
+        """,
+    ),
+}
+
+_STAMP_REFRESH_LOG_SQL = """
+INSERT INTO mv_refresh_log (mv_name, last_refreshed_at)
+SELECT unnest(%s::text[]), now()
+ON CONFLICT (mv_name)
+DO UPDATE SET last_refreshed_at = EXCLUDED.last_refreshed_at
+"""
+
+# Buckets whose stored row differs from the full definition, including rows missing on either side.
+# Mismatches are counted before they are queued, so buckets that were already dirty still count;
+# each statement returns up to 20 sample keys, each carrying the total.
+_MISMATCH_SQL = {
+    "site_days": """
+        WITH mismatched AS (
+          SELECT COALESCE(s.site_key, r.site_key) AS site_key, COALESCE(s.day, r.day) AS day
+          FROM (SELECT * FROM msgraph_site_activity_daily_source WHERE %(cutoff)s::timestamptz IS NULL OR day >= %(cutoff)s) s
+          FULL OUTER JOIN (
+            SELECT * FROM msgraph_site_activity_daily WHERE %(cutoff)s::timestamptz IS NULL OR day >= %(cutoff)s
+          ) r ON r.site_key = s.site_key AND r.day = s.day
+          WHERE (s.modified_items, s.active_users, s.shares) IS DISTINCT FROM (r.modified_items, r.active_users, r.shares)
+        ),
+        queued AS (
+          INSERT INTO activity_rollup_dirty_site_days (site_key, day)
+          SELECT site_key, day FROM mismatched
+          ON CONFLICT DO NOTHING
+        )
+        SELECT site_key, day, count(*) OVER () FROM mismatched LIMIT 20
+        """,
+    "user_days": """
+        WITH mismatched AS (
+          SELECT COALESCE(s.user_id, r.user_id) AS user_id, COALESCE(s.day, r.day) AS day
+          FROM (SELECT * FROM msgraph_user_activity_daily_source WHERE %(cutoff)s::timestamptz IS NULL OR day >= %(cutoff)s) s
+          FULL OUTER JOIN (
+            SELECT * FROM msgraph_user_activity_daily WHERE %(cutoff)s::timestamptz IS NULL OR day >= %(cutoff)s
+          ) r ON r.user_id = s.user_id AND r.day = s.day
+          WHERE (s.modified_items, s.sites_touched, s.last_modified_dt)
+            IS DISTINCT FROM (r.modified_items, r.sites_touched, r.last_modified_dt)
+        ),
+        queued AS (
+          INSERT INTO activity_rollup_dirty_user_days (user_id, day)
+          SELECT user_id, day FROM mismatched
+          ON CONFLICT DO NOTHING
+        )
+        SELECT user_id, day, count(*) OVER () FROM mismatched LIMIT 20
+        """,
+    "items": """
+        WITH mismatched AS (
+          SELECT DISTINCT COALESCE(s.drive_id, r.drive_id) AS drive_id, COALESCE(s.item_id, r.item_id) AS item_id
+          FROM (SELECT * FROM msgraph_item_link_daily_source WHERE %(cutoff)s::timestamptz IS NULL OR day >= %(cutoff)s) s
+          FULL OUTER JOIN (
+            SELECT * FROM msgraph_item_link_daily WHERE %(cutoff)s::timestamptz IS NULL OR day >= %(cutoff)s
+          ) r ON r.drive_id = s.drive_id AND r.item_id = s.item_id AND r.link_scope = s.link_scope AND r.day = s.day
+          WHERE s.link_shares IS DISTINCT FROM r.link_shares
+        ),
+        queued AS (
+          INSERT INTO activity_rollup_dirty_items (drive_id, item_id)
+          SELECT drive_id, item_id FROM mismatched
+          ON CONFLICT DO NOTHING
+        )
+        SELECT drive_id, item_id, count(*) OVER () FROM mismatched LIMIT 20
+        """,
+}
+
+
+def _apply_pass(cur, batch_size: int) -> Dict[str, int]:
+    for statement in _CLAIM_TABLES_SQL:
+        cur.execute(statement)
+    cur.execute(_CLAIM_DRIVES_SQL)
+    drives = max(cur.rowcount, 0)
+    if drives:
+        for statement in _EXPAND_DRIVES_SQL:
+            cur.execute(statement)
+
+    counts = {"drives": drives}
+    for bucket, claim_sql in _CLAIM_BUCKETS_SQL.items():
+        cur.execute(claim_sql, [batch_size])
+        counts[bucket] = max(cur.rowcount, 0)
+        if not counts[bucket]:
+            continue
+        delete_sql, insert_sql = _RECOMPUTE_SQL[bucket]
+        cur.execute(delete_sql)
+        cur.execute(insert_sql)
+    return counts
+
+
+def apply_activity_rollup_changes(*, batch_size: Optional[int] = None) -> Dict[str, Any]:
+    """Recompute the activity rollup buckets marked dirty by the ingest-table triggers.
+
+    Each pass claims up to `batch_size` buckets per rollup and commits, so a large backlog (for
+    example after a first full sync) is worked off in bounded transactions.
+    """
+    batch_size = max(1, int(batch_size or DEFAULT_APPLY_BATCH_SIZE))
+    summary: Dict[str, Any] = {"passes": 0, "drives": 0, "site_days": 0, "user_days": 0, "items": 0}
+
+    conn = db.get_conn()
+    try:
+        cur = conn.cursor()
+        if not db.try_advisory_lock(cur, _APPLY_LOCK_KEY):
+            conn.commit()
+            return {"skipped": True, "reason": "locked"}
+        try:
+            while True:
+                try:
+                    counts = _apply_pass(cur, batch_size)
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                summary["passes"] += 1
+                for key, value in counts.items():
+                    summary[key] += value
+                if all(counts[bucket] < batch_size for bucket in _CLAIM_BUCKETS_SQL):
+                    break
+            cur.execute(_STAMP_REFRESH_LOG_SQL, [list(ROLLUP_TABLES)])
+            conn.commit()
+        finally:
+            db.advisory_unlock(cur, _APPLY_LOCK_KEY)
+            conn.commit()
+    finally:
+        conn.close()
+
+    emit(
+        "INFO",
+        "SCHEDULER",
+        "Activity rollups applied: "
+        f"passes={summary['passes']} drives={summary['drives']} site_days={summary['site_days']} "
+        f"user_days={summary['user_days']} items={summary['items']}",
+    )
+    return summary
+
+
+def _get_reconcile_runtime_config(job_id: str) -> Dict[str, Any]:
+    row = db.fetch_one("SELECT config FROM jobs WHERE job_id = %s", [job_id]) or {}
+    config = row.get("config") if isinstance(row, dict) else {}
+    if not isinstance(config, dict):
+        config = {}
+    window_days = int(config.get("window_days", 0) or 0)
+    return {"window_days": max(0, window_days), "repair": bool(config.get("repair", True))}
+
+
+def run_activity_rollup_reconcile(*, run_id: str, job_id: str, actor: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Compare each rollup table with its *_source view and rebuild the buckets that disagree."""
+    config = _get_reconcile_runtime_config(job_id)
+    window_days = config["window_days"]
+    cutoff = datetime.now(timezone.utc) - timedelta(days=window_days) if window_days else None
+
+    emit("INFO", "SCHEDULER", f"Activity rollup reconcile started: run_id={run_id} job_id={job_id} window_days={window_days}")
+    log_job_run_log(
+        run_id=run_id,
+        level="INFO",
+        message="activity_rollup_reconcile_started",
+        context={"job_id": job_id, **config},
+    )
+
+    mismatches: Dict[str, int] = {}
+    samples: Dict[str, list] = {}
+    conn = db.get_conn()
+    try:
+        cur = conn.cursor()
+        for bucket, mismatch_sql in _MISMATCH_SQL.items():
+            cur.execute(mismatch_sql, {"cutoff": cutoff})
+            rows = cur.fetchall()
+            mismatches[bucket] = int(rows[0][-1]) if rows else 0
+            samples[bucket] = [list(map(str, row[:-1])) for row in rows]
+        if config["repair"]:
+            conn.commit()
+        else:
+            conn.rollback()
+    finally:
+        conn.close()
+
+    summary: Dict[str, Any] = {
+        "window_days": window_days,
+        "repair": config["repair"],
+        "mismatches": mismatches,
+        "mismatch_samples": samples,
+        "applied": None,
+    }
+    if config["repair"] and any(mismatches.values()):
+        summary["applied"] = apply_activity_rollup_changes()
+    summary["finished_at"] = datetime.now(timezone.utc).isoformat()
+
+    drifted = sum(mismatches.values())
+    log_job_run_log(
+        run_id=run_id,
+        level="INFO" if drifted == 0 else "WARN",
+        message="activity_rollup_reconcile_completed",
+        context={"job_id": job_id, "summary": summary},
+    )
+    log_audit_event(
+        action="activity_rollup_reconcile_completed",
+        entity_type="job_run",
+        entity_id=run_id,
+        actor=actor,
+        details={"job_id": job_id, "summary": summary},
+    )
+    emit(
+        "INFO" if drifted == 0 else "WARN",
+        "SCHEDULER",
+        f"Activity rollup reconcile finished: run_id={run_id} job_id={job_id} mismatches={mismatches} repair={config['repair']}",
+    )
+    return summary
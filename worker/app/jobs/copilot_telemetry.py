@@ -24,6 +24,7 @@ from datetime import datetime, timezone, timedelta
 import requests
 
 from app import db
+from app.job_control import stop_requested
 from app.jobs.mv_refresh import enqueue_impacted_mvs_for_tables
 from app.runtime_logger import emit
 from app.utils import log_job_run_log
@@ -75,35 +76,50 @@ def run_copilot_telemetry(*, run_id: str, job_id: str, actor=None):
         except Exception as exc:
             emit("WARN", "COPILOT_TELEMETRY", f"Failed to queue impacted MVs after session upsert: error={exc}")
 
+    # Later stages check for a cancel or an elapsed deadline first; each stage re-reads the whole
+    # lookback window, so the next run fills in whatever a stopped run skipped.
+    events, errors, topics, tools, response_times = [], [], [], [], []
+
     # --- Stage 2: Raw events ---
-    events = _fetch_events(since_iso)
-    if events:
-        _insert_events(events)
+    stopped = stop_requested(run_id, stage="events")
+    if not stopped:
+        events = _fetch_events(since_iso)
+        if events:
+            _insert_events(events)
 
     # --- Stage 3: Errors ---
-    errors = _fetch_errors(since_iso)
-    if errors:
-        _insert_errors(errors)
+    stopped = stopped or stop_requested(run_id, stage="errors")
+    if not stopped:
+        errors = _fetch_errors(since_iso)
+        if errors:
+            _insert_errors(errors)
 
     # --- Stage 4: Topic performance ---
-    topics = _fetch_topic_performance(since_iso)
-    if topics:
-        _upsert_topics(_aggregate_topics(topics))
-        _upsert_topics_hourly(topics)
+    stopped = stopped or stop_requested(run_id, stage="topics")
+    if not stopped:
+        topics = _fetch_topic_performance(since_iso)
+        if topics:
+            _upsert_topics(_aggregate_topics(topics))
+            _upsert_topics_hourly(topics)
 
     # --- Stage 5: Tool/connector performance ---
-    tools = _fetch_tool_performance(since_iso)
-    if tools:
-        _upsert_tools(_aggregate_tools(tools))
-        _upsert_tools_hourly(tools)
+    stopped = stopped or stop_requested(run_id, stage="tools")
+    if not stopped:
+        tools = _fetch_tool_performance(since_iso)
+        if tools:
+            _upsert_tools(_aggregate_tools(tools))
+            _upsert_tools_hourly(tools)
 
     # --- Stage 6: Agent response time ---
-    response_times = _fetch_response_times(since_iso)
-    if response_times:
-        _upsert_response_times(response_times)
+    stopped = stopped or stop_requested(run_id, stage="response_times")
+    if not stopped:
+        response_times = _fetch_response_times(since_iso)
+        if response_times:
+            _upsert_response_times(response_times)
 
     # --- Summary ---
-    log_job_run_log(run_id=run_id, level="INFO", message="copilot_telemetry_completed", context={
+    log_job_run_log(run_id=run_id, level="WARN" if stopped else "INFO",
+                    message="copilot_telemetry_stopped" if stopped else "copilot_telemetry_completed", context={
         "job_id": job_id,
         "lookback_hours": lookback_hours,
         "duration_sec": round(time.monotonic() - job_start, 2),
@@ -114,6 +130,7 @@ def run_copilot_telemetry(*, run_id: str, job_id: str, actor=None):
         "tools": len(tools),
         "response_times": len(response_times),
         "mv_refresh_queue": queued_mvs_summary,
+        "stopped": stopped,
     })
 
 
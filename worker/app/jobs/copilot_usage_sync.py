@@ -11,6 +11,7 @@ from urllib.parse import quote
 
 from app import db
 from app.graph_client import GraphClient, GraphError
+from app.job_control import clear_resume_cursor, load_resume_cursor, rotate_after, save_resume_cursor, stop_requested
 from app.runtime_logger import emit
 from app.utils import log_job_run_log
 
@@ -93,28 +94,41 @@ def run_copilot_usage_sync(*, run_id: str, job_id: str, actor=None):
 
     _upsert_report_data(summary_rows, trend_rows, user_detail_rows)
 
-    users_to_process = d7_active_rows[:max_users] if max_users > 0 else d7_active_rows
+    # A stopped run records the last report user it finished; the next run starts after that user.
+    resume_after = _load_interaction_resume_after()
+    candidate_rows = d7_active_rows
+    if resume_after is not None:
+        ordered = sorted(d7_active_rows, key=lambda row: row["report_user_key"])
+        keys = rotate_after([row["report_user_key"] for row in ordered], resume_after)
+        by_key = {row["report_user_key"]: row for row in ordered}
+        candidate_rows = [by_key[key] for key in keys]
+    users_to_process = candidate_rows[:max_users] if max_users > 0 else candidate_rows
+
     resolved_users: list[dict[str, Any]] = []
     unresolved_users = 0
+    aggregate_map: dict[tuple, dict[str, Any]] = {}
+    prompt_count = 0
+    stopped = None
+    last_user_key = None
     for user_row in users_to_process:
+        stopped = stop_requested(run_id, stage="interactions")
+        if stopped:
+            break
         resolved = _resolve_user(client, user_row)
         if resolved:
-            resolved_users.append({**user_row, **resolved})
+            resolved_row = {**user_row, **resolved}
+            resolved_users.append(resolved_row)
+            interactions = _fetch_enterprise_interactions(
+                client,
+                user_id=resolved_row["entra_user_id"],
+                window_start=interaction_window_start,
+                window_end=interaction_window_end,
+                page_size=page_size,
+            )
+            prompt_count += _aggregate_user_prompts(aggregate_map, resolved_row, interactions)
         else:
             unresolved_users += 1
-
-    aggregate_map: dict[tuple, dict[str, Any]] = {}
-    prompt_count = 0
-    for user_row in resolved_users:
-        interactions = _fetch_enterprise_interactions(
-            client,
-            user_id=user_row["entra_user_id"],
-            window_start=interaction_window_start,
-            window_end=interaction_window_end,
-            page_size=page_size,
-        )
-        user_prompt_count = _aggregate_user_prompts(aggregate_map, user_row, interactions)
-        prompt_count += user_prompt_count
+        last_user_key = user_row["report_user_key"]
 
     _replace_interaction_aggregates(
         list(aggregate_map.values()),
@@ -122,20 +136,25 @@ def run_copilot_usage_sync(*, run_id: str, job_id: str, actor=None):
         all_time=all_time_interactions,
         window_start=interaction_window_start,
         window_end=interaction_window_end,
+        processed_users_only=bool(stopped),
     )
-    _upsert_sync_state(
-        d7_active_users=len(d7_active_rows),
-        resolved_users=len(resolved_users),
-        unresolved_users=unresolved_users,
-        prompt_count=prompt_count,
-        window_start=interaction_window_start,
-        window_end=interaction_window_end,
-    )
+    if stopped:
+        _save_interaction_resume_after(last_user_key or resume_after, run_id=run_id, reason=stopped)
+    else:
+        _clear_interaction_resume_after()
+        _upsert_sync_state(
+            d7_active_users=len(d7_active_rows),
+            resolved_users=len(resolved_users),
+            unresolved_users=unresolved_users,
+            prompt_count=prompt_count,
+            window_start=interaction_window_start,
+            window_end=interaction_window_end,
+        )
 
     log_job_run_log(
         run_id=run_id,
-        level="INFO",
-        message="copilot_usage_sync_completed",
+        level="WARN" if stopped else "INFO",
+        message="copilot_usage_sync_stopped" if stopped else "copilot_usage_sync_completed",
         context={
             "job_id": job_id,
             "duration_sec": round(time.monotonic() - job_start, 2),
@@ -148,10 +167,39 @@ def run_copilot_usage_sync(*, run_id: str, job_id: str, actor=None):
             "unresolved_users": unresolved_users,
             "interaction_aggregate_rows": len(aggregate_map),
             "prompt_count": prompt_count,
+            "stopped": stopped,
         },
     )
 
 
+def _load_interaction_resume_after() -> str | None:
+    conn = db.get_conn()
+    try:
+        cursor = load_resume_cursor(conn.cursor(), "copilot_usage_sync", "interactions") or {}
+        conn.commit()
+    finally:
+        conn.close()
+    return cursor.get("after")
+
+
+def _save_interaction_resume_after(after: str | None, *, run_id: str, reason: str):
+    conn = db.get_conn()
+    try:
+        save_resume_cursor(conn.cursor(), "copilot_usage_sync", "interactions", {"after": after}, run_id=run_id, reason=reason)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _clear_interaction_resume_after():
+    conn = db.get_conn()
+    try:
+        clear_resume_cursor(conn.cursor(), "copilot_usage_sync", "interactions")
+        conn.commit()
+    finally:
+        conn.close()
+
+
 def _load_job_config(job_id: str) -> dict[str, Any]:
     try:
         row = db.fetch_one("SELECT config FROM jobs WHERE job_id = %s", [job_id])
@@ -686,6 +734,7 @@ def _replace_interaction_aggregates(
     all_time: bool,
     window_start: datetime | None,
     window_end: datetime,
+    processed_users_only: bool = False,
 ):
     conn = db.get_conn()
     try:
@@ -699,6 +748,18 @@ def _replace_interaction_aggregates(
                     """,
                     [user_ids],
                 )
+        elif window_start is not None and processed_users_only:
+            # A stopped run only rebuilt the users it reached; other users keep their window rows.
+            if user_ids:
+                cur.execute(
+                    """
+                    DELETE FROM m365_copilot_interaction_aggregates
+                    WHERE bucket_start_utc >= date_trunc('hour', %s::timestamptz)
+                      AND bucket_start_utc < %s::timestamptz
+                      AND entra_user_id = ANY(%s)
+                    """,
+                    [window_start, window_end, user_ids],
+                )
         elif window_start is not None:
             cur.execute(
                 """
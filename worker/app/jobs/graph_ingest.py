@@ -1,16 +1,40 @@
 import hashlib
 import json
 import os
+import queue
+import threading
 import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextvars import copy_context
 from datetime import datetime, timedelta, timezone
-from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, Optional, Tuple
 from urllib.parse import quote, unquote, urlparse
 
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+except ImportError:  # optional: only needed when GRAPH_TRANSFORM_COLUMNAR is enabled
+    pa = None
+
 from app import db
+from app.flush_sizing import flush_size, flush_sizer, observe as observe_flush
 from app.graph_client import GraphClient, GraphError
-from app.jobs.mv_refresh import enqueue_impacted_mvs_for_tables
+from app.job_control import clear_resume_cursor, load_resume_cursor, rotate_after, save_resume_cursor, stop_requested
+from app.job_progress import report_progress
+from app.raw_payloads import (
+    PayloadColumns,
+    archives_payloads,
+    detach as detach_payloads,
+    keeps_inline,
+    stage_archive_sql,
+)
+from app.jobs.graph_transform import TransformPool, page_links
+from app.jobs.activity_rollups import apply_activity_rollup_changes
+from app.jobs.mv_refresh import enqueue_changed_mvs
 from app.runtime_logger import emit
+from app.stage_timing import TRANSFORM, record, stage_timer, timed
+from app.tracing import span
 from app.utils import log_audit_event, log_job_run_log
 
 
@@ -20,20 +44,18 @@ GRAPH_MAX_CONCURRENCY = int(os.getenv("GRAPH_MAX_CONCURRENCY", "4"))
 
 DEFAULT_PERMISSIONS_BATCH_SIZE = int(os.getenv("GRAPH_PERMISSIONS_BATCH_SIZE", "50"))
 DEFAULT_PERMISSIONS_STALE_AFTER_HOURS = int(os.getenv("GRAPH_PERMISSIONS_STALE_AFTER_HOURS", "24"))
+DEFAULT_TRANSFORM_PROCESSES = int(os.getenv("GRAPH_TRANSFORM_PROCESSES", "0"))
+DEFAULT_DRIVE_ITEMS_FORCE_CRAWL_HOURS = int(os.getenv("GRAPH_DRIVE_ITEMS_FORCE_CRAWL_HOURS", "24"))
+DEFAULT_PARTITION_BOUNDARIES = ["c", "f", "j", "m", "p", "s", "v"]
 
 TEST_MODE_FEATURE_KEY = "test_mode"
 TEST_MODE_GROUP_ENV = "GRAPH_SYNC_TEST_MODE_GROUP_ID"
 GRAPH_SYNC_MODE_STATE_KEY = "graph_ingest"
 
-STAGE_IMPACTED_TABLES: Dict[str, Tuple[str, ...]] = {
-    "users": ("msgraph_users",),
-    "groups": ("msgraph_groups",),
-    "group_memberships": ("msgraph_group_memberships",),
-    "sites": ("msgraph_sites",),
-    "drives": ("msgraph_drives",),
-    "drive_items": ("msgraph_drive_items",),
-    "permissions": ("msgraph_drive_item_permissions", "msgraph_drive_item_permission_grants"),
-}
+# Tombstones are a few columns wide, so they get their own adaptive flush size instead of
+# sharing (and skewing) the table's size for full rows.
+_DRIVE_ITEMS_REMOVED_SIZING = "msgraph_drive_items:removed"
+_SITES_REMOVED_SIZING = "msgraph_sites:removed"
 
 
 def _env_bool(name: str, default: bool) -> bool:
@@ -65,6 +87,12 @@ def get_graph_sync_runtime_config() -> Dict[str, Any]:
         "skip_stages": _env_csv("GRAPH_SYNC_SKIP_STAGES"),
         "permissions_batch_size": DEFAULT_PERMISSIONS_BATCH_SIZE,
         "permissions_stale_after_hours": DEFAULT_PERMISSIONS_STALE_AFTER_HOURS,
+        "transform_processes": DEFAULT_TRANSFORM_PROCESSES,
+        "transform_columnar": _env_bool("GRAPH_TRANSFORM_COLUMNAR", False),
+        "drive_items_skip_unchanged": _env_bool("GRAPH_DRIVE_ITEMS_SKIP_UNCHANGED", True),
+        "drive_items_force_crawl_hours": DEFAULT_DRIVE_ITEMS_FORCE_CRAWL_HOURS,
+        "partitioned_enumeration": _env_bool("GRAPH_PARTITIONED_ENUMERATION", False),
+        "partition_boundaries": _env_csv("GRAPH_PARTITION_BOUNDARIES") or DEFAULT_PARTITION_BOUNDARIES,
     }
 
 
@@ -317,9 +345,13 @@ def _save_graph_sync_scope_state(scope: dict[str, Any]):
         conn.close()
 
 
-def _should_prune_test_mode_data(stages: dict[str, Any]) -> bool:
+def _drives_stage_completed(stages: dict[str, Any]) -> bool:
     drives_stage = stages.get("drives")
-    return isinstance(drives_stage, dict) and not drives_stage.get("skipped")
+    return isinstance(drives_stage, dict) and not drives_stage.get("skipped") and not drives_stage.get("stopped")
+
+
+def _should_prune_test_mode_data(stages: dict[str, Any]) -> bool:
+    return _drives_stage_completed(stages)
 
 
 def _get_scoped_site_ids_from_db(cur, scope: dict[str, Any]) -> list[str]:
@@ -477,6 +509,14 @@ def _prune_test_mode_data(scope: dict[str, Any], *, run_id: str) -> dict[str, in
         conn.close()
 
 
+# Stage result keys that count rows written, for the stage timing's rows/sec.
+_STAGE_ROW_KEYS = ("upserted", "upserted_active", "upserted_removed", "edges_upserted", "drive_upserts", "items_processed")
+
+
+def _stage_rows_written(stage_result: Dict[str, Any]) -> int:
+    return sum(int(stage_result.get(key) or 0) for key in _STAGE_ROW_KEYS)
+
+
 def _compact_json(value: Any, *, max_len: int = 300) -> str:
     try:
         text = json.dumps(value, sort_keys=True, default=str)
@@ -511,10 +551,14 @@ def _execute_values_dedup_keep_last(
     rows: list[tuple],
     *,
     key_fn: Callable[[tuple], Hashable],
+    payloads: Optional[PayloadColumns] = None,
+    sizing_key: Optional[str] = None,
 ) -> tuple[int, int]:
     deduped, dropped = _dedupe_rows_keep_last(rows, key_fn)
     if deduped:
-        db.execute_values(cur, query, deduped)
+        if payloads is not None:
+            deduped = detach_payloads(cur, deduped, payloads)
+        db.execute_values(cur, query, deduped, sizing_key=sizing_key)
     return len(deduped), dropped
 
 
@@ -619,7 +663,133 @@ def _execute_db_mutation_with_retry(
             time.sleep(sleep_seconds)
 
 
+# `eq null` on directory objects is an advanced query: Graph rejects it with 400 unless the request
+# carries ConsistencyLevel: eventual and $count=true. Every partition is sent that way so the ranges
+# and the null bucket read from the same index.
+_ADVANCED_QUERY_HEADERS = {"ConsistencyLevel": "eventual"}
+
+
+def _partition_filters(field: str, boundaries: list[str]) -> list[tuple[str, str]]:
+    """Split a collection into ranges on `field` that together cover every value.
+
+    Graph only offers ge/le on displayName, so neighbouring ranges share their boundary value;
+    _iter_partitioned dedupes the overlap by id. Range comparisons never match a null value, so a
+    last `eq null` partition picks those objects up; otherwise the synced_at sweep would delete
+    them. Empty strings sort before every boundary and fall in the first range. The filters are
+    advanced queries; send them with _ADVANCED_QUERY_HEADERS and `$count=true`.
+    """
+    bounds = sorted({b.strip() for b in boundaries if b and b.strip()})
+    if not bounds:
+        return []
+
+    def literal(value: str) -> str:
+        return "'" + value.replace("'", "''") + "'"
+
+    filters = [(f"..{bounds[0]}", f"{field} le {literal(bounds[0])}")]
+    for low, high in zip(bounds, bounds[1:]):
+        filters.append((f"{low}..{high}", f"{field} ge {literal(low)} and {field} le {literal(high)}"))
+    filters.append((f"{bounds[-1]}..", f"{field} ge {literal(bounds[-1])}"))
+    filters.append(("null", f"{field} eq null"))
+    return filters
+
+
+def _iter_partitioned(
+    client: GraphClient,
+    path: str,
+    *,
+    field: str,
+    boundaries: list[str],
+    max_workers: int,
+    stats: Dict[str, Any],
+) -> Iterator[Dict[str, Any]]:
+    """Yield every object of a flat collection, crawling `$filter` ranges concurrently.
+
+    Pages are handed to the caller's thread through a bounded queue so DB writes stay on one
+    connection. If Graph rejects the range filter (400) the remaining objects are read through
+    the plain nextLink chain, skipping ids that were already yielded.
+    """
+    filters = _partition_filters(field, boundaries)
+    partitions: Dict[str, Dict[str, int]] = {label: {"seen": 0, "duplicates": 0} for label, _ in filters}
+    stats.update({"mode": "partitioned", "partitions": partitions})
+    seen_ids: set[str] = set()
+    pages: "queue.Queue[tuple[str, Any]]" = queue.Queue(maxsize=max(2, max_workers * 2))
+    stop = threading.Event()
+    done = object()
+
+    def put(entry: tuple[str, Any]) -> bool:
+        while not stop.is_set():
+            try:
+                pages.put(entry, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def crawl(label: str, expr: str):
+        try:
+            sep = "&" if "?" in path else "?"
+            next_url: Optional[str] = f"{path}{sep}$count=true&$filter={quote(expr)}"
+            while next_url and not stop.is_set():
+                data = client.get_json(next_url, headers=_ADVANCED_QUERY_HEADERS)
+                if not put((label, data.get("value", []) or [])):
+                    return
+                next_url = data.get("@odata.nextLink")
+            put((label, done))
+        except Exception as exc:
+            put((label, exc))
+
+    def take(label: str, objects: list[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        for obj in objects:
+            obj_id = obj.get("id")
+            if not obj_id:
+                continue
+            if obj_id in seen_ids:
+                partitions[label]["duplicates"] += 1
+                continue
+            seen_ids.add(obj_id)
+            partitions[label]["seen"] += 1
+            yield obj
+
+    failure: Optional[Exception] = None
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(filters))))
+    try:
+        for label, expr in filters:
+            executor.submit(copy_context().run, crawl, label, expr)
+        remaining = len(filters)
+        while remaining:
+            label, payload = pages.get()
+            if payload is done:
+                remaining -= 1
+            elif isinstance(payload, Exception):
+                failure = payload
+                break
+            else:
+                yield from take(label, payload)
+    finally:
+        stop.set()
+        while True:
+            try:
+                pages.get_nowait()
+            except queue.Empty:
+                break
+        executor.shutdown(wait=True)
+
+    if failure is None:
+        return
+    if not (isinstance(failure, GraphError) and failure.status_code == 400):
+        raise failure
+    emit("WARN", "GRAPH", f"Partitioned enumeration rejected, falling back to sequential: path={path} error={failure}")
+    stats["mode"] = "sequential_fallback"
+    partitions["sequential"] = {"seen": 0, "duplicates": 0}
+    next_url = path
+    while next_url:
+        data = client.get_json(next_url)
+        yield from take("sequential", data.get("value", []) or [])
+        next_url = data.get("@odata.nextLink")
+
+
 _AVAILABILITY_TABLES = {"msgraph_users", "msgraph_sites", "msgraph_drives"}
+_DELETION_ONLY_TABLES = {"msgraph_groups"}
 
 
 def _graph_error_code(graph_error: GraphError) -> Optional[str]:
@@ -670,9 +840,11 @@ def _availability_error_payload(
     }
 
 
-def _mark_entity_available(cur, *, table: str, entity_id: str, checked_at: datetime):
+def _mark_entities_available(cur, *, table: str, entity_ids: list[str], checked_at: datetime) -> int:
     if table not in _AVAILABILITY_TABLES:
         raise ValueError(f"Unsupported availability table: {table}")
+    if not entity_ids:
+        return 0
     cur.execute(
         f"""
         UPDATE {table}
@@ -681,36 +853,99 @@ def _mark_entity_available(cur, *, table: str, entity_id: str, checked_at: datet
             availability_checked_at = %s,
             availability_reason = NULL,
             availability_error = NULL
-        WHERE id = %s
+        WHERE id = ANY(%s)
           AND deleted_at IS NULL
         """,
-        [checked_at, checked_at, entity_id],
+        [checked_at, checked_at, list(entity_ids)],
     )
+    return cur.rowcount
 
 
-def _mark_entity_unavailable(
+def _mark_entities_unavailable(
     cur,
     *,
     table: str,
-    entity_id: str,
+    marks: list[tuple[str, str, Optional[Dict[str, Any]]]],
     checked_at: datetime,
-    reason: str,
-    error_payload: Optional[Dict[str, Any]],
-):
+) -> int:
+    """Mark `(entity_id, reason, error_payload)` rows unavailable in a single statement."""
     if table not in _AVAILABILITY_TABLES:
         raise ValueError(f"Unsupported availability table: {table}")
+    if not marks:
+        return 0
     cur.execute(
         f"""
         UPDATE {table}
         SET is_available = FALSE,
             availability_checked_at = %s,
-            availability_reason = %s,
-            availability_error = %s
-        WHERE id = %s
+            availability_reason = v.reason,
+            availability_error = v.error
+        FROM unnest(%s::text[], %s::text[], %s::jsonb[]) AS v (id, reason, error)
+        WHERE {table}.id = v.id
+          AND {table}.deleted_at IS NULL
+        """,
+        [
+            checked_at,
+            [entity_id for entity_id, _reason, _error in marks],
+            [reason for _entity_id, reason, _error in marks],
+            [db.jsonb(error) if error is not None else None for _entity_id, _reason, error in marks],
+        ],
+    )
+    return cur.rowcount
+
+
+def _mark_entities_deleted(cur, *, table: str, entity_ids: list[str], deleted_at: datetime) -> int:
+    if table not in _AVAILABILITY_TABLES and table not in _DELETION_ONLY_TABLES:
+        raise ValueError(f"Unsupported deletion table: {table}")
+    if not entity_ids:
+        return 0
+    availability_sql = ""
+    params: list[Any] = [deleted_at, deleted_at]
+    if table in _AVAILABILITY_TABLES:
+        availability_sql = """,
+            is_available = FALSE,
+            availability_checked_at = %s,
+            availability_reason = 'deleted',
+            availability_error = '{}'::jsonb"""
+        params.append(deleted_at)
+    cur.execute(
+        f"""
+        UPDATE {table}
+        SET deleted_at = %s,
+            synced_at = %s{availability_sql}
+        WHERE id = ANY(%s)
           AND deleted_at IS NULL
         """,
-        [checked_at, reason, db.jsonb(error_payload) if error_payload is not None else None, entity_id],
+        [*params, list(entity_ids)],
     )
+    return cur.rowcount
+
+
+def _sweep_unseen_as_deleted(conn, cur, *, table: str, synced_at: datetime, chunk_size: int) -> int:
+    """Mark live rows this pass did not touch (`synced_at` older than the pass) as deleted.
+
+    The stale ids stream from a held cursor and are marked `chunk_size` at a time, one commit per
+    chunk, so a large tenant never holds row locks on the whole table in a single transaction.
+    """
+    rows = db.stream_rows(
+        conn,
+        f"graph_ingest_sweep_{table}",
+        f"SELECT id FROM {table} WHERE synced_at < %s AND deleted_at IS NULL",
+        [synced_at],
+        withhold=True,
+    )
+    marked = 0
+    chunk: list[str] = []
+    for (entity_id,) in rows:
+        chunk.append(entity_id)
+        if len(chunk) >= chunk_size:
+            marked += _mark_entities_deleted(cur, table=table, entity_ids=chunk, deleted_at=synced_at)
+            conn.commit()
+            chunk = []
+    if chunk:
+        marked += _mark_entities_deleted(cur, table=table, entity_ids=chunk, deleted_at=synced_at)
+        conn.commit()
+    return marked
 
 
 def _mark_drives_unavailable(
@@ -741,17 +976,19 @@ def _is_terminal_drive_listing_error(graph_error: GraphError) -> bool:
     return graph_error.status_code in (403, 404, 410) or _is_blocked_site_graph_error(graph_error)
 
 
-def _load_user_maps(cur) -> tuple[dict[str, str], dict[str, str]]:
-    cur.execute(
+def _load_user_maps(conn) -> tuple[dict[str, str], dict[str, str]]:
+    rows = db.stream_rows(
+        conn,
+        "graph_ingest_user_maps",
         """
         SELECT id, mail, user_principal_name
         FROM msgraph_users
         WHERE deleted_at IS NULL
-        """
+        """,
     )
     users_by_id: dict[str, str] = {}
     users_by_email: dict[str, str] = {}
-    for user_id, mail, upn in cur.fetchall():
+    for user_id, mail, upn in rows:
         if not user_id:
             continue
         users_by_id[user_id] = user_id
@@ -762,6 +999,23 @@ def _load_user_maps(cur) -> tuple[dict[str, str], dict[str, str]]:
     return users_by_id, users_by_email
 
 
+def _count_rows(cur, count_sql: str, params=None) -> int:
+    cur.execute(count_sql, params)
+    return int(cur.fetchone()[0])
+
+
+def _stream_ids_after(conn, name: str, select_sql: str, after: Optional[str]):
+    """Stream `select_sql` (a bare `SELECT id ... WHERE ...`) ordered by id, starting after `after`.
+
+    Same order as `rotate_after` over the sorted ids, without holding them in memory. The cursor is
+    held across the caller's per-id commits and rollbacks.
+    """
+    if after is None:
+        return db.stream_rows(conn, name, f"{select_sql} ORDER BY id", withhold=True)
+    # FALSE sorts first, so ids past `after` come before the wrapped-around ones.
+    return db.stream_rows(conn, name, f"{select_sql} ORDER BY id <= %s, id", [after], withhold=True)
+
+
 def _resolve_identity(
     identity: Optional[Dict[str, Any]],
     users_by_id: dict[str, str],
@@ -846,7 +1100,13 @@ def _compute_path_level(normalized_path: Optional[str]) -> Optional[int]:
     return len([seg for seg in path.split("/") if seg])
 
 
-def run_graph_ingest(*, run_id: str, job_id: str, actor: Optional[Dict[str, Any]] = None):
+def run_graph_ingest(*, run_id: str, job_id: str, actor: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    # Ingest changes are released in bulk by enqueue_changed_mvs() at the end of the run.
+    with db.deferred_mv_invalidation():
+        return _run_graph_ingest(run_id=run_id, job_id=job_id, actor=actor)
+
+
+def _run_graph_ingest(*, run_id: str, job_id: str, actor: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     client = GraphClient()
     scope, transition = _prepare_graph_sync_scope(client)
     transition_summary = _apply_graph_sync_transition(transition)
@@ -856,6 +1116,13 @@ def run_graph_ingest(*, run_id: str, job_id: str, actor: Optional[Dict[str, Any]
     pull_permissions = bool(config.get("pull_permissions", True))
     sync_group_memberships = bool(config.get("sync_group_memberships", True))
     group_memberships_users_only = bool(config.get("group_memberships_users_only", True))
+    transform_processes = int(config.get("transform_processes", DEFAULT_TRANSFORM_PROCESSES))
+    transform_columnar = bool(config.get("transform_columnar", False))
+    drive_items_skip_unchanged = bool(config.get("drive_items_skip_unchanged", True))
+    drive_items_force_crawl_hours = int(config.get("drive_items_force_crawl_hours", DEFAULT_DRIVE_ITEMS_FORCE_CRAWL_HOURS))
+    partition_boundaries: Optional[list[str]] = None
+    if config.get("partitioned_enumeration"):
+        partition_boundaries = list(config.get("partition_boundaries") or DEFAULT_PARTITION_BOUNDARIES)
     requested_stages = config.get("stages")
     skip_stages = set(config.get("skip_stages") or [])
     emit(
@@ -863,7 +1130,7 @@ def run_graph_ingest(*, run_id: str, job_id: str, actor: Optional[Dict[str, Any]
         "GRAPH",
         (
             f"Job started: run_id={run_id} job_id={job_id} "
-            f"flush_every={flush_every} pull_permissions={pull_permissions} "
+            f"flush_every={flush_every} pull_permissions={pull_permissions} transform_processes={transform_processes} transform_columnar={transform_columnar} "
             f"sync_group_memberships={sync_group_memberships} users_only={group_memberships_users_only} "
             f"requested_stages={_compact_json(requested_stages)} skip_stages={_compact_json(sorted(skip_stages))} "
             f"mode={scope.get('mode')} transition={_compact_json(transition_summary)}"
@@ -915,12 +1182,20 @@ def run_graph_ingest(*, run_id: str, job_id: str, actor: Optional[Dict[str, Any]
         "scope_changed": bool(transition.get("scope_changed")),
         "transition": transition_summary,
     }
+    stopped_reason: Optional[str] = None
     for stage in stage_order:
         if stage in skip_stages:
             stages[stage] = {"skipped": True}
             emit("INFO", "GRAPH", f"Stage completed: {stage} summary={_compact_json(stages[stage])}")
             continue
 
+        stop_reason = stop_requested(run_id, stage=stage)
+        if stop_reason:
+            stopped_reason = stop_reason
+            stages[stage] = {"skipped": True, "reason": stop_reason}
+            emit("WARN", "GRAPH", f"Stage not started: {stage} reason={stop_reason}")
+            continue
+
         log_job_run_log(
             run_id=run_id,
             level="INFO",
@@ -928,48 +1203,89 @@ def run_graph_ingest(*, run_id: str, job_id: str, actor: Optional[Dict[str, Any]
             context={"job_id": job_id},
         )
         emit("INFO", "GRAPH", f"Stage started: {stage}")
+        report_progress(run_id, stage)
 
         stage_result: Dict[str, Any]
-        if stage == "users":
-            stage_result = _ingest_users(client, run_id=run_id, flush_every=flush_every, scope=scope)
-            stages["users"] = stage_result
-        elif stage == "groups":
-            stage_result = _ingest_groups(client, run_id=run_id, flush_every=flush_every, scope=scope)
-            stages["groups"] = stage_result
-        elif stage == "group_memberships":
-            if not sync_group_memberships:
-                stage_result = {"skipped": True, "reason": "sync_group_memberships_disabled"}
-                stages["group_memberships"] = stage_result
-            else:
-                stage_result = _ingest_group_memberships(
+        with stage_timer() as timer, flush_sizer(flush_every) as sizer, span("graph_ingest.stage", **{"job.stage": stage}) as stage_span:
+            if stage == "users":
+                stage_result = _ingest_users(
+                    client,
+                    run_id=run_id,
+                    flush_every=flush_every,
+                    scope=scope,
+                    partition_boundaries=partition_boundaries,
+                )
+                stages["users"] = stage_result
+            elif stage == "groups":
+                stage_result = _ingest_groups(
                     client,
                     run_id=run_id,
                     flush_every=flush_every,
-                    users_only=group_memberships_users_only,
                     scope=scope,
+                    partition_boundaries=partition_boundaries,
                 )
-                stages["group_memberships"] = stage_result
-        elif stage == "sites":
-            stage_result = _ingest_sites(client, run_id=run_id, flush_every=flush_every, scope=scope)
-            stages["sites"] = stage_result
-        elif stage == "drives":
-            stage_result = _ingest_drives(client, run_id=run_id, flush_every=flush_every, scope=scope)
-            stages["drives"] = stage_result
-        elif stage == "drive_items":
-            stage_result = _ingest_drive_items(client, run_id=run_id, flush_every=flush_every, scope=scope)
-            stages["drive_items"] = stage_result
-        elif stage == "permissions":
-            if not pull_permissions:
-                stage_result = {"skipped": True, "reason": "pull_permissions_disabled"}
-                stages["permissions"] = stage_result
+                stages["groups"] = stage_result
+            elif stage == "group_memberships":
+                if not sync_group_memberships:
+                    stage_result = {"skipped": True, "reason": "sync_group_memberships_disabled"}
+                    stages["group_memberships"] = stage_result
+                else:
+                    stage_result = _ingest_group_memberships(
+                        client,
+                        run_id=run_id,
+                        flush_every=flush_every,
+                        users_only=group_memberships_users_only,
+                        scope=scope,
+                    )
+                    stages["group_memberships"] = stage_result
+            elif stage == "sites":
+                stage_result = _ingest_sites(client, run_id=run_id, flush_every=flush_every, scope=scope)
+                stages["sites"] = stage_result
+            elif stage == "drives":
+                stage_result = _ingest_drives(client, run_id=run_id, flush_every=flush_every, scope=scope)
+                stages["drives"] = stage_result
+            elif stage == "drive_items":
+                stage_result = _ingest_drive_items(
+                    client,
+                    run_id=run_id,
+                    flush_every=flush_every,
+                    scope=scope,
+                    transform_processes=transform_processes,
+                    transform_columnar=transform_columnar,
+                    # Drive markers are only current if this run's drives stage ran to completion.
+                    skip_unchanged=drive_items_skip_unchanged and _drives_stage_completed(stages),
+                    force_crawl_hours=drive_items_force_crawl_hours,
+                )
+                stages["drive_items"] = stage_result
+            elif stage == "permissions":
+                if not pull_permissions:
+                    stage_result = {"skipped": True, "reason": "pull_permissions_disabled"}
+                    stages["permissions"] = stage_result
+                else:
+                    stage_result = _scan_permissions(client, config, run_id=run_id, scope=scope)
+                    stages["permissions"] = stage_result
             else:
-                stage_result = _scan_permissions(client, config, run_id=run_id, scope=scope)
-                stages["permissions"] = stage_result
-        else:
-            stage_result = {"skipped": True, "reason": "unknown_stage"}
-            stages[stage] = stage_result
+                stage_result = {"skipped": True, "reason": "unknown_stage"}
+                stages[stage] = stage_result
+            if not stage_result.get("skipped"):
+                stage_result["timing"] = timer.summary(rows=_stage_rows_written(stage_result))
+            if sizer is not None and sizer.summary():
+                stage_result["flush_sizes"] = sizer.summary()
+            stage_span.set_attributes(
+                {
+                    "job.stage.skipped": bool(stage_result.get("skipped")),
+                    "job.stage.stopped": stage_result.get("stopped"),
+                    "job.stage.rows": _stage_rows_written(stage_result),
+                }
+            )
 
-        emit("INFO", "GRAPH", f"Stage completed: {stage} summary={_compact_json(stage_result)}")
+        if stage_result.get("stopped"):
+            stopped_reason = stage_result["stopped"]
+            emit("WARN", "GRAPH", f"Stage stopped early: {stage} reason={stopped_reason} summary={_compact_json(stage_result)}")
+        else:
+            emit("INFO", "GRAPH", f"Stage completed: {stage} summary={_compact_json(stage_result)}")
+        if stage_result.get("timing"):
+            emit("INFO", "GRAPH", f"Stage timing: {stage} {_compact_json(stage_result['timing'], max_len=600)}")
 
     if scope.get("mode") == "test":
         if _should_prune_test_mode_data(stages):
@@ -981,35 +1297,40 @@ def run_graph_ingest(*, run_id: str, job_id: str, actor: Optional[Dict[str, Any]
 
     _save_graph_sync_scope_state(scope)
 
-    queued_mvs_summary: Dict[str, Any] = {"tables": [], "queued": 0, "queued_mvs": []}
     try:
-        touched_tables: set[str] = set()
-        for stage_name, stage_result in stages.items():
-            if isinstance(stage_result, dict) and stage_result.get("skipped"):
-                continue
-            touched_tables.update(STAGE_IMPACTED_TABLES.get(stage_name, ()))
-        queued_mvs_summary = enqueue_impacted_mvs_for_tables(sorted(touched_tables))
+        stages["activity_rollups"] = apply_activity_rollup_changes()
+    except Exception as exc:
+        stages["activity_rollups"] = {"error": str(exc)}
+        emit("WARN", "GRAPH", f"Failed to apply activity rollups: error={exc}")
+
+    queued_mvs_summary: Dict[str, Any] = {"changes": {}, "tables": [], "queued": 0, "queued_mvs": []}
+    try:
+        # Only tables whose rows really changed (per the statement triggers' change log) invalidate MVs.
+        queued_mvs_summary = enqueue_changed_mvs()
         emit(
             "INFO",
             "GRAPH",
-            f"Queued impacted MVs: queued={queued_mvs_summary.get('queued', 0)} tables={_compact_json(queued_mvs_summary.get('tables', []))}",
+            f"Queued impacted MVs: queued={queued_mvs_summary.get('queued', 0)} tables={_compact_json(queued_mvs_summary.get('tables', []))} "
+            f"changes={_compact_json(queued_mvs_summary.get('changes', {}))} held={_compact_json(queued_mvs_summary.get('held', {}))}",
         )
     except Exception as exc:
         emit("WARN", "GRAPH", f"Failed to queue impacted MVs: error={exc}")
     stages["mv_refresh_queue"] = queued_mvs_summary
 
+    # A stopped run keeps its partial stage summaries; cursors saved by the stages let the next run resume.
+    outcome = "graph_ingest_stopped" if stopped_reason else "graph_ingest_completed"
     log_job_run_log(
         run_id=run_id,
-        level="INFO",
-        message="graph_ingest_completed",
-        context={"job_id": job_id, "stages": stages, "started_at": started_at.isoformat()},
+        level="WARN" if stopped_reason else "INFO",
+        message=outcome,
+        context={"job_id": job_id, "stages": stages, "started_at": started_at.isoformat(), "stopped": stopped_reason},
     )
     log_audit_event(
-        action="graph_ingest_completed",
+        action=outcome,
         entity_type="job_run",
         entity_id=run_id,
         actor=actor,
-        details={"job_id": job_id, "stages": stages},
+        details={"job_id": job_id, "stages": stages, "stopped": stopped_reason},
     )
     duration_seconds = int((datetime.now(timezone.utc) - started_at).total_seconds())
     emit(
@@ -1017,6 +1338,7 @@ def run_graph_ingest(*, run_id: str, job_id: str, actor: Optional[Dict[str, Any]
         "GRAPH",
         f"Job finished: run_id={run_id} job_id={job_id} duration_seconds={duration_seconds} stages={_compact_json(stages, max_len=500)}",
     )
+    return stages
 
 
 def _get_delta_link(cur, resource_type: str, partition_key: str) -> Optional[str]:
@@ -1030,24 +1352,79 @@ def _get_delta_link(cur, resource_type: str, partition_key: str) -> Optional[str
     return row[0]
 
 
-def _set_delta_link(cur, resource_type: str, partition_key: str, delta_link: str):
+def _set_delta_link(
+    cur,
+    resource_type: str,
+    partition_key: str,
+    delta_link: str,
+    *,
+    source_modified_dt: Optional[datetime] = None,
+    source_quota_used: Optional[int] = None,
+):
     cur.execute(
         """
-        INSERT INTO msgraph_delta_state (resource_type, partition_key, delta_link, last_synced_at)
-        VALUES (%s, %s, %s, now())
+        INSERT INTO msgraph_delta_state
+          (resource_type, partition_key, delta_link, last_synced_at, source_modified_dt, source_quota_used)
+        VALUES (%s, %s, %s, now(), %s, %s)
         ON CONFLICT (resource_type, partition_key)
-        DO UPDATE SET delta_link = EXCLUDED.delta_link, last_synced_at = EXCLUDED.last_synced_at
+        DO UPDATE SET
+          delta_link = EXCLUDED.delta_link,
+          last_synced_at = EXCLUDED.last_synced_at,
+          source_modified_dt = EXCLUDED.source_modified_dt,
+          source_quota_used = EXCLUDED.source_quota_used
         """,
-        [resource_type, partition_key, delta_link],
+        [resource_type, partition_key, delta_link, source_modified_dt, source_quota_used],
     )
 
 
+def _load_drive_change_state(cur) -> dict[str, tuple]:
+    # Current drive markers (written by the drives stage) and when they were written, next to the
+    # markers recorded at the last successful drive_items delta commit for the same drive.
+    cur.execute(
+        """
+        SELECT d.id, d.last_modified_dt, d.quota_used, d.synced_at,
+               s.source_modified_dt, s.source_quota_used, s.last_synced_at
+        FROM msgraph_drives d
+        LEFT JOIN msgraph_delta_state s
+          ON s.resource_type = 'drive_items' AND s.partition_key = d.id AND s.delta_link IS NOT NULL
+        WHERE d.deleted_at IS NULL AND d.is_available = TRUE
+        """
+    )
+    return {row[0]: tuple(row[1:]) for row in cur.fetchall()}
+
+
+def _drive_change_decision(
+    state: Optional[tuple],
+    *,
+    now: datetime,
+    force_crawl_after: Optional[timedelta],
+) -> str:
+    """Return "crawl", "skip" or "force" for one drive ahead of the drive_items delta request.
+
+    Matching markers only prove the drive is unchanged if the drives stage wrote them after the last
+    delta commit; markers left over from an earlier listing always crawl.
+    """
+    if not state:
+        return "crawl"
+    last_modified_dt, quota_used, drive_synced_at, source_modified_dt, source_quota_used, last_synced_at = state
+    if last_modified_dt is None or source_modified_dt is None or last_synced_at is None:
+        return "crawl"
+    if drive_synced_at is None or drive_synced_at <= last_synced_at:
+        return "crawl"
+    if last_modified_dt != source_modified_dt or quota_used != source_quota_used:
+        return "crawl"
+    if force_crawl_after is not None and now - last_synced_at >= force_crawl_after:
+        return "force"
+    return "skip"
+
+
 def _ingest_users(
     client: GraphClient,
     *,
     run_id: str,
     flush_every: int,
     scope: Optional[Dict[str, Any]] = None,
+    partition_boundaries: Optional[list[str]] = None,
 ) -> Dict[str, Any]:
     if scope and scope.get("mode") == "test":
         synced_at = datetime.now(timezone.utc)
@@ -1194,7 +1571,20 @@ def _ingest_users(
     try:
         cur = conn.cursor()
         batch: list[tuple] = []
-        for user in client.iter_paged(f"/users?$select={select}&$top=999"):
+        stopped: Optional[str] = None
+        enumeration: Dict[str, Any] = {"mode": "sequential"}
+        if partition_boundaries:
+            users_iter = _iter_partitioned(
+                client,
+                f"/users?$select={select}&$top=999",
+                field="displayName",
+                boundaries=partition_boundaries,
+                max_workers=GRAPH_MAX_CONCURRENCY,
+                stats=enumeration,
+            )
+        else:
+            users_iter = client.iter_paged(f"/users?$select={select}&$top=999")
+        for user in users_iter:
             user_id = user.get("id")
             if not user_id:
                 continue
@@ -1222,48 +1612,49 @@ def _ingest_users(
                 )
             )
             total += 1
-            if len(batch) >= flush_every:
+            if len(batch) >= flush_size("msgraph_users", flush_every):
                 executed, dropped = _execute_values_dedup_keep_last(cur, upsert_sql, batch, key_fn=lambda r: r[0])
                 conn.commit()
                 flushed += executed
                 dropped_duplicates += dropped
                 batch = []
+                report_progress(run_id, "users", items_seen=total, rows_written=flushed)
+                stopped = stop_requested(run_id, stage="users")
+                if stopped:
+                    break
+        if stopped:
+            users_iter.close()
 
         if batch:
             executed, dropped = _execute_values_dedup_keep_last(cur, upsert_sql, batch, key_fn=lambda r: r[0])
             conn.commit()
             flushed += executed
             dropped_duplicates += dropped
+        report_progress(run_id, "users", items_seen=total, rows_written=flushed)
 
-        cur.execute(
-            """
-            UPDATE msgraph_users
-            SET deleted_at = %s,
-                synced_at = %s,
-                is_available = FALSE,
-                availability_checked_at = %s,
-                availability_reason = 'deleted',
-                availability_error = '{}'::jsonb
-            WHERE synced_at < %s AND deleted_at IS NULL
-            """,
-            [synced_at, synced_at, synced_at, synced_at],
-        )
-        marked_deleted = cur.rowcount
-        conn.commit()
+        # Users not seen by a stopped enumeration are not gone, so the deletion sweep only runs on a full pass.
+        marked_deleted = 0
+        if not stopped:
+            marked_deleted = _sweep_unseen_as_deleted(
+                conn, cur, table="msgraph_users", synced_at=synced_at, chunk_size=flush_every
+            )
 
+        summary = {
+            "total_seen": total,
+            "upserted": flushed,
+            "dropped_duplicates": dropped_duplicates,
+            "marked_deleted": marked_deleted,
+            "enumeration": enumeration,
+        }
+        if stopped:
+            summary["stopped"] = stopped
         log_job_run_log(
             run_id=run_id,
             level="INFO",
             message="users_ingested",
-            context={
-                "synced_at": synced_at.isoformat(),
-                "total_seen": total,
-                "upserted": flushed,
-                "dropped_duplicates": dropped_duplicates,
-                "marked_deleted": marked_deleted,
-            },
+            context={"synced_at": synced_at.isoformat(), **summary},
         )
-        return {"total_seen": total, "upserted": flushed, "dropped_duplicates": dropped_duplicates, "marked_deleted": marked_deleted}
+        return summary
     finally:
         conn.close()
 
@@ -1274,6 +1665,7 @@ def _ingest_groups(
     run_id: str,
     flush_every: int,
     scope: Optional[Dict[str, Any]] = None,
+    partition_boundaries: Optional[list[str]] = None,
 ) -> Dict[str, Any]:
     if scope and scope.get("mode") == "test":
         synced_at = datetime.now(timezone.utc)
@@ -1393,7 +1785,20 @@ def _ingest_groups(
     try:
         cur = conn.cursor()
         batch: list[tuple] = []
-        for group in client.iter_paged(f"/groups?$select={select}&$top=999"):
+        stopped: Optional[str] = None
+        enumeration: Dict[str, Any] = {"mode": "sequential"}
+        if partition_boundaries:
+            groups_iter = _iter_partitioned(
+                client,
+                f"/groups?$select={select}&$top=999",
+                field="displayName",
+                boundaries=partition_boundaries,
+                max_workers=GRAPH_MAX_CONCURRENCY,
+                stats=enumeration,
+            )
+        else:
+            groups_iter = client.iter_paged(f"/groups?$select={select}&$top=999")
+        for group in groups_iter:
             group_id = group.get("id")
             if not group_id:
                 continue
@@ -1414,43 +1819,48 @@ def _ingest_groups(
                 )
             )
             total += 1
-            if len(batch) >= flush_every:
+            if len(batch) >= flush_size("msgraph_groups", flush_every):
                 executed, dropped = _execute_values_dedup_keep_last(cur, upsert_sql, batch, key_fn=lambda r: r[0])
                 conn.commit()
                 flushed += executed
                 dropped_duplicates += dropped
                 batch = []
+                report_progress(run_id, "groups", items_seen=total, rows_written=flushed)
+                stopped = stop_requested(run_id, stage="groups")
+                if stopped:
+                    break
+        if stopped:
+            groups_iter.close()
 
         if batch:
             executed, dropped = _execute_values_dedup_keep_last(cur, upsert_sql, batch, key_fn=lambda r: r[0])
             conn.commit()
             flushed += executed
             dropped_duplicates += dropped
+        report_progress(run_id, "groups", items_seen=total, rows_written=flushed)
 
-        cur.execute(
-            """
-            UPDATE msgraph_groups
-            SET deleted_at = %s, synced_at = %s
-            WHERE synced_at < %s AND deleted_at IS NULL
-            """,
-            [synced_at, synced_at, synced_at],
-        )
-        marked_deleted = cur.rowcount
-        conn.commit()
+        marked_deleted = 0
+        if not stopped:
+            marked_deleted = _sweep_unseen_as_deleted(
+                conn, cur, table="msgraph_groups", synced_at=synced_at, chunk_size=flush_every
+            )
 
+        summary = {
+            "total_seen": total,
+            "upserted": flushed,
+            "dropped_duplicates": dropped_duplicates,
+            "marked_deleted": marked_deleted,
+            "enumeration": enumeration,
+        }
+        if stopped:
+            summary["stopped"] = stopped
         log_job_run_log(
             run_id=run_id,
             level="INFO",
             message="groups_ingested",
-            context={
-                "synced_at": synced_at.isoformat(),
-                "total_seen": total,
-                "upserted": flushed,
-                "dropped_duplicates": dropped_duplicates,
-                "marked_deleted": marked_deleted,
-            },
+            context={"synced_at": synced_at.isoformat(), **summary},
         )
-        return {"total_seen": total, "upserted": flushed, "dropped_duplicates": dropped_duplicates, "marked_deleted": marked_deleted}
+        return summary
     finally:
         conn.close()
 
@@ -1464,6 +1874,10 @@ def _member_type(member: Dict[str, Any]) -> str:
     return odata_type or "directoryObject"
 
 
+# (group_id, member_id, member_type, synced_at, deleted_at, raw_json)
+_MEMBERSHIP_PAYLOADS = PayloadColumns("group_membership", key=(0, 1, 2), payload=5, synced_at=3)
+
+
 def _ingest_group_memberships(
     client: GraphClient,
     *,
@@ -1504,6 +1918,7 @@ def _ingest_group_memberships(
                     upsert_sql,
                     chunk,
                     key_fn=lambda r: (r[0], r[1], r[2]),
+                    payloads=_MEMBERSHIP_PAYLOADS,
                 )
                 conn.commit()
                 edge_upserts += executed
@@ -1553,12 +1968,32 @@ def _ingest_group_memberships(
     conn = db.get_conn()
     try:
         cur = conn.cursor()
-        cur.execute("SELECT id FROM msgraph_groups WHERE deleted_at IS NULL")
-        group_ids = [row[0] for row in cur.fetchall()]
-        conn.commit()
+        group_total = _count_rows(cur, "SELECT count(*) FROM msgraph_groups WHERE deleted_at IS NULL")
+        # A stopped run records the last group it finished; start after it so the rest are not starved.
+        resume = load_resume_cursor(cur, "graph_ingest", "group_memberships") or {}
+        group_rows = _stream_ids_after(
+            conn,
+            "graph_ingest_group_memberships",
+            "SELECT id FROM msgraph_groups WHERE deleted_at IS NULL",
+            resume.get("after"),
+        )
 
-        for group_id in group_ids:
+        stopped: Optional[str] = None
+        last_group_id: Optional[str] = None
+        for (group_id,) in group_rows:
+            report_progress(
+                run_id,
+                "group_memberships",
+                rows_written=edge_upserts,
+                units_done=group_count,
+                units_total=group_total,
+                unit="groups",
+            )
+            stopped = stop_requested(run_id, stage="group_memberships")
+            if stopped:
+                break
             group_count += 1
+            last_group_id = group_id
             try:
                 members_iter = client.iter_paged(f"/groups/{group_id}/members?$select=id,displayName,userPrincipalName,mail&$top=999")
                 batch: list[tuple] = []
@@ -1570,12 +2005,13 @@ def _ingest_group_memberships(
                     if users_only and mtype != "user":
                         continue
                     batch.append((group_id, member_id, mtype, synced_at, None, db.jsonb(member)))
-                    if len(batch) >= flush_every:
+                    if len(batch) >= flush_size("msgraph_group_memberships", flush_every):
                         executed, dropped = _execute_values_dedup_keep_last(
                             cur,
                             upsert_sql,
                             batch,
                             key_fn=lambda r: (r[0], r[1], r[2]),
+                            payloads=_MEMBERSHIP_PAYLOADS,
                         )
                         conn.commit()
                         edge_upserts += executed
@@ -1588,6 +2024,7 @@ def _ingest_group_memberships(
                         upsert_sql,
                         batch,
                         key_fn=lambda r: (r[0], r[1], r[2]),
+                        payloads=_MEMBERSHIP_PAYLOADS,
                     )
                     conn.commit()
                     edge_upserts += executed
@@ -1617,27 +2054,37 @@ def _ingest_group_memberships(
                 )
                 conn.rollback()
                 continue
+        report_progress(run_id, "group_memberships", rows_written=edge_upserts, units_done=group_count)
+
+        if stopped:
+            save_resume_cursor(
+                cur,
+                "graph_ingest",
+                "group_memberships",
+                {"after": last_group_id or resume.get("after")},
+                run_id=run_id,
+                reason=stopped,
+            )
+        else:
+            clear_resume_cursor(cur, "graph_ingest", "group_memberships")
+        conn.commit()
 
-        log_job_run_log(
-            run_id=run_id,
-            level="INFO",
-            message="group_memberships_ingested",
-            context={
-                "synced_at": synced_at.isoformat(),
-                "groups_processed": group_count,
-                "edges_upserted": edge_upserts,
-                "dropped_duplicates": dropped_duplicates,
-                "skipped_groups": skipped_groups,
-                "users_only": users_only,
-            },
-        )
-        return {
+        summary = {
             "groups_processed": group_count,
             "edges_upserted": edge_upserts,
             "dropped_duplicates": dropped_duplicates,
             "skipped_groups": skipped_groups,
             "users_only": users_only,
         }
+        if stopped:
+            summary["stopped"] = stopped
+        log_job_run_log(
+            run_id=run_id,
+            level="INFO",
+            message="group_memberships_ingested",
+            context={"synced_at": synced_at.isoformat(), **summary},
+        )
+        return summary
     finally:
         conn.close()
 
@@ -1718,6 +2165,7 @@ def _ingest_sites(
             conn.commit()
 
             active_batch: list[tuple] = []
+            unavailable_marks: list[tuple[str, str, Optional[Dict[str, Any]]]] = []
             for site_id in scope.get("site_ids") or []:
                 try:
                     site = client.get_json(f"/sites/{site_id}?$select={select}")
@@ -1741,12 +2189,14 @@ def _ingest_sites(
                             db.jsonb(site),
                         )
                     )
-                    if len(active_batch) >= flush_every:
+                    if len(active_batch) >= flush_size("msgraph_sites", flush_every):
                         executed, dropped = _execute_values_dedup_keep_last(cur, upsert_active_sql, active_batch, key_fn=lambda r: r[0])
+                        _mark_entities_unavailable(cur, table="msgraph_sites", marks=unavailable_marks, checked_at=synced_at)
                         conn.commit()
                         flushed_active += executed
                         dropped_active_duplicates += dropped
                         active_batch = []
+                        unavailable_marks = []
                 except GraphError as exc:
                     skipped_error += 1
                     if _is_terminal_drive_listing_error(exc):
@@ -1757,20 +2207,13 @@ def _ingest_sites(
                             target_id=site_id,
                             reason=reason,
                         )
-                        _mark_entity_unavailable(
-                            cur,
-                            table="msgraph_sites",
-                            entity_id=site_id,
-                            checked_at=synced_at,
-                            reason=reason,
-                            error_payload=error_payload,
-                        )
-                        conn.commit()
+                        unavailable_marks.append((site_id, reason, error_payload))
                         continue
                     raise
 
-            if active_batch:
+            if active_batch or unavailable_marks:
                 executed, dropped = _execute_values_dedup_keep_last(cur, upsert_active_sql, active_batch, key_fn=lambda r: r[0])
+                _mark_entities_unavailable(cur, table="msgraph_sites", marks=unavailable_marks, checked_at=synced_at)
                 conn.commit()
                 flushed_active += executed
                 dropped_active_duplicates += dropped
@@ -1867,6 +2310,8 @@ def _ingest_sites(
         delta_link = _get_delta_link(cur, "sites", "global")
         next_url = delta_link or f"/sites/delta?$select={select}&$top=999"
         delta_link_new: Optional[str] = None
+        stopped: Optional[str] = None
+        resume_url: Optional[str] = None
 
         active_batch: list[tuple] = []
         removed_batch: list[tuple] = []
@@ -1903,15 +2348,17 @@ def _ingest_sites(
                             )
                         )
 
-                    if len(active_batch) >= flush_every:
+                    if len(active_batch) >= flush_size("msgraph_sites", flush_every):
                         executed, dropped = _execute_values_dedup_keep_last(cur, upsert_active_sql, active_batch, key_fn=lambda r: r[0])
                         conn.commit()
                         flushed_active += executed
                         dropped_active_duplicates += dropped
                         active_batch = []
 
-                    if len(removed_batch) >= flush_every:
-                        executed, dropped = _execute_values_dedup_keep_last(cur, upsert_removed_sql, removed_batch, key_fn=lambda r: r[0])
+                    if len(removed_batch) >= flush_size(_SITES_REMOVED_SIZING, flush_every):
+                        executed, dropped = _execute_values_dedup_keep_last(
+                            cur, upsert_removed_sql, removed_batch, key_fn=lambda r: r[0], sizing_key=_SITES_REMOVED_SIZING
+                        )
                         conn.commit()
                         flushed_removed += executed
                         dropped_removed_duplicates += dropped
@@ -1919,6 +2366,12 @@ def _ingest_sites(
 
                 next_url = data.get("@odata.nextLink")
                 delta_link_new = data.get("@odata.deltaLink") or delta_link_new
+                report_progress(run_id, "sites", items_seen=total, rows_written=flushed_active + flushed_removed)
+                if next_url:
+                    stopped = stop_requested(run_id, stage="sites")
+                    if stopped:
+                        resume_url = next_url
+                        break
         except GraphError as exc:
             mode = "list_fallback"
             emit("WARN", "GRAPH", f"Sites delta failed, switching to full listing: status_code={exc.status_code} error={exc}")
@@ -1935,8 +2388,11 @@ def _ingest_sites(
             removed = 0
             flushed_active = 0
             flushed_removed = 0
+            stopped = None
+            resume_url = None
 
-            for site in client.iter_paged(f"/sites?search=*&$select={select}&$top=999"):
+            sites_iter = client.iter_paged(f"/sites?search=*&$select={select}&$top=999")
+            for site in sites_iter:
                 site_id = site.get("id")
                 if not site_id:
                     continue
@@ -1960,12 +2416,17 @@ def _ingest_sites(
                         db.jsonb(site),
                     )
                 )
-                if len(active_batch) >= flush_every:
+                if len(active_batch) >= flush_size("msgraph_sites", flush_every):
                     executed, dropped = _execute_values_dedup_keep_last(cur, upsert_active_sql, active_batch, key_fn=lambda r: r[0])
                     conn.commit()
                     flushed_active += executed
                     dropped_active_duplicates += dropped
                     active_batch = []
+                    report_progress(run_id, "sites", items_seen=total, rows_written=flushed_active)
+                    stopped = stop_requested(run_id, stage="sites")
+                    if stopped:
+                        sites_iter.close()
+                        break
 
         if active_batch:
             executed, dropped = _execute_values_dedup_keep_last(cur, upsert_active_sql, active_batch, key_fn=lambda r: r[0])
@@ -1974,31 +2435,23 @@ def _ingest_sites(
             dropped_active_duplicates += dropped
 
         if removed_batch:
-            executed, dropped = _execute_values_dedup_keep_last(cur, upsert_removed_sql, removed_batch, key_fn=lambda r: r[0])
+            executed, dropped = _execute_values_dedup_keep_last(
+                cur, upsert_removed_sql, removed_batch, key_fn=lambda r: r[0], sizing_key=_SITES_REMOVED_SIZING
+            )
             conn.commit()
             flushed_removed += executed
             dropped_removed_duplicates += dropped
+        report_progress(run_id, "sites", items_seen=total, rows_written=flushed_active + flushed_removed)
 
         if mode == "delta" and delta_link_new:
             _set_delta_link(cur, "sites", "global", delta_link_new)
             conn.commit()
+        elif mode == "delta" and resume_url:
+            # Every page up to here is written, so the next run continues the delta round from this page.
+            _set_delta_link(cur, "sites", "global", resume_url)
+            conn.commit()
 
-        log_job_run_log(
-            run_id=run_id,
-            level="INFO",
-            message="sites_ingested",
-            context={
-                "mode": mode,
-                "synced_at": synced_at.isoformat(),
-                "total_seen": total,
-                "removed_seen": removed,
-                "upserted_active": flushed_active,
-                "upserted_removed": flushed_removed,
-                "dropped_active_duplicates": dropped_active_duplicates,
-                "dropped_removed_duplicates": dropped_removed_duplicates,
-            },
-        )
-        return {
+        summary = {
             "mode": mode,
             "total_seen": total,
             "removed_seen": removed,
@@ -2007,11 +2460,22 @@ def _ingest_sites(
             "dropped_active_duplicates": dropped_active_duplicates,
             "dropped_removed_duplicates": dropped_removed_duplicates,
         }
+        if stopped:
+            summary["stopped"] = stopped
+        log_job_run_log(
+            run_id=run_id,
+            level="INFO",
+            message="sites_ingested",
+            context={"synced_at": synced_at.isoformat(), **summary},
+        )
+        return summary
     finally:
         conn.close()
 
 
 def _is_personal_site(site_row: Dict[str, Any]) -> bool:
+    if site_row.get("is_personal_site") is True:
+        return True
     raw_json = site_row.get("raw_json") or {}
     raw: Dict[str, Any] = {}
     if isinstance(raw_json, dict):
@@ -2448,7 +2912,7 @@ def _ingest_drives(
         conn = db.get_conn()
         try:
             cur = conn.cursor()
-            users_by_id, users_by_email = _load_user_maps(cur)
+            users_by_id, users_by_email = _load_user_maps(conn)
 
             batch: list[tuple] = []
             scoped_drive_ids: set[str] = set()
@@ -2509,7 +2973,7 @@ def _ingest_drives(
                         continue
                     raise
 
-                if len(batch) >= flush_every:
+                if len(batch) >= flush_size("msgraph_drives", flush_every):
                     executed, dropped = _flush_drive_batch(cur, conn, upsert_sql, batch)
                     drive_upserts += executed
                     dropped_duplicates += dropped
@@ -2570,7 +3034,7 @@ def _ingest_drives(
                         continue
                     raise
 
-                if len(batch) >= flush_every:
+                if len(batch) >= flush_size("msgraph_drives", flush_every):
                     executed, dropped = _flush_drive_batch(cur, conn, upsert_sql, batch)
                     drive_upserts += executed
                     dropped_duplicates += dropped
@@ -2622,17 +3086,40 @@ def _ingest_drives(
     conn = db.get_conn()
     try:
         cur = conn.cursor()
-        users_by_id, users_by_email = _load_user_maps(cur)
+        users_by_id, users_by_email = _load_user_maps(conn)
 
-        cur.execute("SELECT id, hostname, web_url, raw_json FROM msgraph_sites WHERE deleted_at IS NULL")
-        sites = [
-            {"id": row[0], "hostname": row[1], "web_url": row[2], "raw_json": row[3]}
-            for row in cur.fetchall()
-        ]
-        conn.commit()
+        site_total = _count_rows(cur, "SELECT count(*) FROM msgraph_sites WHERE deleted_at IS NULL")
+        # Only the fields _is_personal_site needs; raw_json stays on the server.
+        site_rows = db.stream_rows(
+            conn,
+            "graph_ingest_drives_sites",
+            """
+            SELECT id,
+                   COALESCE(NULLIF(hostname, ''), raw_json->'siteCollection'->>'hostname'),
+                   COALESCE(NULLIF(web_url, ''), raw_json->>'webUrl'),
+                   COALESCE(raw_json->>'isPersonalSite' = 'true', FALSE)
+            FROM msgraph_sites
+            WHERE deleted_at IS NULL
+            """,
+            withhold=True,
+        )
 
         batch: list[tuple] = []
-        for site in sites:
+        available_site_ids: list[str] = []
+        stopped: Optional[str] = None
+        for row in site_rows:
+            site = {"id": row[0], "hostname": row[1], "web_url": row[2], "is_personal_site": row[3]}
+            report_progress(
+                run_id,
+                "drives",
+                rows_written=drive_upserts,
+                units_done=site_count,
+                units_total=site_total,
+                unit="sites",
+            )
+            stopped = stop_requested(run_id, stage="drives")
+            if stopped:
+                break
             site_count += 1
             site_id = site["id"]
             if _is_personal_site(site):
@@ -2655,13 +3142,16 @@ def _ingest_drives(
                         )
                     )
                 batch.extend(site_batch)
-                if len(batch) >= flush_every:
+                available_site_ids.append(site_id)
+                # Listed sites are marked available with the drive flush, one statement per flush.
+                if len(batch) >= flush_size("msgraph_drives", flush_every) or len(available_site_ids) >= flush_every:
+                    _mark_entities_available(cur, table="msgraph_sites", entity_ids=available_site_ids, checked_at=synced_at)
                     executed, dropped = _flush_drive_batch(cur, conn, upsert_sql, batch)
+                    conn.commit()
                     drive_upserts += executed
                     dropped_duplicates += dropped
                     batch = []
-                _mark_entity_available(cur, table="msgraph_sites", entity_id=site_id, checked_at=synced_at)
-                conn.commit()
+                    available_site_ids = []
             except GraphError as exc:
                 _print_drive_listing_failure(
                     target_kind="site",
@@ -2682,13 +3172,11 @@ def _ingest_drives(
                         target_id=site_id,
                         reason=reason,
                     )
-                    _mark_entity_unavailable(
+                    _mark_entities_unavailable(
                         cur,
                         table="msgraph_sites",
-                        entity_id=site_id,
+                        marks=[(site_id, reason, error_payload)],
                         checked_at=synced_at,
-                        reason=reason,
-                        error_payload=error_payload,
                     )
                     _mark_drives_unavailable(
                         cur,
@@ -2709,11 +3197,29 @@ def _ingest_drives(
                     conn.commit()
                 else:
                     conn.rollback()
+        if available_site_ids:
+            _mark_entities_available(cur, table="msgraph_sites", entity_ids=available_site_ids, checked_at=synced_at)
+            conn.commit()
 
-        cur.execute("SELECT id FROM msgraph_groups WHERE deleted_at IS NULL")
-        group_ids = [row[0] for row in cur.fetchall()]
-        conn.commit()
-        for group_id in group_ids:
+        group_total = _count_rows(cur, "SELECT count(*) FROM msgraph_groups WHERE deleted_at IS NULL")
+        group_rows = db.stream_rows(
+            conn,
+            "graph_ingest_drives_groups",
+            "SELECT id FROM msgraph_groups WHERE deleted_at IS NULL",
+            withhold=True,
+        )
+        for (group_id,) in group_rows:
+            report_progress(
+                run_id,
+                "drives",
+                rows_written=drive_upserts,
+                units_done=group_count,
+                units_total=group_total,
+                unit="groups",
+            )
+            stopped = stopped or stop_requested(run_id, stage="drives")
+            if stopped:
+                break
             group_count += 1
             group_batch: list[tuple] = []
             try:
@@ -2765,16 +3271,31 @@ def _ingest_drives(
                 emit("ERROR", "GRAPH", f"Group drive listing failed: group_id={group_id} status_code={exc.status_code} error={exc}")
                 raise
 
-            if len(batch) >= flush_every:
+            if len(batch) >= flush_size("msgraph_drives", flush_every):
                 executed, dropped = _flush_drive_batch(cur, conn, upsert_sql, batch)
                 drive_upserts += executed
                 dropped_duplicates += dropped
                 batch = []
 
-        cur.execute("SELECT id FROM msgraph_users WHERE deleted_at IS NULL")
-        user_ids = [row[0] for row in cur.fetchall()]
-        conn.commit()
-        for user_id in user_ids:
+        user_total = _count_rows(cur, "SELECT count(*) FROM msgraph_users WHERE deleted_at IS NULL")
+        user_rows = db.stream_rows(
+            conn,
+            "graph_ingest_drives_users",
+            "SELECT id FROM msgraph_users WHERE deleted_at IS NULL",
+            withhold=True,
+        )
+        for (user_id,) in user_rows:
+            report_progress(
+                run_id,
+                "drives",
+                rows_written=drive_upserts,
+                units_done=user_count,
+                units_total=user_total,
+                unit="users",
+            )
+            stopped = stopped or stop_requested(run_id, stage="drives")
+            if stopped:
+                break
             user_count += 1
             user_batch: list[tuple] = []
             try:
@@ -2842,7 +3363,7 @@ def _ingest_drives(
                 emit("ERROR", "GRAPH", f"User drive listing failed: user_id={user_id} status_code={exc.status_code} error={exc}")
                 raise
 
-            if len(batch) >= flush_every:
+            if len(batch) >= flush_size("msgraph_drives", flush_every):
                 executed, dropped = _flush_drive_batch(cur, conn, upsert_sql, batch)
                 drive_upserts += executed
                 dropped_duplicates += dropped
@@ -2852,25 +3373,9 @@ def _ingest_drives(
             executed, dropped = _flush_drive_batch(cur, conn, upsert_sql, batch)
             drive_upserts += executed
             dropped_duplicates += dropped
+        report_progress(run_id, "drives", rows_written=drive_upserts, units_done=user_count)
 
-        log_job_run_log(
-            run_id=run_id,
-            level="INFO",
-            message="drives_ingested",
-            context={
-                "synced_at": synced_at.isoformat(),
-                "sites_processed": site_count,
-                "sites_skipped_personal": site_skipped_personal,
-                "sites_skipped_error": site_skipped_error,
-                "groups_processed": group_count,
-                "groups_no_drive": group_no_drive,
-                "users_processed": user_count,
-                "users_no_drive": user_no_drive,
-                "drive_upserts": drive_upserts,
-                "dropped_duplicates": dropped_duplicates,
-            },
-        )
-        return {
+        summary = {
             "sites_processed": site_count,
             "sites_skipped_personal": site_skipped_personal,
             "sites_skipped_error": site_skipped_error,
@@ -2881,6 +3386,15 @@ def _ingest_drives(
             "drive_upserts": drive_upserts,
             "dropped_duplicates": dropped_duplicates,
         }
+        if stopped:
+            summary["stopped"] = stopped
+        log_job_run_log(
+            run_id=run_id,
+            level="INFO",
+            message="drives_ingested",
+            context={"synced_at": synced_at.isoformat(), **summary},
+        )
+        return summary
     finally:
         conn.close()
 
@@ -2910,44 +3424,54 @@ def _item_file_hash_sha1(item: Dict[str, Any]) -> Optional[str]:
     return None
 
 
-def _ingest_drive_items(
-    client: GraphClient,
-    *,
-    run_id: str,
-    flush_every: int,
-    scope: Optional[Dict[str, Any]] = None,
-) -> Dict[str, Any]:
-    synced_at = datetime.now(timezone.utc)
-    select = ",".join(
-        [
-            "id",
-            "name",
-            "parentReference",
-            "webUrl",
-            "size",
-            "createdDateTime",
-            "lastModifiedDateTime",
-            "createdBy",
-            "lastModifiedBy",
-            "file",
-            "folder",
-            "fileSystemInfo",
-            "shared",
-            "remoteItem",
-            "sharepointIds",
-            "deleted",
-        ]
-    )
-
-    upsert_active_sql = """
-        INSERT INTO msgraph_drive_items
-          (drive_id, id, name, web_url, parent_id, path, normalized_path, path_level, is_folder, child_count,
-           size, mime_type, file_hash_sha1, created_dt, modified_dt, created_by_user_id, created_by_display_name,
-           created_by_email, last_modified_by_user_id, last_modified_by_display_name, last_modified_by_email,
-           is_shared, sp_site_id, sp_list_id, sp_list_item_id, sp_list_item_unique_id,
-           permissions_last_synced_at, permissions_last_error_at, permissions_last_error, permissions_last_error_details,
-           synced_at, deleted_at, raw_json)
-        VALUES %s
+_DRIVE_ITEM_COLUMNS = (
+    "drive_id",
+    "id",
+    "name",
+    "web_url",
+    "parent_id",
+    "path",
+    "normalized_path",
+    "path_level",
+    "is_folder",
+    "child_count",
+    "size",
+    "mime_type",
+    "file_hash_sha1",
+    "created_dt",
+    "modified_dt",
+    "created_by_user_id",
+    "created_by_display_name",
+    "created_by_email",
+    "last_modified_by_user_id",
+    "last_modified_by_display_name",
+    "last_modified_by_email",
+    "is_shared",
+    "sp_site_id",
+    "sp_list_id",
+    "sp_list_item_id",
+    "sp_list_item_unique_id",
+    "e_tag",
+    "c_tag",
+    "permissions_last_synced_at",
+    "permissions_last_error_at",
+    "permissions_last_error",
+    "permissions_last_error_details",
+    "synced_at",
+    "deleted_at",
+    "raw_json",
+)
+
+_DRIVE_ITEM_PAYLOADS = PayloadColumns(
+    "drive_item",
+    key=(0, 1),
+    payload=_DRIVE_ITEM_COLUMNS.index("raw_json"),
+    synced_at=_DRIVE_ITEM_COLUMNS.index("synced_at"),
+)
+# Tombstones (drive_id, id, synced_at, deleted_at, raw_json) keep the item's last archived payload.
+_DRIVE_ITEM_TOMBSTONE_PAYLOADS = PayloadColumns("drive_item", key=(0, 1), payload=4, synced_at=2, archive=False)
+
+_DRIVE_ITEM_CONFLICT_SQL = """
         ON CONFLICT (drive_id, id) DO UPDATE SET
           name = EXCLUDED.name,
           web_url = EXCLUDED.web_url,
@@ -2973,15 +3497,384 @@ def _ingest_drive_items(
           sp_list_id = EXCLUDED.sp_list_id,
           sp_list_item_id = EXCLUDED.sp_list_item_id,
           sp_list_item_unique_id = EXCLUDED.sp_list_item_unique_id,
-          permissions_last_synced_at = NULL,
-          permissions_last_error_at = NULL,
-          permissions_last_error = NULL,
-          permissions_last_error_details = NULL,
+          e_tag = EXCLUDED.e_tag,
+          c_tag = EXCLUDED.c_tag,
+          permissions_last_synced_at = CASE WHEN {unchanged} THEN msgraph_drive_items.permissions_last_synced_at END,
+          permissions_last_error_at = CASE WHEN {unchanged} THEN msgraph_drive_items.permissions_last_error_at END,
+          permissions_last_error = CASE WHEN {unchanged} THEN msgraph_drive_items.permissions_last_error END,
+          permissions_last_error_details = CASE WHEN {unchanged} THEN msgraph_drive_items.permissions_last_error_details END,
           synced_at = EXCLUDED.synced_at,
           deleted_at = NULL,
           raw_json = EXCLUDED.raw_json
+        WHERE NOT COALESCE(
+          {unchanged}
+          AND msgraph_drive_items.path IS NOT DISTINCT FROM EXCLUDED.path
+          AND msgraph_drive_items.normalized_path IS NOT DISTINCT FROM EXCLUDED.normalized_path,
+          FALSE
+        )
+""".format(
+    # Permission sync state survives only when a live row comes back with the same eTag/cTag.
+    # A row with the same tags and path is not rewritten at all; a renamed or moved ancestor leaves
+    # the child's eTag alone but changes its path, so that still updates.
+    unchanged=(
+        "msgraph_drive_items.deleted_at IS NULL AND EXCLUDED.e_tag IS NOT NULL"
+        " AND msgraph_drive_items.e_tag = EXCLUDED.e_tag"
+        " AND msgraph_drive_items.c_tag IS NOT DISTINCT FROM EXCLUDED.c_tag"
+    )
+)
+
+_DRIVE_ITEMS_UPSERT_ACTIVE_SQL = (
+    f"""
+        INSERT INTO msgraph_drive_items
+          ({", ".join(_DRIVE_ITEM_COLUMNS)})
+        VALUES %s
+"""
+    + _DRIVE_ITEM_CONFLICT_SQL
+)
+
+# Rows produced by the transform pool are COPYed into a session temp table tagged with
+# (page_seq, position) and merged in one statement; the newest copy of a key wins, same as
+# _dedupe_rows_keep_last on the VALUES path.
+_DRIVE_ITEMS_STAGE_TABLE_SQL = """
+    CREATE TEMP TABLE IF NOT EXISTS drive_items_stage
+      (stage_seq bigint, stage_pos int, LIKE msgraph_drive_items)
+    ON COMMIT DELETE ROWS
+"""
+
+_DRIVE_ITEMS_STAGE_ORDER = "stage_seq DESC, stage_pos DESC"
+
+
+def _drive_items_merge_stage_sql(*, keep_raw_json: bool) -> str:
+    select_columns = [col if keep_raw_json or col != "raw_json" else "NULL::jsonb" for col in _DRIVE_ITEM_COLUMNS]
+    return (
+        f"""
+        INSERT INTO msgraph_drive_items
+          ({", ".join(_DRIVE_ITEM_COLUMNS)})
+        SELECT DISTINCT ON (drive_id, id) {", ".join(select_columns)}
+        FROM drive_items_stage
+        ORDER BY drive_id, id, {_DRIVE_ITEMS_STAGE_ORDER}
+"""
+        + _DRIVE_ITEM_CONFLICT_SQL
+    )
+
+
+_DRIVE_ITEMS_MERGE_STAGE_SQL = _drive_items_merge_stage_sql(keep_raw_json=True)
+_DRIVE_ITEMS_MERGE_STAGE_DETACHED_SQL = _drive_items_merge_stage_sql(keep_raw_json=False)
+
+
+def _drive_item_row(
+    drive_id: str,
+    item: Dict[str, Any],
+    *,
+    synced_at: datetime,
+    users_by_id: dict[str, str],
+    users_by_email: dict[str, str],
+) -> tuple:
+    parent_ref = item.get("parentReference") or {}
+    normalized_path = parent_ref.get("path")
+    path_level = _compute_path_level(normalized_path)
+    created_by_user_id, _, created_by_display_name, created_by_email, _ = _resolve_identity(
+        item.get("createdBy"), users_by_id, users_by_email
+    )
+    last_modified_by_user_id, _, last_modified_by_display_name, last_modified_by_email, _ = _resolve_identity(
+        item.get("lastModifiedBy"), users_by_id, users_by_email
+    )
+    sp_ids = item.get("sharepointIds") or {}
+    return (
+        drive_id,
+        item.get("id"),
+        item.get("name"),
+        item.get("webUrl"),
+        parent_ref.get("id"),
+        _item_path(item),
+        normalized_path,
+        path_level,
+        bool(item.get("folder")),
+        (item.get("folder") or {}).get("childCount"),
+        item.get("size"),
+        (item.get("file") or {}).get("mimeType"),
+        _item_file_hash_sha1(item),
+        item.get("createdDateTime"),
+        item.get("lastModifiedDateTime"),
+        created_by_user_id,
+        created_by_display_name,
+        created_by_email,
+        last_modified_by_user_id,
+        last_modified_by_display_name,
+        last_modified_by_email,
+        bool(item.get("shared") is not None),
+        sp_ids.get("siteId"),
+        sp_ids.get("listId"),
+        sp_ids.get("listItemId"),
+        sp_ids.get("listItemUniqueId"),
+        item.get("eTag"),
+        item.get("cTag"),
+        None,
+        None,
+        None,
+        None,
+        synced_at,
+        None,
+        db.jsonb(item),
+    )
+
+
+def _drive_item_is_removed(item: Dict[str, Any]) -> bool:
+    return "@removed" in item or "deleted" in item
+
+
+# Only the fields the row builder reads; pa.array() ignores every other key of the item dicts.
+_DRIVE_ITEM_ARROW_TYPE = (
+    pa.struct(
+        [
+            ("id", pa.string()),
+            ("name", pa.string()),
+            ("webUrl", pa.string()),
+            ("size", pa.int64()),
+            ("createdDateTime", pa.string()),
+            ("lastModifiedDateTime", pa.string()),
+            ("eTag", pa.string()),
+            ("cTag", pa.string()),
+            ("parentReference", pa.struct([("id", pa.string()), ("path", pa.string())])),
+            (
+                "file",
+                pa.struct([("mimeType", pa.string()), ("hashes", pa.struct([("sha1Hash", pa.string())]))]),
+            ),
+            ("folder", pa.struct([("childCount", pa.int64())])),
+            ("shared", pa.struct([("scope", pa.string())])),
+            (
+                "sharepointIds",
+                pa.struct(
+                    [
+                        ("siteId", pa.string()),
+                        ("listId", pa.string()),
+                        ("listItemId", pa.string()),
+                        ("listItemUniqueId", pa.string()),
+                    ]
+                ),
+            ),
+        ]
+    )
+    if pa is not None
+    else None
+)
+
+
+def _encode_drive_items_csv(
+    items: list[Dict[str, Any]],
+    *,
+    drive_id: str,
+    synced_at: datetime,
+    page_seq: int,
+    users_by_id: dict[str, str],
+    users_by_email: dict[str, str],
+) -> bytes:
+    """Column-wise equivalent of _drive_item_row over one page, encoded for COPY ... (FORMAT csv).
+
+    Field extraction, path and path_level run as Arrow kernels; identity resolution and raw_json
+    stay per item because they depend on the user maps and the full payload.
     """
+    count = len(items)
+    arr = pa.array(items, type=_DRIVE_ITEM_ARROW_TYPE)
+
+    def field(*path: str):
+        return pc.struct_field(arr, list(path))
+
+    def resolved(key: str, idx: int):
+        return pa.array(
+            [_resolve_identity(item.get(key), users_by_id, users_by_email)[idx] for item in items],
+            pa.string(),
+        )
+
+    name = field("name")
+    normalized_path = field("parentReference", "path")
+    parent_path = pc.utf8_trim_whitespace(
+        pc.replace_substring_regex(pc.fill_null(normalized_path, ""), r"^[^:]*:", "", max_replacements=1)
+    )
+    joined_path = pc.if_else(
+        pc.ends_with(parent_path, "/"),
+        pc.binary_join_element_wise(parent_path, name, ""),
+        pc.binary_join_element_wise(parent_path, name, "/"),
+    )
+    item_path = pc.if_else(
+        pc.and_(pc.is_valid(name), pc.not_equal(pc.fill_null(name, ""), "")),
+        pc.if_else(pc.equal(parent_path, ""), name, joined_path),
+        pa.scalar(None, pa.string()),
+    )
+    path_level = pc.if_else(
+        pc.equal(normalized_path, ""),
+        pa.scalar(None, pa.int64()),
+        pc.cast(pc.count_substring_regex(parent_path, r"[^/]+"), pa.int64()),
+    )
+    null_text = pa.nulls(count, pa.string())
+    synced = pa.array([synced_at] * count, pa.timestamp("us", tz="UTC"))
+
+    columns = [
+        pa.array([page_seq] * count, pa.int64()),
+        pa.array(range(count), pa.int64()),
+        pa.array([drive_id] * count, pa.string()),
+        field("id"),
+        name,
+        field("webUrl"),
+        field("parentReference", "id"),
+        item_path,
+        normalized_path,
+        path_level,
+        # Same truthiness as _drive_item_row: an empty `folder: {}` facet is not a folder.
+        pa.array([bool(item.get("folder")) for item in items], pa.bool_()),
+        field("folder", "childCount"),
+        field("size"),
+        field("file", "mimeType"),
+        field("file", "hashes", "sha1Hash"),
+        field("createdDateTime"),
+        field("lastModifiedDateTime"),
+        resolved("createdBy", 0),
+        resolved("createdBy", 2),
+        resolved("createdBy", 3),
+        resolved("lastModifiedBy", 0),
+        resolved("lastModifiedBy", 2),
+        resolved("lastModifiedBy", 3),
+        pc.is_valid(field("shared")),
+        field("sharepointIds", "siteId"),
+        field("sharepointIds", "listId"),
+        field("sharepointIds", "listItemId"),
+        field("sharepointIds", "listItemUniqueId"),
+        field("eTag"),
+        field("cTag"),
+        null_text,
+        null_text,
+        null_text,
+        null_text,
+        synced,
+        null_text,
+        pa.array([json.dumps(item) for item in items], pa.string()),
+    ]
+    table = pa.Table.from_arrays(columns, names=["stage_seq", "stage_pos", *_DRIVE_ITEM_COLUMNS])
+    sink = pa.BufferOutputStream()
+    pa_csv.write_csv(table, sink, write_options=pa_csv.WriteOptions(include_header=False))
+    return sink.getvalue().to_pybytes()
+
 
+def _transform_drive_items_page(
+    page: Dict[str, Any],
+    *,
+    drive_id: str,
+    synced_at: datetime,
+    page_seq: int,
+    shared: Dict[str, Any],
+    columnar: bool = False,
+) -> Dict[str, Any]:
+    # Runs inside TransformPool workers: no DB or Graph access, only the identity maps in `shared`.
+    cpu_start = time.thread_time()
+    users_by_id = shared.get("users_by_id") or {}
+    users_by_email = shared.get("users_by_email") or {}
+    active_items: list[Dict[str, Any]] = []
+    removed_items: list[Dict[str, Any]] = []
+    items_seen = 0
+    for item in page.get("value", []) or []:
+        if not item.get("id"):
+            continue
+        items_seen += 1
+        if _drive_item_is_removed(item):
+            removed_items.append(item)
+        else:
+            active_items.append(item)
+
+    result = {
+        "copy_format": "text",
+        "copy_buffer": b"",
+        "active_rows": len(active_items),
+        "removed_items": removed_items,
+        "items_seen": items_seen,
+    }
+    if not active_items:
+        result["transform_seconds"] = time.thread_time() - cpu_start
+        return result
+    if columnar and pa is not None:
+        try:
+            result["copy_buffer"] = _encode_drive_items_csv(
+                active_items,
+                drive_id=drive_id,
+                synced_at=synced_at,
+                page_seq=page_seq,
+                users_by_id=users_by_id,
+                users_by_email=users_by_email,
+            )
+            result["copy_format"] = "csv"
+            result["transform_seconds"] = time.thread_time() - cpu_start
+            return result
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # A field with an unexpected type (e.g. a string size) fails the whole page; the
+            # tuple builder below tolerates it the same way the inline path does.
+            pass
+
+    rows = [
+        (page_seq, pos)
+        + _drive_item_row(
+            drive_id,
+            item,
+            synced_at=synced_at,
+            users_by_id=users_by_id,
+            users_by_email=users_by_email,
+        )
+        for pos, item in enumerate(active_items)
+    ]
+    result["copy_buffer"] = db.encode_copy_rows(rows)
+    result["transform_seconds"] = time.thread_time() - cpu_start
+    return result
+
+
+def _written_rows(cur, default: int) -> int:
+    return cur.rowcount if isinstance(cur.rowcount, int) and cur.rowcount >= 0 else default
+
+
+def _upsert_drive_items(cur, rows: list[tuple]) -> tuple[int, int, int]:
+    """Upsert active rows; returns (rows written, duplicates dropped, unchanged rows the conflict guard skipped)."""
+    deduped, dropped = _dedupe_rows_keep_last(rows, key_fn=lambda r: (r[0], r[1]))
+    if not deduped:
+        return 0, dropped, 0
+    deduped = detach_payloads(cur, deduped, _DRIVE_ITEM_PAYLOADS)
+    # One statement, so rowcount covers every row.
+    db.execute_values(cur, _DRIVE_ITEMS_UPSERT_ACTIVE_SQL, deduped, page_size=len(deduped))
+    written = _written_rows(cur, len(deduped))
+    return written, dropped, len(deduped) - written
+
+
+def _copy_merge_drive_items(cur, buffers: list[tuple[str, bytes, int]], *, staged_rows: int) -> tuple[int, int, int]:
+    """COPY staged rows and merge them; returns (rows written, duplicates dropped, unchanged rows skipped)."""
+    if not staged_rows:
+        return 0, 0, 0
+    started = time.perf_counter()
+    cur.execute(_DRIVE_ITEMS_STAGE_TABLE_SQL)
+    for copy_format in ("text", "csv"):
+        parts = [(buffer, rows) for fmt, buffer, rows in buffers if fmt == copy_format]
+        if not parts:
+            continue
+        db.copy_rows(
+            cur,
+            "drive_items_stage",
+            ["stage_seq", "stage_pos", *_DRIVE_ITEM_COLUMNS],
+            b"".join(buffer for buffer, _rows in parts),
+            row_count=sum(rows for _buffer, rows in parts),
+            format=copy_format,
+        )
+    cur.execute("SELECT count(DISTINCT (drive_id, id)) FROM drive_items_stage")
+    row = cur.fetchone()
+    distinct_rows = row[0] if row else staged_rows
+    cur.execute(_DRIVE_ITEMS_MERGE_STAGE_SQL if keeps_inline() else _DRIVE_ITEMS_MERGE_STAGE_DETACHED_SQL)
+    merged = _written_rows(cur, distinct_rows)
+    if archives_payloads():
+        cur.execute(stage_archive_sql("drive_item", "drive_items_stage", order_by=_DRIVE_ITEMS_STAGE_ORDER))
+    observe_flush(
+        "msgraph_drive_items",
+        rows=staged_rows,
+        seconds=time.perf_counter() - started,
+        nbytes=sum(len(buffer) for _fmt, buffer, _rows in buffers),
+    )
+    return merged, staged_rows - distinct_rows, distinct_rows - merged
+
+
+def _flush_drive_items_removed(conn, cur, *, run_id: str, drive_id: str, removed_batch: list[tuple]) -> tuple[bool, int, int]:
     upsert_removed_sql = """
         INSERT INTO msgraph_drive_items
           (drive_id, id, synced_at, deleted_at, raw_json)
@@ -3004,213 +3897,305 @@ def _ingest_drive_items(
         WHERE p.drive_id = v.drive_id AND p.item_id = v.item_id
     """
 
+    removed_batch, dropped = _dedupe_rows_keep_last(removed_batch, key_fn=lambda r: (r[0], r[1]))
+    removed_batch.sort(key=lambda r: (r[0], r[1]))
+    removed_keys = [(r[0], r[1]) for r in removed_batch]
+
+    def write_removed_batch():
+        if removed_batch:
+            db.execute_values(
+                cur,
+                upsert_removed_sql,
+                detach_payloads(cur, removed_batch, _DRIVE_ITEM_TOMBSTONE_PAYLOADS),
+                sizing_key=_DRIVE_ITEMS_REMOVED_SIZING,
+            )
+        if removed_keys:
+            db.execute_values(cur, delete_permissions_grants_sql, removed_keys)
+            db.execute_values(cur, delete_permissions_sql, removed_keys)
+
+    success, _, sqlstate, error = _execute_db_mutation_with_retry(
+        conn,
+        run_id=run_id,
+        op_name=f"drive_items_removed_cleanup:{drive_id}",
+        retry_log_message="drive_items_db_write_retry",
+        mutation_fn=write_removed_batch,
+    )
+    if not success:
+        emit(
+            "WARN",
+            "GRAPH",
+            f"Drive items cleanup write retries exhausted: drive_id={drive_id} sqlstate={sqlstate} error={error}",
+        )
+        log_job_run_log(
+            run_id=run_id,
+            level="WARN",
+            message="drive_items_db_write_retry",
+            context={
+                "operation": f"drive_items_removed_cleanup:{drive_id}",
+                "exhausted": True,
+                "sqlstate": sqlstate,
+                "error": error,
+            },
+        )
+        return False, 0, 0
+    return True, len(removed_batch), dropped
+
+
+def _ingest_drive_items(
+    client: GraphClient,
+    *,
+    run_id: str,
+    flush_every: int,
+    scope: Optional[Dict[str, Any]] = None,
+    transform_processes: int = 0,
+    transform_columnar: bool = False,
+    skip_unchanged: bool = False,
+    force_crawl_hours: int = DEFAULT_DRIVE_ITEMS_FORCE_CRAWL_HOURS,
+) -> Dict[str, Any]:
+    synced_at = datetime.now(timezone.utc)
+    select = ",".join(
+        [
+            "id",
+            "name",
+            "parentReference",
+            "webUrl",
+            "size",
+            "createdDateTime",
+            "lastModifiedDateTime",
+            "createdBy",
+            "lastModifiedBy",
+            "file",
+            "folder",
+            "fileSystemInfo",
+            "shared",
+            "remoteItem",
+            "sharepointIds",
+            "deleted",
+            "eTag",
+            "cTag",
+        ]
+    )
+
     drive_count = 0
     drive_skipped_error = 0
+    drive_skipped_unchanged = 0
+    drive_forced_crawls = 0
     drive_delta_resets = 0
     item_total = 0
     item_removed = 0
+    item_unchanged = 0
     flushed_active = 0
     flushed_removed = 0
     dropped_active_duplicates = 0
     dropped_removed_duplicates = 0
+    pages_transformed = 0
 
     conn = db.get_conn()
+    transform_pool: Optional[TransformPool] = None
     try:
         cur = conn.cursor()
+        # Drives after the last one a stopped run finished go first; a drive stopped mid-crawl resumes
+        # from the page link saved as its delta cursor.
+        resume = load_resume_cursor(cur, "graph_ingest", "drive_items") or {}
         if scope and scope.get("mode") == "test":
             drive_ids = _get_scoped_drive_ids_from_db(cur, scope, require_available=True)
             scope["drive_ids"] = drive_ids
+            drive_total = len(drive_ids)
+            drive_rows = [(drive_id,) for drive_id in rotate_after(sorted(drive_ids), resume.get("after"))]
         else:
-            cur.execute("SELECT id FROM msgraph_drives WHERE deleted_at IS NULL AND is_available = TRUE")
-            drive_ids = [row[0] for row in cur.fetchall()]
+            available_sql = "FROM msgraph_drives WHERE deleted_at IS NULL AND is_available = TRUE"
+            drive_total = _count_rows(cur, f"SELECT count(*) {available_sql}")
+            drive_rows = _stream_ids_after(conn, "graph_ingest_drive_items", f"SELECT id {available_sql}", resume.get("after"))
+        conn.commit()
+        drive_change_state = _load_drive_change_state(cur)
         conn.commit()
-        users_by_id, users_by_email = _load_user_maps(cur)
+        force_crawl_after = timedelta(hours=force_crawl_hours) if force_crawl_hours > 0 else None
+        users_by_id, users_by_email = _load_user_maps(conn)
+        if transform_columnar and pa is None:
+            emit("WARN", "GRAPH", "GRAPH_TRANSFORM_COLUMNAR requested but pyarrow is not installed; using tuple builder")
+            transform_columnar = False
+        if transform_processes > 0 or transform_columnar:
+            transform_pool = TransformPool(
+                _transform_drive_items_page,
+                processes=transform_processes,
+                shared_state={"users_by_id": users_by_id, "users_by_email": users_by_email},
+            )
 
-        for drive_id in drive_ids:
+        stopped: Optional[str] = None
+        cursor_after = resume.get("after")
+        for drives_done, (drive_id,) in enumerate(drive_rows):
+            report_progress(
+                run_id,
+                "drive_items",
+                items_seen=item_total,
+                rows_written=flushed_active + flushed_removed,
+                units_done=drives_done,
+                units_total=drive_total,
+                unit="drives",
+            )
+            stopped = stop_requested(run_id, stage="drive_items")
+            if stopped:
+                break
+            change_state = drive_change_state.get(drive_id)
+            if skip_unchanged:
+                decision = _drive_change_decision(change_state, now=synced_at, force_crawl_after=force_crawl_after)
+                if decision == "skip":
+                    drive_skipped_unchanged += 1
+                    continue
+                if decision == "force":
+                    drive_forced_crawls += 1
             drive_count += 1
             base_url = f"/drives/{drive_id}/root/delta?$top={GRAPH_PAGE_SIZE}&$select={select}"
             delta_link = _get_delta_link(cur, "drive_items", drive_id)
             next_url = delta_link or base_url
+            conn.commit()
 
             for attempt in range(2):
                 delta_link_new: Optional[str] = None
+                resume_url: Optional[str] = None
                 active_batch: list[tuple] = []
+                active_buffers: list[tuple[str, bytes, int]] = []
+                staged_active = 0
                 removed_batch: list[tuple] = []
-                removed_keys: list[tuple] = []
                 drive_write_incomplete = False
+                page_seq = 0
                 try:
                     while next_url:
-                        data = client.get_json(next_url)
-                        for item in data.get("value", []) or []:
-                            item_id = item.get("id")
-                            if not item_id:
-                                continue
-                            item_total += 1
-                            removed = "@removed" in item or "deleted" in item
-                            if removed:
-                                item_removed += 1
-                                removed_batch.append((drive_id, item_id, synced_at, synced_at, db.jsonb(item)))
-                                removed_keys.append((drive_id, item_id))
+                        if transform_pool is not None:
+                            if transform_pool.inline:
+                                data = client.get_json(next_url)
+                                page = data
                             else:
-                                parent_ref = item.get("parentReference") or {}
-                                normalized_path = parent_ref.get("path")
-                                path_level = _compute_path_level(normalized_path)
-                                created_by_user_id, _, created_by_display_name, created_by_email, _ = _resolve_identity(
-                                    item.get("createdBy"), users_by_id, users_by_email
-                                )
-                                last_modified_by_user_id, _, last_modified_by_display_name, last_modified_by_email, _ = _resolve_identity(
-                                    item.get("lastModifiedBy"), users_by_id, users_by_email
-                                )
-                                sp_ids = item.get("sharepointIds") or {}
-                                active_batch.append(
-                                    (
-                                        drive_id,
-                                        item_id,
-                                        item.get("name"),
-                                        item.get("webUrl"),
-                                        parent_ref.get("id"),
-                                        _item_path(item),
-                                        normalized_path,
-                                        path_level,
-                                        bool(item.get("folder")),
-                                        (item.get("folder") or {}).get("childCount"),
-                                        item.get("size"),
-                                        (item.get("file") or {}).get("mimeType"),
-                                        _item_file_hash_sha1(item),
-                                        item.get("createdDateTime"),
-                                        item.get("lastModifiedDateTime"),
-                                        created_by_user_id,
-                                        created_by_display_name,
-                                        created_by_email,
-                                        last_modified_by_user_id,
-                                        last_modified_by_display_name,
-                                        last_modified_by_email,
-                                        bool(item.get("shared") is not None),
-                                        sp_ids.get("siteId"),
-                                        sp_ids.get("listId"),
-                                        sp_ids.get("listItemId"),
-                                        sp_ids.get("listItemUniqueId"),
-                                        None,
-                                        None,
-                                        None,
-                                        None,
-                                        synced_at,
-                                        None,
-                                        db.jsonb(item),
-                                    )
-                                )
-
-                            if len(active_batch) >= flush_every:
-                                executed, dropped = _execute_values_dedup_keep_last(
-                                    cur,
-                                    upsert_active_sql,
-                                    active_batch,
-                                    key_fn=lambda r: (r[0], r[1]),
-                                )
-                                conn.commit()
-                                flushed_active += executed
-                                dropped_active_duplicates += dropped
-                                active_batch = []
-
-                            if len(removed_batch) >= flush_every:
-                                removed_batch, dropped = _dedupe_rows_keep_last(removed_batch, key_fn=lambda r: (r[0], r[1]))
-                                removed_batch.sort(key=lambda r: (r[0], r[1]))
-                                removed_keys = [(r[0], r[1]) for r in removed_batch]
-
-                                def write_removed_batch():
-                                    if removed_batch:
-                                        db.execute_values(cur, upsert_removed_sql, removed_batch)
-                                    if removed_keys:
-                                        db.execute_values(cur, delete_permissions_grants_sql, removed_keys)
-                                        db.execute_values(cur, delete_permissions_sql, removed_keys)
-
-                                success, _, sqlstate, error = _execute_db_mutation_with_retry(
-                                    conn,
-                                    run_id=run_id,
-                                    op_name=f"drive_items_removed_cleanup:{drive_id}",
-                                    retry_log_message="drive_items_db_write_retry",
-                                    mutation_fn=write_removed_batch,
-                                )
-                                if success:
-                                    flushed_removed += len(removed_batch)
-                                    dropped_removed_duplicates += dropped
-                                else:
-                                    drive_write_incomplete = True
-                                    emit(
-                                        "WARN",
-                                        "GRAPH",
-                                        f"Drive items cleanup write retries exhausted: drive_id={drive_id} sqlstate={sqlstate} error={error}",
-                                    )
-                                    log_job_run_log(
-                                        run_id=run_id,
-                                        level="WARN",
-                                        message="drive_items_db_write_retry",
-                                        context={
-                                            "operation": f"drive_items_removed_cleanup:{drive_id}",
-                                            "exhausted": True,
-                                            "sqlstate": sqlstate,
-                                            "error": error,
-                                        },
-                                    )
-                                removed_batch = []
-                                removed_keys = []
+                                page = client.get_bytes(next_url) or b"{}"
+                                # The workers parse the page; only its links are needed here.
+                                data = page_links(page)
+                            page_seq += 1
+                            results = transform_pool.submit(
+                                page,
+                                drive_id=drive_id,
+                                synced_at=synced_at,
+                                page_seq=page_seq,
+                                columnar=transform_columnar,
+                            )
+                        else:
+                            data = client.get_json(next_url)
+                            results = []
+                            # Row building only; flushes inside the loop are timed as DB writes and commits.
+                            with timed(TRANSFORM, exclusive=True):
+                                for item in data.get("value", []) or []:
+                                    item_id = item.get("id")
+                                    if not item_id:
+                                        continue
+                                    item_total += 1
+                                    if _drive_item_is_removed(item):
+                                        item_removed += 1
+                                        removed_batch.append((drive_id, item_id, synced_at, synced_at, db.jsonb(item)))
+                                    else:
+                                        active_batch.append(
+                                            _drive_item_row(
+                                                drive_id,
+                                                item,
+                                                synced_at=synced_at,
+                                                users_by_id=users_by_id,
+                                                users_by_email=users_by_email,
+                                            )
+                                        )
+
+                                    if len(active_batch) >= flush_size("msgraph_drive_items", flush_every):
+                                        executed, dropped, unchanged = _upsert_drive_items(cur, active_batch)
+                                        conn.commit()
+                                        flushed_active += executed
+                                        dropped_active_duplicates += dropped
+                                        item_unchanged += unchanged
+                                        active_batch = []
+
+                                    if len(removed_batch) >= flush_size(_DRIVE_ITEMS_REMOVED_SIZING, flush_every):
+                                        success, flushed, dropped = _flush_drive_items_removed(
+                                            conn, cur, run_id=run_id, drive_id=drive_id, removed_batch=removed_batch
+                                        )
+                                        if success:
+                                            flushed_removed += flushed
+                                            dropped_removed_duplicates += dropped
+                                        else:
+                                            drive_write_incomplete = True
+                                        removed_batch = []
 
                         next_url = data.get("@odata.nextLink")
                         delta_link_new = data.get("@odata.deltaLink") or delta_link_new
+                        # Stop only on a page boundary, after everything up to this page is written.
+                        stopping = False
+                        if next_url:
+                            stopped = stop_requested(run_id, stage="drive_items")
+                            stopping = bool(stopped)
+                        if transform_pool is not None and (not next_url or stopping):
+                            results.extend(transform_pool.drain())
+
+                        for result in results:
+                            pages_transformed += 1
+                            record(TRANSFORM, result.get("transform_seconds", 0.0))
+                            item_total += result["items_seen"]
+                            item_removed += len(result["removed_items"])
+                            if result["active_rows"]:
+                                active_buffers.append((result["copy_format"], result["copy_buffer"], result["active_rows"]))
+                                staged_active += result["active_rows"]
+                            for item in result["removed_items"]:
+                                removed_batch.append((drive_id, item["id"], synced_at, synced_at, db.jsonb(item)))
+
+                        if staged_active >= flush_size("msgraph_drive_items", flush_every) or ((not next_url or stopping) and staged_active):
+                            executed, dropped, unchanged = _copy_merge_drive_items(cur, active_buffers, staged_rows=staged_active)
+                            conn.commit()
+                            flushed_active += executed
+                            dropped_active_duplicates += dropped
+                            item_unchanged += unchanged
+                            active_buffers = []
+                            staged_active = 0
+
+                        if transform_pool is not None and len(removed_batch) >= flush_size(_DRIVE_ITEMS_REMOVED_SIZING, flush_every):
+                            success, flushed, dropped = _flush_drive_items_removed(
+                                conn, cur, run_id=run_id, drive_id=drive_id, removed_batch=removed_batch
+                            )
+                            if success:
+                                flushed_removed += flushed
+                                dropped_removed_duplicates += dropped
+                            else:
+                                drive_write_incomplete = True
+                            removed_batch = []
+
+                        report_progress(run_id, "drive_items", items_seen=item_total, rows_written=flushed_active + flushed_removed)
+                        if stopping:
+                            resume_url = next_url
+                            break
 
                     if active_batch:
-                        executed, dropped = _execute_values_dedup_keep_last(
-                            cur,
-                            upsert_active_sql,
-                            active_batch,
-                            key_fn=lambda r: (r[0], r[1]),
-                        )
+                        executed, dropped, unchanged = _upsert_drive_items(cur, active_batch)
                         conn.commit()
                         flushed_active += executed
                         dropped_active_duplicates += dropped
+                        item_unchanged += unchanged
 
                     if removed_batch:
-                        removed_batch, dropped = _dedupe_rows_keep_last(removed_batch, key_fn=lambda r: (r[0], r[1]))
-                        removed_batch.sort(key=lambda r: (r[0], r[1]))
-                        removed_keys = [(r[0], r[1]) for r in removed_batch]
-                        def write_removed_batch():
-                            if removed_batch:
-                                db.execute_values(cur, upsert_removed_sql, removed_batch)
-                            if removed_keys:
-                                db.execute_values(cur, delete_permissions_grants_sql, removed_keys)
-                                db.execute_values(cur, delete_permissions_sql, removed_keys)
-
-                        success, _, sqlstate, error = _execute_db_mutation_with_retry(
-                            conn,
-                            run_id=run_id,
-                            op_name=f"drive_items_removed_cleanup:{drive_id}",
-                            retry_log_message="drive_items_db_write_retry",
-                            mutation_fn=write_removed_batch,
+                        success, flushed, dropped = _flush_drive_items_removed(
+                            conn, cur, run_id=run_id, drive_id=drive_id, removed_batch=removed_batch
                         )
                         if success:
-                            flushed_removed += len(removed_batch)
+                            flushed_removed += flushed
                             dropped_removed_duplicates += dropped
                         else:
                             drive_write_incomplete = True
-                            emit(
-                                "WARN",
-                                "GRAPH",
-                                f"Drive items cleanup write retries exhausted: drive_id={drive_id} sqlstate={sqlstate} error={error}",
-                            )
-                            log_job_run_log(
-                                run_id=run_id,
-                                level="WARN",
-                                message="drive_items_db_write_retry",
-                                context={
-                                    "operation": f"drive_items_removed_cleanup:{drive_id}",
-                                    "exhausted": True,
-                                    "sqlstate": sqlstate,
-                                    "error": error,
-                                },
-                            )
 
                     if delta_link_new and not drive_write_incomplete:
-                        _set_delta_link(cur, "drive_items", drive_id, delta_link_new)
+                        _set_delta_link(
+                            cur,
+                            "drive_items",
+                            drive_id,
+                            delta_link_new,
+                            source_modified_dt=change_state[0] if change_state else None,
+                            source_quota_used=change_state[1] if change_state else None,
+                        )
+                        conn.commit()
+                    elif resume_url and not drive_write_incomplete:
+                        # No change markers, so the next run crawls this drive from the saved page.
+                        _set_delta_link(cur, "drive_items", drive_id, resume_url)
                         conn.commit()
                     elif delta_link_new and drive_write_incomplete:
                         emit(
@@ -3231,6 +4216,8 @@ def _ingest_drive_items(
 
                     break
                 except GraphError as exc:
+                    if transform_pool is not None:
+                        transform_pool.discard()
                     if exc.status_code == 410 and attempt == 0 and delta_link:
                         drive_delta_resets += 1
                         emit(
@@ -3262,13 +4249,9 @@ def _ingest_drive_items(
                             target_id=drive_id,
                             reason=reason,
                         )
-                        _mark_entity_unavailable(
-                            cur,
-                            table="msgraph_drives",
-                            entity_id=drive_id,
-                            checked_at=synced_at,
-                            reason=reason,
-                            error_payload=error_payload,
+                        # Written with this drive's commit so the mark survives a later failure in the stage.
+                        _mark_entities_unavailable(
+                            cur, table="msgraph_drives", marks=[(drive_id, reason, error_payload)], checked_at=synced_at
                         )
                         conn.commit()
                     emit(
@@ -3286,35 +4269,53 @@ def _ingest_drive_items(
                         conn.rollback()
                     break
 
-        log_job_run_log(
-            run_id=run_id,
-            level="INFO",
-            message="drive_items_ingested",
-            context={
-                "synced_at": synced_at.isoformat(),
-                "drives_processed": drive_count,
-                "drives_skipped_error": drive_skipped_error,
-                "drives_delta_resets": drive_delta_resets,
-                "items_seen": item_total,
-                "items_removed_seen": item_removed,
-                "upserted_active": flushed_active,
-                "upserted_removed": flushed_removed,
-                "dropped_active_duplicates": dropped_active_duplicates,
-                "dropped_removed_duplicates": dropped_removed_duplicates,
-            },
+            if stopped:
+                break
+            cursor_after = drive_id
+        report_progress(
+            run_id,
+            "drive_items",
+            items_seen=item_total,
+            rows_written=flushed_active + flushed_removed,
+            units_done=drive_count + drive_skipped_unchanged,
         )
-        return {
+
+        if stopped:
+            save_resume_cursor(cur, "graph_ingest", "drive_items", {"after": cursor_after}, run_id=run_id, reason=stopped)
+        else:
+            clear_resume_cursor(cur, "graph_ingest", "drive_items")
+        conn.commit()
+
+        summary = {
             "drives_processed": drive_count,
             "drives_skipped_error": drive_skipped_error,
+            "skip_unchanged": skip_unchanged,
+            "drives_skipped_unchanged": drive_skipped_unchanged,
+            "drives_forced_crawls": drive_forced_crawls,
             "drives_delta_resets": drive_delta_resets,
             "items_seen": item_total,
             "items_removed_seen": item_removed,
+            "items_unchanged_skipped": item_unchanged,
             "upserted_active": flushed_active,
             "upserted_removed": flushed_removed,
             "dropped_active_duplicates": dropped_active_duplicates,
             "dropped_removed_duplicates": dropped_removed_duplicates,
+            "transform_processes": transform_processes,
+            "transform_columnar": transform_columnar,
+            "pages_transformed": pages_transformed,
         }
+        if stopped:
+            summary["stopped"] = stopped
+        log_job_run_log(
+            run_id=run_id,
+            level="INFO",
+            message="drive_items_ingested",
+            context={"synced_at": synced_at.isoformat(), **summary},
+        )
+        return summary
     finally:
+        if transform_pool is not None:
+            transform_pool.close()
         conn.close()
 
 
@@ -3531,6 +4532,83 @@ def _build_permission_error_state(
     return {"summary": summary, "details": details}
 
 
+def _permission_row(drive_id: str, item_id: str, perm: Dict[str, Any], *, synced_at: datetime) -> tuple:
+    link = perm.get("link") or {}
+    inherited_from_id = (perm.get("inheritedFrom") or {}).get("id")
+    return (
+        drive_id,
+        item_id,
+        perm.get("id"),
+        "inherited" if inherited_from_id else "direct",
+        perm.get("roles"),
+        link.get("type"),
+        link.get("scope"),
+        link.get("webUrl"),
+        link.get("preventsDownload"),
+        link.get("expirationDateTime"),
+        inherited_from_id,
+        synced_at,
+        None,
+        db.jsonb(perm),
+    )
+
+
+def _permission_grant_rows(drive_id: str, item_id: str, perm: Dict[str, Any], *, synced_at: datetime) -> list[tuple]:
+    return [
+        (
+            drive_id,
+            item_id,
+            perm.get("id"),
+            grant.get("principal_type"),
+            grant.get("principal_id"),
+            grant.get("principal_display_name"),
+            grant.get("principal_email"),
+            grant.get("principal_user_principal_name"),
+            synced_at,
+            None,
+            db.jsonb(grant.get("raw") or {}),
+        )
+        for grant in _extract_grants(perm)
+    ]
+
+
+_PERMISSION_PAYLOADS = PayloadColumns("permission", key=(0, 1, 2), payload=13, synced_at=11)
+_PERMISSION_GRANT_PAYLOADS = PayloadColumns("permission_grant", key=(0, 1, 2, 3, 4), payload=10, synced_at=8)
+
+_PERMISSIONS_UPSERT_SQL = """
+    INSERT INTO msgraph_drive_item_permissions
+      (drive_id, item_id, permission_id, source, roles, link_type, link_scope, link_web_url,
+       link_prevents_download, link_expiration_dt, inherited_from_id, synced_at, deleted_at, raw_json)
+    VALUES %s
+    ON CONFLICT (drive_id, item_id, permission_id) DO UPDATE SET
+      source = EXCLUDED.source,
+      roles = EXCLUDED.roles,
+      link_type = EXCLUDED.link_type,
+      link_scope = EXCLUDED.link_scope,
+      link_web_url = EXCLUDED.link_web_url,
+      link_prevents_download = EXCLUDED.link_prevents_download,
+      link_expiration_dt = EXCLUDED.link_expiration_dt,
+      inherited_from_id = EXCLUDED.inherited_from_id,
+      synced_at = EXCLUDED.synced_at,
+      deleted_at = NULL,
+      raw_json = EXCLUDED.raw_json
+"""
+
+_PERMISSION_GRANTS_UPSERT_SQL = """
+    INSERT INTO msgraph_drive_item_permission_grants
+      (drive_id, item_id, permission_id, principal_type, principal_id, principal_display_name,
+       principal_email, principal_user_principal_name, synced_at, deleted_at, raw_json)
+    VALUES %s
+    ON CONFLICT (drive_id, item_id, permission_id, principal_type, principal_id) DO UPDATE SET
+      principal_display_name = EXCLUDED.principal_display_name,
+      principal_email = EXCLUDED.principal_email,
+      principal_user_principal_name = EXCLUDED.principal_user_principal_name,
+      synced_at = EXCLUDED.synced_at,
+      deleted_at = NULL,
+      raw_json = EXCLUDED.raw_json
+"""
+
+
 def _scan_permissions(
     client: GraphClient,
     config: Dict[str, Any],
@@ -3556,37 +4634,6 @@ def _scan_permissions(
         USING (VALUES %s) AS v(drive_id, item_id)
         WHERE p.drive_id = v.drive_id AND p.item_id = v.item_id
     """
-    insert_permissions_sql = """
-        INSERT INTO msgraph_drive_item_permissions
-          (drive_id, item_id, permission_id, source, roles, link_type, link_scope, link_web_url,
-           link_prevents_download, link_expiration_dt, inherited_from_id, synced_at, deleted_at, raw_json)
-        VALUES %s
-        ON CONFLICT (drive_id, item_id, permission_id) DO UPDATE SET
-          source = EXCLUDED.source,
-          roles = EXCLUDED.roles,
-          link_type = EXCLUDED.link_type,
-          link_scope = EXCLUDED.link_scope,
-          link_web_url = EXCLUDED.link_web_url,
-          link_prevents_download = EXCLUDED.link_prevents_download,
-          link_expiration_dt = EXCLUDED.link_expiration_dt,
-          inherited_from_id = EXCLUDED.inherited_from_id,
-          synced_at = EXCLUDED.synced_at,
-          deleted_at = NULL,
-          raw_json = EXCLUDED.raw_json
-    """
-    insert_grants_sql = """
-        INSERT INTO msgraph_drive_item_permission_grants
-          (drive_id, item_id, permission_id, principal_type, principal_id, principal_display_name,
-           principal_email, principal_user_principal_name, synced_at, deleted_at, raw_json)
-        VALUES %s
-        ON CONFLICT (drive_id, item_id, permission_id, principal_type, principal_id) DO UPDATE SET
-          principal_display_name = EXCLUDED.principal_display_name,
-          principal_email = EXCLUDED.principal_email,
-          principal_user_principal_name = EXCLUDED.principal_user_principal_name,
-          synced_at = EXCLUDED.synced_at,
-          deleted_at = NULL,
-          raw_json = EXCLUDED.raw_json
-    """
     update_items_ok_sql = """
         UPDATE msgraph_drive_items d
         SET permissions_last_synced_at = v.synced_at,
@@ -3703,7 +4750,7 @@ def _scan_permissions(
             if GRAPH_MAX_CONCURRENCY > 1:
                 with ThreadPoolExecutor(max_workers=GRAPH_MAX_CONCURRENCY) as executor:
                     future_to_key = {
-                        executor.submit(_fetch_permissions, client, drive_id, item_id): (drive_id, item_id)
+                        executor.submit(copy_context().run, _fetch_permissions, client, drive_id, item_id): (drive_id, item_id)
                         for drive_id, item_id in keys
                     }
                     for future in as_completed(future_to_key):
@@ -3746,46 +4793,10 @@ def _scan_permissions(
                     ok_updates.append((drive_id, item_id, synced_at))
                     perms = res.get("permissions") or []
                     for perm in perms:
-                        perm_id = perm.get("id")
-                        if not perm_id:
+                        if not perm.get("id"):
                             continue
-                        link = perm.get("link") or {}
-                        inherited_from_id = (perm.get("inheritedFrom") or {}).get("id")
-                        source = "inherited" if inherited_from_id else "direct"
-                        permission_rows.append(
-                            (
-                                drive_id,
-                                item_id,
-                                perm_id,
-                                source,
-                                perm.get("roles"),
-                                link.get("type"),
-                                link.get("scope"),
-                                link.get("webUrl"),
-                                link.get("preventsDownload"),
-                                link.get("expirationDateTime"),
-                                inherited_from_id,
-                                synced_at,
-                                None,
-                                db.jsonb(perm),
-                            )
-                        )
-                        for grant in _extract_grants(perm):
-                            grant_rows.append(
-                                (
-                                    drive_id,
-                                    item_id,
-                                    perm_id,
-                                    grant.get("principal_type"),
-                                    grant.get("principal_id"),
-                                    grant.get("principal_display_name"),
-                                    grant.get("principal_email"),
-                                    grant.get("principal_user_principal_name"),
-                                    synced_at,
-                                    None,
-                                    db.jsonb(grant.get("raw") or {}),
-                                )
-                            )
+                        permission_rows.append(_permission_row(drive_id, item_id, perm, synced_at=synced_at))
+                        grant_rows.extend(_permission_grant_rows(drive_id, item_id, perm, synced_at=synced_at))
                     continue
 
                 failed_at = datetime.now(timezone.utc)
@@ -3883,7 +4894,22 @@ def _scan_permissions(
             updates.sort(key=lambda r: (r[0], r[1]))
             return updates
 
+        # Each batch commits its items' permissions_last_synced_at, so a stopped scan resumes from the
+        # items that are still stale.
+        stopped: Optional[str] = None
         while True:
+            report_progress(
+                run_id,
+                "permissions",
+                items_seen=items_processed,
+                rows_written=items_ok + items_err,
+                units_done=batches,
+                unit="batches",
+            )
+            stopped = stop_requested(run_id, stage="permissions")
+            if stopped:
+                conn.commit()
+                break
             query_params: list[Any] = []
             scoped_filter_sql = ""
             if scoped_drive_ids:
@@ -3961,9 +4987,9 @@ def _scan_permissions(
                     db.execute_values(cur, delete_grants_sql, ok_keys)
                     db.execute_values(cur, delete_permissions_sql, ok_keys)
                     if permission_rows:
-                        db.execute_values(cur, insert_permissions_sql, permission_rows)
+                        db.execute_values(cur, _PERMISSIONS_UPSERT_SQL, detach_payloads(cur, permission_rows, _PERMISSION_PAYLOADS))
                     if grant_rows:
-                        db.execute_values(cur, insert_grants_sql, grant_rows)
+                        db.execute_values(cur, _PERMISSION_GRANTS_UPSERT_SQL, detach_payloads(cur, grant_rows, _PERMISSION_GRANT_PAYLOADS))
                     db.execute_values(cur, update_items_ok_sql, ok_updates)
 
                 if not_found_cleanup_keys:
@@ -4143,7 +5169,8 @@ def _scan_permissions(
                     context={"batch": batches, "errors": len(err_updates), "sample": sample_errors},
                 )
 
-        pending_end_retry_keys = sorted(list(failed_keys_for_end_retry), key=lambda r: (r[0], r[1]))
+        # A stopped scan leaves failed items for the next run, which picks items with errors first.
+        pending_end_retry_keys = [] if stopped else sorted(list(failed_keys_for_end_retry), key=lambda r: (r[0], r[1]))
         end_retry_candidates = len(pending_end_retry_keys)
         if pending_end_retry_keys:
             emit(
@@ -4174,9 +5201,9 @@ def _scan_permissions(
                         db.execute_values(cur, delete_grants_sql, ok_keys)
                         db.execute_values(cur, delete_permissions_sql, ok_keys)
                         if permission_rows:
-                            db.execute_values(cur, insert_permissions_sql, permission_rows)
+                            db.execute_values(cur, _PERMISSIONS_UPSERT_SQL, detach_payloads(cur, permission_rows, _PERMISSION_PAYLOADS))
                         if grant_rows:
-                            db.execute_values(cur, insert_grants_sql, grant_rows)
+                            db.execute_values(cur, _PERMISSION_GRANTS_UPSERT_SQL, detach_payloads(cur, grant_rows, _PERMISSION_GRANT_PAYLOADS))
                         db.execute_values(cur, update_items_ok_sql, ok_updates)
 
                     if not_found_cleanup_keys:
@@ -4321,6 +5348,7 @@ def _scan_permissions(
                 },
             )
 
+        report_progress(run_id, "permissions", items_seen=items_processed, rows_written=items_ok + items_err, units_done=batches)
         log_job_run_log(
             run_id=run_id,
             level="INFO",
@@ -4366,6 +5394,7 @@ def _scan_permissions(
             "end_retry_ok": end_retry_ok,
             "end_retry_err": end_retry_err,
             "end_retry_remaining": end_retry_remaining,
+            **({"stopped": stopped} if stopped else {}),
         }
     finally:
         conn.close()
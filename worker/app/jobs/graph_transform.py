@@ -0,0 +1,109 @@
+import json
+import multiprocessing
+import re
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Deque, Dict, Optional
+
+# Set once per worker process by the pool initializer, so the identity maps are unpickled once per
+# worker instead of once per page.
+_SHARED_STATE: Dict[str, Any] = {}
+
+# Graph only ever puts @odata.nextLink / @odata.deltaLink on the page object; inside string values a
+# quote after the key name would be escaped, so the pattern cannot match item content.
+_PAGE_LINK_RE = re.compile(rb'"@odata\.(nextLink|deltaLink)"\s*:\s*("(?:[^"\\]|\\.)*")')
+
+
+def _init_worker(shared_state: Dict[str, Any]):
+    global _SHARED_STATE
+    _SHARED_STATE = shared_state
+
+
+def page_links(raw: bytes) -> Dict[str, str]:
+    """Return the page's `@odata.nextLink` / `@odata.deltaLink` without parsing the whole page."""
+    return {f"@odata.{name.decode()}": json.loads(value) for name, value in _PAGE_LINK_RE.findall(raw or b"")}
+
+
+def _start_method() -> str:
+    # The ingest process runs Graph and heartbeat threads; forking it could copy a held lock.
+    return "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+def _run_transform(transform_fn: Callable[..., Any], raw: bytes, kwargs: Dict[str, Any]) -> Any:
+    return transform_fn(json.loads(raw), shared=_SHARED_STATE, **kwargs)
+
+
+class TransformPool:
+    """Runs a pure page transform (raw Graph bytes -> row buffers) off the ingest thread.
+
+    Results are returned in submission order. With processes <= 0 the transform runs inline,
+    which keeps the single-process path free of multiprocessing entirely. Workers are started
+    with forkserver (spawn where unavailable) and receive `shared_state` once, through the pool
+    initializer.
+    """
+
+    def __init__(
+        self,
+        transform_fn: Callable[..., Any],
+        *,
+        processes: int,
+        shared_state: Dict[str, Any],
+        max_pending: Optional[int] = None,
+    ):
+        self._transform_fn = transform_fn
+        self.processes = max(0, int(processes))
+        self._max_pending = max(1, int(max_pending or self.processes * 2 or 1))
+        self._pending: Deque[Future] = deque()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._shared_state = shared_state
+        if self.processes <= 0:
+            return
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=multiprocessing.get_context(_start_method()),
+            initializer=_init_worker,
+            initargs=(shared_state,),
+        )
+
+    @property
+    def inline(self) -> bool:
+        """True when pages are transformed in this process; callers can then pass parsed pages."""
+        return self._executor is None
+
+    def submit(self, page: bytes | Dict[str, Any], **kwargs: Any) -> list[Any]:
+        """Queue one page (raw bytes, or an already parsed dict when `inline`) and return any
+        results that are ready, oldest first."""
+        if self._executor is None:
+            data = json.loads(page) if isinstance(page, (bytes, bytearray)) else page
+            return [self._transform_fn(data, shared=self._shared_state, **kwargs)]
+        self._pending.append(self._executor.submit(_run_transform, self._transform_fn, page, kwargs))
+        ready: list[Any] = []
+        while self._pending and (len(self._pending) > self._max_pending or self._pending[0].done()):
+            ready.append(self._pending.popleft().result())
+        return ready
+
+    def drain(self) -> list[Any]:
+        """Wait for every queued page and return the results in submission order."""
+        ready: list[Any] = []
+        while self._pending:
+            ready.append(self._pending.popleft().result())
+        return ready
+
+    def discard(self):
+        """Drop queued pages, e.g. after a delta cursor reset; errors from dropped pages are ignored."""
+        while self._pending:
+            future = self._pending.popleft()
+            if not future.cancel():
+                future.exception()
+
+    def close(self):
+        self._pending.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def __enter__(self) -> "TransformPool":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -1,16 +1,30 @@
 import os
 import re
-from datetime import datetime, timezone
-from typing import Any, Dict, Iterable, Optional
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, Optional
 
 from psycopg2 import sql
 
 from app import db
+from app.jobs.activity_rollups import apply_activity_rollup_changes
+from app.metrics import MV_REFRESH_SECONDS
 from app.runtime_logger import emit
 from app.utils import log_audit_event, log_job_run_log
 
 
 DEFAULT_MAX_VIEWS_PER_RUN = int(os.getenv("MV_REFRESH_MAX_VIEWS_PER_RUN", "20"))
+DEFAULT_REFRESH_PARALLELISM = int(os.getenv("MV_REFRESH_PARALLELISM", "2"))
+DEFAULT_TIME_BUDGET_SECONDS = int(os.getenv("MV_REFRESH_TIME_BUDGET_SECONDS", "240"))
+DEFAULT_BACKOFF_BASE_SECONDS = int(os.getenv("MV_REFRESH_BACKOFF_BASE_SECONDS", "60"))
+DEFAULT_BACKOFF_MAX_SECONDS = int(os.getenv("MV_REFRESH_BACKOFF_MAX_SECONDS", "3600"))
+# Assumed cost for views without successful refresh history yet.
+DEFAULT_EXPECTED_COST_SECONDS = 30.0
+HISTORY_SAMPLE_SIZE = 20
+HISTORY_RETENTION_DAYS = 30
+DEFAULT_INVALIDATION_MIN_CHANGED_ROWS = int(os.getenv("MV_INVALIDATION_MIN_CHANGED_ROWS", "1"))
+DEFAULT_INVALIDATION_MAX_HOLD_MINUTES = int(os.getenv("MV_INVALIDATION_MAX_HOLD_MINUTES", "1440"))
 _MV_NAME_PATTERN = re.compile(r"^[a-zA-Z_][a-zA-Z0-9_]*$")
 
 
@@ -24,7 +38,41 @@ def _get_mv_refresh_runtime_config(job_id: str) -> Dict[str, Any]:
     if not isinstance(config, dict):
         config = {}
     max_views_per_run = int(config.get("max_views_per_run", DEFAULT_MAX_VIEWS_PER_RUN))
-    return {"max_views_per_run": max(1, min(max_views_per_run, 200))}
+    parallelism = int(config.get("parallelism", DEFAULT_REFRESH_PARALLELISM))
+    time_budget_seconds = int(config.get("time_budget_seconds", DEFAULT_TIME_BUDGET_SECONDS))
+    backoff_base_seconds = int(config.get("backoff_base_seconds", DEFAULT_BACKOFF_BASE_SECONDS))
+    backoff_max_seconds = int(config.get("backoff_max_seconds", DEFAULT_BACKOFF_MAX_SECONDS))
+    return {
+        "max_views_per_run": max(1, min(max_views_per_run, 200)),
+        "parallelism": max(1, min(parallelism, 8)),
+        "time_budget_seconds": max(10, min(time_budget_seconds, 3600)),
+        "backoff_base_seconds": max(0, backoff_base_seconds),
+        "backoff_max_seconds": max(0, backoff_max_seconds),
+    }
+
+
+def _enqueue_impacted_mvs(cur, table_names: list[str]) -> list[str]:
+    cur.execute(
+        """
+        WITH impacted AS (
+          SELECT DISTINCT mv_name
+          FROM mv_dependencies
+          WHERE table_name = ANY(%s::text[])
+        ),
+        queued AS (
+          INSERT INTO mv_refresh_queue (mv_name, dirty_since)
+          SELECT mv_name, now()
+          FROM impacted
+          ON CONFLICT (mv_name) DO NOTHING
+          RETURNING mv_name
+        )
+        SELECT mv_name
+        FROM queued
+        ORDER BY mv_name
+        """,
+        [table_names],
+    )
+    return [row[0] for row in cur.fetchall()]
 
 
 def enqueue_impacted_mvs_for_tables(table_names: Iterable[str]) -> Dict[str, Any]:
@@ -35,124 +83,520 @@ def enqueue_impacted_mvs_for_tables(table_names: Iterable[str]) -> Dict[str, Any
     conn = db.get_conn()
     try:
         cur = conn.cursor()
+        queued_mvs = _enqueue_impacted_mvs(cur, normalized_tables)
+        conn.commit()
+    finally:
+        conn.close()
+
+    return {"tables": normalized_tables, "queued": len(queued_mvs), "queued_mvs": queued_mvs}
+
+
+def enqueue_changed_mvs(
+    *,
+    min_changed_rows: Optional[int] = None,
+    max_hold_minutes: Optional[int] = None,
+    wake_scheduler: bool = True,
+) -> Dict[str, Any]:
+    """Queue MVs whose source tables actually changed since the last call.
+
+    Worker sessions defer trigger-driven invalidation: `refresh_impacted_mvs()` only appends the
+    real inserted/updated/deleted row counts of each statement to `table_change_log`. This folds
+    the log into `table_change_pending` and releases tables whose pending volume reaches
+    `min_changed_rows` (or that have waited `max_hold_minutes`) into `mv_refresh_queue`.
+    With `wake_scheduler=False` the queue inserts do not notify the scheduler; `mv_refresh` uses
+    this for views it is about to refresh in the same run.
+    """
+    min_changed_rows = max(1, int(min_changed_rows if min_changed_rows is not None else DEFAULT_INVALIDATION_MIN_CHANGED_ROWS))
+    max_hold_minutes = max(1, int(max_hold_minutes if max_hold_minutes is not None else DEFAULT_INVALIDATION_MAX_HOLD_MINUTES))
+
+    conn = db.get_conn()
+    try:
+        cur = conn.cursor()
+        if not wake_scheduler:
+            cur.execute("SET LOCAL sentinel.suppress_scheduler_wakeup = 'on'")
         cur.execute(
             """
-            WITH impacted AS (
-              SELECT DISTINCT mv_name
-              FROM mv_dependencies
-              WHERE table_name = ANY(%s::text[])
+            WITH consumed AS (
+              DELETE FROM table_change_log
+              RETURNING table_name, inserted_rows, updated_rows, deleted_rows, logged_at
+            ),
+            totals AS (
+              SELECT
+                table_name,
+                SUM(inserted_rows)::bigint AS inserted_rows,
+                SUM(updated_rows)::bigint AS updated_rows,
+                SUM(deleted_rows)::bigint AS deleted_rows,
+                MIN(logged_at) AS first_changed_at
+              FROM consumed
+              GROUP BY table_name
             ),
-            queued AS (
-              INSERT INTO mv_refresh_queue (mv_name, dirty_since)
-              SELECT mv_name, now()
-              FROM impacted
-              ON CONFLICT (mv_name) DO NOTHING
-              RETURNING mv_name
+            merged AS (
+              INSERT INTO table_change_pending (table_name, inserted_rows, updated_rows, deleted_rows, first_changed_at)
+              SELECT table_name, inserted_rows, updated_rows, deleted_rows, first_changed_at
+              FROM totals
+              ON CONFLICT (table_name) DO UPDATE
+              SET inserted_rows = table_change_pending.inserted_rows + EXCLUDED.inserted_rows,
+                  updated_rows = table_change_pending.updated_rows + EXCLUDED.updated_rows,
+                  deleted_rows = table_change_pending.deleted_rows + EXCLUDED.deleted_rows,
+                  first_changed_at = LEAST(table_change_pending.first_changed_at, EXCLUDED.first_changed_at)
+              RETURNING table_name
             )
-            SELECT mv_name
-            FROM queued
-            ORDER BY mv_name
+            SELECT table_name, inserted_rows, updated_rows, deleted_rows
+            FROM totals
+            ORDER BY table_name
+            """
+        )
+        changes = {
+            table_name: {"inserted": int(inserted), "updated": int(updated), "deleted": int(deleted)}
+            for table_name, inserted, updated, deleted in cur.fetchall()
+        }
+        cur.execute(
+            """
+            DELETE FROM table_change_pending
+            WHERE inserted_rows + updated_rows + deleted_rows >= %s
+               OR first_changed_at <= now() - make_interval(mins => %s)
+            RETURNING table_name
             """,
-            [normalized_tables],
+            [min_changed_rows, max_hold_minutes],
+        )
+        released_tables = sorted(row[0] for row in cur.fetchall())
+        queued_mvs = _enqueue_impacted_mvs(cur, released_tables) if released_tables else []
+        cur.execute(
+            """
+            SELECT table_name, inserted_rows + updated_rows + deleted_rows
+            FROM table_change_pending
+            ORDER BY table_name
+            """
         )
-        rows = cur.fetchall()
+        held = {table_name: int(total) for table_name, total in cur.fetchall()}
         conn.commit()
     finally:
         conn.close()
 
-    queued_mvs = [row[0] for row in rows]
-    return {"tables": normalized_tables, "queued": len(queued_mvs), "queued_mvs": queued_mvs}
+    return {
+        "changes": changes,
+        "min_changed_rows": min_changed_rows,
+        "tables": released_tables,
+        "held": held,
+        "queued": len(queued_mvs),
+        "queued_mvs": queued_mvs,
+    }
+
+
+def _load_mv_upstreams(cur) -> Dict[str, set[str]]:
+    """Map each MV to the MVs it reads from.
+
+    Edges come from `mv_dependencies` rows whose table_name is itself a registered MV, plus
+    view-on-view references found in the catalog so undeclared nesting is still ordered.
+    """
+    cur.execute(
+        """
+        SELECT DISTINCT d.mv_name, d.table_name
+        FROM mv_dependencies d
+        JOIN (SELECT DISTINCT mv_name FROM mv_dependencies) m ON m.mv_name = d.table_name
+        WHERE d.mv_name <> d.table_name
+        """
+    )
+    edges = list(cur.fetchall())
+    cur.execute(
+        """
+        SELECT DISTINCT v.relname, ref.relname
+        FROM pg_rewrite r
+        JOIN pg_class v ON v.oid = r.ev_class AND v.relkind = 'm'
+        JOIN pg_depend d
+          ON d.objid = r.oid
+         AND d.classid = 'pg_rewrite'::regclass
+         AND d.refclassid = 'pg_class'::regclass
+        JOIN pg_class ref ON ref.oid = d.refobjid AND ref.relkind = 'm' AND ref.oid <> v.oid
+        """
+    )
+    edges.extend(cur.fetchall())
+
+    upstream: Dict[str, set[str]] = {}
+    for mv_name, upstream_name in edges:
+        upstream.setdefault(mv_name, set()).add(upstream_name)
+    return upstream
+
+
+def _downstream_map(upstream: Dict[str, set[str]]) -> Dict[str, list[str]]:
+    downstream: Dict[str, set[str]] = {}
+    for mv_name, parents in upstream.items():
+        for parent in parents:
+            downstream.setdefault(parent, set()).add(mv_name)
+    return {mv_name: sorted(children) for mv_name, children in downstream.items()}
+
+
+def _refresh_in_dependency_order(
+    mv_names: list[str],
+    upstream: Dict[str, set[str]],
+    *,
+    parallelism: int,
+    refresh_one: Callable[[str], Any],
+) -> Dict[str, Any]:
+    """Refresh `mv_names` with up to `parallelism` in flight, never before a queued upstream view.
+
+    Ready views are started in the order given (dirty_since order). Views whose upstream failed,
+    or that sit on a dependency cycle, are never started and come back as `blocked`.
+    """
+    run_set = set(mv_names)
+    waiting_on = {
+        mv_name: {name for name in upstream.get(mv_name, ()) if name in run_set and name != mv_name}
+        for mv_name in mv_names
+    }
+    pending = list(mv_names)
+    outcome: Dict[str, Any] = {"refreshed": [], "failed": [], "blocked": []}
+
+    with ThreadPoolExecutor(max_workers=max(1, parallelism), thread_name_prefix="mv-refresh") as pool:
+        running: Dict[Any, str] = {}
+        while True:
+            for mv_name in list(pending):
+                if len(running) >= parallelism:
+                    break
+                if not waiting_on[mv_name]:
+                    pending.remove(mv_name)
+                    running[pool.submit(refresh_one, mv_name)] = mv_name
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                mv_name = running.pop(future)
+                exc = future.exception()
+                if exc is not None:
+                    outcome["failed"].append((mv_name, exc))
+                    continue
+                outcome["refreshed"].append(mv_name)
+                for other in pending:
+                    waiting_on[other].discard(mv_name)
+
+    for mv_name in pending:
+        outcome["blocked"].append((mv_name, sorted(waiting_on[mv_name])))
+    return outcome
+
+
+def _backoff_seconds(attempts: int, *, base_seconds: int, max_seconds: int) -> float:
+    if attempts <= 0 or base_seconds <= 0:
+        return 0.0
+    return float(min(max_seconds, base_seconds * (2 ** min(attempts - 1, 16))))
+
+
+def _plan_refresh(
+    candidates: list[Dict[str, Any]],
+    upstream: Dict[str, set[str]],
+    *,
+    now: datetime,
+    budget_seconds: float,
+    parallelism: int,
+    max_views: int,
+    backoff_base_seconds: int,
+    backoff_max_seconds: int,
+) -> tuple[list[Dict[str, Any]], list[Dict[str, Any]]]:
+    """Pick the queued views to refresh this run.
+
+    Views in backoff are skipped. The rest are ranked by staleness (time since `dirty_since`) per
+    second of expected refresh cost and taken while their expected cost fits the budget; with
+    `parallelism` workers the budget covers `budget_seconds * parallelism` refresh-seconds. A view
+    is only taken together with its queued upstream views. The first pick always fits so a single
+    expensive view cannot starve.
+    """
+    eligible: Dict[str, Dict[str, Any]] = {}
+    deferred: list[Dict[str, Any]] = []
+    for candidate in candidates:
+        attempts = int(candidate.get("attempts") or 0)
+        last_attempt_at = candidate.get("last_attempt_at")
+        wait_seconds = _backoff_seconds(attempts, base_seconds=backoff_base_seconds, max_seconds=backoff_max_seconds)
+        if last_attempt_at is not None and wait_seconds > 0:
+            retry_at = last_attempt_at + timedelta(seconds=wait_seconds)
+            if retry_at > now:
+                deferred.append({"mv_name": candidate["mv_name"], "reason": "backoff", "retry_at": retry_at.isoformat()})
+                continue
+        eligible[candidate["mv_name"]] = candidate
+
+    def cost(name: str) -> float:
+        expected = eligible[name].get("expected_seconds")
+        return float(expected) if expected else DEFAULT_EXPECTED_COST_SECONDS
+
+    def score(name: str) -> float:
+        dirty_since = eligible[name].get("dirty_since")
+        stale_seconds = max((now - dirty_since).total_seconds(), 0.0) if dirty_since else 0.0
+        return stale_seconds / max(cost(name), 1.0)
+
+    def with_upstreams(name: str, group: list[str], seen: set[str]):
+        if name in seen:
+            return
+        seen.add(name)
+        for parent in sorted(upstream.get(name, ())):
+            if parent in eligible:
+                with_upstreams(parent, group, seen)
+        group.append(name)
 
+    capacity = float(budget_seconds) * max(1, parallelism)
+    selected: list[str] = []
+    spent = 0.0
+    for name in sorted(eligible, key=lambda item: (-score(item), item)):
+        if name in selected:
+            continue
+        group: list[str] = []
+        with_upstreams(name, group, set(selected))
+        group_cost = sum(cost(item) for item in group)
+        if len(selected) + len(group) > max_views:
+            deferred.append({"mv_name": name, "reason": "max_views"})
+        elif selected and spent + group_cost > capacity:
+            deferred.append({"mv_name": name, "reason": "budget"})
+        else:
+            selected.extend(group)
+            spent += group_cost
 
-def _refresh_mv_concurrently(mv_name: str):
+    planned = [
+        {"mv_name": name, "expected_seconds": round(cost(name), 3), "score": round(score(name), 3)}
+        for name in selected
+    ]
+    return planned, deferred
+
+
+def _refresh_mv_and_dequeue(mv_name: str, dependents: Iterable[str] = (), *, run_id: Optional[str] = None):
+    """Refresh one MV and settle its queue row in a single transaction.
+
+    On success the refresh, the `mv_refresh_log` stamp, the history row, the dequeue and the
+    re-queue of downstream MVs commit together; on failure only the attempt counters and a failed
+    history row are written.
+    """
     if not _MV_NAME_PATTERN.match(mv_name):
         raise ValueError(f"invalid_mv_name:{mv_name}")
 
+    started_at = datetime.now(timezone.utc)
+    started = time.perf_counter()
     conn = db.get_conn()
     try:
-        conn.autocommit = True
         cur = conn.cursor()
-        cur.execute(
-            sql.SQL("REFRESH MATERIALIZED VIEW CONCURRENTLY {}").format(sql.Identifier(mv_name))
-        )
+        try:
+            cur.execute(
+                sql.SQL("REFRESH MATERIALIZED VIEW CONCURRENTLY {}").format(sql.Identifier(mv_name))
+            )
+            duration_ms = int((time.perf_counter() - started) * 1000)
+            cur.execute(
+                """
+                INSERT INTO mv_refresh_log (mv_name, last_refreshed_at)
+                VALUES (%s, now())
+                ON CONFLICT (mv_name)
+                DO UPDATE SET last_refreshed_at = EXCLUDED.last_refreshed_at
+                """,
+                [mv_name],
+            )
+            # The planner's estimate (as of the last ANALYZE) instead of scanning the view again.
+            cur.execute(
+                """
+                INSERT INTO mv_refresh_history (mv_name, run_id, started_at, duration_ms, row_count, outcome)
+                SELECT %s, %s, %s, %s,
+                       (SELECT NULLIF(c.reltuples, -1)::bigint FROM pg_class c WHERE c.oid = to_regclass(%s)),
+                       'success'
+                """,
+                [mv_name, run_id, started_at, duration_ms, mv_name],
+            )
+            cur.execute("DELETE FROM mv_refresh_queue WHERE mv_name = %s", [mv_name])
+            dependents = sorted(dependents)
+            if dependents:
+                cur.execute(
+                    """
+                    INSERT INTO mv_refresh_queue (mv_name, dirty_since)
+                    SELECT unnest(%s::text[]), now()
+                    ON CONFLICT (mv_name) DO NOTHING
+                    """,
+                    [dependents],
+                )
+            conn.commit()
+            MV_REFRESH_SECONDS.observe(time.perf_counter() - started, mv_name=mv_name, outcome="success")
+        except Exception as exc:
+            MV_REFRESH_SECONDS.observe(time.perf_counter() - started, mv_name=mv_name, outcome="failed")
+            conn.rollback()
+            cur.execute(
+                "UPDATE mv_refresh_queue SET last_attempt_at = now(), attempts = attempts + 1 WHERE mv_name = %s",
+                [mv_name],
+            )
+            cur.execute(
+                """
+                INSERT INTO mv_refresh_history (mv_name, run_id, started_at, duration_ms, outcome, error)
+                VALUES (%s, %s, %s, %s, 'failed', %s)
+                """,
+                [mv_name, run_id, started_at, int((time.perf_counter() - started) * 1000), str(exc)[:1000]],
+            )
+            conn.commit()
+            raise
     finally:
         conn.close()
 
 
+def get_mv_refresh_stats(*, days: int = 7) -> list[Dict[str, Any]]:
+    """Per-view refresh duration percentiles and outcomes over the last `days` days."""
+    return db.fetch_all(
+        """
+        SELECT
+          h.mv_name,
+          COUNT(*)::int AS refreshes,
+          COUNT(*) FILTER (WHERE h.outcome <> 'success')::int AS failures,
+          percentile_cont(0.5) WITHIN GROUP (ORDER BY h.duration_ms) FILTER (WHERE h.outcome = 'success') AS p50_ms,
+          percentile_cont(0.95) WITHIN GROUP (ORDER BY h.duration_ms) FILTER (WHERE h.outcome = 'success') AS p95_ms,
+          MAX(h.duration_ms) FILTER (WHERE h.outcome = 'success') AS max_ms,
+          (ARRAY_AGG(h.row_count ORDER BY h.finished_at DESC) FILTER (WHERE h.outcome = 'success'))[1] AS last_row_count,
+          (ARRAY_AGG(h.outcome ORDER BY h.finished_at DESC))[1] AS last_outcome,
+          MAX(h.finished_at) AS last_finished_at,
+          q.dirty_since,
+          q.attempts
+        FROM mv_refresh_history h
+        LEFT JOIN mv_refresh_queue q ON q.mv_name = h.mv_name
+        WHERE h.finished_at >= now() - make_interval(days => %s)
+        GROUP BY h.mv_name, q.dirty_since, q.attempts
+        ORDER BY p95_ms DESC NULLS LAST, h.mv_name
+        """,
+        [max(1, int(days))],
+    )
+
+
 def run_mv_refresh(*, run_id: str, job_id: str, actor: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     config = _get_mv_refresh_runtime_config(job_id)
     max_views_per_run = int(config.get("max_views_per_run", DEFAULT_MAX_VIEWS_PER_RUN))
+    parallelism = int(config.get("parallelism", DEFAULT_REFRESH_PARALLELISM))
+    time_budget_seconds = int(config.get("time_budget_seconds", DEFAULT_TIME_BUDGET_SECONDS))
+
+    # Changes logged by worker sessions that did not release them (e.g. an interrupted ingest).
+    try:
+        invalidation = enqueue_changed_mvs(wake_scheduler=False)
+    except Exception as exc:
+        invalidation = {"error": str(exc)}
+        emit("WARN", "SCHEDULER", f"Change-aware MV invalidation failed: error={exc}")
 
     conn = db.get_conn()
     try:
         cur = conn.cursor()
         cur.execute(
             """
-            SELECT q.mv_name, q.dirty_since, q.attempts
+            SELECT q.mv_name, q.dirty_since, q.attempts, q.last_attempt_at, c.expected_ms
             FROM mv_refresh_queue q
             JOIN (SELECT DISTINCT mv_name FROM mv_dependencies) d ON d.mv_name = q.mv_name
+            LEFT JOIN LATERAL (
+              SELECT percentile_cont(0.5) WITHIN GROUP (ORDER BY recent.duration_ms) AS expected_ms
+              FROM (
+                SELECT h.duration_ms
+                FROM mv_refresh_history h
+                WHERE h.mv_name = q.mv_name AND h.outcome = 'success'
+                ORDER BY h.finished_at DESC
+                LIMIT %s
+              ) recent
+            ) c ON true
             ORDER BY q.dirty_since ASC, q.mv_name ASC
-            LIMIT %s
             """,
-            [max_views_per_run],
+            [HISTORY_SAMPLE_SIZE],
         )
         pending_rows = cur.fetchall()
+        upstream = _load_mv_upstreams(cur)
         conn.commit()
     finally:
         conn.close()
 
+    candidates = [
+        {
+            "mv_name": mv_name,
+            "dirty_since": dirty_since,
+            "attempts": attempts,
+            "last_attempt_at": last_attempt_at,
+            "expected_seconds": (float(expected_ms) / 1000.0) if expected_ms is not None else None,
+        }
+        for mv_name, dirty_since, attempts, last_attempt_at, expected_ms in pending_rows
+    ]
+    planned, deferred = _plan_refresh(
+        candidates,
+        upstream,
+        now=datetime.now(timezone.utc),
+        budget_seconds=time_budget_seconds,
+        parallelism=parallelism,
+        max_views=max_views_per_run,
+        backoff_base_seconds=int(config.get("backoff_base_seconds", DEFAULT_BACKOFF_BASE_SECONDS)),
+        backoff_max_seconds=int(config.get("backoff_max_seconds", DEFAULT_BACKOFF_MAX_SECONDS)),
+    )
+
     summary: Dict[str, Any] = {
         "max_views_per_run": max_views_per_run,
+        "parallelism": parallelism,
+        "time_budget_seconds": time_budget_seconds,
         "pending_seen": len(pending_rows),
+        "planned_cost_seconds": round(sum(item["expected_seconds"] for item in planned), 3),
         "attempted": 0,
         "refreshed": 0,
         "failed": 0,
+        "blocked": 0,
+        "deferred": len(deferred),
         "refreshed_mvs": [],
         "failed_mvs": [],
+        "blocked_mvs": [],
+        "deferred_mvs": deferred,
+        "invalidation": invalidation,
         "finished_at": datetime.now(timezone.utc).isoformat(),
     }
 
     emit(
         "INFO",
         "SCHEDULER",
-        f"MV refresh run started: run_id={run_id} job_id={job_id} pending={len(pending_rows)} limit={max_views_per_run}",
+        f"MV refresh run started: run_id={run_id} job_id={job_id} pending={len(pending_rows)} planned={len(planned)} "
+        f"deferred={len(deferred)} limit={max_views_per_run} parallelism={parallelism} budget_seconds={time_budget_seconds}",
     )
     log_job_run_log(
         run_id=run_id,
         level="INFO",
         message="mv_refresh_started",
-        context={"job_id": job_id, "pending": len(pending_rows), "max_views_per_run": max_views_per_run},
+        context={
+            "job_id": job_id,
+            "pending": len(pending_rows),
+            "max_views_per_run": max_views_per_run,
+            "parallelism": parallelism,
+            "time_budget_seconds": time_budget_seconds,
+            "planned": planned,
+            "deferred": deferred,
+        },
+    )
+
+    # Rollup buckets dirtied outside graph_ingest (revokes, manual fixes) are settled here.
+    try:
+        summary["activity_rollups"] = apply_activity_rollup_changes()
+    except Exception as exc:
+        summary["activity_rollups"] = {"error": str(exc)}
+        emit("WARN", "SCHEDULER", f"Activity rollup apply failed: error={exc}")
+
+    downstream = _downstream_map(upstream)
+
+    def refresh_one(mv_name: str):
+        _refresh_mv_and_dequeue(mv_name, downstream.get(mv_name, ()), run_id=run_id)
+        emit("INFO", "SCHEDULER", f"MV refreshed: mv_name={mv_name}")
+
+    outcome = _refresh_in_dependency_order(
+        [item["mv_name"] for item in planned],
+        upstream,
+        parallelism=parallelism,
+        refresh_one=refresh_one,
     )
 
-    for mv_name, _, _ in pending_rows:
-        summary["attempted"] += 1
+    summary["refreshed_mvs"] = outcome["refreshed"]
+    summary["refreshed"] = len(outcome["refreshed"])
+    for mv_name, exc in outcome["failed"]:
+        summary["failed_mvs"].append({"mv_name": mv_name, "error": str(exc)})
+        emit("WARN", "SCHEDULER", f"MV refresh failed: mv_name={mv_name} error={exc}")
+    summary["failed"] = len(summary["failed_mvs"])
+    for mv_name, waiting_on in outcome["blocked"]:
+        summary["blocked_mvs"].append({"mv_name": mv_name, "waiting_on": waiting_on})
+        emit("WARN", "SCHEDULER", f"MV refresh blocked: mv_name={mv_name} waiting_on={','.join(waiting_on)}")
+    summary["blocked"] = len(summary["blocked_mvs"])
+    summary["attempted"] = summary["refreshed"] + summary["failed"]
+    summary["finished_at"] = datetime.now(timezone.utc).isoformat()
+
+    try:
         db.execute(
-            "UPDATE mv_refresh_queue SET last_attempt_at = now(), attempts = attempts + 1 WHERE mv_name = %s",
-            [mv_name],
+            "DELETE FROM mv_refresh_history WHERE finished_at < now() - make_interval(days => %s)",
+            [HISTORY_RETENTION_DAYS],
         )
-        try:
-            _refresh_mv_concurrently(mv_name)
-            db.execute(
-                """
-                INSERT INTO mv_refresh_log (mv_name, last_refreshed_at)
-                VALUES (%s, now())
-                ON CONFLICT (mv_name)
-                DO UPDATE SET last_refreshed_at = EXCLUDED.last_refreshed_at
-                """,
-                [mv_name],
-            )
-            db.execute("DELETE FROM mv_refresh_queue WHERE mv_name = %s", [mv_name])
-            summary["refreshed"] += 1
-            summary["refreshed_mvs"].append(mv_name)
-            emit("INFO", "SCHEDULER", f"MV refreshed: mv_name={mv_name}")
-        except Exception as exc:
-            summary["failed"] += 1
-            summary["failed_mvs"].append({"mv_name": mv_name, "error": str(exc)})
-            emit("WARN", "SCHEDULER", f"MV refresh failed: mv_name={mv_name} error={exc}")
+    except Exception as exc:
+        emit("WARN", "SCHEDULER", f"MV refresh history prune failed: error={exc}")
 
     log_job_run_log(
         run_id=run_id,
-        level="INFO" if summary["failed"] == 0 else "WARN",
+        level="INFO" if summary["failed"] == 0 and summary["blocked"] == 0 else "WARN",
         message="mv_refresh_completed",
         context={"job_id": job_id, "summary": summary},
     )
@@ -166,6 +610,7 @@ def run_mv_refresh(*, run_id: str, job_id: str, actor: Optional[Dict[str, Any]]
     emit(
         "INFO",
         "SCHEDULER",
-        f"MV refresh run finished: run_id={run_id} job_id={job_id} refreshed={summary['refreshed']} failed={summary['failed']}",
+        f"MV refresh run finished: run_id={run_id} job_id={job_id} refreshed={summary['refreshed']} failed={summary['failed']} "
+        f"blocked={summary['blocked']} deferred={summary['deferred']}",
     )
     return summary
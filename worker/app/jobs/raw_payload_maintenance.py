@@ -0,0 +1,61 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from app import db
+from app.job_control import stop_requested
+from app.raw_payloads import (
+    GRAPH_RAW_PAYLOAD_MAINTENANCE_CHUNK,
+    GRAPH_RAW_PAYLOAD_MAINTENANCE_ROWS,
+    GRAPH_RAW_PAYLOAD_RETENTION_DAYS,
+    maintain_raw_payloads,
+)
+from app.runtime_logger import emit
+from app.utils import log_audit_event, log_job_run_log
+
+
+def _get_runtime_config(job_id: str) -> Dict[str, Any]:
+    row = db.fetch_one("SELECT config FROM jobs WHERE job_id = %s", [job_id]) or {}
+    config = row.get("config") if isinstance(row, dict) else {}
+    if not isinstance(config, dict):
+        config = {}
+    retention_days = config.get("retention_days", GRAPH_RAW_PAYLOAD_RETENTION_DAYS)
+    max_rows = config.get("max_rows", GRAPH_RAW_PAYLOAD_MAINTENANCE_ROWS)
+    return {
+        "retention_days": max(0, int(retention_days or 0)),
+        "max_rows": max(1, int(max_rows or GRAPH_RAW_PAYLOAD_MAINTENANCE_ROWS)),
+    }
+
+
+def run_raw_payload_maintenance(*, run_id: str, job_id: str, actor: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Move inline raw_json left over from a policy change and apply opt-in payload retention."""
+    config = _get_runtime_config(job_id)
+    emit("INFO", "SCHEDULER", f"Raw payload maintenance started: run_id={run_id} job_id={job_id} config={config}")
+    log_job_run_log(
+        run_id=run_id,
+        level="INFO",
+        message="raw_payload_maintenance_started",
+        context={"job_id": job_id, **config},
+    )
+
+    summary = maintain_raw_payloads(
+        retention_days=config["retention_days"],
+        max_rows=config["max_rows"],
+        chunk_size=GRAPH_RAW_PAYLOAD_MAINTENANCE_CHUNK,
+        should_stop=lambda: stop_requested(run_id, stage="raw_payloads") is not None,
+    )
+    summary["finished_at"] = datetime.now(timezone.utc).isoformat()
+
+    log_job_run_log(
+        run_id=run_id,
+        level="INFO",
+        message="raw_payload_maintenance_completed",
+        context={"job_id": job_id, "summary": summary},
+    )
+    log_audit_event(
+        action="raw_payload_maintenance_completed",
+        entity_type="job_run",
+        entity_id=run_id,
+        actor=actor,
+        details={"job_id": job_id, "summary": summary},
+    )
+    return summary
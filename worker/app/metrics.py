@@ -0,0 +1,207 @@
+import math
+import re
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+from urllib.parse import urlparse
+
+
+# Seconds; covers fast Graph calls and single DB writes up to multi-hour graph_ingest runs.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900, 3600, 14400)
+
+_LITERAL_SEGMENT = re.compile(r"[A-Za-z$.]+")
+_FUNCTION_SEGMENT = re.compile(r"([A-Za-z$.][A-Za-z0-9$.]*)\(.*\)")
+_GRAPH_VERSION_SEGMENTS = {"v1.0", "beta"}
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = self.header()
+        for key, value in values:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [bucket counts..., +Inf count], sum
+        self._values: Dict[Tuple[str, ...], Tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            counts[-1] += 1
+            total[0] += value
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+            return entry[0][-1] if entry else 0
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = sorted((key, (list(counts), total[0])) for key, (counts, total) in self._values.items())
+        lines = self.header()
+        for key, (counts, total) in values:
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {counts[-1]}")
+        return lines
+
+
+GRAPH_REQUESTS = Counter(
+    "sentinel_graph_requests_total",
+    "Graph HTTP responses by endpoint class, method and status (transport errors use status=error).",
+    ("endpoint", "method", "status"),
+)
+GRAPH_REQUEST_SECONDS = Histogram(
+    "sentinel_graph_request_duration_seconds",
+    "Graph HTTP request latency per attempt.",
+    ("endpoint", "method"),
+)
+GRAPH_RETRIES = Counter(
+    "sentinel_graph_retries_total",
+    "Graph request attempts that were retried, by reason.",
+    ("endpoint", "reason"),
+)
+GRAPH_THROTTLE_SLEEP_SECONDS = Counter(
+    "sentinel_graph_throttle_sleep_seconds_total",
+    "Time spent sleeping before Graph retries (Retry-After and backoff).",
+    ("endpoint",),
+)
+DB_WRITES = Counter(
+    "sentinel_db_writes_total",
+    "DB write calls by table, op and outcome.",
+    ("table", "op", "outcome"),
+)
+DB_WRITE_ROWS = Counter(
+    "sentinel_db_write_rows_total",
+    "Rows passed to DB write calls by table and op.",
+    ("table", "op"),
+)
+DB_WRITE_SECONDS = Histogram(
+    "sentinel_db_write_duration_seconds",
+    "DB write call latency by table and op.",
+    ("table", "op"),
+)
+SCHEDULER_TICK_SECONDS = Histogram(
+    "sentinel_scheduler_tick_duration_seconds",
+    "Time to drain due schedules and dispatch queued jobs after one scheduler wakeup.",
+)
+JOB_RUNS = Counter(
+    "sentinel_job_runs_total",
+    "Finished job runs by job type and status.",
+    ("job_type", "status"),
+)
+JOB_RUN_SECONDS = Histogram(
+    "sentinel_job_run_duration_seconds",
+    "Job run duration by job type and status.",
+    ("job_type", "status"),
+)
+MV_REFRESH_SECONDS = Histogram(
+    "sentinel_mv_refresh_duration_seconds",
+    "Materialized view refresh duration by view and outcome.",
+    ("mv_name", "outcome"),
+)
+
+REGISTRY = (
+    GRAPH_REQUESTS,
+    GRAPH_REQUEST_SECONDS,
+    GRAPH_RETRIES,
+    GRAPH_THROTTLE_SLEEP_SECONDS,
+    DB_WRITES,
+    DB_WRITE_ROWS,
+    DB_WRITE_SECONDS,
+    SCHEDULER_TICK_SECONDS,
+    JOB_RUNS,
+    JOB_RUN_SECONDS,
+    MV_REFRESH_SECONDS,
+)
+
+
+def graph_endpoint_class(url: str) -> str:
+    """Collapse a Graph URL to a low-cardinality label, e.g. `/drives/{id}/root/delta`.
+
+    Word-only segments are kept, function calls keep their name, and anything with digits or
+    punctuation (ids, UPNs, site ids) becomes `{id}`. Query strings are dropped.
+    """
+    segments = [segment for segment in urlparse(url).path.split("/") if segment]
+    if segments and segments[0] in _GRAPH_VERSION_SEGMENTS:
+        segments = segments[1:]
+    labels = []
+    for segment in segments[:6]:
+        if _LITERAL_SEGMENT.fullmatch(segment):
+            labels.append(segment)
+            continue
+        match = _FUNCTION_SEGMENT.fullmatch(segment)
+        labels.append(f"{match.group(1)}()" if match else "{id}")
+    return "/" + "/".join(labels)
+
+
+def render_metrics() -> str:
+    lines: list[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,335 @@
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterator, NamedTuple, Optional
+
+from app import db
+from app.runtime_logger import emit
+
+
+INLINE = "inline"
+OFF = "off"
+ARCHIVE = "archive"
+HASH = "hash"
+RAW_PAYLOAD_MODES = (INLINE, OFF, ARCHIVE, HASH)
+
+
+def _env_mode(name: str, default: str) -> str:
+    raw = (os.getenv(name) or default).strip().lower()
+    if raw not in RAW_PAYLOAD_MODES:
+        raise ValueError(f"{name} must be one of {', '.join(RAW_PAYLOAD_MODES)}, got {raw!r}")
+    return raw
+
+
+# inline: payloads stay in the hot tables' raw_json (the original layout).
+# off: raw_json is left NULL and payloads are dropped.
+# archive: raw_json is left NULL and payloads go to msgraph_raw_payloads (lz4-compressed jsonb).
+# hash: raw_json is left NULL and msgraph_raw_payloads keeps only a sha256 of each payload.
+GRAPH_RAW_PAYLOADS = _env_mode("GRAPH_RAW_PAYLOADS", INLINE)
+# Retention is opt-in: 0 keeps payloads of deleted entities.
+GRAPH_RAW_PAYLOAD_RETENTION_DAYS = int(os.getenv("GRAPH_RAW_PAYLOAD_RETENTION_DAYS", "0"))
+GRAPH_RAW_PAYLOAD_MAINTENANCE_ROWS = int(os.getenv("GRAPH_RAW_PAYLOAD_MAINTENANCE_ROWS", "200000"))
+GRAPH_RAW_PAYLOAD_MAINTENANCE_CHUNK = int(os.getenv("GRAPH_RAW_PAYLOAD_MAINTENANCE_CHUNK", "2000"))
+
+# High-volume ingest tables the policy applies to, keyed by msgraph_raw_payloads.entity_type.
+# Users, groups, sites and drives keep raw_json inline: they are small, and the site MVs read it.
+ENTITY_TABLES: Dict[str, tuple[str, tuple[str, ...]]] = {
+    "drive_item": ("msgraph_drive_items", ("drive_id", "id")),
+    "permission": ("msgraph_drive_item_permissions", ("drive_id", "item_id", "permission_id")),
+    "permission_grant": (
+        "msgraph_drive_item_permission_grants",
+        ("drive_id", "item_id", "permission_id", "principal_type", "principal_id"),
+    ),
+    "group_membership": ("msgraph_group_memberships", ("group_id", "member_id", "member_type")),
+}
+
+
+class PayloadColumns(NamedTuple):
+    """Positions of the entity key, raw_json and synced_at values in an upsert row."""
+
+    entity_type: str
+    key: tuple[int, ...]
+    payload: int
+    synced_at: int
+    # False for tombstones: they clear raw_json but must not replace the last archived payload.
+    archive: bool = True
+
+
+def _mode(mode: Optional[str]) -> str:
+    return mode or GRAPH_RAW_PAYLOADS
+
+
+def keeps_inline(mode: Optional[str] = None) -> bool:
+    return _mode(mode) == INLINE
+
+
+def archives_payloads(mode: Optional[str] = None) -> bool:
+    return _mode(mode) in (ARCHIVE, HASH)
+
+
+def _conflict_sql(keep_payload: bool) -> str:
+    # Unchanged payloads are not rewritten; switching between archive and hash is a change.
+    return f"""
+        ON CONFLICT (entity_type, entity_key) DO UPDATE SET
+          payload_hash = EXCLUDED.payload_hash,
+          payload = EXCLUDED.payload,
+          updated_at = EXCLUDED.updated_at
+        WHERE msgraph_raw_payloads.payload_hash IS DISTINCT FROM EXCLUDED.payload_hash
+           OR msgraph_raw_payloads.payload IS {"" if keep_payload else "NOT "}NULL
+    """
+
+
+def upsert_sql(mode: Optional[str] = None) -> str:
+    keep_payload = _mode(mode) == ARCHIVE
+    return f"""
+        INSERT INTO msgraph_raw_payloads (entity_type, entity_key, payload_hash, payload, updated_at)
+        SELECT v.entity_type,
+               v.entity_key,
+               sha256(convert_to(v.payload::jsonb::text, 'UTF8')),
+               {"v.payload::jsonb" if keep_payload else "NULL::jsonb"},
+               v.updated_at
+        FROM (VALUES %s) AS v (entity_type, entity_key, payload, updated_at)
+    """ + _conflict_sql(keep_payload)
+
+
+def stage_archive_sql(
+    entity_type: str,
+    stage_table: str,
+    *,
+    order_by: str,
+    mode: Optional[str] = None,
+) -> str:
+    """Archive the newest staged payload per key straight from a COPY staging table."""
+    key_columns = ENTITY_TABLES[entity_type][1]
+    keep_payload = _mode(mode) == ARCHIVE
+    keys = ", ".join(key_columns)
+    return f"""
+        INSERT INTO msgraph_raw_payloads (entity_type, entity_key, payload_hash, payload, updated_at)
+        SELECT DISTINCT ON ({keys})
+               '{entity_type}',
+               ARRAY[{keys}],
+               sha256(convert_to(raw_json::text, 'UTF8')),
+               {"raw_json" if keep_payload else "NULL::jsonb"},
+               synced_at
+        FROM {stage_table}
+        WHERE raw_json IS NOT NULL
+        ORDER BY {keys}, {order_by}
+    """ + _conflict_sql(keep_payload)
+
+
+def detach(cur, rows: list[tuple], columns: PayloadColumns, *, mode: Optional[str] = None) -> list[tuple]:
+    """Apply the payload policy to upsert rows: returns the rows to write to the hot table.
+
+    In archive and hash mode the payloads are written to msgraph_raw_payloads first, on the same
+    cursor, so they commit with the hot rows. `rows` must already be deduplicated by key.
+    """
+    mode = _mode(mode)
+    if mode == INLINE or not rows:
+        return rows
+    index = columns.payload
+    if columns.archive and archives_payloads(mode):
+        payloads = []
+        for row in rows:
+            payload = row[index]
+            if payload is None:
+                continue
+            payloads.append((columns.entity_type, [row[pos] for pos in columns.key], payload, row[columns.synced_at]))
+        if payloads:
+            db.execute_values(cur, upsert_sql(mode), payloads)
+    return [row[:index] + (None,) + row[index + 1 :] for row in rows]
+
+
+def record_payload_mode(cur, mode: Optional[str] = None):
+    """Record the policy rows are written under; a mode change re-opens every table's inline backlog."""
+    cur.execute(
+        """
+        INSERT INTO msgraph_raw_payload_state (entity_type, mode)
+        SELECT entity_type, %s FROM unnest(%s::text[]) AS t (entity_type)
+        ON CONFLICT (entity_type) DO UPDATE SET
+          mode = EXCLUDED.mode,
+          backlog_cleared_at = NULL,
+          updated_at = now()
+        WHERE msgraph_raw_payload_state.mode <> EXCLUDED.mode
+        """,
+        [_mode(mode), list(ENTITY_TABLES)],
+    )
+
+
+def _cleared_backlogs(cur, mode: str) -> set[str]:
+    cur.execute(
+        "SELECT entity_type FROM msgraph_raw_payload_state WHERE mode = %s AND backlog_cleared_at IS NOT NULL",
+        [mode],
+    )
+    return {row[0] for row in cur.fetchall()}
+
+
+def _mark_backlog_cleared(cur, entity_type: str, mode: str):
+    cur.execute(
+        """
+        UPDATE msgraph_raw_payload_state
+        SET backlog_cleared_at = now(), updated_at = now()
+        WHERE entity_type = %s AND mode = %s
+        """,
+        [entity_type, mode],
+    )
+
+
+def _key_join(left: str, right: str, key_columns: tuple[str, ...]) -> str:
+    return " AND ".join(f"{left}.{col} = {right}.{col}" for col in key_columns)
+
+
+def _iter_key_chunks(conn, name: str, query: str, params: list[Any], chunk_size: int) -> Iterator[list[tuple]]:
+    chunk: list[tuple] = []
+    for row in db.stream_rows(conn, name, query, params, withhold=True):
+        chunk.append(tuple(row))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _detach_inline_payloads(conn, cur, entity_type: str, *, mode: str, limit: int, chunk_size: int) -> int:
+    """Move raw_json already stored in a hot table under the current policy, `chunk_size` rows per commit."""
+    table, key_columns = ENTITY_TABLES[entity_type]
+    keys = ", ".join(key_columns)
+    archive_sql = ""
+    if archives_payloads(mode):
+        # Rows the new policy already wrote are newer than the inline copy.
+        archive_sql = f"""
+        , archived AS (
+          INSERT INTO msgraph_raw_payloads (entity_type, entity_key, payload_hash, payload, updated_at)
+          SELECT '{entity_type}',
+                 ARRAY[{", ".join(f"old.{col}" for col in key_columns)}],
+                 sha256(convert_to(old.raw_json::text, 'UTF8')),
+                 {"old.raw_json" if mode == ARCHIVE else "NULL::jsonb"},
+                 COALESCE(old.synced_at, now())
+          FROM old
+          ON CONFLICT (entity_type, entity_key) DO NOTHING
+        )"""
+    detach_sql = f"""
+        WITH k ({keys}) AS (VALUES %s),
+        old AS (
+          SELECT t.{", t.".join(key_columns)}, t.raw_json, t.synced_at
+          FROM {table} t
+          JOIN k ON {_key_join("t", "k", key_columns)}
+          WHERE t.raw_json IS NOT NULL
+          FOR UPDATE OF t
+        ){archive_sql}
+        UPDATE {table} t
+        SET raw_json = NULL
+        FROM old
+        WHERE {_key_join("t", "old", key_columns)}
+    """
+    moved = 0
+    for chunk in _iter_key_chunks(
+        conn,
+        f"raw_payloads_detach_{entity_type}",
+        f"SELECT {keys} FROM {table} WHERE raw_json IS NOT NULL LIMIT %s",
+        [limit],
+        chunk_size,
+    ):
+        db.execute_values(cur, detach_sql, chunk, page_size=chunk_size)
+        conn.commit()
+        moved += len(chunk)
+    return moved
+
+
+def _prune_deleted(conn, cur, entity_type: str, *, cutoff: datetime, limit: int, chunk_size: int) -> Dict[str, int]:
+    """Drop payloads of entities deleted before `cutoff`, and archived payloads whose entity is gone."""
+    table, key_columns = ENTITY_TABLES[entity_type]
+    keys = ", ".join(key_columns)
+    cleared = 0
+    for chunk in _iter_key_chunks(
+        conn,
+        f"raw_payloads_prune_inline_{entity_type}",
+        # Served by the partial index on deleted rows that still carry a payload.
+        f"SELECT {keys} FROM {table} WHERE deleted_at < %s AND deleted_at IS NOT NULL AND raw_json IS NOT NULL LIMIT %s",
+        [cutoff, limit],
+        chunk_size,
+    ):
+        db.execute_values(
+            cur,
+            f"UPDATE {table} t SET raw_json = NULL FROM (VALUES %s) AS k ({keys}) WHERE {_key_join('t', 'k', key_columns)}",
+            chunk,
+            page_size=chunk_size,
+        )
+        conn.commit()
+        cleared += len(chunk)
+
+    key_match = " AND ".join(f"t.{col} = p.entity_key[{pos}]" for pos, col in enumerate(key_columns, start=1))
+    deleted = 0
+    for chunk in _iter_key_chunks(
+        conn,
+        f"raw_payloads_prune_archive_{entity_type}",
+        f"""
+        SELECT p.entity_key
+        FROM msgraph_raw_payloads p
+        LEFT JOIN {table} t ON {key_match}
+        WHERE p.entity_type = %s
+          AND p.updated_at < %s
+          AND (t.deleted_at < %s OR t.{key_columns[0]} IS NULL)
+        LIMIT %s
+        """,
+        [entity_type, cutoff, cutoff, limit],
+        chunk_size,
+    ):
+        db.execute_values(
+            cur,
+            f"""
+            DELETE FROM msgraph_raw_payloads p
+            USING (VALUES %s) AS k (entity_key)
+            WHERE p.entity_type = '{entity_type}' AND p.entity_key = k.entity_key::text[]
+            """,
+            chunk,
+            page_size=chunk_size,
+        )
+        conn.commit()
+        deleted += len(chunk)
+    return {"inline_cleared": cleared, "archived_deleted": deleted}
+
+
+def maintain_raw_payloads(
+    *,
+    mode: Optional[str] = None,
+    retention_days: int = GRAPH_RAW_PAYLOAD_RETENTION_DAYS,
+    max_rows: int = GRAPH_RAW_PAYLOAD_MAINTENANCE_ROWS,
+    chunk_size: int = GRAPH_RAW_PAYLOAD_MAINTENANCE_CHUNK,
+    should_stop: Optional[Callable[[], bool]] = None,
+) -> Dict[str, Any]:
+    """Bring stored payloads in line with the policy and apply retention.
+
+    Outside inline mode, raw_json left in the hot tables (rows written before the policy changed)
+    is detached: archived or hashed, then cleared. A table whose backlog was cleared under the
+    current mode is not scanned again until the mode changes. With `retention_days` > 0, payloads
+    of entities deleted more than that many days ago are cleared inline and removed from the
+    archive, as are archived payloads whose entity row no longer exists. Each table does at most
+    `max_rows` per step per run.
+    """
+    mode = _mode(mode)
+    chunk_size = max(1, chunk_size)
+    summary: Dict[str, Any] = {"mode": mode, "detached": {}, "pruned": {}, "stopped": False}
+    conn = db.get_conn()
+    try:
+        cur = conn.cursor()
+        record_payload_mode(cur, mode)
+        cleared = _cleared_backlogs(cur, mode)
+        conn.commit()
+        for entity_type in ENTITY_TABLES:
+            if should_stop is not None and should_stop():
+                summary["stopped"] = True
+                break
+            if mode != INLINE and entity_type not in cleared:
+                moved = _detach_inline_payloads(conn, cur, entity_type, mode=mode, limit=max_rows, chunk_size=chunk_size)
+                summary["detached"][entity_type] = moved
+                if moved < max_rows:
+                    _mark_backlog_cleared(cur, entity_type, mode)
+                    conn.commit()
+            if retention_days > 0:
+                cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+                summary["pruned"][entity_type] = _prune_deleted(
+                    conn, cur, entity_type, cutoff=cutoff, limit=max_rows, chunk_size=chunk_size
+                )
+    finally:
+        conn.close()
+    emit("INFO", "GRAPH", f"Raw payload maintenance completed: mode={mode} detached={summary['detached']} pruned={summary['pruned']}")
+    return summary
@@ -1,21 +1,57 @@
 import os
 import json
+import select
 import threading
 import time
+import uuid
+from contextvars import copy_context
 from datetime import datetime, timezone
 
 from croniter import croniter
 
 from app import db
+from app.job_executor import (
+    DEFAULT_JOB_TYPE_CONCURRENCY,
+    JOB_EXECUTOR_MAX_WORKERS,
+    JOB_TYPE_CONCURRENCY,
+    JobExecutor,
+    acquire_job_lease,
+    parse_job_type_limits,
+    release_job_lease,
+    start_lease_heartbeat_thread,
+)
+from app.job_control import (
+    STOP_CANCEL_REQUESTED,
+    get_run_control,
+    job_run_deadline_seconds,
+    register_run,
+    request_cancel,
+    stop_lost_leases,
+    sync_cancel_requests,
+    unregister_run,
+)
+from app.job_progress import finish_progress, start_progress
+from app.jobs.activity_rollups import run_activity_rollup_reconcile
+from app.jobs.raw_payload_maintenance import run_raw_payload_maintenance
 from app.jobs.graph_ingest import run_graph_ingest
 from app.jobs.mv_refresh import run_mv_refresh
 from app.jobs.copilot_telemetry import run_copilot_telemetry
 from app.jobs.copilot_usage_sync import run_copilot_usage_sync
 from app.license import LicenseFeatureError, get_job_type_license_feature, require_license_feature
+from app.metrics import JOB_RUN_SECONDS, JOB_RUNS, SCHEDULER_TICK_SECONDS
 from app.runtime_logger import emit
+from app.tracing import STATUS_ERROR, span
 from app.utils import log_audit_event, log_job_run_log
 
 SCHEDULER_POLL_SECONDS = int(os.getenv("SCHEDULER_POLL_SECONDS", "30"))
+SCHEDULER_MV_QUEUE_DEBOUNCE_SECONDS = int(os.getenv("SCHEDULER_MV_QUEUE_DEBOUNCE_SECONDS", "15"))
+SCHEDULER_WAKEUP_CHANNEL = "ps_scheduler_wakeup"
+# Upper bound on schedules handled per wake, so a misbehaving schedule cannot spin the loop.
+SCHEDULER_MAX_DRAIN_PER_WAKE = 100
+# Higher priorities dispatch first; equal priorities dispatch in request order.
+JOB_QUEUE_RUN_NOW_PRIORITY = int(os.getenv("JOB_QUEUE_RUN_NOW_PRIORITY", "100"))
+JOB_QUEUE_SCHEDULE_PRIORITY = int(os.getenv("JOB_QUEUE_SCHEDULE_PRIORITY", "50"))
+JOB_QUEUE_MAX_PRIORITY = 1000
 RECOVER_INTERRUPTED_RUNS_ON_STARTUP = os.getenv("RECOVER_INTERRUPTED_RUNS_ON_STARTUP", "true").strip().lower() in {
     "1",
     "true",
@@ -29,18 +65,52 @@ _scheduler_status = {
     "running": False,
     "last_tick": None,
     "last_error": None,
+    "wakeup_listener": False,
+    "next_wake_at": None,
 }
 
 INTERRUPTED_RUN_ERROR = "interrupted_worker_restart"
+LEASE_EXPIRED_ERROR = "job_lease_expired"
+
+# Finished jobs and new queue entries write to this pipe so the scheduler dispatches without waiting for a poll.
+_wake_read_fd, _wake_write_fd = os.pipe()
+os.set_blocking(_wake_read_fd, False)
+
+
+def wake_scheduler():
+    try:
+        os.write(_wake_write_fd, b"x")
+    except (BlockingIOError, OSError):
+        pass
+
+
+def _drain_wake_pipe() -> bool:
+    woke = False
+    while True:
+        try:
+            if not os.read(_wake_read_fd, 512):
+                return woke
+            woke = True
+        except (BlockingIOError, OSError):
+            return woke
+
+
+_executor = JobExecutor(
+    max_workers=JOB_EXECUTOR_MAX_WORKERS,
+    type_limits=parse_job_type_limits(JOB_TYPE_CONCURRENCY),
+    default_type_limit=DEFAULT_JOB_TYPE_CONCURRENCY,
+    on_finished=wake_scheduler,
+)
 
 
 def get_scheduler_status():
-    return _scheduler_status
+    return {**_scheduler_status, "executor": _executor.status()}
 
 
 def start_scheduler_thread():
     thread = threading.Thread(target=_scheduler_loop, daemon=True)
     thread.start()
+    start_lease_heartbeat_thread(_executor, on_heartbeat=sync_cancel_requests, on_lease_lost=stop_lost_leases)
     emit("INFO", "SCHEDULER", "Scheduler thread started")
 
 
@@ -53,18 +123,162 @@ def _scheduler_loop():
                 emit("WARN", "SCHEDULER", f"Recovered interrupted runs at startup: count={recovered}")
         except Exception as exc:
             emit("ERROR", "SCHEDULER", f"Failed recovering interrupted runs: error={exc}")
+    listener = None
     while True:
         _scheduler_status["last_tick"] = datetime.now(timezone.utc).isoformat()
         try:
-            _run_due_schedule()
+            reaped = _reap_expired_leases()
+            if reaped:
+                emit("WARN", "SCHEDULER", f"Failed runs whose job lease expired: count={reaped}")
+        except Exception as exc:
+            emit("ERROR", "SCHEDULER", f"Failed reaping expired job leases: error={exc}")
+        tick_started = time.monotonic()
+        try:
+            _drain_due_schedules()
             _scheduler_status["last_error"] = None
         except Exception as exc:
             _scheduler_status["last_error"] = str(exc)
             emit("ERROR", "SCHEDULER", f"Scheduler loop failure: error={exc}")
-        time.sleep(SCHEDULER_POLL_SECONDS)
+        SCHEDULER_TICK_SECONDS.observe(time.monotonic() - tick_started)
+
+        try:
+            sleep_seconds = _seconds_until_next_run()
+        except Exception as exc:
+            sleep_seconds = float(SCHEDULER_POLL_SECONDS)
+            emit("WARN", "SCHEDULER", f"Failed reading next schedule time: error={exc}")
+        _scheduler_status["next_wake_at"] = datetime.fromtimestamp(time.time() + sleep_seconds, timezone.utc).isoformat()
+
+        listener, notifications = _wait_for_wakeup(listener, sleep_seconds)
+        if any(item.get("table_name") == "mv_refresh_queue" for item in notifications):
+            try:
+                _pull_forward_mv_refresh()
+            except Exception as exc:
+                emit("WARN", "SCHEDULER", f"Failed pulling forward mv_refresh schedule: error={exc}")
+
+
+def _drain_due_schedules() -> int:
+    """Queue every due schedule, then dispatch queued jobs until the pool or the queue runs out."""
+    handled = 0
+    while handled < SCHEDULER_MAX_DRAIN_PER_WAKE and _run_due_schedule():
+        handled += 1
+    dispatched = 0
+    while dispatched < SCHEDULER_MAX_DRAIN_PER_WAKE and _dispatch_next_queued_job():
+        dispatched += 1
+    return handled + dispatched
+
+
+def _seconds_until_next_run() -> float:
+    """Seconds until the earliest future `next_run_at`, capped at `SCHEDULER_POLL_SECONDS`.
+
+    Queued jobs that could not be started (live job lease, job type at its limit) are not counted;
+    a finishing job wakes the scheduler through the wake pipe, so they are retried then.
+    """
+    row = db.fetch_one(
+        """
+        SELECT
+          bool_or(js.next_run_at IS NULL) AS has_unscheduled,
+          EXTRACT(EPOCH FROM (MIN(js.next_run_at) FILTER (WHERE js.next_run_at > now()) - now())) AS seconds
+        FROM job_schedules js
+        JOIN jobs j ON j.job_id = js.job_id
+        WHERE js.enabled = true
+          AND j.enabled = true
+        """
+    )
+    if row and row.get("has_unscheduled"):
+        return 0.0
+    seconds = row.get("seconds") if row else None
+    if seconds is None:
+        return float(SCHEDULER_POLL_SECONDS)
+    return max(0.0, min(float(seconds), float(SCHEDULER_POLL_SECONDS)))
+
+
+def _open_wakeup_listener():
+    conn = db.get_conn()
+    conn.autocommit = True
+    cur = conn.cursor()
+    cur.execute(f"LISTEN {SCHEDULER_WAKEUP_CHANNEL}")
+    return conn
+
+
+def _wait_for_wakeup(listener, timeout_seconds: float):
+    """Block until a `ps_scheduler_wakeup` notification arrives or the timeout passes.
 
+    Finished jobs also end the wait (see `wake_scheduler`). Returns the (possibly reopened) listener
+    connection and the decoded notification payloads. Without a listener (connection failure) this
+    degrades to a plain timed wait.
+    """
+    if listener is None:
+        try:
+            listener = _open_wakeup_listener()
+            _scheduler_status["wakeup_listener"] = True
+        except Exception as exc:
+            _scheduler_status["wakeup_listener"] = False
+            emit("WARN", "SCHEDULER", f"Scheduler wakeup listener unavailable, polling instead: error={exc}")
+            select.select([_wake_read_fd], [], [], timeout_seconds)
+            _drain_wake_pipe()
+            return None, []
+
+    try:
+        if not listener.notifies:
+            ready, _, _ = select.select([listener, _wake_read_fd], [], [], timeout_seconds)
+            if listener in ready:
+                listener.poll()
+            _drain_wake_pipe()
+        else:
+            listener.poll()
+        notifications = []
+        while listener.notifies:
+            notify = listener.notifies.pop(0)
+            try:
+                payload = json.loads(notify.payload or "{}")
+            except ValueError:
+                payload = {}
+            notifications.append(payload if isinstance(payload, dict) else {})
+        return listener, notifications
+    except Exception as exc:
+        _scheduler_status["wakeup_listener"] = False
+        emit("WARN", "SCHEDULER", f"Scheduler wakeup listener failed: error={exc}")
+        try:
+            listener.close()
+        except Exception:
+            pass
+        return None, []
 
-def _run_due_schedule():
+
+def _pull_forward_mv_refresh() -> int:
+    """Move enabled `mv_refresh` schedules up to run shortly after new queue entries.
+
+    Entries queued by an `mv_refresh` run itself do not notify (see `enqueue_changed_mvs`), so this
+    cannot chain runs back to back.
+    """
+    conn = db.get_conn()
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            UPDATE job_schedules js
+            SET next_run_at = now() + make_interval(secs => %s)
+            FROM jobs j
+            WHERE j.job_id = js.job_id
+              AND j.job_type = 'mv_refresh'
+              AND j.enabled = true
+              AND js.enabled = true
+              AND js.next_run_at > now() + make_interval(secs => %s)
+            RETURNING js.schedule_id
+            """,
+            [SCHEDULER_MV_QUEUE_DEBOUNCE_SECONDS, SCHEDULER_MV_QUEUE_DEBOUNCE_SECONDS],
+        )
+        rows = cur.fetchall()
+        conn.commit()
+    finally:
+        conn.close()
+    if rows:
+        emit("INFO", "SCHEDULER", f"MV refresh pulled forward by queue activity: schedules={len(rows)}")
+    return len(rows)
+
+
+def _run_due_schedule() -> bool:
+    """Queue one pending or due schedule; returns False when no schedule was due."""
     conn = db.get_conn()
     try:
         cur = conn.cursor()
@@ -92,7 +306,7 @@ def _run_due_schedule():
                     cron_expr=cron_expr,
                     error_reason=f"invalid_cron_expr: {exc}",
                 )
-                return
+                return True
             cur.execute(
                 "UPDATE job_schedules SET next_run_at = %s WHERE schedule_id = %s",
                 [next_run_at, schedule_id],
@@ -103,7 +317,7 @@ def _run_due_schedule():
                 "SCHEDULER",
                 f"New schedule picked up: schedule_id={schedule_id} next_run_at={next_run_at.isoformat()}",
             )
-            return
+            return True
 
         cur.execute(
             """
@@ -114,14 +328,14 @@ def _run_due_schedule():
               AND j.enabled = true
               AND js.next_run_at <= now()
             ORDER BY js.next_run_at ASC
-            FOR UPDATE SKIP LOCKED
+            FOR UPDATE OF js SKIP LOCKED
             LIMIT 1
             """
         )
         row = cur.fetchone()
         if not row:
             conn.rollback()
-            return
+            return False
 
         schedule_id, job_id, cron_expr, job_type = row
         try:
@@ -134,7 +348,7 @@ def _run_due_schedule():
                 cron_expr=cron_expr,
                 error_reason=f"invalid_cron_expr: {exc}",
             )
-            return
+            return True
 
         feature_key = get_job_type_license_feature(job_type)
         if feature_key:
@@ -158,75 +372,256 @@ def _run_due_schedule():
                     actor=None,
                     details={"job_type": job_type, "trigger": "schedule", "feature": feature_key, "error": str(exc)},
                 )
-                return
-
-        locked = db.try_advisory_lock(cur, str(job_id))
-        if not locked:
-            conn.rollback()
-            emit(
-                "WARN",
-                "SCHEDULER",
-                f"Scheduled job skipped: advisory lock unavailable job_id={job_id}",
-            )
-            return
+                return True
 
-        run_id = _insert_job_run(cur, job_id)
+        queued = _enqueue_job(cur, job_id=job_id, trigger="schedule", priority=JOB_QUEUE_SCHEDULE_PRIORITY)
         cur.execute(
             "UPDATE job_schedules SET next_run_at = %s WHERE schedule_id = %s",
             [next_run_at, schedule_id],
         )
         conn.commit()
-        emit(
-            "INFO",
-            "SCHEDULER",
-            f"Scheduled job triggered: job_id={job_id} job_type={job_type} run_id={run_id}",
+    finally:
+        conn.close()
+
+    emit(
+        "INFO",
+        "SCHEDULER",
+        f"Scheduled job queued: job_id={job_id} job_type={job_type} priority={queued['priority']} "
+        f"coalesced={queued['coalesced']}",
+    )
+    return True
+
+
+def _enqueue_job(cur, *, job_id, trigger: str, priority: int, actor_claims=None, deadline_seconds=None):
+    """Add a run request to `job_queue`, folding it into the job's pending request if one exists.
+
+    A coalesced request keeps the earlier `requested_at` (so it does not lose its place) and raises the
+    priority to the higher of the two; the trigger and actor follow whichever request has the higher priority,
+    and an explicit deadline replaces a missing one.
+    """
+    cur.execute(
+        """
+        INSERT INTO job_queue (job_id, priority, trigger, actor, deadline_seconds, requested_at, request_count)
+        VALUES (%s, %s, %s, %s, %s, now(), 1)
+        ON CONFLICT (job_id) DO UPDATE
+        SET priority = GREATEST(job_queue.priority, EXCLUDED.priority),
+            trigger = CASE WHEN EXCLUDED.priority > job_queue.priority THEN EXCLUDED.trigger ELSE job_queue.trigger END,
+            actor = CASE WHEN EXCLUDED.priority > job_queue.priority THEN EXCLUDED.actor ELSE job_queue.actor END,
+            deadline_seconds = COALESCE(EXCLUDED.deadline_seconds, job_queue.deadline_seconds),
+            request_count = job_queue.request_count + 1
+        RETURNING (xmax = 0) AS inserted, priority, request_count
+        """,
+        [
+            str(job_id),
+            int(priority),
+            trigger,
+            db.jsonb(actor_claims) if actor_claims is not None else None,
+            deadline_seconds,
+        ],
+    )
+    inserted, queued_priority, request_count = cur.fetchone()
+    return {
+        "job_id": str(job_id),
+        "priority": int(queued_priority),
+        "request_count": int(request_count),
+        "coalesced": not inserted,
+    }
+
+
+def _dispatch_next_queued_job() -> bool:
+    """Start the highest-priority queued job that can run now; returns False when nothing was started.
+
+    Jobs whose type is at its concurrency limit or whose lease is still live stay queued. Jobs run on the
+    executor pool; the scheduler thread only creates the run row and the job lease.
+    """
+    if not _executor.has_capacity():
+        return False
+
+    dispatch_started_ns = time.time_ns()
+    conn = db.get_conn()
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT q.job_id, j.job_type, q.trigger, q.actor, q.priority, q.request_count, q.deadline_seconds
+            FROM job_queue q
+            JOIN jobs j ON j.job_id = q.job_id
+            WHERE NOT (j.job_type = ANY(%s::text[]))
+              AND NOT EXISTS (
+                SELECT 1 FROM job_leases l
+                WHERE l.job_id = q.job_id
+                  AND l.leased_until >= now()
+              )
+            ORDER BY q.priority DESC, q.requested_at ASC
+            FOR UPDATE OF q SKIP LOCKED
+            LIMIT 1
+            """,
+            [_executor.saturated_job_types()],
         )
+        row = cur.fetchone()
+        if not row:
+            conn.rollback()
+            return False
 
-        log_audit_event(
-            action="job_run_started",
-            entity_type="job_run",
-            entity_id=str(run_id),
-            actor=None,
-            details={"job_id": str(job_id), "job_type": job_type, "trigger": "schedule"},
+        job_id, job_type, trigger, actor_claims, priority, request_count, deadline_seconds = row
+        job_id = str(job_id)
+        deadline_seconds = deadline_seconds or job_run_deadline_seconds(job_type)
+        slot = _executor.reserve(job_type)
+        if slot is None:
+            conn.rollback()
+            return False
+
+        run_id = str(uuid.uuid4())
+        try:
+            if not acquire_job_lease(cur, job_id=job_id, run_id=run_id):
+                conn.rollback()
+                _executor.release(slot)
+                emit("WARN", "SCHEDULER", f"Queued job left pending: job lease held job_id={job_id}")
+                return False
+            _insert_job_run(cur, job_id, run_id, deadline_seconds=deadline_seconds)
+            cur.execute("DELETE FROM job_queue WHERE job_id = %s", [job_id])
+            conn.commit()
+        except Exception:
+            _executor.release(slot)
+            raise
+    finally:
+        conn.close()
+
+    label = "Scheduled" if trigger == "schedule" else "Run-now"
+    emit(
+        "INFO",
+        "SCHEDULER",
+        f"{label} job triggered: job_id={job_id} job_type={job_type} run_id={run_id} "
+        f"priority={priority} requests={request_count} deadline_seconds={deadline_seconds}",
+    )
+    with span(
+        "scheduler.dispatch",
+        start_ns=dispatch_started_ns,
+        run_id=run_id,
+        job_id=job_id,
+        job_type=job_type,
+        trigger=trigger,
+        **{"job.priority": priority, "job.request_count": request_count},
+    ):
+        _start_job_run(
+            slot,
+            job_id=job_id,
+            job_type=job_type,
+            run_id=run_id,
+            trigger=trigger,
+            actor_claims=actor_claims,
+            deadline_seconds=deadline_seconds,
         )
+    return True
+
+
+def _start_job_run(slot, *, job_id: str, job_type: str, run_id: str, trigger: str, actor_claims=None, deadline_seconds=None):
+    log_audit_event(
+        action="job_run_started",
+        entity_type="job_run",
+        entity_id=run_id,
+        actor=actor_claims,
+        details={"job_id": job_id, "job_type": job_type, "trigger": trigger},
+    )
+    # The run's spans continue the dispatch trace on the executor thread.
+    context = copy_context()
+    _executor.start(
+        slot,
+        run_id=run_id,
+        job_id=job_id,
+        fn=lambda: context.run(
+            _run_job,
+            job_id=job_id,
+            job_type=job_type,
+            run_id=run_id,
+            trigger=trigger,
+            actor_claims=actor_claims,
+            deadline_seconds=deadline_seconds,
+        ),
+    )
 
-        status, error = _execute_job(job_type, run_id=str(run_id), job_id=str(job_id), actor_claims=None)
 
+def _run_job(*, job_id: str, job_type: str, run_id: str, trigger: str, actor_claims=None, deadline_seconds=None):
+    start_progress(run_id, job_id=job_id, job_type=job_type)
+    register_run(run_id, job_type=job_type, deadline_seconds=deadline_seconds)
+    status = "failed"
+    started = time.monotonic()
+    try:
+        status, error = _execute_job(job_type, run_id=run_id, job_id=job_id, actor_claims=actor_claims)
+    finally:
+        unregister_run(run_id)
+        finish_progress(run_id, status)
+        JOB_RUNS.inc(job_type=job_type, status=status)
+        JOB_RUN_SECONDS.observe(time.monotonic() - started, job_type=job_type, status=status)
+
+    conn = db.get_conn()
+    try:
+        cur = conn.cursor()
+        # A run the lease reaper already failed keeps that outcome; its job may be running again elsewhere.
         cur.execute(
-            "UPDATE job_runs SET finished_at = now(), status = %s, error = %s WHERE run_id = %s",
+            """
+            UPDATE job_runs
+            SET finished_at = now(), status = %s, error = %s
+            WHERE run_id = %s
+              AND status = 'running'
+              AND finished_at IS NULL
+            """,
             [status, error, run_id],
         )
-        db.advisory_unlock(cur, str(job_id))
+        finalized = cur.rowcount != 0
+        release_job_lease(cur, job_id=job_id, run_id=run_id)
         conn.commit()
-        if status == "success":
-            emit(
-                "INFO",
-                "SCHEDULER",
-                f"Scheduled job finished: job_id={job_id} job_type={job_type} run_id={run_id} status={status}",
-            )
-        else:
-            emit(
-                "ERROR",
-                "SCHEDULER",
-                f"Scheduled job finished: job_id={job_id} job_type={job_type} run_id={run_id} status={status} error={error}",
-            )
+    finally:
+        conn.close()
 
-        log_audit_event(
-            action="job_run_%s" % ("succeeded" if status == "success" else "failed"),
-            entity_type="job_run",
-            entity_id=str(run_id),
-            actor=None,
-            details={"job_id": str(job_id), "job_type": job_type, "trigger": "schedule", "error": error},
+    label = "Scheduled" if trigger == "schedule" else "Run-now"
+    if not finalized:
+        emit(
+            "WARN",
+            "SCHEDULER",
+            f"{label} job finished after its run was already closed: job_id={job_id} job_type={job_type} run_id={run_id} "
+            f"status={status} error={error}",
         )
-
         log_job_run_log(
-            run_id=str(run_id),
-            level="INFO" if status == "success" else "ERROR",
-            message="job_finished",
-            context={"job_id": str(job_id), "job_type": job_type, "trigger": "schedule", "status": status, "error": error},
+            run_id=run_id,
+            level="WARN",
+            message="job_finished_after_lease_lost",
+            context={"job_id": job_id, "job_type": job_type, "trigger": trigger, "status": status, "error": error},
         )
-    finally:
-        conn.close()
+        return
+    if status == "success":
+        emit(
+            "INFO",
+            "SCHEDULER",
+            f"{label} job finished: job_id={job_id} job_type={job_type} run_id={run_id} status={status}",
+        )
+    elif status == "partial":
+        emit(
+            "WARN",
+            "SCHEDULER",
+            f"{label} job stopped early: job_id={job_id} job_type={job_type} run_id={run_id} status={status} reason={error}",
+        )
+    else:
+        emit(
+            "ERROR",
+            "SCHEDULER",
+            f"{label} job finished: job_id={job_id} job_type={job_type} run_id={run_id} status={status} error={error}",
+        )
+
+    log_audit_event(
+        action="job_run_%s" % {"success": "succeeded", "partial": "partial"}.get(status, "failed"),
+        entity_type="job_run",
+        entity_id=run_id,
+        actor=actor_claims,
+        details={"job_id": job_id, "job_type": job_type, "trigger": trigger, "error": error},
+    )
+
+    log_job_run_log(
+        run_id=run_id,
+        level={"success": "INFO", "partial": "WARN"}.get(status, "ERROR"),
+        message="job_finished",
+        context={"job_id": job_id, "job_type": job_type, "trigger": trigger, "status": status, "error": error},
+    )
 
 
 def _disable_invalid_schedule(*, schedule_id, job_id, cron_expr, error_reason: str):
@@ -339,6 +734,11 @@ def _recover_interrupted_runs() -> int:
                 error = COALESCE(error, %s)
             WHERE status = 'running'
               AND finished_at IS NULL
+              AND NOT EXISTS (
+                SELECT 1 FROM job_leases l
+                WHERE l.run_id = job_runs.run_id
+                  AND l.leased_until >= now()
+              )
             RETURNING run_id, job_id
             """,
             [INTERRUPTED_RUN_ERROR],
@@ -348,6 +748,42 @@ def _recover_interrupted_runs() -> int:
     finally:
         conn.close()
 
+    return _log_recovered_runs(rows, error=INTERRUPTED_RUN_ERROR)
+
+
+def _reap_expired_leases() -> int:
+    """Fail runs whose worker stopped renewing their job lease (crash, lost DB connection)."""
+    conn = db.get_conn()
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            WITH expired AS (
+              DELETE FROM job_leases
+              WHERE leased_until < now()
+              RETURNING run_id
+            )
+            UPDATE job_runs r
+            SET finished_at = now(),
+                status = 'failed',
+                error = COALESCE(r.error, %s)
+            FROM expired e
+            WHERE r.run_id = e.run_id
+              AND r.status = 'running'
+              AND r.finished_at IS NULL
+            RETURNING r.run_id, r.job_id
+            """,
+            [LEASE_EXPIRED_ERROR],
+        )
+        rows = cur.fetchall()
+        conn.commit()
+    finally:
+        conn.close()
+
+    return _log_recovered_runs(rows, error=LEASE_EXPIRED_ERROR)
+
+
+def _log_recovered_runs(rows, *, error: str) -> int:
     recovered = 0
     for row in rows:
         run_id = str(row[0])
@@ -359,7 +795,7 @@ def _recover_interrupted_runs() -> int:
                 entity_type="job_run",
                 entity_id=run_id,
                 actor=None,
-                details={"job_id": job_id, "trigger": "worker_recovery", "error": INTERRUPTED_RUN_ERROR},
+                details={"job_id": job_id, "trigger": "worker_recovery", "error": error},
             )
         except Exception as exc:
             emit(
@@ -372,7 +808,7 @@ def _recover_interrupted_runs() -> int:
                 run_id=run_id,
                 level="ERROR",
                 message="job_interrupted_recovered",
-                context={"job_id": job_id, "error": INTERRUPTED_RUN_ERROR, "trigger": "worker_recovery"},
+                context={"job_id": job_id, "error": error, "trigger": "worker_recovery"},
             )
         except Exception as exc:
             emit(
@@ -383,8 +819,9 @@ def _recover_interrupted_runs() -> int:
     return recovered
 
 
-def run_job_once(job, actor_claims=None):
-    job_id = job["job_id"]
+def run_job_once(job, actor_claims=None, priority=None, deadline_seconds=None):
+    """Queue a run-now request after the license check; returns the queue entry, or None when blocked."""
+    job_id = str(job["job_id"])
     job_type = job["job_type"]
     feature_key = get_job_type_license_feature(job_type)
     if feature_key:
@@ -399,90 +836,104 @@ def run_job_once(job, actor_claims=None):
             log_audit_event(
                 action="job_run_blocked_license",
                 entity_type="job",
-                entity_id=str(job_id),
+                entity_id=job_id,
                 actor=actor_claims,
                 details={"job_type": job_type, "trigger": "run_now", "feature": feature_key, "error": str(exc)},
             )
-            return
+            return None
+
+    return enqueue_job(
+        job_id,
+        trigger="run_now",
+        priority=priority,
+        actor_claims=actor_claims,
+        deadline_seconds=deadline_seconds,
+    )
+
+
+def enqueue_job(job_id, *, trigger: str, priority=None, actor_claims=None, deadline_seconds=None):
+    """Queue a run request for `job_id` and wake the scheduler to dispatch it."""
+    if priority is None:
+        priority = JOB_QUEUE_RUN_NOW_PRIORITY if trigger == "run_now" else JOB_QUEUE_SCHEDULE_PRIORITY
     conn = db.get_conn()
     try:
         cur = conn.cursor()
-        locked = db.try_advisory_lock(cur, str(job_id))
-        if not locked:
-            conn.rollback()
-            emit("WARN", "SCHEDULER", f"Run-now job skipped: advisory lock unavailable job_id={job_id}")
-            return
-
-        run_id = _insert_job_run(cur, job_id)
-        conn.commit()
-        emit(
-            "INFO",
-            "SCHEDULER",
-            f"Run-now job triggered: job_id={job_id} job_type={job_type} run_id={run_id}",
-        )
-
-        log_audit_event(
-            action="job_run_started",
-            entity_type="job_run",
-            entity_id=str(run_id),
-            actor=actor_claims,
-            details={"job_id": str(job_id), "job_type": job_type, "trigger": "run_now"},
-        )
-
-        status, error = _execute_job(
-            job_type,
-            run_id=str(run_id),
-            job_id=str(job_id),
+        queued = _enqueue_job(
+            cur,
+            job_id=job_id,
+            trigger=trigger,
+            priority=priority,
             actor_claims=actor_claims,
+            deadline_seconds=deadline_seconds,
         )
-
-        cur.execute(
-            "UPDATE job_runs SET finished_at = now(), status = %s, error = %s WHERE run_id = %s",
-            [status, error, run_id],
-        )
-        db.advisory_unlock(cur, str(job_id))
         conn.commit()
-        if status == "success":
-            emit(
-                "INFO",
-                "SCHEDULER",
-                f"Run-now job finished: job_id={job_id} job_type={job_type} run_id={run_id} status={status}",
-            )
-        else:
-            emit(
-                "ERROR",
-                "SCHEDULER",
-                f"Run-now job finished: job_id={job_id} job_type={job_type} run_id={run_id} status={status} error={error}",
-            )
-
-        log_audit_event(
-            action="job_run_%s" % ("succeeded" if status == "success" else "failed"),
-            entity_type="job_run",
-            entity_id=str(run_id),
-            actor=actor_claims,
-            details={"job_id": str(job_id), "job_type": job_type, "trigger": "run_now", "error": error},
-        )
-
-        log_job_run_log(
-            run_id=str(run_id),
-            level="INFO" if status == "success" else "ERROR",
-            message="job_finished",
-            context={"job_id": str(job_id), "job_type": job_type, "trigger": "run_now", "status": status, "error": error},
-        )
     finally:
         conn.close()
 
+    label = "Scheduled" if trigger == "schedule" else "Run-now"
+    emit(
+        "INFO",
+        "SCHEDULER",
+        f"{label} job queued: job_id={queued['job_id']} priority={queued['priority']} coalesced={queued['coalesced']}",
+    )
+    wake_scheduler()
+    return queued
 
-def _insert_job_run(cur, job_id):
+
+def _insert_job_run(cur, job_id, run_id: str, *, deadline_seconds=None):
     cur.execute(
         """
-        INSERT INTO job_runs (run_id, job_id, started_at, status)
-        VALUES (gen_random_uuid(), %s, now(), 'running')
-        RETURNING run_id
+        INSERT INTO job_runs (run_id, job_id, started_at, status, deadline_at)
+        VALUES (%s, %s, now(), 'running', now() + make_interval(secs => %s))
         """,
-        [job_id],
+        [run_id, job_id, deadline_seconds],
     )
-    return cur.fetchone()[0]
+    return run_id
+
+
+def cancel_job_run(*, run_id=None, job_id=None, actor_claims=None):
+    """Ask a running job to stop at its next flush boundary, and drop a still-queued request for the job.
+
+    The cancel is recorded on `job_runs.cancel_requested_at`, so a run executing on another worker picks it
+    up on its next lease heartbeat; a run on this worker is signalled immediately.
+    """
+    conn = db.get_conn()
+    try:
+        cur = conn.cursor()
+        dequeued = False
+        if job_id:
+            cur.execute("DELETE FROM job_queue WHERE job_id = %s RETURNING job_id", [job_id])
+            dequeued = cur.fetchone() is not None
+        cur.execute(
+            """
+            UPDATE job_runs
+            SET cancel_requested_at = COALESCE(cancel_requested_at, now())
+            WHERE status = 'running'
+              AND finished_at IS NULL
+              AND (run_id = %s OR job_id = %s)
+            RETURNING run_id, job_id
+            """,
+            [run_id, job_id],
+        )
+        rows = cur.fetchall()
+        conn.commit()
+    finally:
+        conn.close()
+
+    run_ids = [str(row[0]) for row in rows]
+    for cancelled_run_id, cancelled_job_id in rows:
+        cancelled_run_id = str(cancelled_run_id)
+        request_cancel(cancelled_run_id, STOP_CANCEL_REQUESTED)
+        emit("WARN", "SCHEDULER", f"Cancel requested: run_id={cancelled_run_id} job_id={cancelled_job_id}")
+        log_job_run_log(
+            run_id=cancelled_run_id,
+            level="WARN",
+            message="job_cancel_requested",
+            context={"actor": actor_claims},
+        )
+    if dequeued:
+        emit("INFO", "SCHEDULER", f"Queued job request dropped: job_id={job_id}")
+    return {"run_ids": run_ids, "dequeued": dequeued}
 
 
 def _compute_next_run(cron_expr):
@@ -492,6 +943,15 @@ def _compute_next_run(cron_expr):
 
 
 def _execute_job(job_type, *, run_id: str, job_id: str, actor_claims=None):
+    with span("job.execute", run_id=run_id, job_id=job_id, job_type=job_type) as job_span:
+        status, error = _execute_job_type(job_type, run_id=run_id, job_id=job_id, actor_claims=actor_claims)
+        job_span.set_attribute("job.status", status)
+        if status == "failed":
+            job_span.set_status(STATUS_ERROR, error)
+        return status, error
+
+
+def _execute_job_type(job_type, *, run_id: str, job_id: str, actor_claims=None):
     try:
         feature_key = get_job_type_license_feature(job_type)
         if feature_key:
@@ -502,6 +962,12 @@ def _execute_job(job_type, *, run_id: str, job_id: str, actor_claims=None):
         elif job_type == "mv_refresh":
             log_job_run_log(run_id=run_id, level="INFO", message="mv_refresh_started", context={"job_id": job_id})
             run_mv_refresh(run_id=run_id, job_id=job_id, actor=actor_claims)
+        elif job_type == "activity_rollup_reconcile":
+            log_job_run_log(run_id=run_id, level="INFO", message="activity_rollup_reconcile_started", context={"job_id": job_id})
+            run_activity_rollup_reconcile(run_id=run_id, job_id=job_id, actor=actor_claims)
+        elif job_type == "raw_payload_maintenance":
+            log_job_run_log(run_id=run_id, level="INFO", message="raw_payload_maintenance_started", context={"job_id": job_id})
+            run_raw_payload_maintenance(run_id=run_id, job_id=job_id, actor=actor_claims)
         elif job_type == "copilot_telemetry":
             log_job_run_log(run_id=run_id, level="INFO", message="copilot_telemetry_started", context={"job_id": job_id})
             run_copilot_telemetry(run_id=run_id, job_id=job_id, actor=actor_claims)
@@ -510,6 +976,16 @@ def _execute_job(job_type, *, run_id: str, job_id: str, actor_claims=None):
             run_copilot_usage_sync(run_id=run_id, job_id=job_id, actor=actor_claims)
         else:
             raise RuntimeError(f"Unknown job_type: {job_type}")
+        control = get_run_control(run_id)
+        if control is not None and control.stopped_stages:
+            reason = control.stop_reason() or STOP_CANCEL_REQUESTED
+            log_job_run_log(
+                run_id=run_id,
+                level="WARN",
+                message="job_stopped_early",
+                context={"job_id": job_id, "job_type": job_type, "reason": reason, "stages": control.stopped_stages},
+            )
+            return "partial", reason
         return "success", None
     except Exception as exc:
         emit("ERROR", "SCHEDULER", f"Job execution failed: job_id={job_id} job_type={job_type} error={exc}")
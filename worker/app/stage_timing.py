@@ -0,0 +1,103 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+
+GRAPH_WAIT = "graph_wait"
+THROTTLE_SLEEP = "throttle_sleep"
+TRANSFORM = "transform"
+DB_READ = "db_read"
+DB_WRITE = "db_write"
+COMMIT = "commit"
+CATEGORIES = (GRAPH_WAIT, THROTTLE_SLEEP, TRANSFORM, DB_READ, DB_WRITE, COMMIT)
+
+
+class StageTimer:
+    """Cumulative time per category for one job stage.
+
+    Graph calls made from helper threads are summed too, so categories can add up to more than the
+    stage's wall time when work runs concurrently.
+    """
+
+    def __init__(self):
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        self.seconds: Dict[str, float] = dict.fromkeys(CATEGORIES, 0.0)
+        self.counts: Dict[str, int] = dict.fromkeys(CATEGORIES, 0)
+        self._recorded = 0.0
+
+    def add(self, category: str, seconds: float, *, count: int = 1):
+        with self._lock:
+            self.seconds[category] = self.seconds.get(category, 0.0) + seconds
+            self.counts[category] = self.counts.get(category, 0) + count
+            self._recorded += seconds
+
+    def recorded(self) -> float:
+        with self._lock:
+            return self._recorded
+
+    def summary(self, *, rows: Optional[int] = None) -> Dict[str, Any]:
+        wall = time.perf_counter() - self._start
+        with self._lock:
+            seconds = dict(self.seconds)
+            counts = dict(self.counts)
+        result: Dict[str, Any] = {"wall_seconds": round(wall, 3)}
+        for category in CATEGORIES:
+            result[f"{category}_seconds"] = round(seconds[category], 3)
+        result["other_seconds"] = round(max(0.0, wall - sum(seconds.values())), 3)
+        result["graph_requests"] = counts[GRAPH_WAIT]
+        result["throttle_sleeps"] = counts[THROTTLE_SLEEP]
+        result["commits"] = counts[COMMIT]
+        result["db_statements"] = counts[DB_READ] + counts[DB_WRITE]
+        if rows is not None:
+            result["rows"] = rows
+            result["rows_per_second"] = round(rows / wall, 1) if wall > 0 else None
+        return result
+
+
+_current: ContextVar[Optional[StageTimer]] = ContextVar("stage_timer", default=None)
+
+
+@contextmanager
+def stage_timer():
+    """Make a fresh StageTimer current for the block (and for work submitted with `copy_context`)."""
+    timer = StageTimer()
+    token = _current.set(timer)
+    try:
+        yield timer
+    finally:
+        _current.reset(token)
+
+
+def current_timer() -> Optional[StageTimer]:
+    return _current.get()
+
+
+def record(category: str, seconds: float, *, count: int = 1):
+    timer = _current.get()
+    if timer is not None:
+        timer.add(category, seconds, count=count)
+
+
+@contextmanager
+def timed(category: str, *, exclusive: bool = False):
+    """Add the block's duration to `category` of the current timer (no-op without one).
+
+    With `exclusive`, time recorded under other categories inside the block (e.g. flushes made
+    while building rows) is subtracted, so the category only gets the block's own work.
+    """
+    timer = _current.get()
+    if timer is None:
+        yield
+        return
+    nested_before = timer.recorded() if exclusive else 0.0
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if exclusive:
+            elapsed = max(0.0, elapsed - (timer.recorded() - nested_before))
+        timer.add(category, elapsed)
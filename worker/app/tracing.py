@@ -0,0 +1,286 @@
+import atexit
+import json
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, Optional
+
+import requests
+
+from app.runtime_logger import emit
+
+
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "off").strip().lower()
+TRACING_FILE_PATH = os.getenv("TRACING_FILE_PATH", "/tmp/sentinel-worker-traces.jsonl")
+TRACING_OTLP_ENDPOINT = os.getenv("TRACING_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+TRACING_OTLP_TIMEOUT_SECONDS = float(os.getenv("TRACING_OTLP_TIMEOUT_SECONDS", "10"))
+TRACING_BATCH_SIZE = int(os.getenv("TRACING_BATCH_SIZE", "512"))
+TRACING_SERVICE_NAME = os.getenv("TRACING_SERVICE_NAME", "princeton-sentinel-worker")
+
+# OTLP SpanKind / StatusCode values
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_CLIENT = 3
+STATUS_UNSET = 0
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [_otlp_value(item) for item in value]}}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> list[Dict[str, Any]]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items() if value is not None]
+
+
+class Span:
+    """One timed operation. Serialized in the OTLP/JSON span shape, so collectors and trace viewers
+    that accept OTLP can read the export without this package depending on the OpenTelemetry SDK.
+
+    `run_id` is inherited from the parent span, so every span below a job run carries it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        parent: Optional["Span"] = None,
+        kind: int = SPAN_KIND_INTERNAL,
+        attributes: Optional[Dict[str, Any]] = None,
+        start_ns: Optional[int] = None,
+    ):
+        self.name = name
+        self.kind = kind
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent is not None else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, Any] = {}
+        if parent is not None and "run_id" in parent.attributes:
+            self.attributes["run_id"] = parent.attributes["run_id"]
+        self.attributes.update(attributes or {})
+        self.events: list[Dict[str, Any]] = []
+        self.status_code = STATUS_UNSET
+        self.status_message: Optional[str] = None
+
+    @property
+    def ended(self) -> bool:
+        return self.end_ns is not None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_attributes(self, attributes: Dict[str, Any]):
+        self.attributes.update(attributes)
+
+    def add_event(self, name: str, **attributes):
+        self.events.append({"name": name, "time_ns": time.time_ns(), "attributes": attributes})
+
+    def set_status(self, code: int, message: Optional[str] = None):
+        self.status_code = code
+        self.status_message = message
+
+    def record_exception(self, exc: BaseException):
+        self.add_event("exception", **{"exception.type": type(exc).__name__, "exception.message": str(exc)[:1000]})
+        self.set_status(STATUS_ERROR, str(exc)[:1000])
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            _on_end(self)
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span: Dict[str, Any] = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or time.time_ns()),
+            "attributes": _otlp_attributes(self.attributes),
+            "status": {"code": self.status_code},
+        }
+        if self.parent is not None:
+            span["parentSpanId"] = self.parent.span_id
+        if self.status_message:
+            span["status"]["message"] = self.status_message
+        if self.events:
+            span["events"] = [
+                {"name": event["name"], "timeUnixNano": str(event["time_ns"]), "attributes": _otlp_attributes(event["attributes"])}
+                for event in self.events
+            ]
+        return span
+
+
+class _NoopSpan:
+    attributes: Dict[str, Any] = {}
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def set_attributes(self, attributes: Dict[str, Any]):
+        pass
+
+    def add_event(self, name: str, **attributes):
+        pass
+
+    def set_status(self, code: int, message: Optional[str] = None):
+        pass
+
+    def record_exception(self, exc: BaseException):
+        pass
+
+    def end(self):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def otlp_payload(spans: Iterable[Span]) -> Dict[str, Any]:
+    """An OTLP/JSON `ExportTraceServiceRequest` for `spans`."""
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": _otlp_attributes({"service.name": TRACING_SERVICE_NAME})},
+                "scopeSpans": [{"scope": {"name": "app.tracing"}, "spans": [span.to_otlp() for span in spans]}],
+            }
+        ]
+    }
+
+
+class InMemorySpanExporter:
+    def __init__(self):
+        self.spans: list[Span] = []
+
+    def export(self, spans: list[Span]):
+        self.spans.extend(spans)
+
+    def by_name(self, name: str) -> list[Span]:
+        return [span for span in self.spans if span.name == name]
+
+    def clear(self):
+        self.spans.clear()
+
+
+class FileSpanExporter:
+    """Appends one OTLP/JSON request per line (the layout the collector's `otlpjsonfile` receiver reads)."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, spans: list[Span]):
+        with open(self.path, "a", encoding="utf-8") as handle:
+            handle.write(json.dumps(otlp_payload(spans), separators=(",", ":")) + "\n")
+
+
+class OtlpHttpSpanExporter:
+    """Posts OTLP/JSON to a collector's HTTP traces endpoint (e.g. `http://collector:4318/v1/traces`)."""
+
+    def __init__(self, endpoint: str, *, timeout: float = TRACING_OTLP_TIMEOUT_SECONDS):
+        self.endpoint = endpoint
+        self.timeout = timeout
+
+    def export(self, spans: list[Span]):
+        resp = requests.post(self.endpoint, json=otlp_payload(spans), timeout=self.timeout)
+        resp.raise_for_status()
+
+
+def _exporter_from_env():
+    if TRACING_EXPORTER in ("", "off", "none", "false", "0"):
+        return None
+    if TRACING_EXPORTER == "file":
+        return FileSpanExporter(TRACING_FILE_PATH)
+    if TRACING_EXPORTER == "otlp":
+        return OtlpHttpSpanExporter(TRACING_OTLP_ENDPOINT)
+    emit("WARN", "TRACING", f"Unknown TRACING_EXPORTER={TRACING_EXPORTER}; tracing disabled")
+    return None
+
+
+_current: ContextVar[Optional[Span]] = ContextVar("trace_span", default=None)
+_lock = threading.Lock()
+_export_lock = threading.Lock()
+_pending: list[Span] = []
+_exporter = _exporter_from_env()
+
+
+def set_exporter(exporter) -> Any:
+    """Install `exporter` (None disables tracing) and return the previous one; pending spans are dropped."""
+    global _exporter
+    with _lock:
+        previous = _exporter
+        _exporter = exporter
+        _pending.clear()
+    return previous
+
+
+def tracing_enabled() -> bool:
+    return _exporter is not None
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def _on_end(span: Span):
+    with _lock:
+        if _exporter is None:
+            return
+        _pending.append(span)
+        # A span whose parent is already closed (a job run started from a finished dispatch span) ends
+        # its piece of the trace just like a root span does, so both export right away.
+        finished_tree = span.parent is None or span.parent.ended
+        if not finished_tree and len(_pending) < TRACING_BATCH_SIZE:
+            return
+    flush_spans()
+
+
+def flush_spans():
+    with _export_lock:
+        with _lock:
+            exporter = _exporter
+            batch = list(_pending)
+            _pending.clear()
+        if exporter is None or not batch:
+            return
+        try:
+            exporter.export(batch)
+        except Exception as exc:
+            emit("WARN", "TRACING", f"Span export failed: spans={len(batch)} error={exc}")
+
+
+atexit.register(flush_spans)
+
+
+@contextmanager
+def span(name: str, *, kind: int = SPAN_KIND_INTERNAL, start_ns: Optional[int] = None, **attributes):
+    """Run the block in a child span of the current one (a new trace when there is none).
+
+    Exceptions mark the span as failed and propagate. Without an exporter this yields a no-op span.
+    Work submitted to other threads joins the trace when submitted through `copy_context().run`.
+    """
+    if _exporter is None:
+        yield _NOOP_SPAN
+        return
+    current = Span(name, parent=_current.get(), kind=kind, attributes=attributes, start_ns=start_ns)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as exc:
+        current.record_exception(exc)
+        raise
+    finally:
+        _current.reset(token)
+        current.end()
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""Compare the worker's database write strategies on the real drive item and permission tables.
+
+Rows are built by the graph_ingest row builders from a synthetic tenant and written through the
+same upserts (and row triggers) the ingest uses, with one commit per flush. Every case writes the
+rows twice: `insert` into an emptied table, then `update` (the nightly re-sync of unchanged items).
+DATABASE_URL must point at a disposable database with the db/init schema applied; the benchmark
+truncates the tables it writes.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import psycopg2.extras
+
+from app import db
+from app.jobs import graph_ingest
+from benchmarks.synthetic_tenant import add_tenant_args, generate_tenant, tenant_params
+
+APPLICATION_NAME = "sentinel-bench-db-writes"
+STRATEGIES = ("values", "copy_merge", "prepared")
+
+TABLES = {
+    "drive_items": {
+        "table": "msgraph_drive_items",
+        "columns": graph_ingest._DRIVE_ITEM_COLUMNS,
+        "key_columns": ("drive_id", "id"),
+        "upsert": graph_ingest._DRIVE_ITEMS_UPSERT_ACTIVE_SQL,
+    },
+    "permissions": {
+        "table": "msgraph_drive_item_permissions",
+        "columns": (
+            "drive_id", "item_id", "permission_id", "source", "roles", "link_type", "link_scope", "link_web_url",
+            "link_prevents_download", "link_expiration_dt", "inherited_from_id", "synced_at", "deleted_at", "raw_json",
+        ),
+        "key_columns": ("drive_id", "item_id", "permission_id"),
+        "upsert": graph_ingest._PERMISSIONS_UPSERT_SQL,
+    },
+    "permission_grants": {
+        "table": "msgraph_drive_item_permission_grants",
+        "columns": (
+            "drive_id", "item_id", "permission_id", "principal_type", "principal_id", "principal_display_name",
+            "principal_email", "principal_user_principal_name", "synced_at", "deleted_at", "raw_json",
+        ),
+        "key_columns": ("drive_id", "item_id", "permission_id", "principal_type", "principal_id"),
+        "upsert": graph_ingest._PERMISSION_GRANTS_UPSERT_SQL,
+    },
+}
+
+
+def _int_list(text: str) -> list[int]:
+    return [int(part) for part in text.split(",") if part.strip()]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark database write strategies against a local Postgres.")
+    parser.add_argument("--tables", default=",".join(TABLES), help="Comma-separated subset of " + ",".join(TABLES))
+    parser.add_argument("--strategies", default=",".join(STRATEGIES), help="Comma-separated subset of " + ",".join(STRATEGIES))
+    parser.add_argument("--page-sizes", type=_int_list, default=[100, 500, 1000, 5000], help="execute_values page sizes")
+    parser.add_argument("--flush-sizes", type=_int_list, default=[100, 500, 2000, 5000], help="Rows per flush (commit)")
+    parser.add_argument("--prepared-batch", type=int, default=100, help="EXECUTEs sent per round trip for `prepared`")
+    parser.add_argument("--writers", type=int, default=1, help="Concurrent writers, each owning a share of the drives")
+    parser.add_argument("--lock-sample-ms", type=int, default=10, help="pg_stat_activity sampling interval for lock waits")
+    parser.add_argument("--out", default="db-write-benchmark.json", help="Machine-readable results file")
+    parser.add_argument("--verbose", action="store_true", help="Show the worker's per-write logs")
+    parser.add_argument("--json", action="store_true", help="Print the results JSON instead of a table")
+    add_tenant_args(parser)
+    parser.set_defaults(items_per_drive=1000, sharing_density=0.3)
+    return parser.parse_args()
+
+
+def build_rows(args: argparse.Namespace) -> dict:
+    tenant = generate_tenant(tenant_params(args))
+    users_by_id = {user["id"]: user["id"] for user in tenant["users"]}
+    users_by_email = {user["mail"].lower(): user["id"] for user in tenant["users"]}
+    synced_at = datetime.now(timezone.utc)
+    rows = {"drive_items": [], "permissions": [], "permission_grants": []}
+    for drive_id, items in tenant["drive_items"].items():
+        for item in items:
+            rows["drive_items"].append(
+                graph_ingest._drive_item_row(drive_id, item, synced_at=synced_at, users_by_id=users_by_id, users_by_email=users_by_email)
+            )
+    for key, perms in tenant["permissions"].items():
+        drive_id, item_id = key.split("/", 1)
+        for perm in perms:
+            rows["permissions"].append(graph_ingest._permission_row(drive_id, item_id, perm, synced_at=synced_at))
+            rows["permission_grants"].extend(graph_ingest._permission_grant_rows(drive_id, item_id, perm, synced_at=synced_at))
+    return rows
+
+
+def _chunks(rows: list[tuple], size: int):
+    for idx in range(0, len(rows), max(1, size)):
+        yield rows[idx : idx + size]
+
+
+def _key_fn(spec: dict):
+    width = len(spec["key_columns"])
+    return lambda row: row[:width]
+
+
+def write_values(conn, spec: dict, rows: list[tuple], *, flush_every: int, page_size: int, **_):
+    cur = conn.cursor()
+    key_fn = _key_fn(spec)
+    for chunk in _chunks(rows, flush_every):
+        deduped, _dropped = graph_ingest._dedupe_rows_keep_last(chunk, key_fn)
+        db.execute_values(cur, spec["upsert"], deduped, page_size=page_size)
+        conn.commit()
+
+
+def _stage_merge_sql(spec: dict, stage: str) -> str:
+    columns = ", ".join(spec["columns"])
+    keys = ", ".join(spec["key_columns"])
+    conflict = spec["upsert"][spec["upsert"].index("ON CONFLICT") :]
+    return (
+        f"INSERT INTO {spec['table']} ({columns}) SELECT DISTINCT ON ({keys}) {columns} FROM {stage} "
+        f"ORDER BY {keys}, stage_seq DESC, stage_pos DESC {conflict}"
+    )
+
+
+def write_copy_merge(conn, spec: dict, rows: list[tuple], *, flush_every: int, **_):
+    cur = conn.cursor()
+    stage = f"{spec['table']}_bench_stage"
+    merge_sql = _stage_merge_sql(spec, stage)
+    for seq, chunk in enumerate(_chunks(rows, flush_every)):
+        buffer = db.encode_copy_rows([(seq, pos) + row for pos, row in enumerate(chunk)])
+        if spec["table"] == "msgraph_drive_items":
+            graph_ingest._copy_merge_drive_items(cur, [("text", buffer, len(chunk))], staged_rows=len(chunk))
+        else:
+            cur.execute(
+                f"CREATE TEMP TABLE IF NOT EXISTS {stage} (stage_seq bigint, stage_pos int, LIKE {spec['table']}) ON COMMIT DELETE ROWS"
+            )
+            db.copy_rows(cur, stage, ["stage_seq", "stage_pos", *spec["columns"]], buffer, row_count=len(chunk))
+            cur.execute(merge_sql)
+        conn.commit()
+
+
+def write_prepared(conn, spec: dict, rows: list[tuple], *, flush_every: int, prepared_batch: int, **_):
+    cur = conn.cursor()
+    width = len(spec["columns"])
+    placeholders = ", ".join(f"${idx}" for idx in range(1, width + 1))
+    cur.execute(f"PREPARE bench_upsert AS {spec['upsert'].replace('VALUES %s', f'VALUES ({placeholders})')}")
+    execute_sql = f"EXECUTE bench_upsert ({', '.join(['%s'] * width)})"
+    try:
+        for chunk in _chunks(rows, flush_every):
+            psycopg2.extras.execute_batch(cur, execute_sql, chunk, page_size=prepared_batch)
+            conn.commit()
+    finally:
+        conn.rollback()
+        cur.execute("DEALLOCATE bench_upsert")
+
+
+WRITERS = {"values": write_values, "copy_merge": write_copy_merge, "prepared": write_prepared}
+
+
+class LockWaitSampler:
+    """Counts benchmark backends waiting on a heavyweight lock, sampled from pg_stat_activity."""
+
+    def __init__(self, interval_seconds: float):
+        self.interval_seconds = interval_seconds
+        self.samples = 0
+        self.waiting_samples = 0
+        self.max_waiting = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="lock-wait-sampler", daemon=True)
+
+    def _run(self):
+        conn = db.get_conn()
+        conn.autocommit = True
+        try:
+            cur = conn.cursor()
+            while not self._stop.is_set():
+                cur.execute(
+                    "SELECT count(*) FROM pg_stat_activity WHERE application_name = %s AND wait_event_type = 'Lock'",
+                    [APPLICATION_NAME],
+                )
+                waiting = int(cur.fetchone()[0])
+                self.samples += 1
+                self.waiting_samples += waiting
+                self.max_waiting = max(self.max_waiting, waiting)
+                self._stop.wait(self.interval_seconds)
+        finally:
+            conn.close()
+
+    def __enter__(self) -> "LockWaitSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def summary(self) -> dict:
+        return {
+            "lock_wait_seconds": round(self.waiting_samples * self.interval_seconds, 3),
+            "max_lock_waiters": self.max_waiting,
+            "lock_samples": self.samples,
+        }
+
+
+def _wal_lsn(cur) -> str:
+    cur.execute("SELECT pg_current_wal_lsn()")
+    return cur.fetchone()[0]
+
+
+def _shards(rows: list[tuple], writers: int) -> list[list[tuple]]:
+    # Writers own whole drives, like the ingest's concurrent drive crawls.
+    shards: list[list[tuple]] = [[] for _ in range(max(1, writers))]
+    owner: dict = {}
+    for row in rows:
+        shards[owner.setdefault(row[0], len(owner) % len(shards))].append(row)
+    return [shard for shard in shards if shard]
+
+
+def run_case(control, spec: dict, rows: list[tuple], strategy: str, options: dict, args: argparse.Namespace) -> dict:
+    write = WRITERS[strategy]
+    errors: list[BaseException] = []
+
+    def writer(shard: list[tuple]):
+        conn = db.get_conn()
+        try:
+            conn.cursor().execute("SET application_name = %s", [APPLICATION_NAME])
+            conn.commit()
+            write(conn, spec, shard, prepared_batch=args.prepared_batch, **options)
+        except BaseException as exc:
+            errors.append(exc)
+        finally:
+            conn.close()
+
+    start_lsn = _wal_lsn(control)
+    with LockWaitSampler(args.lock_sample_ms / 1000.0) as sampler:
+        started = time.perf_counter()
+        threads = [threading.Thread(target=writer, args=(shard,)) for shard in _shards(rows, args.writers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        seconds = time.perf_counter() - started
+    if errors:
+        raise errors[0]
+    control.execute("SELECT pg_wal_lsn_diff(pg_current_wal_lsn(), %s)", [start_lsn])
+    wal_bytes = int(control.fetchone()[0])
+    return {
+        "rows": len(rows),
+        "seconds": round(seconds, 4),
+        "rows_per_second": round(len(rows) / seconds, 1) if seconds else None,
+        "wal_bytes": wal_bytes,
+        "wal_bytes_per_row": round(wal_bytes / len(rows), 1) if rows else None,
+        **sampler.summary(),
+    }
+
+
+def case_options(strategy: str, args: argparse.Namespace) -> list[dict]:
+    default_page = 1000
+    if strategy != "values":
+        return [{"flush_every": flush, "page_size": None} for flush in args.flush_sizes]
+    options = [{"flush_every": max(args.flush_sizes), "page_size": page} for page in args.page_sizes]
+    options += [{"flush_every": flush, "page_size": default_page} for flush in args.flush_sizes]
+    unique = []
+    for option in options:
+        if option not in unique:
+            unique.append(option)
+    return unique
+
+
+def run(args: argparse.Namespace) -> dict:
+    tables = [name.strip() for name in args.tables.split(",") if name.strip()]
+    strategies = [name.strip() for name in args.strategies.split(",") if name.strip()]
+    rows_by_table = build_rows(args)
+    results = []
+    control_conn = db.get_conn()
+    control_conn.autocommit = True
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(devnull):
+            control = control_conn.cursor()
+            for table in tables:
+                spec = TABLES[table]
+                rows = rows_by_table[table]
+                for strategy in strategies:
+                    for options in case_options(strategy, args):
+                        control.execute(f"TRUNCATE {spec['table']}")
+                        for write_pass in ("insert", "update"):
+                            result = run_case(control, spec, rows, strategy, options, args)
+                            results.append(
+                                {
+                                    "case": f"{table}.{strategy}.flush{options['flush_every']}"
+                                    + (f".page{options['page_size']}" if options["page_size"] else "")
+                                    + f".{write_pass}",
+                                    "table": table,
+                                    "strategy": strategy,
+                                    "pass": write_pass,
+                                    "writers": args.writers,
+                                    **options,
+                                    **result,
+                                }
+                            )
+    finally:
+        control_conn.close()
+    return {
+        "params": {
+            **tenant_params(args),
+            "tables": tables,
+            "strategies": strategies,
+            "writers": args.writers,
+            "prepared_batch": args.prepared_batch,
+            "flush_every_default": graph_ingest.FLUSH_EVERY_DEFAULT,
+        },
+        "rows": {table: len(rows_by_table[table]) for table in tables},
+        "results": results,
+    }
+
+
+def main() -> int:
+    args = parse_args()
+    report = run(args)
+    Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+    print(f"rows={json.dumps(report['rows'])} writers={args.writers} out={args.out}")
+    print(f"{'case':56} {'seconds':>9} {'rows/s':>10} {'WAL B/row':>10} {'lock wait s':>12}")
+    for row in report["results"]:
+        print(
+            f"{row['case']:56} {row['seconds']:>9.3f} {row['rows_per_second'] or 0:>10.0f} "
+            f"{row['wal_bytes_per_row'] or 0:>10.0f} {row['lock_wait_seconds']:>12.3f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""Compare the tuple row builders with the Arrow columnar transform on synthetic Graph pages."""
+
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.jobs import graph_ingest
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark drive/drive item page transforms.")
+    parser.add_argument("--pages", type=int, default=50, help="Synthetic drive item pages per run")
+    parser.add_argument("--page-size", type=int, default=200, help="Items per page (GRAPH_PAGE_SIZE)")
+    parser.add_argument("--owners", type=int, default=2000, help="Owners for the drives case (one listing each)")
+    parser.add_argument("--users", type=int, default=5000, help="Users in the identity maps")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case; the best run is reported")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true", help="Emit machine-readable JSON instead of a table")
+    return parser.parse_args()
+
+
+def _identity(rng: random.Random, users: int) -> dict:
+    roll = rng.random()
+    if roll < 0.85:
+        idx = rng.randrange(users)
+        return {"user": {"id": f"user-{idx}", "email": f"user{idx}@contoso.com", "displayName": f"User {idx}"}}
+    if roll < 0.95:
+        return {"application": {"id": "app-1", "displayName": "Sync App"}}
+    return {"user": {"displayName": "System Account"}}
+
+
+def make_item(rng: random.Random, idx: int, users: int) -> dict:
+    depth = rng.randint(0, 6)
+    parent_path = "/drive/root:" + "".join(f"/Folder {rng.randrange(40)}" for _ in range(depth))
+    item = {
+        "id": f"01ITEM{idx:010d}",
+        "name": f"Document {idx}.docx",
+        "webUrl": f"https://contoso.sharepoint.com/sites/s/Shared%20Documents/Document%20{idx}.docx",
+        "size": rng.randrange(1, 50_000_000),
+        "createdDateTime": "2025-11-03T10:15:00Z",
+        "lastModifiedDateTime": "2026-02-17T08:42:11Z",
+        "parentReference": {"driveId": "b!drive", "driveType": "documentLibrary", "id": f"01PARENT{depth}", "path": parent_path},
+        "createdBy": _identity(rng, users),
+        "lastModifiedBy": _identity(rng, users),
+        "fileSystemInfo": {"createdDateTime": "2025-11-03T10:15:00Z", "lastModifiedDateTime": "2026-02-17T08:42:11Z"},
+        "sharepointIds": {
+            "siteId": "site-guid",
+            "listId": "list-guid",
+            "listItemId": str(idx),
+            "listItemUniqueId": f"unique-{idx}",
+        },
+    }
+    if rng.random() < 0.15:
+        item["folder"] = {"childCount": rng.randrange(200)}
+    else:
+        item["file"] = {"mimeType": "application/vnd.openxmlformats", "hashes": {"sha1Hash": f"{idx:040x}"}}
+    if rng.random() < 0.2:
+        item["shared"] = {"scope": "users"}
+    return item
+
+
+def make_drive(rng: random.Random, idx: int, users: int) -> dict:
+    return {
+        "id": f"b!drive{idx}",
+        "name": "OneDrive",
+        "driveType": "business",
+        "webUrl": f"https://contoso-my.sharepoint.com/personal/user{idx}/Documents",
+        "owner": _identity(rng, users),
+        "createdBy": _identity(rng, users),
+        "lastModifiedBy": _identity(rng, users),
+        "lastModifiedDateTime": "2026-02-17T08:42:11Z",
+        "createdDateTime": "2024-01-01T00:00:00Z",
+        "quota": {"total": 1 << 40, "used": rng.randrange(1 << 30), "remaining": 1 << 39, "deleted": 0, "state": "normal"},
+        "sharepointIds": {"siteId": f"site-{idx}", "siteUrl": f"https://contoso-my.sharepoint.com/personal/user{idx}"},
+    }
+
+
+def _user_maps(users: int) -> tuple[dict[str, str], dict[str, str]]:
+    by_id = {f"user-{idx}": f"user-{idx}" for idx in range(users)}
+    by_email = {f"user{idx}@contoso.com": f"user-{idx}" for idx in range(users)}
+    return by_id, by_email
+
+
+def _best_of(repeat: int, fn) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run(args: argparse.Namespace) -> dict:
+    rng = random.Random(args.seed)
+    synced_at = datetime.now(timezone.utc)
+    users_by_id, users_by_email = _user_maps(args.users)
+    shared = {"users_by_id": users_by_id, "users_by_email": users_by_email}
+    pages = [
+        {"value": [make_item(rng, page * args.page_size + pos, args.users) for pos in range(args.page_size)]}
+        for page in range(args.pages)
+    ]
+    owners = [[make_drive(rng, idx, args.users)] for idx in range(args.owners)]
+    item_count = args.pages * args.page_size
+
+    def tuple_rows():
+        for page in pages:
+            for item in page["value"]:
+                graph_ingest._drive_item_row(
+                    "drive-1", item, synced_at=synced_at, users_by_id=users_by_id, users_by_email=users_by_email
+                )
+
+    def tuple_copy():
+        for seq, page in enumerate(pages):
+            graph_ingest._transform_drive_items_page(page, drive_id="drive-1", synced_at=synced_at, page_seq=seq, shared=shared)
+
+    def columnar_copy():
+        for seq, page in enumerate(pages):
+            graph_ingest._transform_drive_items_page(
+                page, drive_id="drive-1", synced_at=synced_at, page_seq=seq, shared=shared, columnar=True
+            )
+
+    def drive_rows():
+        for drives in owners:
+            for drive in drives:
+                graph_ingest._drive_row(
+                    drive,
+                    site_id=None,
+                    owner_hint_id="user-1",
+                    owner_hint_type="user",
+                    synced_at=synced_at,
+                    users_by_id=users_by_id,
+                    users_by_email=users_by_email,
+                )
+
+    def drive_arrow_load():
+        # Drive listings arrive one owner at a time, so a columnar pass pays its fixed cost per owner.
+        for drives in owners:
+            pa.Table.from_pylist([{"id": d["id"], "quota": d["quota"], "webUrl": d["webUrl"]} for d in drives])
+
+    cases = [
+        ("drive_items.tuple_rows_no_adapt", item_count, tuple_rows),
+        ("drive_items.tuple_copy_text", item_count, tuple_copy),
+    ]
+    if pa is not None:
+        cases.append(("drive_items.arrow_copy_csv", item_count, columnar_copy))
+    cases.append(("drives.tuple_rows", args.owners, drive_rows))
+    if pa is not None:
+        cases.append(("drives.arrow_table_per_owner", args.owners, drive_arrow_load))
+
+    results = []
+    for name, rows, fn in cases:
+        seconds = _best_of(args.repeat, fn)
+        results.append(
+            {
+                "case": name,
+                "rows": rows,
+                "seconds": round(seconds, 6),
+                "rows_per_second": round(rows / seconds, 1) if seconds else None,
+            }
+        )
+
+    sample = graph_ingest._transform_drive_items_page(pages[0], drive_id="drive-1", synced_at=synced_at, page_seq=0, shared=shared)
+    return {
+        "params": {
+            "pages": args.pages,
+            "page_size": args.page_size,
+            "owners": args.owners,
+            "users": args.users,
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+        "pyarrow": getattr(pa, "__version__", None),
+        "copy_bytes_per_page": len(sample["copy_buffer"]),
+        "raw_bytes_per_page": len(json.dumps(pages[0]).encode("utf-8")),
+        "results": results,
+    }
+
+
+def main() -> int:
+    args = parse_args()
+    report = run(args)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+    print(f"pyarrow={report['pyarrow']} params={json.dumps(report['params'])}")
+    print(f"{'case':32} {'rows':>8} {'seconds':>10} {'rows/s':>12}")
+    for row in report["results"]:
+        print(f"{row['case']:32} {row['rows']:>8} {row['seconds']:>10.4f} {row['rows_per_second']:>12.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""Run graph_ingest stages end to end against the fake Graph and a local Postgres.
+
+Each stage runs in its own worker process (`GRAPH_SYNC_STAGES=<stage>`) so its peak RSS is its own;
+stages run in ingest order against the same database, so later stages see the rows earlier ones wrote.
+DATABASE_URL must point at a disposable database with the db/init schema applied.
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import uuid
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from benchmarks.fake_graph import DEFAULT_PAGE_SIZE, DEFAULT_TOKEN, FakeGraphServer, FakeTenant, TenantBackend
+from benchmarks.synthetic_tenant import add_tenant_args, generate_tenant, tenant_counts, tenant_params
+
+STAGES = ["users", "groups", "group_memberships", "sites", "drives", "drive_items", "permissions"]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark graph_ingest stages against the fake Graph.")
+    parser.add_argument("--tenant", help="Tenant fixture JSON (default: generate one from the synthetic tenant options)")
+    parser.add_argument("--stages", default=",".join(STAGES), help="Comma-separated stages, run in this order")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE, help="Largest page the fake Graph returns")
+    parser.add_argument("--out", default="ingest-benchmark.json", help="Machine-readable results file")
+    parser.add_argument("--verbose", action="store_true", help="Show the stage processes' worker logs")
+    parser.add_argument("--json", action="store_true", help="Print the results JSON instead of a table")
+    parser.add_argument("--child-stage", help=argparse.SUPPRESS)
+    parser.add_argument("--child-out", help=argparse.SUPPRESS)
+    parser.add_argument("--run-id", help=argparse.SUPPRESS)
+    parser.add_argument("--job-id", help=argparse.SUPPRESS)
+    add_tenant_args(parser)
+    return parser.parse_args()
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux and bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_child(args: argparse.Namespace) -> int:
+    from app.jobs.graph_ingest import run_graph_ingest
+
+    baseline = _peak_rss_mb()
+    stages = run_graph_ingest(run_id=args.run_id, job_id=args.job_id)
+    result = {"stage": stages.get(args.child_stage) or {}, "baseline_rss_mb": baseline, "peak_rss_mb": _peak_rss_mb()}
+    Path(args.child_out).write_text(json.dumps(result, default=str), encoding="utf-8")
+    return 0
+
+
+def _graph_ingest_job_id(conn) -> str:
+    with conn.cursor() as cur:
+        cur.execute("SELECT job_id FROM jobs WHERE job_type = 'graph_ingest' ORDER BY job_id LIMIT 1")
+        row = cur.fetchone()
+    if not row:
+        raise RuntimeError("No graph_ingest job found; apply db/init to the benchmark database first")
+    return str(row[0])
+
+
+def _start_run(conn, job_id: str) -> str:
+    run_id = str(uuid.uuid4())
+    with conn.cursor() as cur:
+        cur.execute(
+            "INSERT INTO job_runs (run_id, job_id, started_at, status) VALUES (%s, %s, now(), 'running')",
+            (run_id, job_id),
+        )
+    conn.commit()
+    return run_id
+
+
+def _finish_run(conn, run_id: str, status: str):
+    with conn.cursor() as cur:
+        cur.execute("UPDATE job_runs SET finished_at = now(), status = %s WHERE run_id = %s", (status, run_id))
+    conn.commit()
+
+
+def _stage_case(stage: str, child: dict, graph_counts: dict) -> dict:
+    result = child.get("stage") or {}
+    timing = result.get("timing") or {}
+    endpoints = {key: value for key, value in graph_counts.items() if " /" in key}
+    return {
+        "case": stage,
+        "rows": timing.get("rows"),
+        "seconds": timing.get("wall_seconds"),
+        "rows_per_second": timing.get("rows_per_second"),
+        "peak_rss_mb": child.get("peak_rss_mb"),
+        "baseline_rss_mb": child.get("baseline_rss_mb"),
+        "graph_calls": graph_counts.get("requests", 0),
+        "graph_throttled": graph_counts.get("throttled", 0),
+        "graph_calls_by_endpoint": endpoints,
+        "db_statements": timing.get("db_statements"),
+        "commits": timing.get("commits"),
+        "skipped": bool(result.get("skipped")),
+        "timing": timing,
+        "flush_sizes": result.get("flush_sizes"),
+    }
+
+
+def run(args: argparse.Namespace) -> dict:
+    from app import db
+
+    if args.tenant:
+        tenant = FakeTenant.load(args.tenant)
+    else:
+        tenant = FakeTenant(generate_tenant(tenant_params(args)))
+    stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+
+    conn = db.get_conn()
+    results = []
+    try:
+        job_id = _graph_ingest_job_id(conn)
+        with FakeGraphServer(TenantBackend(tenant, page_size=args.page_size)) as server, tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, GRAPH_BASE=server.base_url, GRAPH_STATIC_TOKEN=DEFAULT_TOKEN)
+            for stage in stages:
+                run_id = _start_run(conn, job_id)
+                child_out = os.path.join(tmp, f"{stage}.json")
+                server.reset_counts()
+                proc = subprocess.run(
+                    [sys.executable, str(Path(__file__).resolve()), "--child-stage", stage, "--child-out", child_out,
+                     "--run-id", run_id, "--job-id", job_id],
+                    env=dict(env, GRAPH_SYNC_STAGES=stage),
+                    cwd=str(ROOT),
+                    stdout=None if args.verbose else subprocess.DEVNULL,
+                    stderr=None if args.verbose else subprocess.PIPE,
+                    text=True,
+                )
+                graph_counts = server.request_counts()
+                if proc.returncode != 0:
+                    _finish_run(conn, run_id, "failed")
+                    raise RuntimeError(f"Stage {stage} failed (exit {proc.returncode}): {(proc.stderr or '')[-2000:]}")
+                _finish_run(conn, run_id, "success")
+                results.append(_stage_case(stage, json.loads(Path(child_out).read_text(encoding="utf-8")), graph_counts))
+    finally:
+        conn.close()
+
+    return {
+        "params": {**tenant_params(args), "tenant": args.tenant, "page_size": args.page_size, "stages": stages},
+        "tenant": tenant_counts(tenant.to_dict()),
+        "results": results,
+    }
+
+
+def main() -> int:
+    args = parse_args()
+    if args.child_stage:
+        return run_child(args)
+    report = run(args)
+    Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+    print(f"tenant={json.dumps(report['tenant'])} out={args.out}")
+    print(f"{'stage':18} {'rows':>8} {'seconds':>9} {'rows/s':>10} {'rss MB':>8} {'graph':>7} {'db stmts':>9} {'commits':>8}")
+    for row in report["results"]:
+        if row["skipped"]:
+            print(f"{row['case']:18} skipped")
+            continue
+        print(
+            f"{row['case']:18} {row['rows'] or 0:>8} {row['seconds'] or 0:>9.3f} {row['rows_per_second'] or 0:>10.0f} "
+            f"{row['peak_rss_mb']:>8.1f} {row['graph_calls']:>7} {row['db_statements'] or 0:>9} {row['commits'] or 0:>8}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""Microbenchmarks for the per-item graph_ingest functions.
+
+Payloads come from the synthetic tenant generator (the same shapes the fake Graph serves), with the
+identity, legacy permission and error variants real tenants produce mixed in.
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.graph_client import GraphError
+from app.jobs import graph_ingest
+from benchmarks.synthetic_tenant import add_tenant_args, generate_tenant, tenant_params
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the per-item graph_ingest functions.")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.05, help="Share of rows repeated in dedupe inputs")
+    parser.add_argument("--errors", type=int, default=5000, help="Permission sync errors to classify")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per case; the best run is reported")
+    parser.add_argument("--case", action="append", help="Only run cases starting with this prefix (repeatable)")
+    parser.add_argument("--out", help="Also write the JSON report to this file")
+    parser.add_argument("--json", action="store_true", help="Emit machine-readable JSON instead of a table")
+    add_tenant_args(parser)
+    return parser.parse_args(argv)
+
+
+def _extra_identities(rng: random.Random, users: list) -> list:
+    user = rng.choice(users)
+    return [
+        {"application": {"id": "00000003-0000-0ff1-ce00-000000000000", "displayName": "SharePoint Online Client Extensibility"}},
+        {"user": {"displayName": "System Account"}},
+        {"user": {"email": user["mail"].upper(), "displayName": user["displayName"]}},
+        {"user": {"id": "external-guest", "email": "guest@fabrikam.com", "displayName": "Guest User"}},
+        {"siteUser": {"id": "12", "displayName": user["displayName"], "loginName": f"i:0#.f|membership|{user['mail']}"}},
+        {"siteGroup": {"id": "5", "displayName": "Site Members"}},
+        {"@odata.type": "#microsoft.graph.userIdentity", "id": user["id"], "displayName": user["displayName"]},
+        {"displayName": "SharePoint App"},
+        None,
+    ]
+
+
+def _legacy(permission: dict) -> dict:
+    legacy = dict(permission)
+    if "grantedToV2" in legacy:
+        legacy["grantedTo"] = legacy.pop("grantedToV2")
+    if "grantedToIdentitiesV2" in legacy:
+        legacy["grantedToIdentities"] = legacy.pop("grantedToIdentitiesV2")
+    return legacy
+
+
+def _errors(rng: random.Random, count: int) -> list:
+    samples = [
+        GraphError(404, "itemNotFound", "https://graph.microsoft.com/v1.0/drives/b!x/items/01A/permissions",
+                   json.dumps({"error": {"code": "itemNotFound", "message": "The resource could not be found."}})),
+        GraphError(403, "accessDenied", "https://graph.microsoft.com/v1.0/drives/b!x/items/01B/permissions",
+                   json.dumps({"error": {"code": "accessDenied", "message": "Access denied. " * 60}})),
+        GraphError(429, "Too many requests", "https://graph.microsoft.com/v1.0/drives/b!x/items/01C/permissions",
+                   json.dumps({"error": {"code": "activityLimitReached", "message": "Throttled"}})),
+        GraphError(503, "Service unavailable", "https://graph.microsoft.com/v1.0/drives/b!x/items/01D/permissions", "<html>503</html>"),
+        RuntimeError("Graph request failed: GET /drives/b!x/items/01E/permissions error=ReadTimeout"),
+        ValueError("unexpected payload"),
+    ]
+    weights = [40, 10, 25, 10, 10, 5]
+    return rng.choices(samples, weights=weights, k=count)
+
+
+def _with_duplicates(rng: random.Random, rows: list, ratio: float) -> list:
+    out = list(rows)
+    for _ in range(int(len(rows) * ratio)):
+        out.insert(rng.randrange(len(out) + 1), rng.choice(rows))
+    return out
+
+
+def build_fixtures(args: argparse.Namespace) -> dict:
+    rng = random.Random(args.seed)
+    tenant = generate_tenant(tenant_params(args))
+    users = tenant["users"]
+    users_by_id = {user["id"]: user["id"] for user in users}
+    users_by_email = {user["mail"].lower(): user["id"] for user in users}
+    synced_at = datetime.now(timezone.utc)
+
+    drives = []
+    for mapping, hint_type in (("site_drives", None), ("group_drives", "group"), ("user_drives", "user")):
+        for owner_id, owned in tenant[mapping].items():
+            for drive in owned:
+                drives.append((drive, owner_id if hint_type else None, hint_type))
+    items = [item for drive_items in tenant["drive_items"].values() for item in drive_items]
+
+    extras = _extra_identities(rng, users)
+    identities = []
+    for item in items:
+        identities.append(item.get("createdBy"))
+        identities.append(rng.choice(extras) if rng.random() < 0.1 else item.get("lastModifiedBy"))
+
+    permissions = [perm for perms in tenant["permissions"].values() for perm in perms]
+    permissions = [_legacy(perm) if rng.random() < 0.2 else perm for perm in permissions]
+    permissions += [{"id": f"inherited-{idx}", "roles": ["read"], "inheritedFrom": {"id": "root"}} for idx in range(len(permissions) // 10)]
+
+    drive_rows = [
+        graph_ingest._drive_row(
+            drive,
+            site_id=None,
+            owner_hint_id=hint_id,
+            owner_hint_type=hint_type,
+            synced_at=synced_at,
+            users_by_id=users_by_id,
+            users_by_email=users_by_email,
+        )
+        for drive, hint_id, hint_type in drives
+    ]
+    membership_rows = [
+        (group_id, member["id"], "user", synced_at, None, None)
+        for group_id, members in tenant["group_members"].items()
+        for member in members
+    ]
+    user_rows = [(user["id"], user["displayName"], user["mail"], synced_at) for user in users]
+
+    return {
+        "users_by_id": users_by_id,
+        "users_by_email": users_by_email,
+        "synced_at": synced_at,
+        "drives": drives,
+        "items": items,
+        "paths": [(item.get("parentReference") or {}).get("path") for item in items],
+        "identities": identities,
+        "permissions": permissions,
+        # Drives are listed once per site and again per owning group, so duplicates get merged.
+        "drive_rows": _with_duplicates(rng, drive_rows, max(args.duplicate_ratio, 0.3)),
+        "membership_rows": _with_duplicates(rng, membership_rows, args.duplicate_ratio),
+        "user_rows": _with_duplicates(rng, user_rows, args.duplicate_ratio),
+        "errors": _errors(rng, args.errors),
+    }
+
+
+def _best_of(repeat: int, fn) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def cases(fx: dict) -> list:
+    users_by_id, users_by_email, synced_at = fx["users_by_id"], fx["users_by_email"], fx["synced_at"]
+    resolve, item_path, path_level = graph_ingest._resolve_identity, graph_ingest._item_path, graph_ingest._compute_path_level
+    iter_identities, extract_grants = graph_ingest._iter_permission_identities, graph_ingest._extract_grants
+    classify = graph_ingest._classify_permission_sync_error
+
+    def resolve_identity():
+        for identity in fx["identities"]:
+            resolve(identity, users_by_id, users_by_email)
+
+    def drive_row():
+        for drive, hint_id, hint_type in fx["drives"]:
+            graph_ingest._drive_row(
+                drive,
+                site_id=None,
+                owner_hint_id=hint_id,
+                owner_hint_type=hint_type,
+                synced_at=synced_at,
+                users_by_id=users_by_id,
+                users_by_email=users_by_email,
+            )
+
+    def item_paths():
+        for item in fx["items"]:
+            item_path(item)
+
+    def path_levels():
+        for path in fx["paths"]:
+            path_level(path)
+
+    def permission_identities():
+        for permission in fx["permissions"]:
+            for _ in iter_identities(permission):
+                pass
+
+    def grants():
+        for permission in fx["permissions"]:
+            extract_grants(permission)
+
+    def classify_errors():
+        for error in fx["errors"]:
+            classify(error)
+
+    return [
+        ("resolve_identity", len(fx["identities"]), resolve_identity),
+        ("drive_row", len(fx["drives"]), drive_row),
+        ("item_path", len(fx["items"]), item_paths),
+        ("compute_path_level", len(fx["paths"]), path_levels),
+        ("iter_permission_identities", len(fx["permissions"]), permission_identities),
+        ("extract_grants", len(fx["permissions"]), grants),
+        ("dedupe_rows_keep_last.users", len(fx["user_rows"]),
+         lambda: graph_ingest._dedupe_rows_keep_last(fx["user_rows"], lambda r: r[0])),
+        ("dedupe_rows_keep_last.memberships", len(fx["membership_rows"]),
+         lambda: graph_ingest._dedupe_rows_keep_last(fx["membership_rows"], lambda r: (r[0], r[1], r[2]))),
+        ("dedupe_drive_rows", len(fx["drive_rows"]), lambda: graph_ingest._dedupe_drive_rows(fx["drive_rows"])),
+        ("classify_permission_sync_error", len(fx["errors"]), classify_errors),
+    ]
+
+
+def run(args: argparse.Namespace) -> dict:
+    fx = build_fixtures(args)
+    results = []
+    for name, rows, fn in cases(fx):
+        if args.case and not any(name.startswith(prefix) for prefix in args.case):
+            continue
+        seconds = _best_of(args.repeat, fn)
+        results.append(
+            {
+                "case": name,
+                "rows": rows,
+                "seconds": round(seconds, 6),
+                "rows_per_second": round(rows / seconds, 1) if seconds else None,
+                "ns_per_row": round(seconds * 1e9 / rows, 1) if rows else None,
+            }
+        )
+    return {
+        "params": {**tenant_params(args), "duplicate_ratio": args.duplicate_ratio, "errors": args.errors, "repeat": args.repeat},
+        "results": results,
+    }
+
+
+def main() -> int:
+    args = parse_args()
+    report = run(args)
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+    print(f"params={json.dumps(report['params'])}")
+    print(f"{'case':36} {'rows':>8} {'seconds':>10} {'rows/s':>12} {'ns/row':>9}")
+    for row in report["results"]:
+        print(f"{row['case']:36} {row['rows']:>8} {row['seconds']:>10.4f} {row['rows_per_second'] or 0:>12.0f} {row['ns_per_row'] or 0:>9.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
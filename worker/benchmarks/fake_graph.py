@@ -0,0 +1,638 @@
+#!/usr/bin/env python3
+"""Local fake Microsoft Graph for running graph_ingest and copilot_usage_sync without a tenant.
+
+The server answers from a tenant fixture (paging, delta rounds, 410 on expired delta tokens, 429
+throttling and `$batch`), replays responses captured with `record`, or records them by proxying a
+real Graph endpoint. Point the worker at it with:
+
+    GRAPH_BASE=http://127.0.0.1:<port>/v1.0 GRAPH_STATIC_TOKEN=fake-graph-token
+
+Fixture JSON keys (all optional):
+    users, groups, sites                      lists of Graph objects
+    group_members                             {group_id: [directoryObject with @odata.type]}
+    site_drives, group_drives, user_drives    {owner_id: [drive]}
+    group_sites                               {group_id: site_id} for /groups/{id}/sites/root
+    drive_items                               {drive_id: [driveItem]}
+    permissions                               {"<drive_id>/<item_id>": [permission]}
+    reports                                   {report_name: [row]} served as CSV
+    interactions                              {user_id: [aiInteraction]}
+"""
+
+import argparse
+import csv
+import io
+import json
+import re
+import sys
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+from urllib.parse import parse_qsl, unquote, urlencode, urlsplit
+
+import requests
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.metrics import graph_endpoint_class
+
+
+DEFAULT_TOKEN = "fake-graph-token"
+DEFAULT_PAGE_SIZE = 100
+BATCH_MAX_REQUESTS = 20
+BASE_PLACEHOLDER = "{GRAPH_BASE}"
+
+_MAPPINGS = (
+    "group_members",
+    "site_drives",
+    "group_drives",
+    "user_drives",
+    "group_sites",
+    "drive_items",
+    "permissions",
+    "reports",
+    "interactions",
+)
+_FILTER_CLAUSE = re.compile(r"^\s*([\w/]+)\s+(eq|ne|ge|gt|le|lt)\s+('(?:[^']|'')*'|\S+)\s*$", re.IGNORECASE)
+_REPORT_SEGMENT = re.compile(r"^(\w+)\(period='(\w+)'\)$")
+
+Response = Tuple[int, Any, Dict[str, str]]
+
+
+class GraphRequestError(Exception):
+    def __init__(self, status: int, code: str, message: str):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+        self.message = message
+
+    def response(self) -> Response:
+        return self.status, {"error": {"code": self.code, "message": self.message}}, {}
+
+
+def _not_found(what: str) -> GraphRequestError:
+    return GraphRequestError(404, "itemNotFound", f"{what} not found")
+
+
+class FakeTenant:
+    """Graph objects for one tenant plus the change versions that drive `delta` rounds.
+
+    Delta tokens are tenant versions: a round started from token N returns what changed after N.
+    Mutate through `upsert_*`/`delete_*` so deltas pick the change up; `expire_delta` makes every
+    token issued so far for a scope (`"sites"` or a drive id) answer 410.
+    """
+
+    def __init__(self, data: Optional[Dict[str, Any]] = None):
+        data = data or {}
+        self.users: list[Dict[str, Any]] = list(data.get("users", []))
+        self.groups: list[Dict[str, Any]] = list(data.get("groups", []))
+        self.sites: list[Dict[str, Any]] = list(data.get("sites", []))
+        for name in _MAPPINGS:
+            setattr(self, name, dict(data.get(name, {})))
+        self.version = 1
+        self._lock = threading.Lock()
+        self._changed_at: Dict[Tuple[str, str], int] = {}
+        self._removed: Dict[str, list[Tuple[str, int]]] = {}
+        self._expired_through: Dict[str, int] = {}
+
+    @classmethod
+    def load(cls, path: str) -> "FakeTenant":
+        return cls(json.loads(Path(path).read_text(encoding="utf-8")))
+
+    def to_dict(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = {"users": self.users, "groups": self.groups, "sites": self.sites}
+        for name in _MAPPINGS:
+            data[name] = getattr(self, name)
+        return data
+
+    def dump(self, path: str):
+        Path(path).write_text(json.dumps(self.to_dict(), separators=(",", ":")), encoding="utf-8")
+
+    def drive(self, drive_id: str) -> Optional[Dict[str, Any]]:
+        for mapping in (self.site_drives, self.group_drives, self.user_drives):
+            for drives in mapping.values():
+                for drive in drives:
+                    if drive.get("id") == drive_id:
+                        return drive
+        return None
+
+    def _touch(self, scope: str, object_id: str):
+        self.version += 1
+        self._changed_at[(scope, object_id)] = self.version
+
+    def upsert_site(self, site: Dict[str, Any]):
+        with self._lock:
+            _replace_by_id(self.sites, site)
+            self._touch("sites", site["id"])
+
+    def delete_site(self, site_id: str):
+        with self._lock:
+            self.sites = [site for site in self.sites if site.get("id") != site_id]
+            self.version += 1
+            self._removed.setdefault("sites", []).append((site_id, self.version))
+
+    def upsert_item(self, drive_id: str, item: Dict[str, Any]):
+        with self._lock:
+            _replace_by_id(self.drive_items.setdefault(drive_id, []), item)
+            self._touch(drive_id, item["id"])
+
+    def delete_item(self, drive_id: str, item_id: str):
+        with self._lock:
+            items = self.drive_items.get(drive_id, [])
+            self.drive_items[drive_id] = [item for item in items if item.get("id") != item_id]
+            self.version += 1
+            self._removed.setdefault(drive_id, []).append((item_id, self.version))
+
+    def expire_delta(self, scope: str):
+        with self._lock:
+            self._expired_through[scope] = self.version
+
+    def delta_changes(self, scope: str, objects: list[Dict[str, Any]], token: Optional[int]) -> list[Dict[str, Any]]:
+        """Objects for a delta round: everything when `token` is None, else changes after `token`."""
+        with self._lock:
+            if token is None:
+                return list(objects)
+            if token <= self._expired_through.get(scope, 0):
+                raise GraphRequestError(410, "resyncRequired", "The delta token has expired; restart the round")
+            changed = [obj for obj in objects if self._changed_at.get((scope, obj.get("id")), 0) > token]
+            for object_id, version in self._removed.get(scope, []):
+                if version > token:
+                    tombstone: Dict[str, Any] = {"id": object_id}
+                    if scope == "sites":
+                        tombstone["@removed"] = {"reason": "deleted"}
+                    else:
+                        tombstone["deleted"] = {"state": "deleted"}
+                    changed.append(tombstone)
+            return changed
+
+
+def _replace_by_id(objects: list[Dict[str, Any]], obj: Dict[str, Any]):
+    for index, existing in enumerate(objects):
+        if existing.get("id") == obj.get("id"):
+            objects[index] = obj
+            return
+    objects.append(obj)
+
+
+def _field(obj: Dict[str, Any], path: str) -> Any:
+    value: Any = obj
+    for part in path.split("/"):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+def _apply_filter(objects: Iterable[Dict[str, Any]], expression: Optional[str]) -> list[Dict[str, Any]]:
+    """Supports `field op value [and ...]` with eq/ne/ge/gt/le/lt; anything else is a 400 like Graph's."""
+    objects = list(objects)
+    if not expression:
+        return objects
+    clauses = []
+    for clause in re.split(r"\s+and\s+", expression.strip(), flags=re.IGNORECASE):
+        match = _FILTER_CLAUSE.match(clause)
+        if not match:
+            raise GraphRequestError(400, "Request_UnsupportedQuery", f"Unsupported $filter: {expression}")
+        field, op, literal = match.groups()
+        if literal.startswith("'"):
+            literal = literal[1:-1].replace("''", "'")
+        clauses.append((field, op.lower(), literal.lower()))
+
+    def matches(obj: Dict[str, Any]) -> bool:
+        for field, op, literal in clauses:
+            value = str(_field(obj, field) or "").lower()
+            ok = {
+                "eq": value == literal,
+                "ne": value != literal,
+                "ge": value >= literal,
+                "gt": value > literal,
+                "le": value <= literal,
+                "lt": value < literal,
+            }[op]
+            if not ok:
+                return False
+        return True
+
+    return [obj for obj in objects if matches(obj)]
+
+
+def _apply_select(obj: Dict[str, Any], select: Optional[str]) -> Dict[str, Any]:
+    if not select:
+        return obj
+    fields = {field.strip() for field in select.split(",") if field.strip()} | {"id"}
+    return {key: value for key, value in obj.items() if key in fields or key.startswith("@")}
+
+
+def _report_csv(rows: list[Dict[str, Any]]) -> str:
+    if not rows:
+        return ""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(rows[0].keys()), extrasaction="ignore")
+    writer.writeheader()
+    writer.writerows(rows)
+    return "\ufeff" + buffer.getvalue()
+
+
+class TenantBackend:
+    """Answers Graph requests from a FakeTenant."""
+
+    def __init__(self, tenant: FakeTenant, *, page_size: int = DEFAULT_PAGE_SIZE):
+        self.tenant = tenant
+        self.page_size = page_size
+        self.base_url = ""
+
+    def handle(self, method: str, path: str, query: Dict[str, str], body: Any) -> Response:
+        try:
+            return self._route(method, path, query)
+        except GraphRequestError as exc:
+            return exc.response()
+
+    def _page(self, path: str, query: Dict[str, str], objects: list[Dict[str, Any]]) -> Response:
+        objects = _apply_filter(objects, query.get("$filter"))
+        top = min(int(query.get("$top") or self.page_size), self.page_size)
+        offset = int(query.get("$skiptoken") or 0)
+        body: Dict[str, Any] = {"value": [_apply_select(obj, query.get("$select")) for obj in objects[offset : offset + top]]}
+        if offset + top < len(objects):
+            body["@odata.nextLink"] = self._link(path, query, **{"$skiptoken": str(offset + top)})
+        return 200, body, {}
+
+    def _delta(self, scope: str, path: str, query: Dict[str, str], objects: list[Dict[str, Any]]) -> Response:
+        token = int(query["$deltatoken"]) if query.get("$deltatoken") else None
+        version = self.tenant.version
+        changes = self.tenant.delta_changes(scope, objects, token)
+        top = min(int(query.get("$top") or self.page_size), self.page_size)
+        offset = int(query.get("$skiptoken") or 0)
+        body: Dict[str, Any] = {"value": [_apply_select(obj, query.get("$select")) for obj in changes[offset : offset + top]]}
+        if offset + top < len(changes):
+            body["@odata.nextLink"] = self._link(path, query, **{"$skiptoken": str(offset + top)})
+        else:
+            body["@odata.deltaLink"] = self._link(path, query, **{"$skiptoken": None, "$deltatoken": str(version)})
+        return 200, body, {}
+
+    def _link(self, path: str, query: Dict[str, str], **overrides: Optional[str]) -> str:
+        params = dict(query)
+        for key, value in overrides.items():
+            if value is None:
+                params.pop(key, None)
+            else:
+                params[key] = value
+        return f"{self.base_url}{path}?{urlencode(params)}"
+
+    def _route(self, method: str, path: str, query: Dict[str, str]) -> Response:
+        tenant = self.tenant
+        parts = [unquote(part) for part in path.strip("/").split("/") if part]
+        if method != "GET":
+            raise GraphRequestError(405, "BadRequest", f"{method} not supported by the fake Graph")
+        if not parts:
+            raise _not_found("resource")
+        head, rest = parts[0], parts[1:]
+
+        if head == "users":
+            if not rest:
+                return self._page(path, query, tenant.users)
+            user = _find(tenant.users, rest[0], "id", "userPrincipalName", "mail")
+            if len(rest) == 1:
+                return 200, _apply_select(user, query.get("$select")), {}
+            if rest[1:] == ["drives"]:
+                return self._page(path, query, tenant.user_drives.get(user["id"], []))
+            if rest[1:] == ["memberOf", "microsoft.graph.group"]:
+                member_groups = [
+                    group
+                    for group in tenant.groups
+                    if any(member.get("id") == user["id"] for member in tenant.group_members.get(group["id"], []))
+                ]
+                return self._page(path, query, member_groups)
+
+        elif head == "groups":
+            if not rest:
+                return self._page(path, query, tenant.groups)
+            group = _find(tenant.groups, rest[0], "id")
+            if len(rest) == 1:
+                return 200, _apply_select(group, query.get("$select")), {}
+            if rest[1] == "members":
+                members = tenant.group_members.get(group["id"], [])
+                if rest[2:] == ["microsoft.graph.user"]:
+                    members = [m for m in members if m.get("@odata.type", "#microsoft.graph.user") == "#microsoft.graph.user"]
+                return self._page(path, query, members)
+            if rest[1:] == ["drives"]:
+                return self._page(path, query, tenant.group_drives.get(group["id"], []))
+            if rest[1:] == ["sites", "root"]:
+                site_id = tenant.group_sites.get(group["id"])
+                return 200, _apply_select(_find(tenant.sites, site_id or "", "id"), query.get("$select")), {}
+
+        elif head == "sites":
+            if not rest:
+                return self._page(path, query, tenant.sites)
+            if rest == ["delta"]:
+                return self._delta("sites", path, query, tenant.sites)
+            if ":" in rest[0]:
+                hostname, site_path = rest[0].split(":", 1)
+                site_path = "/".join([site_path] + rest[1:]).rstrip("/")
+                url = f"https://{hostname}{site_path}".lower()
+                site = next((s for s in tenant.sites if str(s.get("webUrl") or "").rstrip("/").lower() == url), None)
+                if site is None:
+                    raise _not_found("site")
+                return 200, _apply_select(site, query.get("$select")), {}
+            site = _find(tenant.sites, rest[0], "id")
+            if len(rest) == 1:
+                return 200, _apply_select(site, query.get("$select")), {}
+            if rest[1:] == ["drives"]:
+                return self._page(path, query, tenant.site_drives.get(site["id"], []))
+
+        elif head == "drives" and rest:
+            drive = tenant.drive(rest[0])
+            if drive is None:
+                raise _not_found("drive")
+            if rest[1:] == ["root"]:
+                root = {"id": f"{drive['id']}-root", "webUrl": drive.get("webUrl"), "sharepointIds": drive.get("sharepointIds") or {}}
+                return 200, _apply_select(root, query.get("$select")), {}
+            if rest[1:] == ["root", "delta"]:
+                return self._delta(drive["id"], path, query, tenant.drive_items.get(drive["id"], []))
+            if len(rest) == 4 and rest[1] == "items" and rest[3] == "permissions":
+                return self._page(path, query, tenant.permissions.get(f"{drive['id']}/{rest[2]}", []))
+
+        elif head == "copilot" and rest:
+            if rest[0] == "reports" and len(rest) == 2:
+                match = _REPORT_SEGMENT.match(rest[1])
+                if match and match.group(1) in tenant.reports:
+                    return 200, _report_csv(tenant.reports[match.group(1)]), {"Content-Type": "text/csv; charset=utf-8"}
+                raise _not_found("report")
+            if rest[0] == "users" and rest[2:] == ["interactionHistory", "getAllEnterpriseInteractions"]:
+                return self._page(path, query, tenant.interactions.get(rest[1], []))
+
+        raise _not_found(path)
+
+
+def _find(objects: list[Dict[str, Any]], key: str, *fields: str) -> Dict[str, Any]:
+    lowered = key.lower()
+    for obj in objects:
+        if any(str(obj.get(field) or "").lower() == lowered for field in fields):
+            return obj
+    raise _not_found(key)
+
+
+class ReplayBackend:
+    """Serves recorded responses by method and path+query; repeated requests walk the recording in order."""
+
+    def __init__(self, records: Iterable[Dict[str, Any]]):
+        self._responses: Dict[Tuple[str, str], list[Dict[str, Any]]] = {}
+        for record in records:
+            self._responses.setdefault((record["method"], record["path"]), []).append(record)
+        self._served: Counter = Counter()
+        self._lock = threading.Lock()
+        self.base_url = ""
+        self.misses = 0
+
+    @classmethod
+    def load(cls, path: str) -> "ReplayBackend":
+        with open(path, encoding="utf-8") as handle:
+            return cls(json.loads(line) for line in handle if line.strip())
+
+    def handle(self, method: str, path: str, query: Dict[str, str], body: Any) -> Response:
+        key = (method, _path_with_query(path, query))
+        with self._lock:
+            responses = self._responses.get(key)
+            if not responses:
+                self.misses += 1
+                return GraphRequestError(404, "replayMiss", f"No recorded response for {key[0]} {key[1]}").response()
+            record = responses[min(self._served[key], len(responses) - 1)]
+            self._served[key] += 1
+        text = record["body"].replace(BASE_PLACEHOLDER, self.base_url)
+        headers = dict(record.get("headers") or {})
+        if "json" in headers.get("Content-Type", "json"):
+            return record["status"], json.loads(text) if text else {}, headers
+        return record["status"], text, headers
+
+
+class RecordingBackend:
+    """Proxies to a real Graph base URL and appends every exchange to a JSONL file ReplayBackend reads."""
+
+    def __init__(self, upstream: str, out_path: str):
+        self.upstream = upstream.rstrip("/")
+        self.out_path = out_path
+        self.base_url = ""
+        self.authorization: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def handle(self, method: str, path: str, query: Dict[str, str], body: Any) -> Response:
+        relative = _path_with_query(path, query)
+        resp = requests.request(
+            method,
+            f"{self.upstream}{relative}",
+            headers={"Authorization": self.authorization or ""},
+            json=body,
+            timeout=(10, 120),
+        )
+        content_type = resp.headers.get("Content-Type", "application/json")
+        text = (resp.text or "").replace(self.upstream, BASE_PLACEHOLDER)
+        headers = {"Content-Type": content_type}
+        if resp.headers.get("Retry-After"):
+            headers["Retry-After"] = resp.headers["Retry-After"]
+        with self._lock, open(self.out_path, "a", encoding="utf-8") as handle:
+            record = {"method": method, "path": relative, "status": resp.status_code, "headers": headers, "body": text}
+            handle.write(json.dumps(record, separators=(",", ":")) + "\n")
+        text = text.replace(BASE_PLACEHOLDER, self.base_url)
+        if "json" in content_type:
+            return resp.status_code, json.loads(text) if text else {}, headers
+        return resp.status_code, text, headers
+
+
+def _path_with_query(path: str, query: Dict[str, str]) -> str:
+    return f"{path}?{urlencode(sorted(query.items()))}" if query else path
+
+
+class FakeGraphServer:
+    """HTTP front for a backend: bearer-token check, `$batch`, injected 429s and per-endpoint counts.
+
+    `throttle_every=N` answers every Nth request (batch sub-requests included) with 429 and
+    `Retry-After: retry_after`. Start with `start()` (background thread, port 0 picks a free port).
+    """
+
+    def __init__(
+        self,
+        backend,
+        *,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        token: Optional[str] = DEFAULT_TOKEN,
+        throttle_every: int = 0,
+        retry_after: int = 0,
+    ):
+        self.backend = backend
+        self.token = token
+        self.throttle_every = throttle_every
+        self.retry_after = retry_after
+        self.stats: Counter = Counter()
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), _handler_for(self))
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+        self.backend.base_url = self.base_url
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1.0"
+
+    def start(self) -> "FakeGraphServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-graph", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self._httpd.server_close()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def __enter__(self) -> "FakeGraphServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def request_counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.stats)
+
+    def reset_counts(self):
+        with self._lock:
+            self.stats.clear()
+
+    def dispatch(self, method: str, raw_path: str, body: Any) -> Response:
+        split = urlsplit(raw_path)
+        path = re.sub(r"^/(v1\.0|beta)(?=/|$)", "", split.path) or "/"
+        query = dict(parse_qsl(split.query, keep_blank_values=True))
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats[f"{method} {graph_endpoint_class(path)}"] += 1
+            throttled = self.throttle_every > 0 and self.stats["requests"] % self.throttle_every == 0
+            if throttled:
+                self.stats["throttled"] += 1
+        if throttled:
+            status, payload, _ = GraphRequestError(429, "TooManyRequests", "Throttled by the fake Graph").response()
+            return status, payload, {"Retry-After": str(self.retry_after)}
+        if method == "POST" and path == "/$batch":
+            return self._batch(body)
+        return self.backend.handle(method, path, query, body)
+
+    def _batch(self, body: Any) -> Response:
+        requests_in = (body or {}).get("requests") or []
+        if len(requests_in) > BATCH_MAX_REQUESTS:
+            return GraphRequestError(400, "BadRequest", f"A batch can hold at most {BATCH_MAX_REQUESTS} requests").response()
+        responses = []
+        for sub in requests_in:
+            url = str(sub.get("url") or "")
+            status, payload, headers = self.dispatch(str(sub.get("method") or "GET").upper(), url if url.startswith("/") else f"/{url}", sub.get("body"))
+            with self._lock:
+                self.stats["batch_subrequests"] += 1
+            responses.append({"id": sub.get("id"), "status": status, "headers": headers, "body": payload})
+        return 200, {"responses": responses}, {}
+
+
+def _handler_for(server: FakeGraphServer):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _serve(self, method: str):
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b""
+            body = json.loads(raw) if raw else None
+            authorization = self.headers.get("Authorization")
+            if isinstance(server.backend, RecordingBackend):
+                server.backend.authorization = authorization
+            elif server.token is not None and authorization != f"Bearer {server.token}":
+                self._send(*GraphRequestError(401, "InvalidAuthenticationToken", "Access token is missing or invalid").response())
+                return
+            self._send(*server.dispatch(method, self.path, body))
+
+        def _send(self, status: int, payload: Any, headers: Dict[str, str]):
+            headers = dict(headers)
+            if isinstance(payload, (dict, list)):
+                data = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+                headers.setdefault("Content-Type", "application/json")
+            else:
+                data = payload.encode("utf-8") if isinstance(payload, str) else (payload or b"")
+                headers.setdefault("Content-Type", "text/plain")
+            self.send_response(status)
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            self._serve("GET")
+
+        def do_POST(self):
+            self._serve("POST")
+
+        def do_PATCH(self):
+            self._serve("PATCH")
+
+        def do_DELETE(self):
+            self._serve("DELETE")
+
+    return Handler
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Serve a fake Microsoft Graph from fixtures or recordings.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    serve = sub.add_parser("serve", help="Serve a tenant fixture")
+    serve.add_argument("--tenant", required=True, help="Tenant fixture JSON")
+    serve.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE, help="Largest page returned")
+    serve.add_argument("--throttle-every", type=int, default=0, help="Answer every Nth request with 429")
+    serve.add_argument("--retry-after", type=int, default=0, help="Retry-After seconds on injected 429s")
+    serve.add_argument("--token", default=DEFAULT_TOKEN, help="Expected bearer token (GRAPH_STATIC_TOKEN)")
+
+    replay = sub.add_parser("replay", help="Serve responses captured with `record`")
+    replay.add_argument("--recording", required=True, help="JSONL written by `record`")
+    replay.add_argument("--token", default=DEFAULT_TOKEN)
+
+    record = sub.add_parser("record", help="Proxy a real Graph endpoint and capture every response")
+    record.add_argument("--upstream", default="https://graph.microsoft.com/v1.0")
+    record.add_argument("--out", required=True, help="JSONL file to append to")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    if args.mode == "serve":
+        backend = TenantBackend(FakeTenant.load(args.tenant), page_size=args.page_size)
+        server = FakeGraphServer(
+            backend,
+            host=args.host,
+            port=args.port,
+            token=args.token,
+            throttle_every=args.throttle_every,
+            retry_after=args.retry_after,
+        )
+    elif args.mode == "replay":
+        server = FakeGraphServer(ReplayBackend.load(args.recording), host=args.host, port=args.port, token=args.token)
+    else:
+        server = FakeGraphServer(RecordingBackend(args.upstream, args.out), host=args.host, port=args.port, token=None)
+    print(f"fake Graph listening: GRAPH_BASE={server.base_url} mode={args.mode}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(json.dumps(server.request_counts(), indent=2, sort_keys=True))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
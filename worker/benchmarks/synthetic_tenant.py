@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""Generate a synthetic tenant fixture for benchmarks/fake_graph.py.
+
+Ids are consistent across collections (item authors are tenant users, permissions grant tenant users
+and groups, group drives hang off group root sites), so every graph_ingest stage has real work.
+Only shared items get explicit permissions; the fake Graph answers other items with no permissions.
+"""
+
+import argparse
+import json
+import random
+import sys
+import uuid
+from pathlib import Path
+from typing import Any, Dict
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+DOMAIN = "contoso.com"
+SP_HOST = "contoso.sharepoint.com"
+MY_HOST = "contoso-my.sharepoint.com"
+DEPARTMENTS = ("Finance", "Legal", "Research", "Engineering", "Operations", "Admissions", "Athletics")
+ROLES = (["read"], ["write"], ["owner"])
+
+
+def add_tenant_args(parser: argparse.ArgumentParser):
+    group = parser.add_argument_group("synthetic tenant")
+    group.add_argument("--users", type=int, default=200)
+    group.add_argument("--groups", type=int, default=20)
+    group.add_argument("--members-per-group", type=int, default=15)
+    group.add_argument("--sites", type=int, default=10, help="Team sites, each with document libraries")
+    group.add_argument("--drives-per-site", type=int, default=1)
+    group.add_argument("--group-site-ratio", type=float, default=0.5, help="Share of groups that own a site and drive")
+    group.add_argument("--onedrive-ratio", type=float, default=0.5, help="Share of users with a OneDrive")
+    group.add_argument("--items-per-drive", type=int, default=200)
+    group.add_argument("--folder-ratio", type=float, default=0.1)
+    group.add_argument("--max-depth", type=int, default=5)
+    group.add_argument("--sharing-density", type=float, default=0.1, help="Share of items with explicit sharing")
+    group.add_argument("--permission-fanout", type=int, default=3, help="Direct grants per shared item")
+    group.add_argument("--seed", type=int, default=7)
+
+
+def tenant_params(args: argparse.Namespace) -> Dict[str, Any]:
+    keys = (
+        "users",
+        "groups",
+        "members_per_group",
+        "sites",
+        "drives_per_site",
+        "group_site_ratio",
+        "onedrive_ratio",
+        "items_per_drive",
+        "folder_ratio",
+        "max_depth",
+        "sharing_density",
+        "permission_fanout",
+        "seed",
+    )
+    return {key: getattr(args, key) for key in keys}
+
+
+def _guid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _user(idx: int, rng: random.Random) -> Dict[str, Any]:
+    upn = f"user{idx}@{DOMAIN}"
+    return {
+        "id": _guid(rng),
+        "displayName": f"User {idx:06d}",
+        "userPrincipalName": upn,
+        "mail": upn,
+        "accountEnabled": rng.random() > 0.03,
+        "userType": "Member" if rng.random() > 0.05 else "Guest",
+        "department": rng.choice(DEPARTMENTS),
+        "jobTitle": "Staff",
+        "createdDateTime": "2024-01-15T09:00:00Z",
+    }
+
+
+def _identity(user: Dict[str, Any]) -> Dict[str, Any]:
+    return {"user": {"id": user["id"], "email": user["mail"], "displayName": user["displayName"]}}
+
+
+def _site(name: str, url: str, rng: random.Random) -> Dict[str, Any]:
+    return {
+        "id": f"{SP_HOST},{_guid(rng)},{_guid(rng)}",
+        "name": name,
+        "displayName": name,
+        "webUrl": url,
+        "createdDateTime": "2024-02-01T00:00:00Z",
+        "lastModifiedDateTime": "2026-09-30T12:00:00Z",
+        "siteCollection": {"hostname": SP_HOST},
+    }
+
+
+def _drive(drive_type: str, web_url: str, owner: Dict[str, Any], site_id: str, rng: random.Random) -> Dict[str, Any]:
+    _, site_guid, web_guid = (site_id.split(",") + ["", ""])[:3]
+    return {
+        "id": f"b!{_guid(rng).replace('-', '')}",
+        "name": "Documents" if drive_type == "documentLibrary" else "OneDrive",
+        "driveType": drive_type,
+        "webUrl": web_url,
+        "createdDateTime": "2024-02-01T00:00:00Z",
+        "lastModifiedDateTime": "2026-09-30T12:00:00Z",
+        "owner": owner,
+        "quota": {"total": 1 << 40, "used": rng.randrange(1 << 30), "remaining": 1 << 39, "deleted": 0, "state": "normal"},
+        "sharepointIds": {"siteId": site_guid, "webId": web_guid, "siteUrl": web_url.rsplit("/", 1)[0]},
+    }
+
+
+def _items(drive: Dict[str, Any], users: list, params: Dict[str, Any], rng: random.Random) -> list:
+    folders = [("root", "/drive/root:")]
+    items = []
+    for idx in range(params["items_per_drive"]):
+        parent_id, parent_path = rng.choice(folders)
+        author = rng.choice(users)
+        editor = rng.choice(users)
+        is_folder = rng.random() < params["folder_ratio"] and parent_path.count("/") <= params["max_depth"] + 1
+        item_id = f"01{drive['id'][-8:].upper()}{idx:010d}"
+        name = f"Folder {idx}" if is_folder else f"Document {idx}.docx"
+        item = {
+            "id": item_id,
+            "name": name,
+            "webUrl": f"{drive['webUrl']}{parent_path[len('/drive/root:'):]}/{name.replace(' ', '%20')}",
+            "size": 0 if is_folder else rng.randrange(1, 50_000_000),
+            "createdDateTime": "2025-11-03T10:15:00Z",
+            "lastModifiedDateTime": "2026-09-17T08:42:11Z",
+            "eTag": f'"{{{_guid(rng).upper()}}},1"',
+            "cTag": f'"c:{{{_guid(rng).upper()}}},1"',
+            "parentReference": {"driveId": drive["id"], "driveType": drive["driveType"], "id": parent_id, "path": parent_path},
+            "createdBy": _identity(author),
+            "lastModifiedBy": _identity(editor),
+            "fileSystemInfo": {"createdDateTime": "2025-11-03T10:15:00Z", "lastModifiedDateTime": "2026-09-17T08:42:11Z"},
+        }
+        if is_folder:
+            item["folder"] = {"childCount": 0}
+            folders.append((item_id, f"{parent_path}/{name}"))
+        else:
+            item["file"] = {"mimeType": "application/vnd.openxmlformats", "hashes": {"quickXorHash": f"{idx:028x}"}}
+        items.append(item)
+    return items
+
+
+def _permissions(item: Dict[str, Any], users: list, groups: list, params: Dict[str, Any], rng: random.Random) -> list:
+    permissions = []
+    for idx in range(params["permission_fanout"]):
+        roll = rng.random()
+        permission: Dict[str, Any] = {"id": f"perm-{item['id']}-{idx}", "roles": rng.choice(ROLES)}
+        if roll < 0.6:
+            permission["grantedToV2"] = _identity(rng.choice(users))
+        elif roll < 0.85 and groups:
+            group = rng.choice(groups)
+            permission["grantedToV2"] = {"group": {"id": group["id"], "displayName": group["displayName"], "email": group["mail"]}}
+        else:
+            scope = rng.choice(("organization", "anonymous", "users"))
+            permission["link"] = {"type": rng.choice(("view", "edit")), "scope": scope, "webUrl": f"https://{SP_HOST}/:w:/s/{_guid(rng)}"}
+            if scope == "users":
+                permission["grantedToIdentitiesV2"] = [_identity(rng.choice(users)) for _ in range(rng.randint(1, 3))]
+        permissions.append(permission)
+    return permissions
+
+
+def generate_tenant(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Build a fake_graph tenant fixture from `tenant_params(...)`-shaped sizes; deterministic per seed."""
+    rng = random.Random(params["seed"])
+    users = [_user(idx, rng) for idx in range(max(1, params["users"]))]
+    groups = []
+    group_members: Dict[str, list] = {}
+    for idx in range(params["groups"]):
+        group = {
+            "id": _guid(rng),
+            "displayName": f"Group {idx:05d}",
+            "mail": f"group{idx}@{DOMAIN}",
+            "mailEnabled": True,
+            "securityEnabled": rng.random() < 0.5,
+            "groupTypes": ["Unified"],
+            "visibility": rng.choice(("Private", "Public")),
+            "createdDateTime": "2024-03-01T00:00:00Z",
+        }
+        groups.append(group)
+        members = rng.sample(users, min(len(users), params["members_per_group"]))
+        group_members[group["id"]] = [
+            {"id": user["id"], "displayName": user["displayName"], "userPrincipalName": user["userPrincipalName"], "mail": user["mail"], "@odata.type": "#microsoft.graph.user"}
+            for user in members
+        ]
+
+    sites, site_drives, group_drives, user_drives, group_sites = [], {}, {}, {}, {}
+    for idx in range(params["sites"]):
+        site = _site(f"Site {idx}", f"https://{SP_HOST}/sites/site{idx}", rng)
+        sites.append(site)
+        site_drives[site["id"]] = [
+            _drive("documentLibrary", f"{site['webUrl']}/Shared%20Documents{'' if n == 0 else n}", _identity(rng.choice(users)), site["id"], rng)
+            for n in range(params["drives_per_site"])
+        ]
+    for idx, group in enumerate(groups[: int(len(groups) * params["group_site_ratio"])]):
+        site = _site(group["displayName"], f"https://{SP_HOST}/sites/group{idx}", rng)
+        sites.append(site)
+        group_sites[group["id"]] = site["id"]
+        drive = _drive("documentLibrary", f"{site['webUrl']}/Shared%20Documents", {"group": {"id": group["id"], "displayName": group["displayName"]}}, site["id"], rng)
+        site_drives[site["id"]] = [drive]
+        group_drives[group["id"]] = [drive]
+    for user in users[: int(len(users) * params["onedrive_ratio"])]:
+        personal = f"https://{MY_HOST}/personal/{user['userPrincipalName'].replace('@', '_').replace('.', '_')}"
+        user_drives[user["id"]] = [_drive("business", f"{personal}/Documents", _identity(user), f"{MY_HOST},{_guid(rng)},{_guid(rng)}", rng)]
+
+    drive_items, permissions = {}, {}
+    all_drives = {drive["id"]: drive for mapping in (site_drives, group_drives, user_drives) for drives in mapping.values() for drive in drives}
+    for drive in all_drives.values():
+        items = _items(drive, users, params, rng)
+        drive_items[drive["id"]] = items
+        for item in items:
+            if rng.random() < params["sharing_density"]:
+                item["shared"] = {"scope": "users"}
+                permissions[f"{drive['id']}/{item['id']}"] = _permissions(item, users, groups, params, rng)
+
+    return {
+        "users": users,
+        "groups": groups,
+        "group_members": group_members,
+        "sites": sites,
+        "site_drives": site_drives,
+        "group_drives": group_drives,
+        "user_drives": user_drives,
+        "group_sites": group_sites,
+        "drive_items": drive_items,
+        "permissions": permissions,
+    }
+
+
+def tenant_counts(tenant: Dict[str, Any]) -> Dict[str, int]:
+    drives = {drive["id"] for key in ("site_drives", "group_drives", "user_drives") for drives in tenant[key].values() for drive in drives}
+    return {
+        "users": len(tenant["users"]),
+        "groups": len(tenant["groups"]),
+        "memberships": sum(len(members) for members in tenant["group_members"].values()),
+        "sites": len(tenant["sites"]),
+        "drives": len(drives),
+        "drive_items": sum(len(items) for items in tenant["drive_items"].values()),
+        "shared_items": len(tenant["permissions"]),
+        "permissions": sum(len(perms) for perms in tenant["permissions"].values()),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Write a synthetic tenant fixture for benchmarks/fake_graph.py.")
+    parser.add_argument("--out", required=True, help="Fixture JSON path")
+    add_tenant_args(parser)
+    args = parser.parse_args()
+    tenant = generate_tenant(tenant_params(args))
+    Path(args.out).write_text(json.dumps(tenant, separators=(",", ":")), encoding="utf-8")
+    print(json.dumps(tenant_counts(tenant), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
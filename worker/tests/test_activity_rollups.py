@@ -0,0 +1,169 @@
+import sys
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.jobs import activity_rollups
+
+
+class FakeCursor:
+    def __init__(self, claim_counts=None, mismatch_rows=None, locked=True):
+        # claim_counts: per bucket, the rowcounts successive claim statements report.
+        self.claim_counts = {bucket: list(counts) for bucket, counts in (claim_counts or {}).items()}
+        self.mismatch_rows = mismatch_rows or {}
+        self.locked = locked
+        self.executed = []
+        self.rowcount = 0
+        self._fetchall = []
+
+    def execute(self, sql, params=None):
+        normalized = " ".join(sql.split())
+        self.executed.append((normalized, params))
+        self.rowcount = 0
+        self._fetchall = []
+        if normalized.startswith("SELECT pg_try_advisory_lock") or normalized.startswith("SELECT pg_advisory_unlock"):
+            self._fetchall = [(self.locked,)]
+        elif normalized.startswith("WITH claimed AS ( DELETE FROM activity_rollup_dirty_drives"):
+            counts = self.claim_counts.get("drives", [])
+            self.rowcount = counts.pop(0) if counts else 0
+        elif normalized.startswith("WITH claimed AS ( DELETE FROM activity_rollup_dirty_"):
+            bucket = normalized.split("activity_rollup_dirty_", 1)[1].split(" ", 1)[0]
+            counts = self.claim_counts.get(bucket, [])
+            self.rowcount = counts.pop(0) if counts else 0
+        elif normalized.startswith("WITH mismatched AS"):
+            bucket = normalized.split("INSERT INTO activity_rollup_dirty_", 1)[1].split(" ", 1)[0]
+            rows = self.mismatch_rows.get(bucket, [])
+            self._fetchall = [row + (len(rows),) for row in rows[:20]]
+
+    def fetchone(self):
+        return self._fetchall[0] if self._fetchall else None
+
+    def fetchall(self):
+        return list(self._fetchall)
+
+
+class FakeConnection:
+    def __init__(self, cursor):
+        self.cursor_obj = cursor
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        return self.cursor_obj
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        pass
+
+
+def _statements(cur, prefix):
+    return [sql for sql, _params in cur.executed if sql.startswith(prefix)]
+
+
+@patch("app.db.emit")
+@patch("app.jobs.activity_rollups.emit")
+class ApplyActivityRollupChangesTests(unittest.TestCase):
+    @patch("app.jobs.activity_rollups.db.get_conn")
+    def test_recomputes_only_claimed_buckets_until_backlog_drains(self, mock_get_conn, _mock_emit, _mock_db_emit):
+        cur = FakeCursor(
+            claim_counts={"drives": [1, 0], "site_days": [2, 1], "user_days": [0, 0], "items": [2, 0]}
+        )
+        mock_get_conn.return_value = FakeConnection(cur)
+
+        summary = activity_rollups.apply_activity_rollup_changes(batch_size=2)
+
+        self.assertEqual(summary, {"passes": 2, "drives": 1, "site_days": 3, "user_days": 0, "items": 2})
+        # A changed drive is expanded into its buckets once, in the pass that claimed it.
+        self.assertEqual(len(_statements(cur, "INSERT INTO activity_rollup_dirty_site_days")), 1)
+        self.assertEqual(len(_statements(cur, "DELETE FROM msgraph_site_activity_daily")), 2)
+        self.assertEqual(len(_statements(cur, "INSERT INTO msgraph_site_activity_daily")), 2)
+        self.assertEqual(_statements(cur, "DELETE FROM msgraph_user_activity_daily"), [])
+        self.assertEqual(len(_statements(cur, "INSERT INTO msgraph_item_link_daily")), 1)
+        claim_params = [params for sql, params in cur.executed if "activity_rollup_dirty_site_days LIMIT" in sql]
+        self.assertEqual(claim_params, [[2], [2]])
+        stamp = [params for sql, params in cur.executed if sql.startswith("INSERT INTO mv_refresh_log")]
+        self.assertEqual(stamp, [[list(activity_rollups.ROLLUP_TABLES)]])
+
+    @patch("app.jobs.activity_rollups.db.get_conn")
+    def test_skips_when_another_apply_holds_the_lock(self, mock_get_conn, _mock_emit, _mock_db_emit):
+        cur = FakeCursor(locked=False)
+        mock_get_conn.return_value = FakeConnection(cur)
+
+        summary = activity_rollups.apply_activity_rollup_changes()
+
+        self.assertEqual(summary, {"skipped": True, "reason": "locked"})
+        self.assertEqual(_statements(cur, "WITH claimed AS"), [])
+
+    def test_recompute_sql_matches_source_view_filters(self, _mock_emit, _mock_db_emit):
+        for bucket, (_delete_sql, insert_sql) in activity_rollups._RECOMPUTE_SQL.items():
+            with self.subTest(bucket=bucket):
+                normalized = " ".join(insert_sql.split())
+                self.assertIn("d.deleted_at IS NULL", normalized)
+                self.assertIn("NOT LIKE '%cachelibrary%'", normalized)
+                self.assertIn("activity_rollup_claimed_", normalized)
+
+
+class ReconcileTests(unittest.TestCase):
+    @patch("app.jobs.activity_rollups.log_audit_event")
+    @patch("app.jobs.activity_rollups.log_job_run_log")
+    @patch("app.jobs.activity_rollups.emit")
+    @patch("app.jobs.activity_rollups.apply_activity_rollup_changes", return_value={"passes": 1})
+    @patch("app.jobs.activity_rollups.db.fetch_one")
+    @patch("app.jobs.activity_rollups.db.get_conn")
+    def test_marks_mismatched_buckets_and_repairs(
+        self, mock_get_conn, mock_fetch_one, mock_apply, _mock_emit, _mock_log_job_run_log, _mock_audit
+    ):
+        already_dirty = [(f"site-{idx}", "2026-03-01") for idx in range(25)]
+        cur = FakeCursor(mismatch_rows={"site_days": already_dirty, "items": [("drive-1", "item-9")]})
+        conn = FakeConnection(cur)
+        mock_get_conn.return_value = conn
+        mock_fetch_one.return_value = {"config": {"window_days": 30}}
+
+        summary = activity_rollups.run_activity_rollup_reconcile(run_id="run-1", job_id="job-1")
+
+        self.assertEqual(summary["mismatches"], {"site_days": 25, "user_days": 0, "items": 1})
+        self.assertEqual(len(summary["mismatch_samples"]["site_days"]), 20)
+        self.assertEqual(summary["mismatch_samples"]["items"], [["drive-1", "item-9"]])
+        # Counted from the comparison itself, not from the rows the ON CONFLICT insert added.
+        self.assertTrue(all("RETURNING" not in sql for sql, _params in cur.executed))
+        self.assertEqual(summary["applied"], {"passes": 1})
+        self.assertEqual(conn.commits, 1)
+        cutoffs = [params["cutoff"] for _sql, params in cur.executed]
+        self.assertTrue(all(cutoff is not None for cutoff in cutoffs))
+        mock_apply.assert_called_once_with()
+
+    @patch("app.jobs.activity_rollups.log_audit_event")
+    @patch("app.jobs.activity_rollups.log_job_run_log")
+    @patch("app.jobs.activity_rollups.emit")
+    @patch("app.jobs.activity_rollups.apply_activity_rollup_changes")
+    @patch("app.jobs.activity_rollups.db.fetch_one")
+    @patch("app.jobs.activity_rollups.db.get_conn")
+    def test_report_only_mode_rolls_back_marks(
+        self, mock_get_conn, mock_fetch_one, mock_apply, _mock_emit, _mock_log_job_run_log, _mock_audit
+    ):
+        cur = FakeCursor(mismatch_rows={"user_days": [("user-1", "2026-03-01")]})
+        conn = FakeConnection(cur)
+        mock_get_conn.return_value = conn
+        mock_fetch_one.return_value = {"config": {"repair": False}}
+
+        summary = activity_rollups.run_activity_rollup_reconcile(run_id="run-1", job_id="job-1")
+
+        self.assertEqual(summary["mismatches"]["user_days"], 1)
+        self.assertIsNone(summary["applied"])
+        self.assertEqual((conn.commits, conn.rollbacks), (0, 1))
+        self.assertTrue(all(params["cutoff"] is None for _sql, params in cur.executed))
+        mock_apply.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+import sys
+import unittest
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from benchmarks import bench_ingest_functions
+
+
+class IngestFunctionBenchmarkTests(unittest.TestCase):
+    def test_every_case_runs_on_a_small_tenant(self):
+        args = bench_ingest_functions.parse_args(
+            ["--users", "10", "--groups", "2", "--sites", "1", "--items-per-drive", "10", "--errors", "12", "--repeat", "1"]
+        )
+
+        report = bench_ingest_functions.run(args)
+
+        names = [row["case"] for row in report["results"]]
+        self.assertEqual(names, [name for name, _rows, _fn in bench_ingest_functions.cases(bench_ingest_functions.build_fixtures(args))])
+        self.assertIn("classify_permission_sync_error", names)
+        self.assertTrue(all(row["rows"] > 0 for row in report["results"]))
+
+    def test_fixtures_mix_in_non_user_identities_and_legacy_permissions(self):
+        args = bench_ingest_functions.parse_args(["--users", "20", "--items-per-drive", "50", "--sharing-density", "0.5"])
+
+        fx = bench_ingest_functions.build_fixtures(args)
+
+        self.assertTrue(any(isinstance(identity, dict) and "application" in identity for identity in fx["identities"]))
+        self.assertTrue(any("grantedTo" in permission for permission in fx["permissions"]))
+        self.assertTrue(any("inheritedFrom" in permission for permission in fx["permissions"]))
+        self.assertLess(len({row[0] for row in fx["drive_rows"]}), len(fx["drive_rows"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
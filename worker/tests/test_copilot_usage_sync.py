@@ -247,6 +247,8 @@ class CopilotUsageSyncTests(unittest.TestCase):
         self.assertNotIn("synced_at", insert_columns)
         self.assertIn("synced_at = now()", query)
 
+    @patch("app.jobs.copilot_usage_sync._clear_interaction_resume_after")
+    @patch("app.jobs.copilot_usage_sync._load_interaction_resume_after", return_value=None)
     @patch("app.jobs.copilot_usage_sync.log_job_run_log")
     @patch("app.jobs.copilot_usage_sync._upsert_sync_state")
     @patch("app.jobs.copilot_usage_sync._replace_interaction_aggregates")
@@ -263,6 +265,8 @@ class CopilotUsageSyncTests(unittest.TestCase):
         mock_replace_interactions,
         mock_upsert_state,
         _mock_log,
+        _mock_load_resume,
+        mock_clear_resume,
     ):
         fake_client = FakeGraphClient()
         mock_graph_client_class.return_value = fake_client
@@ -299,6 +303,40 @@ class CopilotUsageSyncTests(unittest.TestCase):
         self.assertNotIn("$filter=", interaction_paths[0])
         mock_upsert_state.assert_called_once()
         self.assertEqual(mock_upsert_state.call_args.kwargs["prompt_count"], 2)
+        mock_clear_resume.assert_called_once()
+
+    @patch("app.jobs.copilot_usage_sync._save_interaction_resume_after")
+    @patch("app.jobs.copilot_usage_sync._load_interaction_resume_after", return_value=None)
+    @patch("app.jobs.copilot_usage_sync.stop_requested", return_value="deadline_exceeded")
+    @patch("app.jobs.copilot_usage_sync.log_job_run_log")
+    @patch("app.jobs.copilot_usage_sync._upsert_sync_state")
+    @patch("app.jobs.copilot_usage_sync._replace_interaction_aggregates")
+    @patch("app.jobs.copilot_usage_sync._upsert_report_data")
+    @patch("app.jobs.copilot_usage_sync._resolve_user")
+    @patch("app.jobs.copilot_usage_sync.GraphClient")
+    @patch("app.jobs.copilot_usage_sync._load_job_config", return_value={"interaction_mode": "window", "interaction_page_size": 100})
+    def test_stopped_run_saves_resume_cursor_and_keeps_sync_state(
+        self,
+        _mock_config,
+        mock_graph_client_class,
+        mock_resolve_user,
+        _mock_upsert_reports,
+        mock_replace_interactions,
+        mock_upsert_state,
+        mock_log,
+        _mock_stop,
+        _mock_load_resume,
+        mock_save_resume,
+    ):
+        mock_graph_client_class.return_value = FakeGraphClient()
+
+        copilot_usage_sync.run_copilot_usage_sync(run_id="run-1", job_id="job-1")
+
+        mock_resolve_user.assert_not_called()
+        self.assertTrue(mock_replace_interactions.call_args.kwargs["processed_users_only"])
+        mock_upsert_state.assert_not_called()
+        self.assertEqual(mock_save_resume.call_args.kwargs["reason"], "deadline_exceeded")
+        self.assertEqual(mock_log.call_args.kwargs["message"], "copilot_usage_sync_stopped")
 
     def test_windowed_interaction_mode_keeps_created_datetime_filter(self):
         client = FakeGraphClient()
@@ -0,0 +1,136 @@
+import sys
+import unittest
+from contextvars import copy_context
+from pathlib import Path
+from unittest.mock import patch
+
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import db
+from app.jobs import graph_ingest
+
+
+class NamedCursor:
+    def __init__(self, conn, name, withhold, rows, close_error=None):
+        self.conn = conn
+        self.name = name
+        self.withhold = withhold
+        self.rows = rows
+        self.close_error = close_error
+        self.itersize = 2000
+        self.executed = []
+        self.closed = False
+
+    def execute(self, sql, params=None):
+        self.executed.append((" ".join(sql.split()), params))
+        self.conn.events.append("execute")
+
+    def __iter__(self):
+        for row in self.rows:
+            self.conn.events.append("fetch")
+            yield row
+
+    def close(self):
+        self.closed = True
+        if self.close_error:
+            raise self.close_error
+
+
+class StreamConnection:
+    def __init__(self, rows, close_error=None):
+        self.rows = rows
+        self.close_error = close_error
+        self.cursors = []
+        self.events = []
+
+    def cursor(self, name=None, withhold=False):
+        cur = NamedCursor(self, name, withhold, self.rows, self.close_error)
+        self.cursors.append(cur)
+        return cur
+
+    def commit(self):
+        self.events.append("commit")
+
+
+class StreamRowsTests(unittest.TestCase):
+    def test_streams_through_named_cursor_and_closes_it(self):
+        conn = StreamConnection([(1,), (2,), (3,)])
+
+        rows = list(db.stream_rows(conn, "scan", "SELECT id FROM t WHERE x = %s", [5], itersize=2))
+
+        self.assertEqual(rows, [(1,), (2,), (3,)])
+        cur = conn.cursors[0]
+        self.assertEqual((cur.name, cur.withhold, cur.itersize), ("scan", False, 2))
+        self.assertEqual(cur.executed, [("SELECT id FROM t WHERE x = %s", [5])])
+        self.assertNotIn("commit", conn.events)
+        self.assertTrue(cur.closed)
+
+    def test_withhold_commits_before_the_first_row(self):
+        conn = StreamConnection([(1,), (2,)])
+
+        rows = list(db.stream_rows(conn, "scan", "SELECT id FROM t", withhold=True))
+
+        self.assertEqual(rows, [(1,), (2,)])
+        self.assertTrue(conn.cursors[0].withhold)
+        self.assertEqual(conn.events, ["execute", "commit", "fetch", "fetch"])
+
+    def test_abandoned_stream_closes_cursor_and_ignores_close_errors(self):
+        conn = StreamConnection([(1,), (2,)], close_error=db.psycopg2.InterfaceError("connection already closed"))
+
+        rows = db.stream_rows(conn, "scan", "SELECT id FROM t")
+        self.assertEqual(next(rows), (1,))
+        rows.close()
+
+        self.assertTrue(conn.cursors[0].closed)
+
+
+class StreamIdsAfterTests(unittest.TestCase):
+    def test_orders_by_id_without_resume_point(self):
+        conn = StreamConnection([("a",), ("b",)])
+
+        ids = list(graph_ingest._stream_ids_after(conn, "ids", "SELECT id FROM msgraph_groups WHERE deleted_at IS NULL", None))
+
+        self.assertEqual(ids, [("a",), ("b",)])
+        cur = conn.cursors[0]
+        self.assertTrue(cur.withhold)
+        self.assertEqual(cur.executed, [("SELECT id FROM msgraph_groups WHERE deleted_at IS NULL ORDER BY id", None)])
+
+    def test_resume_point_orders_later_ids_first(self):
+        conn = StreamConnection([])
+
+        list(graph_ingest._stream_ids_after(conn, "ids", "SELECT id FROM msgraph_groups WHERE deleted_at IS NULL", "g-5"))
+
+        self.assertEqual(
+            conn.cursors[0].executed,
+            [("SELECT id FROM msgraph_groups WHERE deleted_at IS NULL ORDER BY id <= %s, id", ["g-5"])],
+        )
+
+
+class DeferredInvalidationTests(unittest.TestCase):
+    @patch("app.db.DB_URL", "postgresql://worker")
+    @patch("app.db.psycopg2.connect")
+    def test_only_connections_opened_inside_the_block_defer_invalidation(self, mock_connect):
+        db.get_conn()
+        with db.deferred_mv_invalidation():
+            db.get_conn()
+            copy_context().run(db.get_conn)
+        db.get_conn()
+
+        options = [call.kwargs.get("options") for call in mock_connect.call_args_list]
+        deferred = "-c sentinel.defer_mv_invalidation=on"
+        self.assertEqual(options, [None, deferred, deferred, None])
+
+
+class PersonalSiteTests(unittest.TestCase):
+    def test_precomputed_personal_flag_is_honoured(self):
+        self.assertTrue(graph_ingest._is_personal_site({"id": "s", "hostname": "contoso.sharepoint.com", "is_personal_site": True}))
+        self.assertFalse(
+            graph_ingest._is_personal_site({"id": "s", "hostname": "contoso.sharepoint.com", "web_url": "", "is_personal_site": False})
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
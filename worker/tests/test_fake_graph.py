@@ -0,0 +1,156 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import requests
+
+from app.graph_client import GraphClient, GraphError
+from benchmarks.fake_graph import DEFAULT_TOKEN, FakeGraphServer, FakeTenant, ReplayBackend, TenantBackend
+
+
+def _tenant() -> FakeTenant:
+    return FakeTenant(
+        {
+            "users": [
+                {"id": f"user-{idx}", "displayName": f"User {idx:02d}", "userPrincipalName": f"user{idx}@contoso.com"}
+                for idx in range(5)
+            ],
+            "groups": [{"id": "group-1", "displayName": "Finance"}],
+            "group_members": {"group-1": [{"id": "user-1", "@odata.type": "#microsoft.graph.user"}]},
+            "sites": [{"id": "site-1", "webUrl": "https://contoso.sharepoint.com/sites/hr", "displayName": "HR"}],
+            "site_drives": {"site-1": [{"id": "drive-1", "driveType": "documentLibrary", "webUrl": "https://contoso.sharepoint.com/sites/hr/Docs"}]},
+            "drive_items": {"drive-1": [{"id": f"item-{idx}", "name": f"Doc {idx}.docx"} for idx in range(3)]},
+            "reports": {"getMicrosoft365CopilotUsageUserDetail": [{"User Principal Name": "user1@contoso.com", "Report Period": "7"}]},
+            "interactions": {
+                "user-1": [
+                    {"id": "i-1", "interactionType": "userPrompt", "createdDateTime": "2026-10-01T00:00:00Z"},
+                    {"id": "i-2", "interactionType": "userPrompt", "createdDateTime": "2026-10-10T00:00:00Z"},
+                ]
+            },
+        }
+    )
+
+
+class FakeGraphServerTests(unittest.TestCase):
+    def setUp(self):
+        self.tenant = _tenant()
+        self.server = FakeGraphServer(TenantBackend(self.tenant, page_size=2)).start()
+        env = {"GRAPH_BASE": self.server.base_url, "GRAPH_STATIC_TOKEN": DEFAULT_TOKEN, "GRAPH_MAX_RETRIES": "2"}
+        with patch.dict(os.environ, env):
+            self.client = GraphClient()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_paging_select_and_filter(self):
+        users = self.client.collect_paged("/users?$select=id,displayName&$top=999")
+        self.assertEqual([user["id"] for user in users], [f"user-{idx}" for idx in range(5)])
+        self.assertNotIn("userPrincipalName", users[0])
+        self.assertEqual(self.server.request_counts()["GET /users"], 3)
+
+        low = self.client.collect_paged("/users?$filter=displayName le 'User 01'")
+        self.assertEqual([user["id"] for user in low], ["user-0", "user-1"])
+        with self.assertRaises(GraphError) as ctx:
+            self.client.get_json("/users?$filter=startswith(displayName,'U')")
+        self.assertEqual(ctx.exception.status_code, 400)
+
+    def test_delta_round_then_incremental_changes_and_expiry(self):
+        def round_from(url):
+            items, delta_link = [], None
+            while url:
+                data = self.client.get_json(url)
+                items.extend(data["value"])
+                url = data.get("@odata.nextLink")
+                delta_link = data.get("@odata.deltaLink") or delta_link
+            return items, delta_link
+
+        items, delta_link = round_from("/drives/drive-1/root/delta?$top=200")
+        self.assertEqual(len(items), 3)
+        self.assertEqual(round_from(delta_link)[0], [])
+
+        self.tenant.upsert_item("drive-1", {"id": "item-9", "name": "New.docx"})
+        self.tenant.delete_item("drive-1", "item-0")
+        changes, delta_link = round_from(delta_link)
+        self.assertEqual(changes, [{"id": "item-9", "name": "New.docx"}, {"id": "item-0", "deleted": {"state": "deleted"}}])
+
+        self.tenant.expire_delta("drive-1")
+        with self.assertRaises(GraphError) as ctx:
+            self.client.get_json(delta_link)
+        self.assertEqual(ctx.exception.status_code, 410)
+        self.assertIn("resyncRequired", ctx.exception.response_text)
+
+    @patch("app.graph_client.time.sleep")
+    def test_throttled_requests_are_retried(self, mock_sleep):
+        self.server.throttle_every = 2
+        self.server.retry_after = 3
+
+        sites = self.client.collect_paged("/sites?search=*")
+        site = self.client.get_json("/sites/contoso.sharepoint.com:/sites/hr?$select=id,webUrl")
+
+        self.assertEqual([s["id"] for s in sites], ["site-1"])
+        self.assertEqual(site, {"id": "site-1", "webUrl": "https://contoso.sharepoint.com/sites/hr"})
+        self.assertEqual(self.server.request_counts()["throttled"], 1)
+        mock_sleep.assert_called_once_with(3.0)
+
+    def test_batch(self):
+        response = self.client.request_json(
+            "POST",
+            "/$batch",
+            json={"requests": [{"id": "1", "method": "GET", "url": "/groups/group-1"}, {"id": "2", "method": "GET", "url": "/users/nobody"}]},
+        )
+
+        by_id = {item["id"]: item for item in response["responses"]}
+        self.assertEqual(by_id["1"]["status"], 200)
+        self.assertEqual(by_id["1"]["body"]["displayName"], "Finance")
+        self.assertEqual(by_id["2"]["status"], 404)
+        self.assertEqual(self.server.request_counts()["batch_subrequests"], 2)
+
+    def test_copilot_report_and_interaction_endpoints(self):
+        text = self.client.get_text("/copilot/reports/getMicrosoft365CopilotUsageUserDetail(period='D7')")
+        interactions = self.client.collect_paged(
+            "/copilot/users/user-1/interactionHistory/getAllEnterpriseInteractions?$top=100"
+            "&$filter=createdDateTime gt 2026-10-05T00:00:00Z and createdDateTime lt 2026-10-19T00:00:00Z"
+        )
+
+        self.assertTrue(text.lstrip("\ufeff").startswith("User Principal Name,Report Period"))
+        self.assertEqual([item["id"] for item in interactions], ["i-2"])
+
+    def test_wrong_token_is_rejected(self):
+        response = requests.get(f"{self.server.base_url}/users", headers={"Authorization": "Bearer other"}, timeout=5)
+        self.assertEqual(response.status_code, 401)
+
+
+class ReplayBackendTests(unittest.TestCase):
+    def test_replays_recorded_responses_in_order_with_local_links(self):
+        records = [
+            {"method": "GET", "path": "/users?%24top=1", "status": 200, "headers": {"Content-Type": "application/json"},
+             "body": json.dumps({"value": [{"id": "u1"}], "@odata.nextLink": "{GRAPH_BASE}/users?%24skiptoken=a&%24top=1"})},
+            {"method": "GET", "path": "/users?%24skiptoken=a&%24top=1", "status": 200, "headers": {"Content-Type": "application/json"},
+             "body": json.dumps({"value": [{"id": "u2"}]})},
+        ]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "recording.jsonl")
+            with open(path, "w", encoding="utf-8") as handle:
+                handle.write("\n".join(json.dumps(record) for record in records))
+            backend = ReplayBackend.load(path)
+
+        with FakeGraphServer(backend) as server, patch.dict(
+            os.environ, {"GRAPH_BASE": server.base_url, "GRAPH_STATIC_TOKEN": DEFAULT_TOKEN}
+        ):
+            users = GraphClient().collect_paged("/users?$top=1")
+
+        self.assertEqual([user["id"] for user in users], ["u1", "u2"])
+        self.assertEqual(backend.misses, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import sys
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import db, flush_sizing
+from app.flush_sizing import FlushSizer
+
+
+class FlushSizerTests(unittest.TestCase):
+    def _sizer(self, **overrides):
+        options = {"target_seconds": 0.5, "max_bytes": 1_000_000, "min_rows": 50, "max_rows": 10_000}
+        options.update(overrides)
+        return FlushSizer(500, **options)
+
+    def test_fast_narrow_writes_grow_at_most_doubling_per_flush(self):
+        sizer = self._sizer()
+        # 500 rows in 0.05s: 5000 rows would hit the 0.5s target.
+        sizer.observe("msgraph_group_memberships", rows=500, seconds=0.05, nbytes=500 * 80)
+        self.assertEqual(sizer.size("msgraph_group_memberships"), 1000)
+        sizer.observe("msgraph_group_memberships", rows=1000, seconds=0.1, nbytes=1000 * 80)
+        sizer.observe("msgraph_group_memberships", rows=2000, seconds=0.2, nbytes=2000 * 80)
+        self.assertEqual(sizer.size("msgraph_group_memberships"), 4000)
+        sizer.observe("msgraph_group_memberships", rows=4000, seconds=0.4, nbytes=4000 * 80)
+        self.assertEqual(sizer.size("msgraph_group_memberships"), 5000)
+
+    def test_slow_writes_shrink_and_tables_are_sized_separately(self):
+        sizer = self._sizer()
+        sizer.observe("msgraph_drive_items", rows=500, seconds=2.0)
+        sizer.observe("msgraph_drive_items", rows=250, seconds=1.0)
+
+        self.assertEqual(sizer.size("msgraph_drive_items"), 125)
+        self.assertEqual(sizer.size("msgraph_users"), 500)
+
+    def test_byte_budget_caps_wide_rows(self):
+        sizer = self._sizer()
+        # Fast enough for 10x the rows, but 4 KB rows only fit 250 under the 1 MB budget.
+        sizer.observe("msgraph_drive_items", rows=500, seconds=0.05, nbytes=500 * 4000)
+
+        self.assertEqual(sizer.size("msgraph_drive_items"), 250)
+        summary = sizer.summary()["msgraph_drive_items"]
+        self.assertEqual(summary["bytes_per_row"], 4000)
+        self.assertEqual(summary["min_flush_rows"], 250)
+        self.assertEqual(summary["max_flush_rows"], 500)
+
+    def test_short_tail_flushes_count_but_do_not_resize(self):
+        sizer = self._sizer()
+        sizer.observe("msgraph_sites", rows=20, seconds=0.2)
+
+        self.assertEqual(sizer.size("msgraph_sites"), 500)
+        self.assertEqual(sizer.summary()["msgraph_sites"]["flushes"], 1)
+
+    def test_disabled_sizer_keeps_static_flush_every(self):
+        with flush_sizing.flush_sizer(500, enabled=False) as sizer:
+            flush_sizing.observe("msgraph_users", rows=500, seconds=10.0)
+            self.assertIsNone(sizer)
+            self.assertEqual(flush_sizing.flush_size("msgraph_users", 500), 500)
+
+    @patch("app.db.emit")
+    @patch("app.db.psycopg2.extras.execute_values")
+    def test_execute_values_feeds_the_current_sizer(self, _mock_execute_values, _mock_emit):
+        cur = SimpleNamespace(query=b"x" * 100 * 400)
+        rows = [(idx,) for idx in range(1400)]
+
+        with flush_sizing.flush_sizer(1000, enabled=True) as sizer:
+            db.execute_values(cur, "INSERT INTO msgraph_users (id) VALUES %s", rows)
+            db.execute_values(cur, "DELETE FROM msgraph_users u USING (VALUES %s) AS v(id) WHERE u.id = v.id", rows)
+
+        summary = sizer.summary()
+        self.assertEqual(list(summary), ["msgraph_users"])
+        self.assertEqual(summary["msgraph_users"]["flushes"], 1)
+        # The last page held 400 rows in 40,000 bytes.
+        self.assertEqual(summary["msgraph_users"]["bytes_per_row"], 100)
+        self.assertIsNone(flush_sizing._current.get())
+
+    @patch("app.db.emit")
+    @patch("app.db.psycopg2.extras.execute_values")
+    def test_tombstones_are_sized_under_their_own_key(self, _mock_execute_values, _mock_emit):
+        rows = [("d", str(idx)) for idx in range(600)]
+
+        with flush_sizing.flush_sizer(1000, enabled=True) as sizer:
+            db.execute_values(SimpleNamespace(query=b"x" * 800 * 600), "INSERT INTO msgraph_drive_items (drive_id, id) VALUES %s", rows)
+            db.execute_values(
+                SimpleNamespace(query=b"x" * 40 * 600),
+                "INSERT INTO msgraph_drive_items (drive_id, id) VALUES %s",
+                rows,
+                sizing_key="msgraph_drive_items:removed",
+            )
+
+        summary = sizer.summary()
+        self.assertEqual(summary["msgraph_drive_items"]["bytes_per_row"], 800)
+        self.assertEqual(summary["msgraph_drive_items:removed"]["bytes_per_row"], 40)
+
+
+if __name__ == "__main__":
+    unittest.main()
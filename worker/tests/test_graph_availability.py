@@ -24,12 +24,23 @@ class FakeCursor:
         lower = normalized.lower()
         self.executed.append((normalized, params))
 
-        if lower.startswith("select id, mail, user_principal_name from msgraph_users"):
+        if lower.startswith("select count(*) from msgraph_sites"):
+            self._fetchall = [(len(self.responses.get("sites", [])),)]
+        elif lower.startswith("select count(*) from msgraph_groups"):
+            self._fetchall = [(len(self.responses.get("groups", [])),)]
+        elif lower.startswith("select count(*) from msgraph_users"):
+            self._fetchall = [(len(self.responses.get("users", [])),)]
+        elif lower.startswith("select count(*) from msgraph_drives"):
+            self._fetchall = [(len(self.responses.get("available_drives", [])),)]
+        elif lower.startswith("select id, mail, user_principal_name from msgraph_users"):
             self._fetchall = list(self.responses.get("user_maps", []))
             self.rowcount = len(self._fetchall)
-        elif lower.startswith("select id, hostname, web_url, raw_json from msgraph_sites"):
+        elif lower.startswith("select id, coalesce(nullif(hostname, ''), raw_json->'sitecollection'->>'hostname')"):
             self._fetchall = list(self.responses.get("sites", []))
             self.rowcount = len(self._fetchall)
+        elif lower.startswith("select id from") and "where synced_at < %s" in lower:
+            self._fetchall = list(self.responses.get("stale", []))
+            self.rowcount = len(self._fetchall)
         elif lower.startswith("select id from msgraph_groups"):
             self._fetchall = list(self.responses.get("groups", []))
             self.rowcount = len(self._fetchall)
@@ -56,6 +67,15 @@ class FakeCursor:
     def fetchall(self):
         return list(self._fetchall)
 
+    def fetchone(self):
+        return self._fetchall[0] if self._fetchall else None
+
+    def __iter__(self):
+        return iter(list(self._fetchall))
+
+    def close(self):
+        pass
+
 
 class FakeConnection:
     def __init__(self, responses=None):
@@ -64,7 +84,7 @@ class FakeConnection:
         self.rollback_count = 0
         self.closed = False
 
-    def cursor(self):
+    def cursor(self, name=None, withhold=False):
         return self.cursor_obj
 
     def commit(self):
@@ -92,7 +112,7 @@ class GraphAvailabilityTests(unittest.TestCase):
         fake_conn = FakeConnection(
             responses={
                 "user_maps": [],
-                "sites": [("site-1", "contoso.sharepoint.com", "https://contoso.sharepoint.com/sites/site-1", {})],
+                "sites": [("site-1", "contoso.sharepoint.com", "https://contoso.sharepoint.com/sites/site-1", False)],
                 "groups": [],
                 "users": [],
             }
@@ -129,7 +149,7 @@ class GraphAvailabilityTests(unittest.TestCase):
         fake_conn = FakeConnection(
             responses={
                 "user_maps": [],
-                "sites": [("site-1", "contoso.sharepoint.com", "https://contoso.sharepoint.com/sites/site-1", {})],
+                "sites": [("site-1", "contoso.sharepoint.com", "https://contoso.sharepoint.com/sites/site-1", False)],
                 "groups": [],
                 "users": [],
             }
@@ -221,7 +241,7 @@ class GraphAvailabilityTests(unittest.TestCase):
         fake_conn = FakeConnection(
             responses={
                 "user_maps": [],
-                "sites": [("site-1", "contoso.sharepoint.com", "https://contoso.sharepoint.com/sites/site-1", {})],
+                "sites": [("site-1", "contoso.sharepoint.com", "https://contoso.sharepoint.com/sites/site-1", False)],
                 "groups": [],
                 "users": [],
             }
@@ -245,6 +265,73 @@ class GraphAvailabilityTests(unittest.TestCase):
         executed_sql = [sql for sql, _params in fake_conn.cursor_obj.executed]
         self.assertTrue(any("UPDATE msgraph_sites SET is_available = TRUE" in sql for sql in executed_sql))
 
+    @patch("app.jobs.graph_ingest.log_job_run_log")
+    @patch("app.jobs.graph_ingest.emit")
+    @patch("app.jobs.graph_ingest.db.get_conn")
+    @patch("app.jobs.graph_ingest._execute_values_dedup_merge_drives")
+    def test_listed_sites_are_marked_available_in_one_statement_per_flush(
+        self,
+        mock_merge_drives,
+        mock_get_conn,
+        _mock_emit,
+        _mock_log_job_run_log,
+    ):
+        fake_conn = FakeConnection(
+            responses={
+                "user_maps": [],
+                "sites": [
+                    (f"site-{idx}", "contoso.sharepoint.com", f"https://contoso.sharepoint.com/sites/site-{idx}", False)
+                    for idx in range(5)
+                ],
+                "groups": [],
+                "users": [],
+            }
+        )
+        mock_get_conn.return_value = fake_conn
+        mock_merge_drives.return_value = (0, 0)
+        client = unittest.mock.Mock()
+        client.iter_paged.return_value = []
+
+        graph_ingest._ingest_drives(client, run_id="run-5", flush_every=3)
+
+        marks = [
+            params for sql, params in fake_conn.cursor_obj.executed if sql.startswith("UPDATE msgraph_sites SET is_available = TRUE")
+        ]
+        self.assertEqual([params[-1] for params in marks], [["site-0", "site-1", "site-2"], ["site-3", "site-4"]])
+
+    def test_unavailable_marks_are_written_in_one_statement(self):
+        cur = FakeCursor()
+        checked_at = unittest.mock.sentinel.checked_at
+
+        graph_ingest._mark_entities_unavailable(
+            cur,
+            table="msgraph_drives",
+            marks=[("drive-1", "not_found", {"status_code": 404}), ("drive-2", "forbidden", None)],
+            checked_at=checked_at,
+        )
+
+        self.assertEqual(len(cur.executed), 1)
+        sql, params = cur.executed[0]
+        self.assertIn("FROM unnest(%s::text[], %s::text[], %s::jsonb[])", sql)
+        self.assertEqual(params[:3], [checked_at, ["drive-1", "drive-2"], ["not_found", "forbidden"]])
+        self.assertEqual(params[3][0].adapted, {"status_code": 404})
+        self.assertIsNone(params[3][1])
+        with self.assertRaises(ValueError):
+            graph_ingest._mark_entities_unavailable(cur, table="msgraph_groups", marks=[], checked_at=checked_at)
+
+    def test_deletion_sweep_marks_unseen_ids_in_chunks(self):
+        fake_conn = FakeConnection(responses={"stale": [("user-1",), ("user-2",), ("user-3",)]})
+        cur = fake_conn.cursor_obj
+
+        graph_ingest._sweep_unseen_as_deleted(
+            fake_conn, cur, table="msgraph_users", synced_at=unittest.mock.sentinel.synced_at, chunk_size=2
+        )
+
+        updates = [(sql, params) for sql, params in cur.executed if sql.startswith("UPDATE msgraph_users")]
+        self.assertEqual([params[-1] for _sql, params in updates], [["user-1", "user-2"], ["user-3"]])
+        self.assertTrue(all("availability_reason = 'deleted'" in sql for sql, _params in updates))
+        self.assertEqual(fake_conn.commit_count, 3)
+
     @patch("app.jobs.graph_ingest.log_job_run_log")
     @patch("app.jobs.graph_ingest.emit")
     @patch("app.jobs.graph_ingest.db.get_conn")
@@ -257,6 +344,35 @@ class GraphAvailabilityTests(unittest.TestCase):
         executed_sql = [sql for sql, _params in fake_conn.cursor_obj.executed]
         self.assertTrue(any("SELECT id FROM msgraph_drives WHERE deleted_at IS NULL AND is_available = TRUE" in sql for sql in executed_sql))
 
+    @patch("app.jobs.graph_ingest.log_job_run_log")
+    @patch("app.jobs.graph_ingest.emit")
+    @patch("app.jobs.graph_ingest.db.get_conn")
+    def test_terminal_drive_mark_is_committed_before_a_later_failure(self, mock_get_conn, _mock_emit, _mock_log_job_run_log):
+        fake_conn = FakeConnection(responses={"available_drives": [("drive-1",), ("drive-2",)], "user_maps": []})
+        mock_get_conn.return_value = fake_conn
+        client = unittest.mock.Mock()
+        client.get_json.side_effect = [
+            GraphError(status_code=404, message="itemNotFound", url="/drives/drive-1/root/delta"),
+            RuntimeError("database went away"),
+        ]
+        commits_at_mark = []
+        execute = fake_conn.cursor_obj.execute
+
+        def record_commit_count(sql, params=None):
+            execute(sql, params)
+            if sql.lstrip().startswith("UPDATE msgraph_drives"):
+                commits_at_mark.append(fake_conn.commit_count)
+
+        fake_conn.cursor_obj.execute = record_commit_count
+
+        with self.assertRaises(RuntimeError):
+            graph_ingest._ingest_drive_items(client, run_id="run-5", flush_every=100)
+
+        marks = [params for sql, params in fake_conn.cursor_obj.executed if sql.startswith("UPDATE msgraph_drives")]
+        self.assertEqual([params[1] for params in marks], [["drive-1"]])
+        self.assertEqual(len(commits_at_mark), 1)
+        self.assertGreater(fake_conn.commit_count, commits_at_mark[0])
+
     @patch("app.jobs.graph_ingest.GRAPH_MAX_CONCURRENCY", 1)
     @patch("app.jobs.graph_ingest.log_job_run_log")
     @patch("app.jobs.graph_ingest.emit")
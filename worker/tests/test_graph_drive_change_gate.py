@@ -0,0 +1,203 @@
+import sys
+import unittest
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.jobs import graph_ingest
+
+
+NOW = datetime(2026, 3, 2, 6, 0, tzinfo=timezone.utc)
+MODIFIED = datetime(2026, 2, 20, 9, 30, tzinfo=timezone.utc)
+LISTED = NOW - timedelta(minutes=30)
+
+
+class FakeCursor:
+    def __init__(self, change_state):
+        self.change_state = change_state
+        self.executed = []
+        self._fetchall = []
+        self.rowcount = -1
+
+    def execute(self, sql, params=None):
+        normalized = " ".join(sql.split())
+        self.executed.append((normalized, params))
+        if normalized.startswith("SELECT count(*) FROM msgraph_drives"):
+            self._fetchall = [(len(self.change_state),)]
+        elif normalized.startswith("SELECT id FROM msgraph_drives"):
+            self._fetchall = [(row[0],) for row in self.change_state]
+        elif normalized.startswith("SELECT d.id, d.last_modified_dt"):
+            self._fetchall = list(self.change_state)
+        else:
+            self._fetchall = []
+
+    def fetchall(self):
+        return list(self._fetchall)
+
+    def fetchone(self):
+        return self._fetchall[0] if self._fetchall else None
+
+    def __iter__(self):
+        return iter(list(self._fetchall))
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, change_state):
+        self.cursor_obj = FakeCursor(change_state)
+
+    def cursor(self, name=None, withhold=False):
+        return self.cursor_obj
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class DriveChangeDecisionTests(unittest.TestCase):
+    def test_unchanged_drive_is_skipped_until_force_interval(self):
+        state = (MODIFIED, 1024, LISTED, MODIFIED, 1024, NOW - timedelta(hours=3))
+        self.assertEqual(
+            graph_ingest._drive_change_decision(state, now=NOW, force_crawl_after=timedelta(hours=24)),
+            "skip",
+        )
+        self.assertEqual(
+            graph_ingest._drive_change_decision(state, now=NOW, force_crawl_after=timedelta(hours=2)),
+            "force",
+        )
+        self.assertEqual(graph_ingest._drive_change_decision(state, now=NOW, force_crawl_after=None), "skip")
+
+    def test_changed_or_unknown_drive_is_crawled(self):
+        cases = [
+            None,
+            (MODIFIED + timedelta(minutes=1), 1024, LISTED, MODIFIED, 1024, NOW - timedelta(hours=1)),
+            (MODIFIED, 2048, LISTED, MODIFIED, 1024, NOW - timedelta(hours=1)),
+            (None, 1024, LISTED, None, 1024, NOW - timedelta(hours=1)),
+            (MODIFIED, 1024, LISTED, MODIFIED, 1024, None),
+        ]
+        for state in cases:
+            with self.subTest(state=state):
+                self.assertEqual(
+                    graph_ingest._drive_change_decision(state, now=NOW, force_crawl_after=timedelta(hours=24)),
+                    "crawl",
+                )
+
+    def test_markers_not_refreshed_since_last_commit_are_crawled(self):
+        last_commit = NOW - timedelta(hours=3)
+        for drive_synced_at in (None, last_commit - timedelta(hours=1), last_commit):
+            with self.subTest(drive_synced_at=drive_synced_at):
+                state = (MODIFIED, 1024, drive_synced_at, MODIFIED, 1024, last_commit)
+                self.assertEqual(
+                    graph_ingest._drive_change_decision(state, now=NOW, force_crawl_after=timedelta(hours=24)),
+                    "crawl",
+                )
+
+    def test_gate_requires_completed_drives_stage(self):
+        self.assertTrue(graph_ingest._drives_stage_completed({"drives": {"drive_upserts": 3}}))
+        for stages in ({}, {"drives": {"skipped": True}}, {"drives": {"stopped": "cancel_requested"}}):
+            with self.subTest(stages=stages):
+                self.assertFalse(graph_ingest._drives_stage_completed(stages))
+
+
+class DriveItemsChangeGateTests(unittest.TestCase):
+    @patch("app.jobs.graph_ingest.log_job_run_log")
+    @patch("app.jobs.graph_ingest.emit")
+    @patch("app.jobs.graph_ingest.db.get_conn")
+    def test_skips_unchanged_drive_and_records_markers_for_crawled_drive(
+        self, mock_get_conn, _mock_emit, _mock_log_job_run_log
+    ):
+        recent = datetime.now(timezone.utc) - timedelta(hours=1)
+        listed = datetime.now(timezone.utc) - timedelta(minutes=5)
+        fake_conn = FakeConnection(
+            [
+                ("drive-idle", MODIFIED, 1024, listed, MODIFIED, 1024, recent),
+                ("drive-busy", MODIFIED + timedelta(hours=1), 4096, listed, MODIFIED, 1024, recent),
+                ("drive-stale", MODIFIED, 1024, recent - timedelta(hours=2), MODIFIED, 1024, recent),
+            ]
+        )
+        mock_get_conn.return_value = fake_conn
+        client = Mock()
+        client.get_json.return_value = {"value": [], "@odata.deltaLink": "delta-next"}
+
+        result = graph_ingest._ingest_drive_items(client, run_id="run-1", flush_every=100, skip_unchanged=True)
+
+        requested = [call[0][0] for call in client.get_json.call_args_list]
+        self.assertEqual(len(requested), 2)
+        self.assertTrue(any("/drives/drive-busy/root/delta" in url for url in requested))
+        self.assertTrue(any("/drives/drive-stale/root/delta" in url for url in requested))
+        self.assertEqual(result["drives_skipped_unchanged"], 1)
+        self.assertEqual(result["drives_processed"], 2)
+        delta_writes = [params for sql, params in fake_conn.cursor_obj.executed if sql.startswith("INSERT INTO msgraph_delta_state")]
+        self.assertIn(["drive_items", "drive-busy", "delta-next", MODIFIED + timedelta(hours=1), 4096], delta_writes)
+
+
+class DriveItemTagShortCircuitTests(unittest.TestCase):
+    def test_conflict_update_keeps_permission_state_only_for_same_tags(self):
+        sql = " ".join(graph_ingest._DRIVE_ITEMS_UPSERT_ACTIVE_SQL.split())
+        self.assertIn(
+            "permissions_last_synced_at = CASE WHEN msgraph_drive_items.deleted_at IS NULL AND EXCLUDED.e_tag IS NOT NULL "
+            "AND msgraph_drive_items.e_tag = EXCLUDED.e_tag AND msgraph_drive_items.c_tag IS NOT DISTINCT FROM EXCLUDED.c_tag "
+            "THEN msgraph_drive_items.permissions_last_synced_at END",
+            sql,
+        )
+
+    def test_conflict_update_skips_rows_with_same_tags_and_path(self):
+        for sql in (graph_ingest._DRIVE_ITEMS_UPSERT_ACTIVE_SQL, graph_ingest._DRIVE_ITEMS_MERGE_STAGE_SQL):
+            with self.subTest(sql=sql[:40]):
+                self.assertIn(
+                    "WHERE NOT COALESCE( msgraph_drive_items.deleted_at IS NULL AND EXCLUDED.e_tag IS NOT NULL "
+                    "AND msgraph_drive_items.e_tag = EXCLUDED.e_tag AND msgraph_drive_items.c_tag IS NOT DISTINCT FROM EXCLUDED.c_tag "
+                    "AND msgraph_drive_items.path IS NOT DISTINCT FROM EXCLUDED.path "
+                    "AND msgraph_drive_items.normalized_path IS NOT DISTINCT FROM EXCLUDED.normalized_path, FALSE )",
+                    " ".join(sql.split()),
+                )
+
+    @patch("app.jobs.graph_ingest.log_job_run_log")
+    @patch("app.jobs.graph_ingest.emit")
+    @patch("app.jobs.graph_ingest.db.execute_values")
+    @patch("app.jobs.graph_ingest.db.get_conn")
+    def test_unchanged_items_are_counted_from_rows_the_upsert_skipped(
+        self, mock_get_conn, mock_execute_values, _mock_emit, _mock_log_job_run_log
+    ):
+        fake_conn = FakeConnection([("drive-1", MODIFIED, 1024, None, None, None, None)])
+        mock_get_conn.return_value = fake_conn
+
+        def upsert(cur, sql, rows, page_size=1000):
+            # The conflict guard left one of the three rows untouched.
+            cur.rowcount = len(rows) - 1
+
+        mock_execute_values.side_effect = upsert
+        client = Mock()
+        client.get_json.return_value = {
+            "value": [
+                {"id": "item-same", "name": "a.txt", "eTag": "e1", "cTag": "c1"},
+                {"id": "item-edited", "name": "b.txt", "eTag": "e2", "cTag": "c2"},
+                {"id": "item-new", "name": "c.txt", "eTag": "e1", "cTag": "c1"},
+            ],
+            "@odata.deltaLink": "delta-next",
+        }
+
+        result = graph_ingest._ingest_drive_items(client, run_id="run-1", flush_every=100)
+
+        self.assertEqual(result["items_seen"], 3)
+        self.assertEqual(result["items_unchanged_skipped"], 1)
+        args, kwargs = mock_execute_values.call_args
+        self.assertEqual([row[1] for row in args[2]], ["item-same", "item-edited", "item-new"])
+        self.assertEqual(kwargs["page_size"], 3)
+        self.assertFalse(any("e_tag, c_tag" in sql for sql, _params in fake_conn.cursor_obj.executed))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -35,13 +35,19 @@ class FakeCursor:
     def fetchall(self):
         return list(self._fetchall)
 
+    def __iter__(self):
+        return iter(list(self._fetchall))
+
+    def close(self):
+        pass
+
 
 class FakeConnection:
     def __init__(self, responses=None):
         self.cursor_obj = FakeCursor(responses=responses)
         self.closed = False
 
-    def cursor(self):
+    def cursor(self, name=None, withhold=False):
         return self.cursor_obj
 
     def commit(self):
@@ -0,0 +1,172 @@
+import sys
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from urllib.parse import unquote
+
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.graph_client import GraphError
+from app.jobs import graph_ingest
+
+
+class FakePartitionClient:
+    def __init__(self, pages_by_filter, reject_filters=False, sequential_pages=None):
+        self.pages_by_filter = pages_by_filter
+        self.reject_filters = reject_filters
+        self.sequential_pages = sequential_pages or {}
+        self.requested = []
+
+    def get_json(self, url, headers=None):
+        self.requested.append(url)
+        if url in self.sequential_pages:
+            return self.sequential_pages[url]
+        if "$filter=" not in url:
+            raise AssertionError(f"unexpected url {url}")
+        expr = unquote(url.split("$filter=", 1)[1])
+        if self.reject_filters:
+            raise GraphError(status_code=400, message="Unsupported query.", url=url)
+        advanced = (headers or {}).get("ConsistencyLevel") == "eventual" and "$count=true" in url
+        if expr.endswith(" eq null") and not advanced:
+            raise GraphError(status_code=400, message="Unsupported query.", url=url)
+        return self.pages_by_filter[expr]
+
+
+class PartitionFilterTests(unittest.TestCase):
+    def test_ranges_cover_collection_and_escape_quotes(self):
+        filters = graph_ingest._partition_filters("displayName", ["m", "o'b", "", "m"])
+
+        self.assertEqual(
+            filters,
+            [
+                ("..m", "displayName le 'm'"),
+                ("m..o'b", "displayName ge 'm' and displayName le 'o''b'"),
+                ("o'b..", "displayName ge 'o''b'"),
+                ("null", "displayName eq null"),
+            ],
+        )
+        self.assertEqual(graph_ingest._partition_filters("displayName", []), [])
+
+
+class IterPartitionedTests(unittest.TestCase):
+    def test_merges_partitions_with_dedupe_and_counts(self):
+        client = FakePartitionClient(
+            {
+                "displayName le 'm'": {"value": [{"id": "u1"}, {"id": "u2"}], "@odata.nextLink": "next-low"},
+                "displayName ge 'm'": {"value": [{"id": "u2"}, {"id": "u3"}, {"displayName": "no id"}]},
+                "displayName eq null": {"value": [{"id": "u5"}]},
+            },
+            sequential_pages={"next-low": {"value": [{"id": "u4"}]}},
+        )
+        stats = {}
+
+        objects = list(
+            graph_ingest._iter_partitioned(
+                client,
+                "/users?$select=id&$top=999",
+                field="displayName",
+                boundaries=["m"],
+                max_workers=2,
+                stats=stats,
+            )
+        )
+
+        self.assertEqual(sorted(obj["id"] for obj in objects), ["u1", "u2", "u3", "u4", "u5"])
+        self.assertEqual(stats["mode"], "partitioned")
+        partitions = stats["partitions"]
+        self.assertEqual(partitions["null"], {"seen": 1, "duplicates": 0})
+        self.assertEqual(partitions["..m"]["seen"] + partitions["m.."]["seen"], 4)
+        self.assertEqual(partitions["..m"]["duplicates"] + partitions["m.."]["duplicates"], 1)
+
+    @patch("app.jobs.graph_ingest.emit")
+    def test_rejected_filter_falls_back_to_sequential_chain(self, _mock_emit):
+        client = FakePartitionClient(
+            {},
+            reject_filters=True,
+            sequential_pages={
+                "/groups?$select=id&$top=999": {"value": [{"id": "g1"}], "@odata.nextLink": "next"},
+                "next": {"value": [{"id": "g2"}, {"id": "g1"}]},
+            },
+        )
+        stats = {}
+
+        objects = list(
+            graph_ingest._iter_partitioned(
+                client,
+                "/groups?$select=id&$top=999",
+                field="displayName",
+                boundaries=["m"],
+                max_workers=2,
+                stats=stats,
+            )
+        )
+
+        self.assertEqual([obj["id"] for obj in objects], ["g1", "g2"])
+        self.assertEqual(stats["mode"], "sequential_fallback")
+        self.assertEqual(stats["partitions"]["sequential"], {"seen": 2, "duplicates": 1})
+
+    def test_fake_client_rejects_null_filter_without_advanced_query(self):
+        client = FakePartitionClient({"displayName eq null": {"value": []}})
+
+        with self.assertRaises(GraphError):
+            client.get_json("/users?$select=id&$filter=displayName%20eq%20null")
+        with self.assertRaises(GraphError):
+            client.get_json("/users?$select=id&$filter=displayName%20eq%20null", headers={"ConsistencyLevel": "eventual"})
+        self.assertEqual(
+            client.get_json(
+                "/users?$select=id&$count=true&$filter=displayName%20eq%20null",
+                headers={"ConsistencyLevel": "eventual"},
+            ),
+            {"value": []},
+        )
+
+    def test_partitions_send_advanced_query_and_join_bare_path(self):
+        client = FakePartitionClient(
+            {
+                "displayName le 'm'": {"value": [{"id": "u1"}]},
+                "displayName ge 'm'": {"value": [{"id": "u2"}]},
+                "displayName eq null": {"value": [{"id": "u3"}]},
+            }
+        )
+        stats = {}
+
+        objects = list(
+            graph_ingest._iter_partitioned(
+                client,
+                "/users",
+                field="displayName",
+                boundaries=["m"],
+                max_workers=2,
+                stats=stats,
+            )
+        )
+
+        self.assertEqual(sorted(obj["id"] for obj in objects), ["u1", "u2", "u3"])
+        self.assertEqual(stats["mode"], "partitioned")
+        self.assertEqual(len(client.requested), 3)
+        for url in client.requested:
+            self.assertTrue(url.startswith("/users?$count=true&$filter="), url)
+
+    def test_non_filter_errors_propagate(self):
+        class FailingClient(FakePartitionClient):
+            def get_json(self, url, headers=None):
+                raise GraphError(status_code=503, message="Service unavailable", url=url)
+
+        with self.assertRaises(GraphError):
+            list(
+                graph_ingest._iter_partitioned(
+                    FailingClient({}),
+                    "/users?$select=id&$top=999",
+                    field="displayName",
+                    boundaries=["f", "p"],
+                    max_workers=3,
+                    stats={},
+                )
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -79,7 +79,7 @@ class GraphTestModeScopeTests(unittest.TestCase):
         )
         self.assertTrue(scope["scope_hash"])
 
-    @patch("app.jobs.graph_ingest.enqueue_impacted_mvs_for_tables", return_value={"tables": [], "queued": 0, "queued_mvs": []})
+    @patch("app.jobs.graph_ingest.enqueue_changed_mvs", return_value={"changes": {}, "tables": [], "queued": 0, "queued_mvs": []})
     @patch("app.jobs.graph_ingest._save_graph_sync_scope_state")
     @patch("app.jobs.graph_ingest._prune_test_mode_data")
     @patch("app.jobs.graph_ingest._ingest_users", return_value={"mode": "test", "upserted": 1})
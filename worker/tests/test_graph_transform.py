@@ -0,0 +1,302 @@
+import csv
+import io
+import json
+import sys
+import unittest
+from datetime import datetime, timezone
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import db
+from app.jobs import graph_ingest
+from app.jobs.graph_transform import TransformPool, page_links
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+
+SYNCED_AT = datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def _page(*items, next_link=None, delta_link=None):
+    page = {"value": list(items)}
+    if next_link:
+        page["@odata.nextLink"] = next_link
+    if delta_link:
+        page["@odata.deltaLink"] = delta_link
+    return page
+
+
+def _item(item_id, name="doc.txt", **extra):
+    item = {
+        "id": item_id,
+        "name": name,
+        "parentReference": {"id": "root", "path": "/drive/root:/Shared"},
+        "createdBy": {"user": {"id": "user-1", "displayName": "Ada", "email": "ada@example.com"}},
+        "file": {"mimeType": "text/plain", "hashes": {"sha1Hash": "abc"}},
+    }
+    item.update(extra)
+    return item
+
+
+def _echo_transform(page, *, shared, tag):
+    return (tag, len(page.get("value", [])), shared.get("marker"))
+
+
+class FakeCursor:
+    def __init__(self):
+        self.executed = []
+        self.copied = []
+        self._fetchall = []
+        self.rowcount = 0
+
+    def execute(self, sql, params=None):
+        normalized = " ".join(sql.split())
+        self.executed.append((normalized, params))
+        self._fetchall = []
+        if normalized.startswith("INSERT INTO msgraph_drive_items") and "FROM drive_items_stage" in normalized:
+            self.rowcount = sum(len(buf.splitlines()) for _table, buf in self.copied[-1:])
+        elif normalized.startswith("SELECT count(*) FROM msgraph_drives"):
+            self._fetchall = [(1,)]
+        elif normalized.startswith("SELECT id FROM msgraph_drives"):
+            self._fetchall = [("drive-1",)]
+        elif normalized.startswith("SELECT delta_link FROM msgraph_delta_state"):
+            self._fetchall = []
+
+    def copy_expert(self, sql, buffer):
+        self.copied.append((sql, buffer.read()))
+
+    def fetchall(self):
+        return list(self._fetchall)
+
+    def fetchone(self):
+        return self._fetchall[0] if self._fetchall else None
+
+    def __iter__(self):
+        return iter(list(self._fetchall))
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self):
+        self.cursor_obj = FakeCursor()
+        self.commits = 0
+
+    def cursor(self, name=None, withhold=False):
+        return self.cursor_obj
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class CopyEncodingTests(unittest.TestCase):
+    def test_encode_copy_rows_escapes_text_format(self):
+        buffer = db.encode_copy_rows(
+            [
+                ("a\tb", None, True, 3, SYNCED_AT, db.jsonb({"k": "line\nbreak"})),
+                ("back\\slash", False, 1.5, "x\ry", "", ""),
+            ]
+        )
+        lines = buffer.decode("utf-8").split("\n")
+        self.assertEqual(lines[-1], "")
+        self.assertEqual(
+            lines[0].split("\t"),
+            ["a\\tb", "\\N", "t", "3", SYNCED_AT.isoformat(), '{"k": "line\\\\nbreak"}'],
+        )
+        self.assertEqual(lines[1].split("\t"), ["back\\\\slash", "f", "1.5", "x\\ry", "", ""])
+
+    def test_encode_copy_rows_writes_lists_as_array_literals(self):
+        buffer = db.encode_copy_rows([(["read", "write"], ['say "hi"', None], [])])
+        self.assertEqual(buffer.decode("utf-8"), '{"read","write"}\t{"say \\\\"hi\\\\"",NULL}\t{}\n')
+
+    def test_encode_copy_rows_empty(self):
+        self.assertEqual(db.encode_copy_rows([]), b"")
+
+
+class DriveItemTransformTests(unittest.TestCase):
+    def test_transform_matches_inline_row_builder(self):
+        users_by_id = {"user-1": "user-1"}
+        users_by_email = {"ada@example.com": "user-1"}
+        active = _item("item-1")
+        removed = {"id": "item-2", "@removed": {"reason": "deleted"}}
+        result = graph_ingest._transform_drive_items_page(
+            _page(active, removed, {"name": "no-id"}),
+            drive_id="drive-1",
+            synced_at=SYNCED_AT,
+            page_seq=7,
+            shared={"users_by_id": users_by_id, "users_by_email": users_by_email},
+        )
+
+        expected_row = graph_ingest._drive_item_row(
+            "drive-1",
+            active,
+            synced_at=SYNCED_AT,
+            users_by_id=users_by_id,
+            users_by_email=users_by_email,
+        )
+        self.assertEqual(len(expected_row), len(graph_ingest._DRIVE_ITEM_COLUMNS))
+        self.assertEqual(result["copy_buffer"], db.encode_copy_rows([(7, 0) + expected_row]))
+        self.assertEqual(result["active_rows"], 1)
+        self.assertEqual(result["removed_items"], [removed])
+        self.assertEqual(result["items_seen"], 2)
+
+
+def _csv_expected(value):
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S.%fZ")
+    if isinstance(value, db.psycopg2.extras.Json):
+        return json.dumps(value.adapted)
+    return str(value)
+
+
+@unittest.skipIf(pyarrow is None, "pyarrow not installed")
+class ColumnarDriveItemTransformTests(unittest.TestCase):
+    def test_columnar_csv_matches_tuple_builder(self):
+        users_by_id = {"user-1": "user-1"}
+        users_by_email = {"ada@example.com": "user-1"}
+        items = [
+            _item("item-1", shared={"scope": "users"}, sharepointIds={"siteId": "site-1", "listItemId": "4"}),
+            _item("item-2", name="Folder", folder={"childCount": 3}, parentReference={"path": "/drive/root:"}),
+            _item("item-3", name="", parentReference={"path": ""}),
+            _item("item-4", name='comma, "quote"\nline', parentReference={"id": "p", "path": "/drive/root:/A/"}),
+            {"id": "item-5", "lastModifiedBy": {"application": {"id": "app", "displayName": "Sync"}}},
+            _item("item-6", name="Empty facet", folder={}),
+        ]
+        result = graph_ingest._transform_drive_items_page(
+            _page(*items),
+            drive_id="drive-1",
+            synced_at=SYNCED_AT,
+            page_seq=3,
+            shared={"users_by_id": users_by_id, "users_by_email": users_by_email},
+            columnar=True,
+        )
+
+        self.assertEqual(result["copy_format"], "csv")
+        parsed = list(csv.reader(io.StringIO(result["copy_buffer"].decode("utf-8"))))
+        self.assertEqual(len(parsed), len(items))
+        for pos, item in enumerate(items):
+            row = (3, pos) + graph_ingest._drive_item_row(
+                "drive-1",
+                item,
+                synced_at=SYNCED_AT,
+                users_by_id=users_by_id,
+                users_by_email=users_by_email,
+            )
+            self.assertEqual(parsed[pos], [_csv_expected(value) for value in row])
+
+    def test_columnar_falls_back_to_text_on_unexpected_types(self):
+        result = graph_ingest._transform_drive_items_page(
+            _page(_item("item-1", size="large")),
+            drive_id="drive-1",
+            synced_at=SYNCED_AT,
+            page_seq=1,
+            shared={},
+            columnar=True,
+        )
+
+        self.assertEqual(result["copy_format"], "text")
+        self.assertEqual(result["active_rows"], 1)
+
+
+class TransformPoolTests(unittest.TestCase):
+    def test_inline_pool_returns_results_immediately(self):
+        with TransformPool(_echo_transform, processes=0, shared_state={"marker": "m"}) as pool:
+            self.assertEqual(pool.submit(json.dumps(_page(1, 2)).encode(), tag="a"), [("a", 2, "m")])
+            self.assertEqual(pool.drain(), [])
+
+    def test_process_pool_preserves_submission_order(self):
+        results = []
+        with TransformPool(_echo_transform, processes=2, shared_state={"marker": "m"}, max_pending=2) as pool:
+            for idx in range(5):
+                results.extend(pool.submit(json.dumps(_page(*range(idx))).encode(), tag=idx))
+            results.extend(pool.drain())
+        self.assertEqual(results, [(idx, idx, "m") for idx in range(5)])
+
+    def test_page_links_ignore_link_text_inside_items(self):
+        raw = json.dumps(
+            _page(_item("item-1", name='"@odata.nextLink":"bogus"'), next_link="https://graph/next?$skiptoken=a%2Fb")
+        ).encode()
+
+        self.assertEqual(page_links(raw), {"@odata.nextLink": "https://graph/next?$skiptoken=a%2Fb"})
+        self.assertEqual(page_links(json.dumps(_page(delta_link="https://graph/delta")).encode()), {"@odata.deltaLink": "https://graph/delta"})
+        self.assertEqual(page_links(b""), {})
+
+
+class DriveItemsPooledIngestTests(unittest.TestCase):
+    @patch("app.jobs.graph_ingest.log_job_run_log")
+    @patch("app.jobs.graph_ingest.emit")
+    @patch("app.db.emit")
+    @patch("app.jobs.graph_ingest.db.get_conn")
+    def test_pooled_ingest_stages_rows_via_copy_and_advances_delta(
+        self, mock_get_conn, _mock_db_emit, _mock_emit, _mock_log_job_run_log
+    ):
+        fake_conn = FakeConnection()
+        mock_get_conn.return_value = fake_conn
+        client = Mock()
+        client.get_bytes.side_effect = [
+            json.dumps(_page(_item("item-1"), _item("item-2"), next_link="page-2")).encode(),
+            json.dumps(_page(_item("item-1", name="renamed.txt"), delta_link="delta-1")).encode(),
+        ]
+
+        result = graph_ingest._ingest_drive_items(client, run_id="run-1", flush_every=100, transform_processes=1)
+
+        cur = fake_conn.cursor_obj
+        self.assertEqual(len(cur.copied), 1)
+        copy_sql, copy_buffer = cur.copied[0]
+        self.assertTrue(copy_sql.startswith("COPY drive_items_stage (stage_seq, stage_pos, drive_id, id,"))
+        self.assertEqual(len(copy_buffer.splitlines()), 3)
+        executed_sql = [sql for sql, _params in cur.executed]
+        self.assertTrue(any(sql.startswith("CREATE TEMP TABLE IF NOT EXISTS drive_items_stage") for sql in executed_sql))
+        self.assertTrue(any("ORDER BY drive_id, id, stage_seq DESC, stage_pos DESC" in sql for sql in executed_sql))
+        self.assertTrue(any("INSERT INTO msgraph_delta_state" in sql for sql in executed_sql))
+        self.assertEqual(result["items_seen"], 3)
+        self.assertEqual(result["pages_transformed"], 2)
+        client.get_json.assert_not_called()
+
+    @unittest.skipIf(pyarrow is None, "pyarrow not installed")
+    @patch("app.jobs.graph_ingest.log_job_run_log")
+    @patch("app.jobs.graph_ingest.emit")
+    @patch("app.db.emit")
+    @patch("app.jobs.graph_ingest.db.get_conn")
+    def test_inline_columnar_ingest_transforms_the_parsed_page(
+        self, mock_get_conn, _mock_db_emit, _mock_emit, _mock_log_job_run_log
+    ):
+        fake_conn = FakeConnection()
+        mock_get_conn.return_value = fake_conn
+        client = Mock()
+        client.get_json.side_effect = [_page(_item("item-1"), _item("item-2"), delta_link="delta-1")]
+
+        with patch("app.jobs.graph_transform.json.loads") as mock_loads:
+            result = graph_ingest._ingest_drive_items(
+                client, run_id="run-1", flush_every=100, transform_processes=0, transform_columnar=True
+            )
+
+        mock_loads.assert_not_called()
+        client.get_bytes.assert_not_called()
+        self.assertEqual(result["pages_transformed"], 1)
+        copy_sql, copy_buffer = fake_conn.cursor_obj.copied[0]
+        self.assertIn("FORMAT csv", copy_sql)
+        self.assertEqual(len(copy_buffer.splitlines()), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -29,8 +29,12 @@ class WorkerInternalAuthTests(unittest.TestCase):
         cases = [
             ("GET", "/health", None),
             ("GET", "/jobs/status", None),
+            ("GET", "/jobs/progress", None),
+            ("GET", "/jobs/progress/stream", None),
+            ("GET", "/metrics", None),
             ("POST", "/jobs/run-now", {"job_id": "00000000-0000-0000-0000-000000000001"}),
             ("POST", "/jobs/pause", {"job_id": "00000000-0000-0000-0000-000000000001"}),
+            ("POST", "/jobs/cancel", {"job_id": "00000000-0000-0000-0000-000000000001"}),
             ("POST", "/jobs/resume", {"job_id": "00000000-0000-0000-0000-000000000001"}),
         ]
         for method, path, payload in cases:
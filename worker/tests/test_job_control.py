@@ -0,0 +1,190 @@
+import os
+import sys
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import job_control, scheduler
+from app.api import create_app
+
+
+class FakeCursor:
+    def __init__(self, state):
+        self.state = state
+        self.executed = state.setdefault("executed", [])
+        self._rows = []
+
+    def execute(self, sql, params=None):
+        normalized = " ".join(sql.split())
+        self.executed.append((normalized, params))
+        self._rows = []
+        if normalized.startswith("DELETE FROM job_queue"):
+            self._rows = [(params[0],)] if self.state.get("queued") else []
+        elif normalized.startswith("UPDATE job_runs SET cancel_requested_at"):
+            self._rows = list(self.state.get("running", []))
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self):
+        return list(self._rows)
+
+
+class FakeConnection:
+    def __init__(self, state):
+        self.state = state
+        self.commits = 0
+
+    def cursor(self):
+        return FakeCursor(self.state)
+
+    def commit(self):
+        self.commits += 1
+
+    def close(self):
+        pass
+
+
+class RunControlTests(unittest.TestCase):
+    def tearDown(self):
+        job_control.unregister_run("run-1")
+
+    def test_unregistered_runs_are_never_stopped(self):
+        self.assertIsNone(job_control.stop_requested("run-unknown", stage="users"))
+
+    def test_cancel_is_reported_and_stages_recorded(self):
+        control = job_control.register_run("run-1", job_type="graph_ingest")
+        self.assertIsNone(job_control.stop_requested("run-1", stage="users"))
+        self.assertEqual(control.stopped_stages, [])
+
+        self.assertTrue(job_control.request_cancel("run-1"))
+        self.assertEqual(job_control.stop_requested("run-1", stage="drives"), job_control.STOP_CANCEL_REQUESTED)
+        job_control.stop_requested("run-1", stage="drives")
+        self.assertEqual(control.stopped_stages, ["drives"])
+
+    @patch("app.job_control.time.monotonic")
+    def test_deadline_elapses(self, mock_monotonic):
+        mock_monotonic.return_value = 100.0
+        job_control.register_run("run-1", job_type="graph_ingest", deadline_seconds=60)
+
+        mock_monotonic.return_value = 159.0
+        self.assertIsNone(job_control.stop_requested("run-1", stage="drive_items"))
+        mock_monotonic.return_value = 160.0
+        self.assertEqual(job_control.stop_requested("run-1", stage="drive_items"), job_control.STOP_DEADLINE_EXCEEDED)
+
+    def test_rotate_after_starts_after_the_resume_key(self):
+        self.assertEqual(job_control.rotate_after(["a", "b", "c", "d"], "b"), ["c", "d", "a", "b"])
+        self.assertEqual(job_control.rotate_after(["a", "b"], "z"), ["a", "b"])
+        self.assertEqual(job_control.rotate_after(["a", "b"], None), ["a", "b"])
+
+    @patch("app.job_control.emit")
+    @patch("app.job_control.db.fetch_all", return_value=[{"run_id": "run-1"}])
+    def test_cancel_requests_from_other_workers_are_applied(self, mock_fetch_all, _mock_emit):
+        control = job_control.register_run("run-1", job_type="mv_refresh")
+
+        self.assertEqual(job_control.sync_cancel_requests(["run-1"]), 1)
+        self.assertEqual(control.stop_reason(), job_control.STOP_CANCEL_REQUESTED)
+        self.assertEqual(mock_fetch_all.call_args[0][1], [["run-1"]])
+
+
+class SchedulerCancelTests(unittest.TestCase):
+    def tearDown(self):
+        job_control.unregister_run("run-1")
+
+    @patch("app.scheduler.log_job_run_log")
+    @patch("app.scheduler.run_mv_refresh")
+    @patch("app.scheduler.get_job_type_license_feature", return_value=None)
+    def test_job_that_stopped_early_finishes_partial(self, _mock_feature, mock_run_mv_refresh, mock_log):
+        job_control.register_run("run-1", job_type="mv_refresh", deadline_seconds=30)
+        mock_run_mv_refresh.side_effect = lambda **kwargs: (
+            job_control.request_cancel("run-1"),
+            job_control.stop_requested("run-1", stage="refresh"),
+        )
+
+        status, error = scheduler._execute_job("mv_refresh", run_id="run-1", job_id="job-1")
+
+        self.assertEqual((status, error), ("partial", job_control.STOP_CANCEL_REQUESTED))
+        self.assertEqual(mock_log.call_args.kwargs["message"], "job_stopped_early")
+        self.assertEqual(mock_log.call_args.kwargs["context"]["stages"], ["refresh"])
+
+    @patch("app.scheduler.log_job_run_log")
+    @patch("app.scheduler.run_mv_refresh")
+    @patch("app.scheduler.get_job_type_license_feature", return_value=None)
+    def test_job_that_ran_to_completion_succeeds(self, _mock_feature, _mock_run_mv_refresh, _mock_log):
+        job_control.register_run("run-1", job_type="mv_refresh", deadline_seconds=30)
+
+        self.assertEqual(scheduler._execute_job("mv_refresh", run_id="run-1", job_id="job-1"), ("success", None))
+
+    @patch("app.scheduler.log_job_run_log")
+    @patch("app.scheduler.emit")
+    @patch("app.scheduler.db.get_conn")
+    def test_cancel_dequeues_and_signals_the_running_run(self, mock_get_conn, _mock_emit, mock_log):
+        state = {"queued": True, "running": [("run-1", "job-1")]}
+        conn = FakeConnection(state)
+        mock_get_conn.return_value = conn
+        control = job_control.register_run("run-1", job_type="graph_ingest")
+
+        result = scheduler.cancel_job_run(job_id="job-1", actor_claims={"upn": "admin@example.com"})
+
+        self.assertEqual(result, {"run_ids": ["run-1"], "dequeued": True})
+        self.assertEqual(control.stop_reason(), job_control.STOP_CANCEL_REQUESTED)
+        self.assertEqual(conn.commits, 1)
+        self.assertEqual(mock_log.call_args.kwargs["message"], "job_cancel_requested")
+
+
+class CancelApiTests(unittest.TestCase):
+    def setUp(self):
+        self.original_token = os.environ.get("WORKER_INTERNAL_API_TOKEN")
+        os.environ["WORKER_INTERNAL_API_TOKEN"] = "worker-secret-token"
+        self.client = create_app().test_client()
+        self.headers = {"X-Worker-Internal-Token": "worker-secret-token"}
+
+    def tearDown(self):
+        if self.original_token is None:
+            os.environ.pop("WORKER_INTERNAL_API_TOKEN", None)
+        else:
+            os.environ["WORKER_INTERNAL_API_TOKEN"] = self.original_token
+
+    @patch("app.api.log_audit_event")
+    @patch("app.api.cancel_job_run", return_value={"run_ids": ["run-1"], "dequeued": False})
+    @patch("app.api.require_license_feature")
+    def test_cancel_accepts_run_id(self, _mock_license, mock_cancel, mock_audit):
+        response = self.client.post("/jobs/cancel", json={"run_id": "run-1"}, headers=self.headers)
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.get_json(), {"status": "cancel_requested", "run_ids": ["run-1"], "dequeued": False})
+        self.assertEqual(mock_cancel.call_args.kwargs["run_id"], "run-1")
+        self.assertEqual(mock_audit.call_args.kwargs["action"], "job_run_cancel_requested")
+
+    @patch("app.api.cancel_job_run", return_value={"run_ids": [], "dequeued": False})
+    @patch("app.api.require_license_feature")
+    def test_cancel_with_nothing_to_stop_is_not_found(self, _mock_license, _mock_cancel):
+        response = self.client.post("/jobs/cancel", json={"job_id": "job-1"}, headers=self.headers)
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.get_json()["error"], "no_running_or_queued_run")
+
+    def test_cancel_requires_a_target(self):
+        response = self.client.post("/jobs/cancel", json={}, headers=self.headers)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()["error"], "job_id_or_run_id_required")
+
+    @patch("app.api.db.fetch_one")
+    def test_run_now_rejects_invalid_deadline(self, mock_fetch_one):
+        response = self.client.post(
+            "/jobs/run-now", json={"job_id": "job-1", "deadline_seconds": 0}, headers=self.headers
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()["error"], "invalid_deadline_seconds")
+        mock_fetch_one.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
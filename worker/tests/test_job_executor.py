@@ -0,0 +1,292 @@
+import os
+import sys
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import job_control, job_executor, scheduler
+from app.api import create_app
+
+
+class FakeCursor:
+    def __init__(self, state):
+        self.state = state
+        self.executed = state.setdefault("executed", [])
+        self._rows = []
+        self.rowcount = 0
+
+    def execute(self, sql, params=None):
+        normalized = " ".join(sql.split())
+        self.executed.append((normalized, params))
+        self._rows = []
+        if normalized.startswith("SELECT schedule_id, job_id, cron_expr FROM job_schedules"):
+            self._rows = []
+        elif normalized.startswith("SELECT js.schedule_id, js.job_id, js.cron_expr, j.job_type"):
+            self._rows = list(self.state.get("due", []))[:1]
+        elif normalized.startswith("SELECT q.job_id, j.job_type, q.trigger"):
+            self._rows = list(self.state.get("queued", []))[:1]
+        elif normalized.startswith("INSERT INTO job_queue"):
+            queue = self.state.setdefault("queue", {})
+            job_id, priority = params[0], params[1]
+            existing = queue.get(job_id)
+            if existing:
+                existing["priority"] = max(existing["priority"], priority)
+                existing["request_count"] += 1
+            else:
+                queue[job_id] = existing = {"priority": priority, "request_count": 1}
+            self._rows = [(existing["request_count"] == 1, existing["priority"], existing["request_count"])]
+        elif normalized.startswith("INSERT INTO job_leases"):
+            self._rows = [(params[0],)] if self.state.get("lease_free", True) else []
+        elif normalized.startswith("UPDATE job_leases SET heartbeat_at"):
+            self._rows = [(run_id,) for run_id in params[1] if run_id in self.state.get("leased", [])]
+            self.rowcount = len(self._rows)
+        elif normalized.startswith("UPDATE job_runs SET finished_at"):
+            self.rowcount = 0 if self.state.get("reaped") else 1
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self):
+        return list(self._rows)
+
+
+class FakeConnection:
+    def __init__(self, state):
+        self.state = state
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self.state)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        pass
+
+
+class JobExecutorTests(unittest.TestCase):
+    def test_limits_apply_per_job_type_and_in_total(self):
+        executor = job_executor.JobExecutor(max_workers=3, type_limits={"mv_refresh": 2})
+
+        ingest = executor.reserve("graph_ingest")
+        self.assertIsNotNone(ingest)
+        self.assertIsNone(executor.reserve("graph_ingest"))
+        self.assertEqual(executor.saturated_job_types(), ["graph_ingest"])
+
+        first = executor.reserve("mv_refresh")
+        second = executor.reserve("mv_refresh")
+        self.assertIsNotNone(first)
+        self.assertIsNotNone(second)
+        self.assertFalse(executor.has_capacity())
+        self.assertIsNone(executor.reserve("copilot_telemetry"))
+
+        executor.release(first)
+        executor.release(first)
+        self.assertTrue(executor.has_capacity("copilot_telemetry"))
+        self.assertFalse(executor.has_capacity("graph_ingest"))
+
+    def test_started_slot_is_freed_when_the_job_finishes(self):
+        finished = threading.Event()
+        release_job = threading.Event()
+        executor = job_executor.JobExecutor(max_workers=2, on_finished=finished.set)
+
+        slot = executor.reserve("graph_ingest")
+        future = executor.start(slot, run_id="run-1", job_id="job-1", fn=release_job.wait)
+        self.assertEqual([item["run_id"] for item in executor.active_runs()], ["run-1"])
+        self.assertFalse(executor.has_capacity("graph_ingest"))
+
+        release_job.set()
+        future.result(timeout=5)
+        self.assertTrue(finished.wait(timeout=5))
+        self.assertEqual(executor.active_runs(), [])
+        self.assertTrue(executor.has_capacity("graph_ingest"))
+
+    def test_parse_job_type_limits(self):
+        self.assertEqual(
+            job_executor.parse_job_type_limits("graph_ingest=1, mv_refresh=3,bad,copilot=x,zero=0"),
+            {"graph_ingest": 1, "mv_refresh": 3, "zero": 1},
+        )
+
+
+class DispatchTests(unittest.TestCase):
+    def setUp(self):
+        self.executor = job_executor.JobExecutor(max_workers=2)
+        patcher = patch.object(scheduler, "_executor", self.executor)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch("app.scheduler.emit")
+    @patch("app.scheduler.get_job_type_license_feature", return_value=None)
+    @patch("app.scheduler.db.get_conn")
+    def test_due_schedule_is_queued_not_started(self, mock_get_conn, _mock_feature, _mock_emit):
+        state = {"due": [("schedule-1", "job-1", "*/5 * * * *", "mv_refresh")]}
+        conn = FakeConnection(state)
+        mock_get_conn.return_value = conn
+
+        self.assertTrue(scheduler._run_due_schedule())
+
+        statements = [sql for sql, _params in state["executed"]]
+        self.assertTrue(any(sql.startswith("INSERT INTO job_queue") for sql in statements))
+        self.assertTrue(any(sql.startswith("UPDATE job_schedules SET next_run_at") for sql in statements))
+        self.assertFalse(any(sql.startswith("INSERT INTO job_runs") for sql in statements))
+        self.assertEqual(state["queue"]["job-1"]["priority"], scheduler.JOB_QUEUE_SCHEDULE_PRIORITY)
+        self.assertEqual(conn.commits, 1)
+
+    @patch("app.scheduler.wake_scheduler")
+    @patch("app.scheduler.emit")
+    @patch("app.scheduler.db.get_conn")
+    def test_repeated_requests_coalesce(self, mock_get_conn, _mock_emit, mock_wake):
+        state = {}
+        mock_get_conn.side_effect = lambda: FakeConnection(state)
+
+        first = scheduler.enqueue_job("job-1", trigger="schedule")
+        second = scheduler.enqueue_job("job-1", trigger="run_now", actor_claims={"upn": "admin@example.com"})
+
+        self.assertFalse(first["coalesced"])
+        self.assertTrue(second["coalesced"])
+        self.assertEqual(second["priority"], scheduler.JOB_QUEUE_RUN_NOW_PRIORITY)
+        self.assertEqual(second["request_count"], 2)
+        self.assertEqual(mock_wake.call_count, 2)
+
+    @patch("app.scheduler.log_audit_event")
+    @patch("app.scheduler.emit")
+    @patch("app.scheduler._run_job")
+    @patch("app.scheduler.db.get_conn")
+    def test_queued_job_is_leased_and_handed_to_the_pool(self, mock_get_conn, mock_run_job, _mock_emit, _mock_audit):
+        actor = {"upn": "admin@example.com"}
+        state = {"queued": [("job-1", "mv_refresh", "run_now", actor, 100, 2, None)]}
+        conn = FakeConnection(state)
+        mock_get_conn.return_value = conn
+        ran = threading.Event()
+        mock_run_job.side_effect = lambda **kwargs: ran.set()
+
+        self.assertTrue(scheduler._dispatch_next_queued_job())
+        self.assertTrue(ran.wait(timeout=5))
+
+        statements = [sql for sql, _params in state["executed"]]
+        self.assertTrue(any(sql.startswith("INSERT INTO job_leases") for sql in statements))
+        self.assertTrue(any(sql.startswith("INSERT INTO job_runs") for sql in statements))
+        self.assertIn("DELETE FROM job_queue WHERE job_id = %s", statements)
+        self.assertEqual(conn.commits, 1)
+        kwargs = mock_run_job.call_args.kwargs
+        self.assertEqual(
+            (kwargs["job_id"], kwargs["job_type"], kwargs["trigger"], kwargs["actor_claims"]),
+            ("job-1", "mv_refresh", "run_now", actor),
+        )
+        queue_params = [params for sql, params in state["executed"] if sql.startswith("SELECT q.job_id")]
+        self.assertEqual(queue_params, [[[]]])
+
+    @patch("app.scheduler.emit")
+    @patch("app.scheduler.db.get_conn")
+    def test_held_lease_keeps_the_job_queued(self, mock_get_conn, _mock_emit):
+        state = {"queued": [("job-1", "graph_ingest", "schedule", None, 50, 1, None)], "lease_free": False}
+        conn = FakeConnection(state)
+        mock_get_conn.return_value = conn
+
+        self.assertFalse(scheduler._dispatch_next_queued_job())
+
+        self.assertEqual(conn.rollbacks, 1)
+        self.assertTrue(self.executor.has_capacity("graph_ingest"))
+        statements = [sql for sql, _params in state["executed"]]
+        self.assertFalse(any(sql.startswith("INSERT INTO job_runs") for sql in statements))
+        self.assertFalse(any(sql.startswith("DELETE FROM job_queue") for sql in statements))
+
+    @patch("app.scheduler.db.get_conn")
+    def test_full_pool_does_not_touch_the_database(self, mock_get_conn):
+        self.executor.reserve("graph_ingest")
+        self.executor.reserve("mv_refresh")
+
+        self.assertFalse(scheduler._dispatch_next_queued_job())
+        mock_get_conn.assert_not_called()
+
+
+class LeaseLossTests(unittest.TestCase):
+    def tearDown(self):
+        job_control.unregister_run("run-1")
+
+    @patch("app.scheduler.log_audit_event")
+    @patch("app.scheduler.log_job_run_log")
+    @patch("app.scheduler.finish_progress")
+    @patch("app.scheduler.start_progress")
+    @patch("app.scheduler.emit")
+    @patch("app.job_control.emit")
+    @patch("app.job_executor.emit")
+    @patch("app.scheduler.db.get_conn")
+    @patch("app.job_executor.db.get_conn")
+    def test_reaped_run_is_stopped_and_keeps_the_reaper_outcome(
+        self, mock_lease_conn, mock_run_conn, _emit_executor, _emit_control, _emit, _start, _finish, mock_run_log, mock_audit
+    ):
+        # The reaper already deleted run-1's lease and failed the run while its thread was still working.
+        state = {"leased": ["run-2"], "reaped": True}
+        mock_lease_conn.side_effect = lambda: FakeConnection(state)
+        mock_run_conn.side_effect = lambda: FakeConnection(state)
+        seen = {}
+
+        def execute_job(job_type, *, run_id, job_id, actor_claims=None):
+            lost = job_executor.renew_job_leases([run_id, "run-2"])
+            job_control.stop_lost_leases(lost)
+            seen["lost"] = lost
+            seen["stop"] = job_control.stop_requested(run_id, stage="drive_items")
+            return "partial", seen["stop"]
+
+        with patch("app.scheduler._execute_job", side_effect=execute_job):
+            scheduler._run_job(job_id="job-1", job_type="graph_ingest", run_id="run-1", trigger="schedule")
+
+        self.assertEqual(seen, {"lost": ["run-1"], "stop": job_control.STOP_LEASE_LOST})
+        final_updates = [sql for sql, _params in state["executed"] if sql.startswith("UPDATE job_runs SET finished_at")]
+        self.assertEqual(len(final_updates), 1)
+        self.assertIn("AND status = 'running' AND finished_at IS NULL", final_updates[0])
+        mock_audit.assert_not_called()
+        self.assertEqual(mock_run_log.call_args.kwargs["message"], "job_finished_after_lease_lost")
+
+
+class RunNowApiTests(unittest.TestCase):
+    def setUp(self):
+        self.original_token = os.environ.get("WORKER_INTERNAL_API_TOKEN")
+        os.environ["WORKER_INTERNAL_API_TOKEN"] = "worker-secret-token"
+        self.client = create_app().test_client()
+        self.headers = {"X-Worker-Internal-Token": "worker-secret-token"}
+
+    def tearDown(self):
+        if self.original_token is None:
+            os.environ.pop("WORKER_INTERNAL_API_TOKEN", None)
+        else:
+            os.environ["WORKER_INTERNAL_API_TOKEN"] = self.original_token
+
+    @patch("app.api.log_audit_event")
+    @patch("app.api.run_job_once")
+    @patch("app.api.require_license_feature")
+    @patch("app.api.db.fetch_one", return_value={"job_id": "job-1", "job_type": "graph_ingest"})
+    def test_run_now_queues_with_clamped_priority(self, _mock_fetch_one, _mock_license, mock_run_job_once, _mock_audit):
+        mock_run_job_once.return_value = {"job_id": "job-1", "priority": 1000, "request_count": 2, "coalesced": True}
+
+        response = self.client.post("/jobs/run-now", json={"job_id": "job-1", "priority": 5000}, headers=self.headers)
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(
+            response.get_json(), {"status": "queued", "priority": 1000, "coalesced": True, "request_count": 2}
+        )
+        self.assertEqual(mock_run_job_once.call_args.kwargs["priority"], 1000)
+
+    @patch("app.api.db.fetch_one")
+    def test_run_now_rejects_invalid_priority(self, mock_fetch_one):
+        response = self.client.post("/jobs/run-now", json={"job_id": "job-1", "priority": "high"}, headers=self.headers)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()["error"], "invalid_priority")
+        mock_fetch_one.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+import json
+import os
+import sys
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import job_progress
+from app.api import create_app
+
+
+def _events(body: str) -> list[tuple[str, dict]]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+class ProgressRegistryTests(unittest.TestCase):
+    def tearDown(self):
+        job_progress.finish_progress("run-1", "success")
+
+    def test_reports_are_ignored_for_unknown_runs(self):
+        job_progress.report_progress("run-unknown", "users", items_seen=10)
+        self.assertEqual(job_progress.get_progress("run-unknown"), [])
+
+    @patch("app.job_progress.time.monotonic")
+    def test_stage_counters_throughput_and_eta(self, mock_monotonic):
+        mock_monotonic.return_value = 1000.0
+        job_progress.start_progress("run-1", job_id="job-1", job_type="graph_ingest")
+        job_progress.report_progress("run-1", "users", items_seen=500, rows_written=500)
+        job_progress.report_progress("run-1", "drive_items", units_done=0, units_total=4, unit="drives")
+
+        mock_monotonic.return_value = 1010.0
+        job_progress.report_progress("run-1", "drive_items", items_seen=2000, rows_written=1000, units_done=1)
+
+        [run] = job_progress.get_progress("run-1")
+        self.assertEqual(run["status"], "running")
+        self.assertEqual(run["current_stage"], "drive_items")
+        users, drive_items = run["stages"]
+        self.assertTrue(users["finished"])
+        self.assertEqual(drive_items["rows_per_second"], 100.0)
+        self.assertEqual((drive_items["units_done"], drive_items["units_total"]), (1, 4))
+        self.assertEqual(drive_items["eta_seconds"], 30.0)
+
+    def test_finished_runs_stay_visible(self):
+        job_progress.start_progress("run-1", job_id="job-1", job_type="mv_refresh")
+        job_progress.finish_progress("run-1", "partial")
+
+        [run] = job_progress.get_progress("run-1")
+        self.assertEqual(run["status"], "partial")
+        self.assertIsNotNone(run["finished_at"])
+
+    def test_stream_for_a_run_ends_when_it_finishes(self):
+        job_progress.start_progress("run-1", job_id="job-1", job_type="graph_ingest")
+        job_progress.finish_progress("run-1", "success")
+
+        body = "".join(job_progress.iter_progress_events("run-1", min_interval=0))
+
+        events = _events(body)
+        self.assertEqual([name for name, _data in events], ["progress", "end"])
+        self.assertEqual(events[0][1]["runs"][0]["status"], "success")
+        self.assertEqual(events[1][1], {"reason": "run_finished"})
+
+    def test_stream_ends_after_max_duration(self):
+        body = "".join(job_progress.iter_progress_events(max_seconds=0, min_interval=0))
+
+        self.assertEqual(_events(body)[-1], ("end", {"reason": "max_duration"}))
+
+
+class ProgressApiTests(unittest.TestCase):
+    def setUp(self):
+        self.original_token = os.environ.get("WORKER_INTERNAL_API_TOKEN")
+        os.environ["WORKER_INTERNAL_API_TOKEN"] = "worker-secret-token"
+        self.client = create_app().test_client()
+        self.headers = {"X-Worker-Internal-Token": "worker-secret-token"}
+
+    def tearDown(self):
+        job_progress.finish_progress("run-1", "success")
+        if self.original_token is None:
+            os.environ.pop("WORKER_INTERNAL_API_TOKEN", None)
+        else:
+            os.environ["WORKER_INTERNAL_API_TOKEN"] = self.original_token
+
+    def test_progress_polling(self):
+        job_progress.start_progress("run-1", job_id="job-1", job_type="graph_ingest")
+        job_progress.report_progress("run-1", "sites", items_seen=42, rows_written=40)
+
+        response = self.client.get("/jobs/progress?run_id=run-1", headers=self.headers)
+
+        self.assertEqual(response.status_code, 200)
+        [run] = response.get_json()["runs"]
+        self.assertEqual(run["stages"][0]["items_seen"], 42)
+
+        missing = self.client.get("/jobs/progress?run_id=run-missing", headers=self.headers)
+        self.assertEqual(missing.status_code, 404)
+
+    def test_progress_stream(self):
+        job_progress.start_progress("run-1", job_id="job-1", job_type="graph_ingest")
+        job_progress.finish_progress("run-1", "failed")
+
+        response = self.client.get("/jobs/progress/stream?run_id=run-1", headers=self.headers)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "text/event-stream")
+        events = _events(response.get_data(as_text=True))
+        self.assertEqual(events[-1], ("end", {"reason": "run_finished"}))
+        response.close()
+
+    def test_progress_stream_is_refused_when_all_slots_are_taken(self):
+        held = [job_progress.open_progress_stream() for _ in range(job_progress.JOB_PROGRESS_STREAM_MAX_CLIENTS)]
+        try:
+            response = self.client.get("/jobs/progress/stream", headers=self.headers)
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.headers["Retry-After"], "5")
+            self.assertEqual(response.get_json(), {"error": "too_many_progress_streams"})
+        finally:
+            for stream in held:
+                stream.close()
+
+        stream = job_progress.open_progress_stream(max_seconds=0, min_interval=0)
+        self.assertIsNotNone(stream)
+        stream.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
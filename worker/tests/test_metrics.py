@@ -0,0 +1,129 @@
+import os
+import sys
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import db, metrics
+from app.api import create_app
+from app.graph_client import GraphClient
+
+
+class MetricsRenderTests(unittest.TestCase):
+    def test_counter_renders_labels_and_escapes_values(self):
+        counter = metrics.Counter("test_total", "Test counter.", ("table", "op"))
+        counter.inc(table='msgraph_"users"', op="upsert")
+        counter.inc(2, table='msgraph_"users"', op="upsert")
+
+        self.assertEqual(
+            counter.render(),
+            [
+                "# HELP test_total Test counter.",
+                "# TYPE test_total counter",
+                'test_total{table="msgraph_\\"users\\"",op="upsert"} 3',
+            ],
+        )
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = metrics.Histogram("test_seconds", "Test histogram.", ("op",), buckets=(0.1, 1))
+        histogram.observe(0.05, op="copy")
+        histogram.observe(0.5, op="copy")
+        histogram.observe(5, op="copy")
+
+        lines = histogram.render()
+
+        self.assertIn('test_seconds_bucket{op="copy",le="0.1"} 1', lines)
+        self.assertIn('test_seconds_bucket{op="copy",le="1"} 2', lines)
+        self.assertIn('test_seconds_bucket{op="copy",le="+Inf"} 3', lines)
+        self.assertIn('test_seconds_sum{op="copy"} 5.55', lines)
+        self.assertIn('test_seconds_count{op="copy"} 3', lines)
+        self.assertEqual(histogram.count(op="copy"), 3)
+
+    def test_graph_endpoint_class_collapses_ids(self):
+        cases = {
+            "https://graph.microsoft.com/v1.0/users?$select=id": "/users",
+            "https://graph.microsoft.com/v1.0/drives/b!abc123/root/delta?token=x": "/drives/{id}/root/delta",
+            "https://graph.microsoft.com/v1.0/groups/0b6e-11aa/members": "/groups/{id}/members",
+            "https://graph.microsoft.com/beta/reports/getOffice365ActiveUserDetail(period='D7')": (
+                "/reports/getOffice365ActiveUserDetail()"
+            ),
+        }
+        for url, expected in cases.items():
+            with self.subTest(url=url):
+                self.assertEqual(metrics.graph_endpoint_class(url), expected)
+
+
+class MetricsInstrumentationTests(unittest.TestCase):
+    @patch("app.db.emit")
+    @patch("app.db.psycopg2.extras.execute_values")
+    def test_execute_values_records_rows_and_outcome(self, mock_execute_values, _mock_emit):
+        query = "INSERT INTO metrics_test_table (id) VALUES %s ON CONFLICT (id) DO UPDATE SET id = EXCLUDED.id"
+        op, table = db._classify_write_query(query)
+        before_rows = metrics.DB_WRITE_ROWS.value(table=table, op=op)
+        before_errors = metrics.DB_WRITES.value(table=table, op=op, outcome="error")
+
+        db.execute_values(object(), query, [(1,), (2,)])
+        mock_execute_values.side_effect = RuntimeError("boom")
+        with self.assertRaises(RuntimeError):
+            db.execute_values(object(), query, [(3,)])
+
+        self.assertEqual(metrics.DB_WRITE_ROWS.value(table=table, op=op), before_rows + 2)
+        self.assertEqual(metrics.DB_WRITES.value(table=table, op=op, outcome="error"), before_errors + 1)
+
+    @patch.dict(os.environ, {"ENTRA_TENANT_ID": "t", "ENTRA_CLIENT_ID": "c", "ENTRA_CLIENT_SECRET": "s"})
+    @patch("app.graph_client.ConfidentialClientApplication")
+    @patch("app.graph_client.time.sleep")
+    @patch("app.graph_client.requests.request")
+    def test_graph_requests_retries_and_sleeps_are_counted(self, mock_request, _mock_sleep, _mock_cca):
+        throttled = SimpleNamespace(status_code=429, headers={"Retry-After": "2"}, ok=False)
+        ok = SimpleNamespace(status_code=200, headers={}, ok=True, json=lambda: {"value": []})
+        mock_request.side_effect = [throttled, ok]
+        endpoint = "/sites/{id}/lists"
+        before = (
+            metrics.GRAPH_REQUESTS.value(endpoint=endpoint, method="GET", status="429"),
+            metrics.GRAPH_RETRIES.value(endpoint=endpoint, reason="429"),
+            metrics.GRAPH_THROTTLE_SLEEP_SECONDS.value(endpoint=endpoint),
+        )
+        client = GraphClient()
+
+        with patch.object(client, "_get_token", return_value="token"):
+            client.get_json("/sites/contoso.sharepoint.com,1,2/lists")
+
+        self.assertEqual(metrics.GRAPH_REQUESTS.value(endpoint=endpoint, method="GET", status="429"), before[0] + 1)
+        self.assertEqual(metrics.GRAPH_RETRIES.value(endpoint=endpoint, reason="429"), before[1] + 1)
+        self.assertEqual(metrics.GRAPH_THROTTLE_SLEEP_SECONDS.value(endpoint=endpoint), before[2] + 2.0)
+
+
+class MetricsApiTests(unittest.TestCase):
+    def setUp(self):
+        self.original_token = os.environ.get("WORKER_INTERNAL_API_TOKEN")
+        os.environ["WORKER_INTERNAL_API_TOKEN"] = "worker-secret-token"
+        self.client = create_app().test_client()
+        self.headers = {"X-Worker-Internal-Token": "worker-secret-token"}
+
+    def tearDown(self):
+        if self.original_token is None:
+            os.environ.pop("WORKER_INTERNAL_API_TOKEN", None)
+        else:
+            os.environ["WORKER_INTERNAL_API_TOKEN"] = self.original_token
+
+    def test_metrics_endpoint_serves_text_exposition(self):
+        metrics.JOB_RUNS.inc(job_type="mv_refresh", status="success")
+
+        response = self.client.get("/metrics", headers=self.headers)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith("text/plain; version=0.0.4"))
+        body = response.get_data(as_text=True)
+        self.assertIn("# TYPE sentinel_job_runs_total counter", body)
+        self.assertIn('sentinel_job_runs_total{job_type="mv_refresh",status="success"}', body)
+
+
+if __name__ == "__main__":
+    unittest.main()
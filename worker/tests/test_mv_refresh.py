@@ -0,0 +1,361 @@
+import os
+import sys
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from unittest.mock import patch
+
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.api import create_app
+from app.jobs import mv_refresh
+
+
+NOW = datetime(2026, 3, 2, 6, 0, tzinfo=timezone.utc)
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self._fetchall = []
+
+    def execute(self, query, params=None):
+        text = query if isinstance(query, str) else repr(query)
+        normalized = " ".join(text.split())
+        self.conn.executed.append((normalized, params))
+        self._fetchall = []
+        if "REFRESH MATERIALIZED VIEW" in normalized:
+            mv_name = normalized.split("Identifier('", 1)[1].split("'", 1)[0]
+            if mv_name in self.conn.state["fail"]:
+                raise RuntimeError(f"refresh failed: {mv_name}")
+        elif normalized.startswith("SELECT q.mv_name, q.dirty_since, q.attempts"):
+            self._fetchall = list(self.conn.state["pending"])
+        elif normalized.startswith("SELECT DISTINCT d.mv_name, d.table_name"):
+            self._fetchall = list(self.conn.state["declared_edges"])
+        elif normalized.startswith("SELECT DISTINCT v.relname, ref.relname"):
+            self._fetchall = list(self.conn.state["catalog_edges"])
+
+    def fetchall(self):
+        return list(self._fetchall)
+
+    def fetchone(self):
+        return self._fetchall[0] if self._fetchall else None
+
+
+class FakeConnection:
+    def __init__(self, state):
+        self.state = state
+        self.executed = []
+        self.commits = 0
+        self.rollbacks = 0
+        state["connections"].append(self)
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        pass
+
+
+class DependencyOrderTests(unittest.TestCase):
+    def test_upstream_views_finish_before_dependents_start(self):
+        started = []
+        finished = []
+        lock = threading.Lock()
+
+        def refresh_one(mv_name):
+            with lock:
+                started.append((mv_name, set(finished)))
+            time.sleep(0.01)
+            with lock:
+                finished.append(mv_name)
+
+        outcome = mv_refresh._refresh_in_dependency_order(
+            ["mv_summary", "mv_site_inventory", "mv_routable", "mv_other"],
+            {"mv_summary": {"mv_site_inventory", "mv_routable"}, "mv_routable": {"mv_site_inventory"}},
+            parallelism=4,
+            refresh_one=refresh_one,
+        )
+
+        self.assertEqual(sorted(outcome["refreshed"]), ["mv_other", "mv_routable", "mv_site_inventory", "mv_summary"])
+        seen_before = dict(started)
+        self.assertIn("mv_site_inventory", seen_before["mv_routable"])
+        self.assertTrue({"mv_site_inventory", "mv_routable"} <= seen_before["mv_summary"])
+        self.assertEqual(outcome["failed"], [])
+        self.assertEqual(outcome["blocked"], [])
+
+    def test_independent_views_run_concurrently_up_to_parallelism(self):
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def refresh_one(mv_name):
+            with lock:
+                active.append(mv_name)
+                peak.append(len(active))
+            time.sleep(0.02)
+            with lock:
+                active.remove(mv_name)
+
+        mv_refresh._refresh_in_dependency_order(
+            [f"mv_{idx}" for idx in range(6)], {}, parallelism=3, refresh_one=refresh_one
+        )
+
+        self.assertEqual(max(peak), 3)
+
+    def test_failed_upstream_blocks_dependents_and_cycles_never_start(self):
+        attempted = []
+
+        def refresh_one(mv_name):
+            attempted.append(mv_name)
+            if mv_name == "mv_base":
+                raise RuntimeError("boom")
+
+        outcome = mv_refresh._refresh_in_dependency_order(
+            ["mv_base", "mv_child", "mv_a", "mv_b", "mv_free"],
+            {"mv_child": {"mv_base"}, "mv_a": {"mv_b"}, "mv_b": {"mv_a"}},
+            parallelism=1,
+            refresh_one=refresh_one,
+        )
+
+        self.assertEqual(attempted, ["mv_base", "mv_free"])
+        self.assertEqual([name for name, _exc in outcome["failed"]], ["mv_base"])
+        self.assertEqual(
+            outcome["blocked"],
+            [("mv_child", ["mv_base"]), ("mv_a", ["mv_b"]), ("mv_b", ["mv_a"])],
+        )
+
+
+def _candidate(name, *, stale_minutes=10, expected_seconds=None, attempts=0, last_attempt_minutes=None):
+    return {
+        "mv_name": name,
+        "dirty_since": NOW - timedelta(minutes=stale_minutes),
+        "attempts": attempts,
+        "last_attempt_at": NOW - timedelta(minutes=last_attempt_minutes) if last_attempt_minutes is not None else None,
+        "expected_seconds": expected_seconds,
+    }
+
+
+class PlanRefreshTests(unittest.TestCase):
+    def _plan(self, candidates, upstream=None, **overrides):
+        kwargs = {
+            "now": NOW,
+            "budget_seconds": 60,
+            "parallelism": 1,
+            "max_views": 20,
+            "backoff_base_seconds": 60,
+            "backoff_max_seconds": 3600,
+        }
+        kwargs.update(overrides)
+        return mv_refresh._plan_refresh(candidates, upstream or {}, **kwargs)
+
+    def test_ranks_by_staleness_per_cost_within_budget(self):
+        planned, deferred = self._plan(
+            [
+                _candidate("mv_slow", stale_minutes=60, expected_seconds=50),
+                _candidate("mv_cheap", stale_minutes=20, expected_seconds=5),
+                _candidate("mv_medium", stale_minutes=30, expected_seconds=20),
+            ]
+        )
+
+        self.assertEqual([item["mv_name"] for item in planned], ["mv_cheap", "mv_medium"])
+        self.assertEqual(deferred, [{"mv_name": "mv_slow", "reason": "budget"}])
+        planned, _ = self._plan([_candidate("mv_huge", expected_seconds=900)])
+        self.assertEqual([item["mv_name"] for item in planned], ["mv_huge"])
+
+    def test_parallelism_scales_budget_and_upstreams_come_first(self):
+        planned, deferred = self._plan(
+            [
+                _candidate("mv_summary", stale_minutes=90, expected_seconds=30),
+                _candidate("mv_inventory", stale_minutes=5, expected_seconds=40),
+                _candidate("mv_other", stale_minutes=5, expected_seconds=60),
+            ],
+            {"mv_summary": {"mv_inventory"}},
+            parallelism=2,
+        )
+
+        self.assertEqual([item["mv_name"] for item in planned], ["mv_inventory", "mv_summary"])
+        self.assertEqual(deferred, [{"mv_name": "mv_other", "reason": "budget"}])
+
+    def test_failed_views_back_off_exponentially(self):
+        self.assertEqual(mv_refresh._backoff_seconds(0, base_seconds=60, max_seconds=3600), 0.0)
+        self.assertEqual(mv_refresh._backoff_seconds(3, base_seconds=60, max_seconds=3600), 240.0)
+        self.assertEqual(mv_refresh._backoff_seconds(12, base_seconds=60, max_seconds=3600), 3600.0)
+
+        planned, deferred = self._plan(
+            [
+                _candidate("mv_retry_later", attempts=3, last_attempt_minutes=2),
+                _candidate("mv_retry_now", attempts=1, last_attempt_minutes=2),
+            ]
+        )
+        self.assertEqual([item["mv_name"] for item in planned], ["mv_retry_now"])
+        self.assertEqual(deferred[0]["mv_name"], "mv_retry_later")
+        self.assertEqual(deferred[0]["reason"], "backoff")
+
+
+class ChangeLogCursor:
+    def __init__(self, consumed, released, held):
+        self.results = {
+            "WITH consumed AS": consumed,
+            "DELETE FROM table_change_pending": released,
+            "WITH impacted AS": [("mv_msgraph_site_inventory",)] if released else [],
+            "SELECT table_name, inserted_rows + updated_rows + deleted_rows": held,
+        }
+        self.executed = []
+        self._fetchall = []
+
+    def execute(self, query, params=None):
+        normalized = " ".join(query.split())
+        self.executed.append((normalized, params))
+        self._fetchall = next((rows for prefix, rows in self.results.items() if normalized.startswith(prefix)), [])
+
+    def fetchall(self):
+        return list(self._fetchall)
+
+
+class EnqueueChangedMvsTests(unittest.TestCase):
+    @patch("app.jobs.mv_refresh.db.get_conn")
+    def test_queues_only_tables_released_from_the_change_log(self, mock_get_conn):
+        cur = ChangeLogCursor(
+            consumed=[("msgraph_drive_items", 3, 10, 0), ("msgraph_groups", 0, 1, 0)],
+            released=[("msgraph_drive_items",)],
+            held=[("msgraph_groups", 1)],
+        )
+        conn = FakeConnection({"connections": []})
+        conn.cursor = lambda: cur
+        mock_get_conn.return_value = conn
+
+        summary = mv_refresh.enqueue_changed_mvs(min_changed_rows=5, max_hold_minutes=60)
+
+        self.assertEqual(summary["changes"]["msgraph_drive_items"], {"inserted": 3, "updated": 10, "deleted": 0})
+        self.assertEqual(summary["tables"], ["msgraph_drive_items"])
+        self.assertEqual(summary["held"], {"msgraph_groups": 1})
+        self.assertEqual(summary["queued_mvs"], ["mv_msgraph_site_inventory"])
+        release = [params for sql, params in cur.executed if sql.startswith("DELETE FROM table_change_pending")]
+        self.assertEqual(release, [[5, 60]])
+        enqueue = [params for sql, params in cur.executed if sql.startswith("WITH impacted AS")]
+        self.assertEqual(enqueue, [[["msgraph_drive_items"]]])
+        self.assertEqual(conn.commits, 1)
+
+    @patch("app.jobs.mv_refresh.db.get_conn")
+    def test_unchanged_tables_queue_nothing(self, mock_get_conn):
+        cur = ChangeLogCursor(consumed=[], released=[], held=[])
+        conn = FakeConnection({"connections": []})
+        conn.cursor = lambda: cur
+        mock_get_conn.return_value = conn
+
+        summary = mv_refresh.enqueue_changed_mvs()
+
+        self.assertEqual((summary["changes"], summary["tables"], summary["queued"]), ({}, [], 0))
+        self.assertFalse(any(sql.startswith("WITH impacted AS") for sql, _params in cur.executed))
+
+
+class RunMvRefreshTests(unittest.TestCase):
+    @patch("app.jobs.mv_refresh.enqueue_changed_mvs", return_value={"changes": {}, "tables": [], "queued": 0, "queued_mvs": []})
+    @patch("app.jobs.mv_refresh.db.execute")
+    @patch("app.jobs.mv_refresh.apply_activity_rollup_changes", return_value={"passes": 1})
+    @patch("app.jobs.mv_refresh.log_audit_event")
+    @patch("app.jobs.mv_refresh.log_job_run_log")
+    @patch("app.jobs.mv_refresh.emit")
+    @patch("app.jobs.mv_refresh.db.fetch_one")
+    @patch("app.jobs.mv_refresh.db.get_conn")
+    def test_refreshes_in_one_transaction_per_view_and_requeues_dependents(
+        self, mock_get_conn, mock_fetch_one, _mock_emit, _mock_log_job_run_log, _mock_audit, mock_apply_rollups, mock_execute, mock_enqueue_changed
+    ):
+        dirty_since = datetime.now(timezone.utc) - timedelta(minutes=5)
+        state = {
+            "pending": [
+                ("mv_msgraph_site_inventory", dirty_since, 0, None, 1500.0),
+                ("mv_broken", dirty_since, 2, dirty_since - timedelta(hours=2), None),
+                ("mv_broken_child", dirty_since, 0, None, None),
+            ],
+            "declared_edges": [("mv_broken_child", "mv_broken")],
+            "catalog_edges": [("mv_msgraph_sharing_posture_summary", "mv_msgraph_site_inventory")],
+            "fail": {"mv_broken"},
+            "connections": [],
+        }
+        mock_get_conn.side_effect = lambda: FakeConnection(state)
+        mock_fetch_one.return_value = {"config": {"parallelism": 2}}
+
+        summary = mv_refresh.run_mv_refresh(run_id="run-1", job_id="job-1")
+
+        self.assertEqual(summary["parallelism"], 2)
+        self.assertEqual(summary["refreshed_mvs"], ["mv_msgraph_site_inventory"])
+        self.assertEqual([row["mv_name"] for row in summary["failed_mvs"]], ["mv_broken"])
+        self.assertEqual(summary["blocked_mvs"], [{"mv_name": "mv_broken_child", "waiting_on": ["mv_broken"]}])
+        self.assertEqual(summary["attempted"], 2)
+        self.assertEqual(summary["activity_rollups"], {"passes": 1})
+        mock_apply_rollups.assert_called_once_with()
+        mock_enqueue_changed.assert_called_once_with(wake_scheduler=False)
+        self.assertTrue(mock_execute.call_args[0][0].startswith("DELETE FROM mv_refresh_history"))
+
+        refresh_conns = state["connections"][1:]
+        self.assertEqual(len(refresh_conns), 2)
+        for conn in refresh_conns:
+            statements = [sql for sql, _params in conn.executed]
+            self.assertTrue(statements[0].startswith("Composed("))
+            if any("REFRESH MATERIALIZED VIEW" in sql and "mv_broken" in sql for sql in statements):
+                self.assertEqual(conn.rollbacks, 1)
+                self.assertTrue(statements[-2].startswith("UPDATE mv_refresh_queue SET last_attempt_at = now()"))
+                self.assertIn("'failed'", statements[-1])
+                self.assertEqual(conn.executed[-1][1][0], "mv_broken")
+            else:
+                self.assertEqual(conn.rollbacks, 0)
+                self.assertEqual(conn.commits, 1)
+                requeue = [params for sql, params in conn.executed if sql.startswith("INSERT INTO mv_refresh_queue")]
+                self.assertEqual(requeue, [[["mv_msgraph_sharing_posture_summary"]]])
+                history = [(sql, params) for sql, params in conn.executed if sql.startswith("INSERT INTO mv_refresh_history")]
+                self.assertEqual(len(history), 1)
+                self.assertEqual(history[0][1][0:2], ["mv_msgraph_site_inventory", "run-1"])
+                self.assertIn("NULLIF(c.reltuples, -1)::bigint", history[0][0])
+                self.assertFalse(any("count(*)" in sql for sql in statements))
+
+    @patch("app.jobs.mv_refresh.db.fetch_one")
+    def test_parallelism_config_is_clamped(self, mock_fetch_one):
+        mock_fetch_one.return_value = {"config": {"parallelism": 50}}
+        self.assertEqual(mv_refresh._get_mv_refresh_runtime_config("job-1")["parallelism"], 8)
+        mock_fetch_one.return_value = {"config": {"parallelism": 0}}
+        self.assertEqual(mv_refresh._get_mv_refresh_runtime_config("job-1")["parallelism"], 1)
+
+
+class MvRefreshStatsApiTests(unittest.TestCase):
+    def setUp(self):
+        self.original_token = os.environ.get("WORKER_INTERNAL_API_TOKEN")
+        os.environ["WORKER_INTERNAL_API_TOKEN"] = "worker-secret-token"
+        self.client = create_app().test_client()
+
+    def tearDown(self):
+        if self.original_token is None:
+            os.environ.pop("WORKER_INTERNAL_API_TOKEN", None)
+        else:
+            os.environ["WORKER_INTERNAL_API_TOKEN"] = self.original_token
+
+    @patch("app.jobs.mv_refresh.db.fetch_all")
+    def test_stats_endpoint_returns_percentiles_per_view(self, mock_fetch_all):
+        mock_fetch_all.return_value = [{"mv_name": "mv_msgraph_site_inventory", "p50_ms": 1200.0, "p95_ms": 4100.0}]
+        headers = {"X-Worker-Internal-Token": "worker-secret-token"}
+
+        response = self.client.get("/mv-refresh/stats?days=500", headers=headers)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["days"], 90)
+        self.assertEqual(response.get_json()["views"][0]["p95_ms"], 4100.0)
+        self.assertIn("percentile_cont(0.95)", mock_fetch_all.call_args[0][0])
+        self.assertEqual(mock_fetch_all.call_args[0][1], [90])
+        self.assertEqual(self.client.get("/mv-refresh/stats?days=x", headers=headers).status_code, 400)
+        self.assertEqual(self.client.get("/mv-refresh/stats").status_code, 401)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,187 @@
+import os
+import sys
+import unittest
+from datetime import datetime, timezone
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import raw_payloads
+from app.jobs import graph_ingest
+
+
+SYNCED_AT = datetime(2026, 10, 19, tzinfo=timezone.utc)
+MEMBERSHIP_ROWS = [
+    ("g1", "u1", "user", SYNCED_AT, None, {"id": "u1"}),
+    ("g1", "u2", "user", SYNCED_AT, None, None),
+]
+
+
+def _sql(query):
+    return " ".join(query.split())
+
+
+class DetachTests(unittest.TestCase):
+    @patch("app.raw_payloads.db.execute_values")
+    def test_inline_mode_returns_rows_untouched(self, mock_execute_values):
+        rows = raw_payloads.detach(object(), MEMBERSHIP_ROWS, graph_ingest._MEMBERSHIP_PAYLOADS, mode="inline")
+
+        self.assertIs(rows, MEMBERSHIP_ROWS)
+        mock_execute_values.assert_not_called()
+
+    @patch("app.raw_payloads.db.execute_values")
+    def test_archive_mode_writes_payloads_by_entity_key_and_clears_raw_json(self, mock_execute_values):
+        cur = object()
+
+        rows = raw_payloads.detach(cur, MEMBERSHIP_ROWS, graph_ingest._MEMBERSHIP_PAYLOADS, mode="archive")
+
+        self.assertEqual([row[5] for row in rows], [None, None])
+        self.assertEqual([row[:5] for row in rows], [row[:5] for row in MEMBERSHIP_ROWS])
+        args = mock_execute_values.call_args.args
+        self.assertIs(args[0], cur)
+        self.assertIn("v.payload::jsonb, v.updated_at", _sql(args[1]))
+        self.assertIn("OR msgraph_raw_payloads.payload IS NULL", _sql(args[1]))
+        self.assertEqual(args[2], [("group_membership", ["g1", "u1", "user"], {"id": "u1"}, SYNCED_AT)])
+
+    @patch("app.raw_payloads.db.execute_values")
+    def test_hash_mode_stores_only_the_hash(self, mock_execute_values):
+        raw_payloads.detach(object(), MEMBERSHIP_ROWS, graph_ingest._MEMBERSHIP_PAYLOADS, mode="hash")
+
+        query = _sql(mock_execute_values.call_args.args[1])
+        self.assertIn("sha256(convert_to(v.payload::jsonb::text, 'UTF8')), NULL::jsonb", query)
+        self.assertIn("OR msgraph_raw_payloads.payload IS NOT NULL", query)
+
+    @patch("app.raw_payloads.db.execute_values")
+    def test_off_mode_and_tombstones_only_clear_raw_json(self, mock_execute_values):
+        tombstones = [("d1", "i1", SYNCED_AT, SYNCED_AT, {"deleted": {}})]
+
+        dropped = raw_payloads.detach(object(), MEMBERSHIP_ROWS, graph_ingest._MEMBERSHIP_PAYLOADS, mode="off")
+        archived = raw_payloads.detach(object(), tombstones, graph_ingest._DRIVE_ITEM_TOMBSTONE_PAYLOADS, mode="archive")
+
+        self.assertEqual([row[5] for row in dropped], [None, None])
+        self.assertEqual(archived, [("d1", "i1", SYNCED_AT, SYNCED_AT, None)])
+        mock_execute_values.assert_not_called()
+
+    @patch("app.raw_payloads.GRAPH_RAW_PAYLOADS", "archive")
+    @patch("app.raw_payloads.db.execute_values")
+    def test_dedup_upsert_archives_only_the_surviving_row(self, mock_execute_values):
+        rows = [
+            ("g1", "u1", "user", SYNCED_AT, None, {"v": 1}),
+            ("g1", "u1", "user", SYNCED_AT, None, {"v": 2}),
+        ]
+
+        executed, dropped = graph_ingest._execute_values_dedup_keep_last(
+            object(), "INSERT", rows, key_fn=lambda r: r[:3], payloads=graph_ingest._MEMBERSHIP_PAYLOADS
+        )
+
+        self.assertEqual((executed, dropped), (1, 1))
+        archive_call, upsert_call = mock_execute_values.call_args_list
+        self.assertEqual(archive_call.args[2], [("group_membership", ["g1", "u1", "user"], {"v": 2}, SYNCED_AT)])
+        self.assertEqual(upsert_call.args[2], [("g1", "u1", "user", SYNCED_AT, None, None)])
+
+
+class PayloadSqlTests(unittest.TestCase):
+    def test_row_positions_match_upsert_columns(self):
+        self.assertEqual(graph_ingest._DRIVE_ITEM_COLUMNS[graph_ingest._DRIVE_ITEM_PAYLOADS.payload], "raw_json")
+        row = graph_ingest._permission_row("d1", "i1", {"id": "p1"}, synced_at=SYNCED_AT)
+        self.assertEqual(row[graph_ingest._PERMISSION_PAYLOADS.payload].adapted, {"id": "p1"})
+        self.assertIs(row[graph_ingest._PERMISSION_PAYLOADS.synced_at], SYNCED_AT)
+
+    def test_detached_stage_merge_writes_null_raw_json(self):
+        query = _sql(graph_ingest._DRIVE_ITEMS_MERGE_STAGE_DETACHED_SQL)
+
+        self.assertIn("permissions_last_error_details, synced_at, deleted_at, NULL::jsonb FROM drive_items_stage", query)
+        self.assertNotIn("NULL::jsonb", _sql(graph_ingest._DRIVE_ITEMS_MERGE_STAGE_SQL))
+
+    def test_stage_archive_keeps_newest_staged_payload_per_key(self):
+        query = _sql(raw_payloads.stage_archive_sql("drive_item", "drive_items_stage", order_by="stage_seq DESC", mode="archive"))
+
+        self.assertIn("SELECT DISTINCT ON (drive_id, id) 'drive_item', ARRAY[drive_id, id]", query)
+        self.assertIn("ORDER BY drive_id, id, stage_seq DESC", query)
+
+    def test_invalid_mode_is_rejected(self):
+        with patch.dict(os.environ, {"GRAPH_RAW_PAYLOADS": "zstd"}):
+            with self.assertRaises(ValueError):
+                raw_payloads._env_mode("GRAPH_RAW_PAYLOADS", "inline")
+
+
+class MaintenanceTests(unittest.TestCase):
+    def _conn(self, cleared=()):
+        conn = MagicMock()
+        cur = conn.cursor.return_value
+        cur.fetchall.return_value = [(entity_type,) for entity_type in cleared]
+        return conn, cur
+
+    @staticmethod
+    def _cleared_marks(cur):
+        return [
+            call.args[1][0]
+            for call in cur.execute.call_args_list
+            if "SET backlog_cleared_at = now()" in _sql(call.args[0])
+        ]
+
+    @patch("app.raw_payloads.db.execute_values")
+    @patch("app.raw_payloads.db.stream_rows")
+    @patch("app.raw_payloads.db.get_conn")
+    def test_hash_mode_detaches_inline_payloads_in_committed_chunks(self, mock_get_conn, mock_stream_rows, mock_execute_values):
+        conn, cur = self._conn()
+        mock_get_conn.return_value = conn
+
+        def stream(_conn, name, query, params, withhold):
+            self.assertTrue(withhold)
+            if name == "raw_payloads_detach_group_membership":
+                return iter([("g1", "u1", "user"), ("g1", "u2", "user"), ("g2", "u1", "user")])
+            return iter([])
+
+        mock_stream_rows.side_effect = stream
+
+        summary = raw_payloads.maintain_raw_payloads(mode="hash", retention_days=0, max_rows=10, chunk_size=2)
+
+        self.assertEqual(summary["detached"]["group_membership"], 3)
+        self.assertEqual(summary["pruned"], {})
+        chunks = [call.args[2] for call in mock_execute_values.call_args_list]
+        self.assertEqual(chunks, [[("g1", "u1", "user"), ("g1", "u2", "user")], [("g2", "u1", "user")]])
+        query = _sql(mock_execute_values.call_args.args[1])
+        self.assertIn("NULL::jsonb", query)
+        self.assertIn("UPDATE msgraph_group_memberships t SET raw_json = NULL FROM old", query)
+        record_query, record_params = cur.execute.call_args_list[0].args
+        self.assertIn("WHERE msgraph_raw_payload_state.mode <> EXCLUDED.mode", _sql(record_query))
+        self.assertEqual(record_params, ["hash", list(raw_payloads.ENTITY_TABLES)])
+        self.assertEqual(self._cleared_marks(cur), list(raw_payloads.ENTITY_TABLES))
+        conn.close.assert_called_once()
+
+    @patch("app.raw_payloads.db.execute_values")
+    @patch("app.raw_payloads.db.stream_rows")
+    @patch("app.raw_payloads.db.get_conn")
+    def test_drained_tables_are_not_rescanned_until_the_mode_changes(self, mock_get_conn, mock_stream_rows, mock_execute_values):
+        conn, cur = self._conn(cleared=[t for t in raw_payloads.ENTITY_TABLES if t != "drive_item"])
+        mock_get_conn.return_value = conn
+        mock_stream_rows.return_value = iter([("d1", "i1"), ("d1", "i2")])
+
+        summary = raw_payloads.maintain_raw_payloads(mode="archive", retention_days=0, max_rows=2, chunk_size=10)
+
+        self.assertEqual(summary["detached"], {"drive_item": 2})
+        self.assertEqual(mock_stream_rows.call_args.args[1], "raw_payloads_detach_drive_item")
+        # A full batch may have left rows behind, so the table stays open for the next run.
+        self.assertEqual(self._cleared_marks(cur), [])
+
+    @patch("app.raw_payloads.db.execute_values")
+    @patch("app.raw_payloads.db.stream_rows")
+    @patch("app.raw_payloads.db.get_conn")
+    def test_inline_mode_without_retention_scans_nothing(self, mock_get_conn, mock_stream_rows, mock_execute_values):
+        conn, _cur = self._conn()
+        mock_get_conn.return_value = conn
+
+        summary = raw_payloads.maintain_raw_payloads(mode="inline", retention_days=0)
+
+        self.assertEqual((summary["detached"], summary["pruned"]), ({}, {}))
+        mock_stream_rows.assert_not_called()
+        mock_execute_values.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import sys
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import scheduler
+
+
+class FakeListener:
+    def __init__(self, payloads=None, pending=None):
+        self.payloads = list(payloads or [])
+        self.notifies = [SimpleNamespace(payload=payload) for payload in (pending or [])]
+        self.polls = 0
+        self.closed = False
+
+    def poll(self):
+        self.polls += 1
+        self.notifies.extend(SimpleNamespace(payload=payload) for payload in self.payloads)
+        self.payloads = []
+
+    def close(self):
+        self.closed = True
+
+
+class DrainTests(unittest.TestCase):
+    @patch("app.scheduler._dispatch_next_queued_job", side_effect=[True, False])
+    @patch("app.scheduler._run_due_schedule", side_effect=[True, True, True, False])
+    def test_drains_every_due_schedule_then_dispatches_the_queue(self, mock_run_due, mock_dispatch):
+        self.assertEqual(scheduler._drain_due_schedules(), 4)
+        self.assertEqual(mock_run_due.call_count, 4)
+        self.assertEqual(mock_dispatch.call_count, 2)
+
+    @patch("app.scheduler._dispatch_next_queued_job", return_value=False)
+    @patch("app.scheduler._run_due_schedule", return_value=True)
+    def test_drain_is_bounded(self, _mock_run_due, _mock_dispatch):
+        self.assertEqual(scheduler._drain_due_schedules(), scheduler.SCHEDULER_MAX_DRAIN_PER_WAKE)
+
+
+class NextRunTests(unittest.TestCase):
+    @patch("app.scheduler.db.fetch_one")
+    def test_sleeps_until_next_run_capped_by_poll_interval(self, mock_fetch_one):
+        mock_fetch_one.return_value = {"has_unscheduled": False, "seconds": 4.5}
+        self.assertEqual(scheduler._seconds_until_next_run(), 4.5)
+
+        mock_fetch_one.return_value = {"has_unscheduled": False, "seconds": 86400}
+        self.assertEqual(scheduler._seconds_until_next_run(), float(scheduler.SCHEDULER_POLL_SECONDS))
+
+        mock_fetch_one.return_value = {"has_unscheduled": False, "seconds": None}
+        self.assertEqual(scheduler._seconds_until_next_run(), float(scheduler.SCHEDULER_POLL_SECONDS))
+
+        mock_fetch_one.return_value = {"has_unscheduled": True, "seconds": 600}
+        self.assertEqual(scheduler._seconds_until_next_run(), 0.0)
+
+
+class WaitForWakeupTests(unittest.TestCase):
+    @patch("app.scheduler.select.select")
+    def test_returns_decoded_notifications(self, mock_select):
+        listener = FakeListener(payloads=['{"table_name": "mv_refresh_queue", "operation": "INSERT"}', "not json"])
+        mock_select.return_value = ([listener], [], [])
+
+        returned, notifications = scheduler._wait_for_wakeup(listener, 12.0)
+
+        self.assertIs(returned, listener)
+        self.assertEqual(notifications, [{"table_name": "mv_refresh_queue", "operation": "INSERT"}, {}])
+        self.assertEqual(mock_select.call_args[0][3], 12.0)
+
+    @patch("app.scheduler.select.select")
+    def test_pending_notifications_skip_the_wait(self, mock_select):
+        listener = FakeListener(pending=['{"table_name": "job_schedules"}'])
+
+        _returned, notifications = scheduler._wait_for_wakeup(listener, 30.0)
+
+        self.assertEqual(notifications, [{"table_name": "job_schedules"}])
+        mock_select.assert_not_called()
+
+    @patch("app.scheduler.emit")
+    @patch("app.scheduler.select.select", return_value=([], [], []))
+    @patch("app.scheduler.db.get_conn", side_effect=RuntimeError("db down"))
+    def test_falls_back_to_timed_wait_without_listener(self, _mock_get_conn, mock_select, _mock_emit):
+        returned, notifications = scheduler._wait_for_wakeup(None, 7.0)
+
+        self.assertEqual((returned, notifications), (None, []))
+        self.assertEqual(mock_select.call_args[0][3], 7.0)
+        self.assertFalse(scheduler.get_scheduler_status()["wakeup_listener"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import os
+import sys
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import db, stage_timing, tracing
+from app.graph_client import GraphClient, GraphError
+from app.jobs import graph_ingest
+
+
+class StageTimerTests(unittest.TestCase):
+    def test_records_nothing_without_a_current_timer(self):
+        with stage_timing.timed(stage_timing.DB_WRITE):
+            pass
+        stage_timing.record(stage_timing.TRANSFORM, 1.0)
+        self.assertIsNone(stage_timing.current_timer())
+
+    @patch("app.stage_timing.time.perf_counter")
+    def test_exclusive_block_excludes_nested_time(self, mock_perf_counter):
+        mock_perf_counter.side_effect = [0.0, 1.0, 2.0, 4.0, 5.0, 10.0]
+        with stage_timing.stage_timer() as timer:
+            with stage_timing.timed(stage_timing.TRANSFORM, exclusive=True):
+                with stage_timing.timed(stage_timing.COMMIT):
+                    pass
+            summary = timer.summary(rows=50)
+
+        self.assertEqual(summary["commit_seconds"], 2.0)
+        self.assertEqual(summary["transform_seconds"], 2.0)
+        self.assertEqual(summary["commits"], 1)
+        self.assertEqual(summary["db_statements"], 0)
+        self.assertEqual(summary["wall_seconds"], 10.0)
+        self.assertEqual(summary["other_seconds"], 6.0)
+        self.assertEqual(summary["rows_per_second"], 5.0)
+        self.assertIsNone(stage_timing.current_timer())
+
+    def test_copied_context_reaches_helper_threads(self):
+        with stage_timing.stage_timer() as timer:
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                futures = [
+                    executor.submit(copy_context().run, stage_timing.record, stage_timing.GRAPH_WAIT, 0.5)
+                    for _ in range(2)
+                ]
+                for future in futures:
+                    future.result()
+
+        self.assertEqual(timer.seconds[stage_timing.GRAPH_WAIT], 1.0)
+        self.assertEqual(timer.counts[stage_timing.GRAPH_WAIT], 2)
+
+    def test_graph_errors_propagate_through_timers_and_spans(self):
+        previous_exporter = tracing.set_exporter(tracing.InMemorySpanExporter())
+        try:
+            with self.assertRaises(GraphError) as ctx:
+                with stage_timing.stage_timer(), tracing.span("graph_ingest.stage"):
+                    with stage_timing.timed(stage_timing.TRANSFORM, exclusive=True):
+                        raise GraphError(410, "resyncRequired", "https://graph.example/delta")
+        finally:
+            tracing.set_exporter(previous_exporter)
+
+        self.assertEqual(ctx.exception.status_code, 410)
+
+    def test_statement_category(self):
+        self.assertEqual(db._statement_category("  SELECT id FROM msgraph_drives"), stage_timing.DB_READ)
+        self.assertEqual(db._statement_category(b"INSERT INTO msgraph_drive_items VALUES (1)"), stage_timing.DB_WRITE)
+
+    def test_stage_rows_written(self):
+        self.assertEqual(graph_ingest._stage_rows_written({"upserted_active": 10, "upserted_removed": 2}), 12)
+        self.assertEqual(graph_ingest._stage_rows_written({"skipped": True}), 0)
+
+
+class GraphClientTimingTests(unittest.TestCase):
+    @patch.dict(os.environ, {"ENTRA_TENANT_ID": "t", "ENTRA_CLIENT_ID": "c", "ENTRA_CLIENT_SECRET": "s"})
+    @patch("app.graph_client.ConfidentialClientApplication")
+    @patch("app.graph_client.time.sleep")
+    @patch("app.graph_client.requests.request")
+    def test_requests_and_throttle_sleeps_are_timed(self, mock_request, mock_sleep, _mock_cca):
+        throttled = SimpleNamespace(status_code=429, headers={"Retry-After": "3"}, ok=False)
+        ok = SimpleNamespace(status_code=200, headers={}, ok=True, json=lambda: {"value": []})
+        mock_request.side_effect = [throttled, ok]
+        client = GraphClient()
+
+        with patch.object(client, "_get_token", return_value="token"), stage_timing.stage_timer() as timer:
+            client.get_json("/users")
+
+        mock_sleep.assert_called_once_with(3.0)
+        self.assertEqual(timer.counts[stage_timing.GRAPH_WAIT], 2)
+        self.assertEqual(timer.counts[stage_timing.THROTTLE_SLEEP], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import sys
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.graph_client import GraphClient
+from benchmarks.fake_graph import DEFAULT_TOKEN, FakeGraphServer, FakeTenant, TenantBackend
+from benchmarks.synthetic_tenant import generate_tenant, tenant_counts
+
+
+PARAMS = {
+    "users": 20,
+    "groups": 4,
+    "members_per_group": 5,
+    "sites": 2,
+    "drives_per_site": 2,
+    "group_site_ratio": 0.5,
+    "onedrive_ratio": 0.25,
+    "items_per_drive": 30,
+    "folder_ratio": 0.2,
+    "max_depth": 3,
+    "sharing_density": 0.2,
+    "permission_fanout": 2,
+    "seed": 3,
+}
+
+
+class SyntheticTenantTests(unittest.TestCase):
+    def test_sizes_follow_params_and_generation_is_deterministic(self):
+        tenant = generate_tenant(PARAMS)
+        counts = tenant_counts(tenant)
+
+        self.assertEqual(tenant, generate_tenant(PARAMS))
+        self.assertEqual(counts["users"], 20)
+        self.assertEqual(counts["memberships"], 20)
+        self.assertEqual(counts["sites"], 4)
+        self.assertEqual(counts["drives"], 2 * 2 + 2 + 5)
+        self.assertEqual(counts["drive_items"], counts["drives"] * 30)
+        self.assertEqual(counts["permissions"], counts["shared_items"] * 2)
+
+    def test_references_resolve_within_the_tenant(self):
+        tenant = generate_tenant(PARAMS)
+        user_ids = {user["id"] for user in tenant["users"]}
+        group_ids = {group["id"] for group in tenant["groups"]}
+
+        for items in tenant["drive_items"].values():
+            folder_ids = {item["id"] for item in items if "folder" in item} | {"root"}
+            for item in items:
+                self.assertIn(item["parentReference"]["id"], folder_ids)
+                self.assertIn(item["createdBy"]["user"]["id"], user_ids)
+        for grants in tenant["permissions"].values():
+            for grant in grants:
+                granted = grant.get("grantedToV2") or {}
+                if "user" in granted:
+                    self.assertIn(granted["user"]["id"], user_ids)
+                if "group" in granted:
+                    self.assertIn(granted["group"]["id"], group_ids)
+
+    def test_fake_graph_serves_the_generated_tenant(self):
+        data = generate_tenant(PARAMS)
+        drive_id, items = next(iter(data["drive_items"].items()))
+        shared_key = next(iter(data["permissions"]))
+
+        with FakeGraphServer(TenantBackend(FakeTenant(data), page_size=7)) as server, patch.dict(
+            os.environ, {"GRAPH_BASE": server.base_url, "GRAPH_STATIC_TOKEN": DEFAULT_TOKEN}
+        ):
+            client = GraphClient()
+            users = client.collect_paged("/users?$top=999")
+            delta = client.collect_paged(f"/drives/{drive_id}/root/delta?$top=200")
+            permissions = client.collect_paged(f"/drives/{shared_key.replace('/', '/items/', 1)}/permissions")
+
+        self.assertEqual(len(users), 20)
+        self.assertEqual([item["id"] for item in delta], [item["id"] for item in items])
+        self.assertEqual(permissions, data["permissions"][shared_key])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import db, scheduler, tracing
+from app.graph_client import GraphClient
+
+
+class TracingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.exporter = tracing.InMemorySpanExporter()
+        self.previous_exporter = tracing.set_exporter(self.exporter)
+
+    def tearDown(self):
+        tracing.set_exporter(self.previous_exporter)
+
+
+class SpanTests(TracingTestCase):
+    def test_children_share_the_trace_and_inherit_run_id(self):
+        with tracing.span("job.execute", run_id="run-1") as parent:
+            with tracing.span("db.write", **{"db.rows": 3}) as child:
+                pass
+
+        self.assertEqual([span.name for span in self.exporter.spans], ["db.write", "job.execute"])
+        self.assertEqual(child.trace_id, parent.trace_id)
+        self.assertIs(child.parent, parent)
+        self.assertEqual(child.attributes["run_id"], "run-1")
+        self.assertIsNone(tracing.current_span())
+
+    def test_exception_marks_span_failed(self):
+        with self.assertRaises(ValueError):
+            with tracing.span("graph_ingest.stage"):
+                raise ValueError("boom")
+
+        (failed,) = self.exporter.spans
+        self.assertEqual(failed.status_code, tracing.STATUS_ERROR)
+        self.assertEqual(failed.events[0]["attributes"]["exception.type"], "ValueError")
+
+    def test_copied_context_carries_the_parent_to_helper_threads(self):
+        def fetch():
+            with tracing.span("graph.request"):
+                pass
+
+        with tracing.span("graph_ingest.stage", run_id="run-1") as stage:
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                executor.submit(copy_context().run, fetch).result()
+
+        (request_span,) = self.exporter.by_name("graph.request")
+        self.assertIs(request_span.parent, stage)
+        self.assertEqual(request_span.attributes["run_id"], "run-1")
+
+    def test_span_whose_parent_already_ended_is_exported_immediately(self):
+        with tracing.span("scheduler.dispatch", run_id="run-1"):
+            context = copy_context()
+        self.exporter.clear()
+
+        def run_job():
+            with tracing.span("job.execute"):
+                pass
+
+        context.run(run_job)
+
+        (job_span,) = self.exporter.spans
+        self.assertEqual(job_span.attributes["run_id"], "run-1")
+
+    def test_disabled_tracing_yields_noop_span(self):
+        tracing.set_exporter(None)
+        with tracing.span("db.write") as noop:
+            noop.set_attribute("db.rows", 1)
+        self.assertFalse(tracing.tracing_enabled())
+        self.assertIsNone(tracing.current_span())
+
+    def test_file_exporter_writes_otlp_json_lines(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "traces.jsonl")
+            tracing.set_exporter(tracing.FileSpanExporter(path))
+            with tracing.span("job.execute", run_id="run-1", **{"job.attempt": 2}):
+                pass
+            with open(path, encoding="utf-8") as handle:
+                payload = json.loads(handle.readline())
+
+        otlp_span = payload["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+        self.assertEqual(otlp_span["name"], "job.execute")
+        self.assertEqual(len(otlp_span["traceId"]), 32)
+        self.assertEqual(len(otlp_span["spanId"]), 16)
+        self.assertIn({"key": "run_id", "value": {"stringValue": "run-1"}}, otlp_span["attributes"])
+        self.assertIn({"key": "job.attempt", "value": {"intValue": "2"}}, otlp_span["attributes"])
+
+
+class InstrumentationTests(TracingTestCase):
+    @patch.dict(os.environ, {"ENTRA_TENANT_ID": "t", "ENTRA_CLIENT_ID": "c", "ENTRA_CLIENT_SECRET": "s"})
+    @patch("app.graph_client.ConfidentialClientApplication")
+    @patch("app.graph_client.time.sleep")
+    @patch("app.graph_client.requests.request")
+    def test_graph_request_has_attempt_and_retry_sleep_children(self, mock_request, _mock_sleep, _mock_cca):
+        throttled = SimpleNamespace(status_code=429, headers={"Retry-After": "1"}, ok=False)
+        ok = SimpleNamespace(status_code=200, headers={}, ok=True, json=lambda: {"value": []})
+        mock_request.side_effect = [throttled, ok]
+        client = GraphClient()
+
+        with patch.object(client, "_get_token", return_value="token"), tracing.span("graph_ingest.stage", run_id="run-1"):
+            client.get_json("/users")
+
+        (request_span,) = self.exporter.by_name("graph.request")
+        attempts = self.exporter.by_name("graph.attempt")
+        (sleep_span,) = self.exporter.by_name("graph.retry_sleep")
+        self.assertEqual(request_span.attributes["graph.endpoint"], "/users")
+        self.assertEqual(request_span.attributes["graph.attempts"], 2)
+        self.assertEqual(request_span.attributes["run_id"], "run-1")
+        self.assertEqual([span.attributes["http.response.status_code"] for span in attempts], [429, 200])
+        self.assertTrue(all(span.parent is request_span for span in attempts + [sleep_span]))
+        self.assertEqual(sleep_span.attributes["graph.retry_reason"], "429")
+
+    @patch("app.db.emit")
+    @patch("app.db.psycopg2.extras.execute_values")
+    def test_db_flush_span(self, _mock_execute_values, _mock_emit):
+        with tracing.span("graph_ingest.stage", run_id="run-1"):
+            db.execute_values(object(), "INSERT INTO msgraph_users (id) VALUES %s", [(1,), (2,)])
+
+        (write_span,) = self.exporter.by_name("db.write")
+        self.assertEqual(write_span.attributes["db.collection.name"], "msgraph_users")
+        self.assertEqual(write_span.attributes["db.rows"], 2)
+        self.assertEqual(write_span.attributes["run_id"], "run-1")
+
+    @patch("app.scheduler.log_job_run_log")
+    @patch("app.scheduler.run_mv_refresh", side_effect=RuntimeError("refresh failed"))
+    @patch("app.scheduler.get_job_type_license_feature", return_value=None)
+    @patch("app.scheduler.emit")
+    def test_execute_job_span_records_status(self, _mock_emit, _mock_feature, _mock_refresh, _mock_log):
+        status, _error = scheduler._execute_job("mv_refresh", run_id="run-1", job_id="job-1")
+
+        (job_span,) = self.exporter.by_name("job.execute")
+        self.assertEqual(status, "failed")
+        self.assertEqual(job_span.attributes["job.status"], "failed")
+        self.assertEqual(job_span.attributes["run_id"], "run-1")
+        self.assertEqual(job_span.status_code, tracing.STATUS_ERROR)
+
+
+if __name__ == "__main__":
+    unittest.main()